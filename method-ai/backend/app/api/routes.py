@@ -2,83 +2,458 @@
 
 import logging
 import uuid
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.serialization import (
+    ProcedureJSONResponse,
+    encode_procedure_result,
+    to_patch_response,
+)
+from app.models.records import ProcedureResult
 from app.models.schemas import (
+    AdmissionStatsResponse,
+    EquipmentAvailabilityResponse,
+    EquipmentBookingRequest,
+    EquipmentBookingResponse,
+    FeedbackBatchRequest,
+    FeedbackBatchResponse,
+    FeedbackBatchResult,
+    FeedbackOutcome,
     FeedbackRequest,
     FeedbackResponse,
     GenerateProcedureRequest,
     GenerateProcedureResponse,
+    LabContextPatch,
+    LabProfileRequest,
+    LabProfileResponse,
+    PatchProcedureResponse,
+    PlanUploadRequest,
+    PlanUploadResponse,
+    PrefetchStatsResponse,
+    ProcedureHistoryResponse,
+    ProcedureVersionResponse,
+    ProcedureVersionSummary,
+)
+from app.services.admission import (
+    GENERATE_STAGE,
+    PLAN_STAGE,
+    AdmissionRejectedError,
+    admission_stats,
+    admit,
+)
+from app.services.equipment_bookings import (
+    Booking,
+    BookingConflictError,
+    BookingNotFoundError,
+    create_booking,
+    delete_booking,
+    earliest_start,
+    find_conflicts,
+)
+from app.services.feedback_export import InvalidCursorError, export_feedback
+from app.services.feedback_store import feedback_record, store_feedback, store_feedback_batch
+from app.services.idempotency_store import (
+    IdempotencyInProgressError,
+    IdempotencyKeyMismatchError,
+    request_fingerprint,
+    run_idempotent,
+)
+from app.services.lab_profiles import (
+    LabProfile,
+    LabProfileNotFoundError,
+    create_lab_profile,
+    get_lab_profile,
+    update_lab_profile,
 )
-from app.services.feedback_store import store_feedback
-from app.services.procedure_generator import generate_procedure
-from app.services.retrosynthesis_adapter import get_retrosynthesis_plan
-from app.services.risk_annotator import annotate_risks
+from app.services.pipeline import patch_procedure, resolve_plan, run_pipeline
+from app.services.plan_store import PlanNotFoundError, get_plan_steps, store_plan
+from app.services.prefetcher import prefetch_stats, record_target_request
+from app.services.procedure_history import (
+    ProcedureVersionInfo,
+    ProcedureVersionNotFoundError,
+    get_version,
+    list_versions,
+)
+from app.services.procedure_store import ProcedureNotFoundError, get_procedure_state
+from app.services.request_registry import is_known_request_id
+from app.services.retrosynthesis_adapter import is_rxn_configured
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_UNKNOWN_REQUEST_ID = "request_id was not issued by this service"
+_UNKNOWN_LAB_PROFILE = "lab_profile_id does not name a stored lab profile"
+_UNKNOWN_PLAN = "plan_id does not name a stored plan"
+
 
-@router.post("/v1/generate-procedure", response_model=GenerateProcedureResponse)
+@router.post(
+    "/v1/generate-procedure",
+    response_model=GenerateProcedureResponse,
+    response_class=ProcedureJSONResponse,
+)
 async def generate_procedure_endpoint(
     request: GenerateProcedureRequest,
-) -> GenerateProcedureResponse:
+    idempotency_key: str | None = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Client key making retries return the original response",
+    ),
+    deadline_ms: int | None = Header(
+        None,
+        alias="X-Deadline-Ms",
+        gt=0,
+        description="Time budget for the response in milliseconds",
+    ),
+) -> ProcedureJSONResponse:
     """
     Generate a draft lab procedure from a target molecule and lab context.
 
     This endpoint produces DRAFT procedures intended for review by qualified
     professionals. Generated content is not validated and may contain errors.
+
+    Requests carrying an ``Idempotency-Key`` run at most once per key; retries
+    replay the stored response, including its ``request_id``.
+
+    Under overload the request is rejected with ``503`` and a ``Retry-After``
+    header instead of queueing indefinitely.
+
+    With a deadline (``X-Deadline-Ms`` header or ``deadline_ms`` field, the
+    tighter one wins), stages short of time take cheaper paths, listed in
+    the response's ``degradations``.
+
+    Instead of ``lab_context``, a request may send the ``lab_profile_id`` of a
+    profile stored with ``POST /v1/lab-profiles``, and instead of
+    ``retrosynthesis_plan`` the ``plan_id`` of a plan stored with
+    ``POST /v1/plans``; unknown IDs get ``422``.
     """
+    deadline = Deadline.from_ms(deadline_ms, request.deadline_ms)
+
+    if idempotency_key is None:
+        return ProcedureJSONResponse(await _run_generate_pipeline(request, deadline))
+
+    async def compute() -> bytes:
+        return encode_procedure_result(await _run_generate_pipeline(request, deadline))
+
+    try:
+        body, replayed = await run_idempotent(
+            idempotency_key, request_fingerprint(request), compute
+        )
+    except IdempotencyKeyMismatchError:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+    except IdempotencyInProgressError:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+        )
+
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return ProcedureJSONResponse(body, headers=headers)
+
+
+async def _run_generate_pipeline(
+    request: GenerateProcedureRequest, deadline: Deadline | None
+) -> ProcedureResult:
+    """Run the generation pipeline under a new request_id, stage by stage."""
     request_id = str(uuid.uuid4())
     logger.info(f"Processing generate-procedure request: {request_id}")
 
+    lab_profile: LabProfile | None = None
+    if request.lab_profile_id is not None:
+        try:
+            lab_profile = get_lab_profile(request.lab_profile_id)
+        except LabProfileNotFoundError:
+            raise HTTPException(status_code=422, detail=_UNKNOWN_LAB_PROFILE)
+    if request.plan_id is not None:
+        try:
+            get_plan_steps(request.plan_id)
+        except PlanNotFoundError:
+            raise HTTPException(status_code=422, detail=_UNKNOWN_PLAN)
+
     try:
-        # Get retrosynthesis plan
-        if request.retrosynthesis_plan is not None:
-            plan = {
-                "source": "user_provided",
-                "target_smiles": request.target_smiles,
-                "steps": request.retrosynthesis_plan.get("steps", []),
-            }
-            logger.info(f"Using user-provided retrosynthesis plan for {request_id}")
-        else:
-            plan = get_retrosynthesis_plan(request.target_smiles)
-            logger.info(f"Retrieved retrosynthesis plan from {plan['source']} for {request_id}")
-
-        # Generate procedure
-        procedure = generate_procedure(
-            plan=plan,
-            lab_context=request.lab_context,
-            notes=request.notes,
+        async with admit(PLAN_STAGE, deadline):
+            plan = await run_in_threadpool(resolve_plan, request, request_id, deadline)
+        async with admit(GENERATE_STAGE, deadline):
+            return await run_in_threadpool(
+                run_pipeline,
+                request,
+                request_id,
+                store_state=True,
+                plan=plan,
+                deadline=deadline,
+                lab_profile=lab_profile,
+            )
+    except AdmissionRejectedError as e:
+        raise _overloaded(e) from e
+    except Exception as e:
+        logger.error(f"Error processing request {request_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+@router.patch("/v1/procedures/{request_id}", response_model=PatchProcedureResponse)
+async def patch_procedure_endpoint(
+    request_id: str, patch: LabContextPatch
+) -> PatchProcedureResponse:
+    """
+    Regenerate a procedure after editing its lab context.
+
+    Only the given lab context fields change. The plan and unaffected steps
+    and risk checks are reused, and the response keeps the original
+    ``request_id`` and includes a diff against the previous version.
+    """
+    logger.info(f"Patching procedure: {request_id}")
+
+    try:
+        async with admit(GENERATE_STAGE):
+            result, diff = await run_in_threadpool(patch_procedure, request_id, patch)
+    except AdmissionRejectedError as e:
+        raise _overloaded(e) from e
+    except ProcedureNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"No editable procedure for request {request_id}"
         )
+    except Exception as e:
+        logger.error(f"Error patching procedure {request_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+    return to_patch_response(result, diff)
+
+
+@router.get("/v1/procedures/{request_id}", response_model=ProcedureVersionResponse)
+async def get_procedure_endpoint(request_id: str) -> ProcedureVersionResponse:
+    """Get the latest saved version of a procedure."""
+    return await _procedure_version_response(request_id, None)
+
+
+@router.get("/v1/procedures/{request_id}/versions", response_model=ProcedureHistoryResponse)
+async def list_procedure_versions_endpoint(
+    request_id: str,
+    cursor: int | None = Query(default=None, description="next_cursor of the previous page"),
+    limit: int = Query(default=50, ge=1, le=500, description="Maximum versions per page"),
+) -> ProcedureHistoryResponse:
+    """
+    List the saved versions of a procedure, newest first.
 
-        # Annotate risks
-        risk_flags, fallback_options = annotate_risks(
-            procedure=procedure,
-            lab_context=request.lab_context,
+    A version is saved when the procedure is generated and on every edit
+    that changes its lab context. Pass ``next_cursor`` back as ``cursor``
+    for the next page.
+    """
+    try:
+        versions, next_cursor = await run_in_threadpool(
+            list_versions, request_id, before=cursor, limit=limit
         )
+    except ProcedureVersionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No saved versions of {request_id}")
+    return ProcedureHistoryResponse(
+        request_id=request_id,
+        versions=[_version_summary(info) for info in versions],
+        next_cursor=next_cursor,
+    )
+
 
-        return GenerateProcedureResponse(
-            procedure=procedure,
-            risk_flags=risk_flags,
-            fallback_options=fallback_options,
-            citations=[],
-            disclaimer=(
-                "DRAFT PROCEDURE - This is a computer-generated draft intended for "
-                "review by qualified professionals. It has not been validated and may "
-                "contain errors. Users must verify all steps, assess risks, and ensure "
-                "compliance with applicable regulations before execution. No warranty "
-                "of safety, accuracy, or fitness for purpose is provided."
-            ),
-            version="0.1.0",
-            request_id=request_id,
+@router.get(
+    "/v1/procedures/{request_id}/versions/{version}", response_model=ProcedureVersionResponse
+)
+async def get_procedure_version_endpoint(request_id: str, version: int) -> ProcedureVersionResponse:
+    """Get one saved version of a procedure."""
+    return await _procedure_version_response(request_id, version)
+
+
+async def _procedure_version_response(
+    request_id: str, version: int | None
+) -> ProcedureVersionResponse:
+    """Response schema for a saved version, or 404."""
+    try:
+        info, document = await run_in_threadpool(get_version, request_id, version)
+    except ProcedureVersionNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"No saved version {version or 'latest'} of {request_id}"
         )
+    return ProcedureVersionResponse(
+        request_id=request_id, **_version_summary(info).model_dump(), **document
+    )
 
-    except Exception as e:
-        logger.error(f"Error processing request {request_id}: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+def _version_summary(info: ProcedureVersionInfo) -> ProcedureVersionSummary:
+    """Response schema for version metadata."""
+    return ProcedureVersionSummary(
+        version=info.version, created_at=info.created_at, changed_fields=list(info.changed_fields)
+    )
+
+
+@router.post("/v1/plans", response_model=PlanUploadResponse, status_code=201)
+async def upload_plan_endpoint(
+    request: PlanUploadRequest, response: Response
+) -> PlanUploadResponse:
+    """
+    Store a retrosynthesis plan under its content hash.
+
+    Generate-procedure requests can then send the returned ``plan_id``
+    instead of the full ``retrosynthesis_plan``. Uploading a plan that is
+    already stored returns its existing ``plan_id`` with ``200``.
+    """
+    plan_id, created = store_plan([step.model_dump() for step in request.steps])
+    if not created:
+        response.status_code = 200
+    return PlanUploadResponse(plan_id=plan_id, step_count=len(request.steps), created=created)
+
+
+@router.post("/v1/lab-profiles", response_model=LabProfileResponse, status_code=201)
+async def create_lab_profile_endpoint(request: LabProfileRequest) -> LabProfileResponse:
+    """
+    Store a lab context under a new ``lab_profile_id``.
+
+    Generate-procedure requests can then send the ID instead of the full
+    ``lab_context``. Risk checks and step values that depend on the lab
+    context alone are computed once per profile version, not per request.
+    """
+    profile = create_lab_profile(request.name, request.lab_context)
+    return _lab_profile_response(profile)
+
+
+@router.get("/v1/lab-profiles/{lab_profile_id}", response_model=LabProfileResponse)
+async def get_lab_profile_endpoint(lab_profile_id: str) -> LabProfileResponse:
+    """Get a stored lab profile."""
+    try:
+        profile = get_lab_profile(lab_profile_id)
+    except LabProfileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No lab profile {lab_profile_id}")
+    return _lab_profile_response(profile)
+
+
+@router.put("/v1/lab-profiles/{lab_profile_id}", response_model=LabProfileResponse)
+async def update_lab_profile_endpoint(
+    lab_profile_id: str, request: LabProfileRequest
+) -> LabProfileResponse:
+    """
+    Replace the name and lab context of a stored lab profile.
+
+    The profile's version is incremented, and every worker recomputes its
+    precomputed state on next use. Procedures generated before the update
+    keep the lab context they were generated with.
+    """
+    try:
+        profile = update_lab_profile(lab_profile_id, request.name, request.lab_context)
+    except LabProfileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No lab profile {lab_profile_id}")
+    return _lab_profile_response(profile)
+
+
+def _lab_profile_response(profile: LabProfile) -> LabProfileResponse:
+    """Response schema for a compiled profile."""
+    return LabProfileResponse(
+        lab_profile_id=profile.lab_profile_id,
+        name=profile.name,
+        version=profile.version,
+        lab_context=profile.lab_context,
+    )
+
+
+@router.post(
+    "/v1/equipment/bookings", response_model=EquipmentBookingResponse, status_code=201
+)
+async def create_booking_endpoint(request: EquipmentBookingRequest) -> EquipmentBookingResponse:
+    """
+    Book an instrument for a time window.
+
+    Generated procedures are flagged when equipment they set up is booked
+    during their session. Bookings overlapping an existing booking of the
+    same instrument are rejected with ``409``.
+    """
+    try:
+        booking = await run_in_threadpool(
+            create_booking, request.equipment, request.start, request.end, request.booked_by
+        )
+    except BookingConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"{request.equipment} is already booked: {e}",
+        )
+    return _booking_response(booking)
+
+
+@router.delete("/v1/equipment/bookings/{booking_id}", status_code=204)
+async def delete_booking_endpoint(booking_id: str) -> Response:
+    """Cancel an equipment booking."""
+    try:
+        await run_in_threadpool(delete_booking, booking_id)
+    except BookingNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No booking {booking_id}")
+    return Response(status_code=204)
+
+
+@router.get("/v1/equipment/availability", response_model=EquipmentAvailabilityResponse)
+async def equipment_availability_endpoint(
+    equipment: list[str] = Query(..., description="Instruments needed (repeatable)"),
+    hours: float = Query(..., gt=0, description="Length of the window, e.g. time_budget_hours"),
+    after: datetime | None = Query(default=None, description="Earliest start, default now"),
+) -> EquipmentAvailabilityResponse:
+    """Find the earliest window with all the given instruments free."""
+    if after is None:
+        after = datetime.now(timezone.utc)
+    start = await run_in_threadpool(earliest_start, equipment, hours, after)
+    conflicts = await run_in_threadpool(
+        find_conflicts, equipment, after, after + timedelta(hours=hours)
+    )
+    return EquipmentAvailabilityResponse(
+        equipment=equipment,
+        hours=hours,
+        earliest_start=start,
+        conflicts=[_booking_response(booking) for booking in conflicts],
+    )
+
+
+def _booking_response(booking: Booking) -> EquipmentBookingResponse:
+    """Response schema for a booking."""
+    return EquipmentBookingResponse(
+        booking_id=booking.booking_id,
+        equipment=booking.equipment,
+        start=booking.start,
+        end=booking.end,
+        booked_by=booking.booked_by,
+    )
+
+
+def _overloaded(error: AdmissionRejectedError) -> HTTPException:
+    """503 response for a request shed by admission control."""
+    return HTTPException(
+        status_code=503,
+        detail="Server is overloaded, retry later",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@router.get("/v1/admission", response_model=AdmissionStatsResponse)
+async def admission_stats_endpoint() -> AdmissionStatsResponse:
+    """
+    Report admission control occupancy and counters per pipeline stage.
+
+    Counters are per worker process and reset on restart.
+    """
+    return AdmissionStatsResponse(enabled=settings.admission_enabled, stages=admission_stats())
+
+
+@router.get("/v1/prefetch", response_model=PrefetchStatsResponse)
+async def prefetch_stats_endpoint() -> PrefetchStatsResponse:
+    """
+    Report the background plan prefetcher's counters.
+
+    Counters are per worker process and reset on restart.
+    """
+    return PrefetchStatsResponse(
+        enabled=settings.prefetch_enabled and is_rxn_configured(), **prefetch_stats()
+    )
 
 
 @router.post("/v1/feedback", response_model=FeedbackResponse)
@@ -87,8 +462,16 @@ async def submit_feedback(request: FeedbackRequest) -> FeedbackResponse:
     Submit feedback on a generated procedure.
 
     Feedback helps improve future procedure generation.
+
+    Feedback for a ``request_id`` this deployment never issued is stored with
+    ``known_request_id: false``, or rejected with ``422`` when
+    FEEDBACK_REQUIRE_KNOWN_REQUEST_ID is set.
     """
     logger.info(f"Received feedback for request: {request.request_id}")
+    known = is_known_request_id(request.request_id)
+    if not known and settings.feedback_require_known_request_id:
+        raise HTTPException(status_code=422, detail=_UNKNOWN_REQUEST_ID)
+    target_smiles = _feedback_target(request.request_id) if known else None
 
     try:
         store_feedback(
@@ -96,9 +479,133 @@ async def submit_feedback(request: FeedbackRequest) -> FeedbackResponse:
             edits=request.edits,
             outcome=request.outcome,
             notes=request.notes,
+            target_smiles=target_smiles,
+            known_request_id=known,
         )
-        return FeedbackResponse(stored=True)
+        return FeedbackResponse(stored=True, known_request_id=known)
 
     except Exception as e:
         logger.error(f"Error storing feedback for {request.request_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to store feedback") from e
+
+
+@router.post("/v1/feedback:batch", response_model=FeedbackBatchResponse)
+async def submit_feedback_batch(batch: FeedbackBatchRequest) -> FeedbackBatchResponse:
+    """
+    Submit many feedback records at once, e.g. from an ELN export.
+
+    Each record is validated on its own; valid records are stored in a single
+    append and invalid ones are reported without failing the batch. Unknown
+    request_ids are flagged or rejected as for ``/v1/feedback``.
+    """
+    if len(batch.records) > settings.feedback_batch_max_records:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batch exceeds {settings.feedback_batch_max_records} records",
+        )
+    logger.info(f"Received feedback batch of {len(batch.records)} records")
+
+    results = []
+    records = []
+    for index, raw in enumerate(batch.records):
+        try:
+            request = FeedbackRequest.model_validate(raw)
+        except ValidationError as e:
+            request_id = raw.get("request_id")
+            results.append(
+                FeedbackBatchResult(
+                    index=index,
+                    request_id=request_id if isinstance(request_id, str) else None,
+                    stored=False,
+                    error=_validation_message(e),
+                )
+            )
+            continue
+        known = is_known_request_id(request.request_id)
+        if not known and settings.feedback_require_known_request_id:
+            results.append(
+                FeedbackBatchResult(
+                    index=index,
+                    request_id=request.request_id,
+                    stored=False,
+                    known_request_id=False,
+                    error=f"request_id: {_UNKNOWN_REQUEST_ID}",
+                )
+            )
+            continue
+        records.append(
+            feedback_record(
+                request_id=request.request_id,
+                edits=request.edits,
+                outcome=request.outcome,
+                notes=request.notes,
+                target_smiles=_feedback_target(request.request_id) if known else None,
+                known_request_id=known,
+            )
+        )
+        results.append(
+            FeedbackBatchResult(
+                index=index, request_id=request.request_id, stored=True, known_request_id=known
+            )
+        )
+
+    try:
+        stored = store_feedback_batch(records)
+    except Exception as e:
+        logger.error(f"Error storing feedback batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to store feedback") from e
+
+    return FeedbackBatchResponse(stored=stored, rejected=len(results) - stored, results=results)
+
+
+@router.get("/v1/feedback/export", response_class=StreamingResponse)
+async def export_feedback_endpoint(
+    outcome: list[FeedbackOutcome] | None = Query(
+        default=None, description="Only export these outcomes (repeatable)"
+    ),
+    since: datetime | None = Query(default=None, description="Only export records at or after"),
+    until: datetime | None = Query(default=None, description="Only export records at or before"),
+    request_id_prefix: str | None = Query(
+        default=None, description="Only export request IDs starting with this"
+    ),
+    cursor: str | None = Query(default=None, description="next_cursor of a previous export"),
+    limit: int | None = Query(default=None, ge=1, description="Maximum records to export"),
+) -> StreamingResponse:
+    """
+    Stream stored feedback as NDJSON, one record per line.
+
+    The last line is a trailer with ``next_cursor``, ``exported`` and
+    ``complete``; pass ``next_cursor`` back as ``cursor`` to resume, e.g.
+    after a dropped connection or to pick up records stored since.
+    """
+    try:
+        chunks = await run_in_threadpool(
+            export_feedback,
+            outcomes=[value.value for value in outcome] if outcome else None,
+            since=since,
+            until=until,
+            request_id_prefix=request_id_prefix,
+            cursor=cursor,
+            limit=limit,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
+def _validation_message(error: ValidationError) -> str:
+    """Compact description of why a record failed validation."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'record'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _feedback_target(request_id: str) -> str | None:
+    """Target of a procedure that received feedback, counted as a request for it."""
+    try:
+        target_smiles: str = get_procedure_state(request_id)["request"]["target_smiles"]
+    except ProcedureNotFoundError:
+        return None
+    record_target_request(target_smiles)
+    return target_smiles
@@ -0,0 +1,230 @@
+"""Command-line interface for Method.AI.
+
+Usage:
+    method-ai                       Run the API server (same as ``serve``)
+    method-ai serve --workers 4     Run the API server with 4 worker processes
+    method-ai batch requests.jsonl -o results.jsonl --checkpoint run.ckpt
+                                    Generate procedures offline from JSONL
+    method-ai index-corpus corpus.jsonl
+                                    Build the citation index from a procedure corpus
+    method-ai build-safety-db compounds.jsonl
+                                    Build the compound safety database
+    method-ai import-inventory inventory.csv
+                                    Import reagent containers into the lab inventory
+"""
+
+import argparse
+import logging
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import BinaryIO
+
+from app.core.config import settings
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with all subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="method-ai",
+        description="Method.AI command-line interface",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve = subparsers.add_parser("serve", help="Run the API server")
+    serve.add_argument("--host", default=settings.api_host, help="Bind address")
+    serve.add_argument("--port", type=int, default=settings.api_port, help="Bind port")
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=settings.api_workers,
+        help="Number of worker processes sharing one local cache",
+    )
+    serve.set_defaults(handler=_serve)
+
+    batch = subparsers.add_parser(
+        "batch", help="Generate procedures offline from JSONL requests"
+    )
+    batch.add_argument(
+        "input", nargs="?", default="-", help="JSONL request file, or - for stdin"
+    )
+    batch.add_argument(
+        "-o", "--output", default="-", help="JSONL result file, or - for stdout"
+    )
+    batch.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (1 runs in-process)",
+    )
+    batch.add_argument(
+        "--chunk-size", type=int, default=100, help="Lines dispatched to a worker at a time"
+    )
+    batch.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint file; an existing checkpoint resumes the run",
+    )
+    batch.set_defaults(handler=_batch)
+
+    index_corpus = subparsers.add_parser(
+        "index-corpus", help="Build the citation index from procedure JSONL files"
+    )
+    index_corpus.add_argument("corpus", nargs="+", help="Procedure corpus JSONL files")
+    index_corpus.add_argument(
+        "-o", "--output", default=settings.citation_index_path, help="Index file to write"
+    )
+    index_corpus.add_argument(
+        "--feedback",
+        default=settings.feedback_storage_path,
+        help="Feedback JSONL used to weight procedures by outcome",
+    )
+    index_corpus.add_argument(
+        "--no-feedback", action="store_true", help="Rank without feedback weighting"
+    )
+    index_corpus.set_defaults(handler=_index_corpus)
+
+    safety_db = subparsers.add_parser(
+        "build-safety-db", help="Build the compound safety database from JSONL datasets"
+    )
+    safety_db.add_argument("dataset", nargs="+", help="Compound safety JSONL files")
+    safety_db.add_argument(
+        "-o", "--output", default=settings.compound_safety_db_path, help="Database file to write"
+    )
+    safety_db.set_defaults(handler=_build_safety_db)
+
+    inventory = subparsers.add_parser(
+        "import-inventory", help="Import reagent containers from CSV or JSONL files"
+    )
+    inventory.add_argument("source", nargs="+", help="Inventory CSV or JSONL files")
+    inventory.add_argument(
+        "-o", "--output", default=settings.inventory_path, help="Inventory store to update"
+    )
+    inventory.add_argument(
+        "--replace",
+        action="store_true",
+        help="Replace the stored inventory instead of merging into it",
+    )
+    inventory.set_defaults(handler=_import_inventory)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """
+    Run the command-line interface.
+
+    Args:
+        argv: Arguments, defaults to sys.argv[1:]
+
+    Returns:
+        Process exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        args = parser.parse_args(["serve"])
+
+    if getattr(args, "workers", 1) < 1:
+        parser.error("--workers must be at least 1")
+    if getattr(args, "chunk_size", 1) < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    return int(args.handler(args))
+
+
+def _serve(args: argparse.Namespace) -> int:
+    """Run the API server."""
+    from app.main import run
+
+    run(host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+def _batch(args: argparse.Namespace) -> int:
+    """Run an offline batch."""
+    from app.services.batch_runner import BatchCheckpoint, run_batch
+
+    # Keep stdout clean for results
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    checkpoint = BatchCheckpoint.load(args.checkpoint) if args.checkpoint else BatchCheckpoint()
+
+    input_stream: BinaryIO = (
+        sys.stdin.buffer if args.input == "-" else open(args.input, "rb")  # noqa: SIM115
+    )
+    if args.output == "-":
+        output_stream: BinaryIO = sys.stdout.buffer
+    elif checkpoint.lines_done and Path(args.output).exists():
+        # Drop anything written after the last checkpoint, then append
+        output_stream = open(args.output, "r+b")  # noqa: SIM115
+        output_stream.truncate(checkpoint.output_offset)
+        output_stream.seek(checkpoint.output_offset)
+    else:
+        output_stream = open(args.output, "wb")  # noqa: SIM115
+        checkpoint.output_offset = 0
+
+    try:
+        stats = run_batch(
+            input_stream,
+            output_stream,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint,
+            checkpoint=checkpoint,
+        )
+    finally:
+        if input_stream is not sys.stdin.buffer:
+            input_stream.close()
+        if output_stream is not sys.stdout.buffer:
+            output_stream.close()
+
+    print(
+        f"Batch complete: {stats.succeeded} succeeded, {stats.failed} failed, "
+        f"{stats.lines_done} lines read",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _index_corpus(args: argparse.Namespace) -> int:
+    """Build the citation index."""
+    from app.services.citation_index import build_citation_index
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    count = build_citation_index(
+        args.corpus,
+        args.output,
+        feedback_path=None if args.no_feedback else args.feedback,
+    )
+    print(f"Indexed {count} procedures into {args.output}", file=sys.stderr)
+    return 0
+
+
+def _build_safety_db(args: argparse.Namespace) -> int:
+    """Build the compound safety database."""
+    from app.services.compound_safety import build_compound_safety_db
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    count = build_compound_safety_db(args.dataset, args.output)
+    print(f"Wrote safety data for {count} compounds into {args.output}", file=sys.stderr)
+    return 0
+
+
+def _import_inventory(args: argparse.Namespace) -> int:
+    """Import containers into the lab inventory."""
+    from app.services.inventory import import_inventory
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    count = import_inventory(args.source, args.output, replace=args.replace)
+    print(f"Imported {count} containers into {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,11 +16,13 @@ class Settings(BaseSettings):
     # IBM RXN Configuration
     rxn_api_key: str | None = None
     rxn_project_id: str | None = None
+    rxn_requests_per_minute: float = 5.0
 
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     debug: bool = False
+    api_workers: int = 1
 
     # Logging
     log_level: str = "INFO"
@@ -30,6 +32,99 @@ class Settings(BaseSettings):
 
     # Storage
     feedback_storage_path: str = "app/services/_feedback/feedback.jsonl"
+    feedback_batch_max_records: int = 50000
+    feedback_index_interval_bytes: int = 65536
+    feedback_require_known_request_id: bool = False
+
+    # Registry of issued request IDs (exact SQLite set plus a Bloom filter)
+    request_registry_path: str = "app/services/_registry/request_ids.sqlite3"
+    request_registry_capacity: int = 10000000
+    request_registry_error_rate: float = 0.01
+
+    # Caches ("memory" per process, or "sqlite" shared by all local workers)
+    cache_backend: str = "memory"
+    cache_db_path: str = "app/services/_cache/cache.sqlite3"
+
+    # Chemistry
+    smiles_cache_size: int = 100000
+    procedure_block_cache_size: int = 10000
+    hazard_scan_cache_size: int = 10000
+    stoichiometry_assumed_yield: float = 1.0
+
+    # Plan cache
+    plan_cache_ttl_seconds: float = 86400.0
+    plan_cache_max_entries: int = 10000
+    plan_cache_snapshot_path: str = "app/services/_cache/plan_cache.jsonl"
+
+    # Retrosynthesis plans uploaded by POST /v1/plans and referenced by plan_id
+    plan_store_path: str = "app/services/_plans/plans.sqlite3"
+    plan_store_cache_size: int = 1000
+
+    # Lab profiles (named lab contexts referenced by lab_profile_id)
+    lab_profile_db_path: str = "app/services/_profiles/lab_profiles.sqlite3"
+    lab_profile_cache_size: int = 1000
+
+    # Stored procedures, for incremental regeneration on lab context edits
+    procedure_store_ttl_seconds: float = 86400.0
+    procedure_store_max_entries: int = 10000
+
+    # Persistent version history of generated and edited procedures
+    procedure_history_enabled: bool = True
+    procedure_history_path: str = "app/services/_history/procedure_history.sqlite3"
+    procedure_history_snapshot_interval: int = 10
+
+    # Similar-target plan reuse
+    similarity_reuse_enabled: bool = True
+    similarity_reuse_threshold: float = 0.85
+    similarity_index_max_entries: int = 1000000
+
+    # Citations from the local procedure corpus (built by `method-ai index-corpus`)
+    citation_index_path: str = "app/services/_corpus/citations.idx"
+    citation_top_k: int = 3
+
+    # Compound safety data (built by `method-ai build-safety-db`)
+    compound_safety_db_path: str = "app/services/_corpus/compound_safety.idx"
+
+    # Lab inventory (imported by `method-ai import-inventory`)
+    inventory_path: str = "app/services/_inventory/inventory.jsonl"
+    inventory_low_stock_mg: float = 100.0
+
+    # Equipment bookings, checked against each procedure's session
+    equipment_bookings_path: str = "app/services/_bookings/equipment_bookings.sqlite3"
+    equipment_booking_horizon_days: float = 30.0
+
+    # Background plan prefetching for hot targets (only with RXN configured)
+    prefetch_enabled: bool = True
+    prefetch_interval_seconds: float = 60.0
+    prefetch_top_targets: int = 50
+    prefetch_min_score: float = 2.0
+    prefetch_refresh_ahead_seconds: float = 3600.0
+    prefetch_rxn_share: float = 0.2
+    prefetch_idle_max_active: int = 0
+    prefetch_history_half_life_seconds: float = 604800.0
+    prefetch_history_max_targets: int = 10000
+
+    # Startup warm-up
+    warmup_synthetic_request: bool = False
+
+    # Admission control (per worker process)
+    admission_enabled: bool = True
+    admission_plan_concurrency: int = 8
+    admission_generate_concurrency: int = 4
+    admission_max_queue: int = 32
+    admission_queue_timeout_seconds: float = 10.0
+
+    # Request deadlines (X-Deadline-Ms header or deadline_ms field)
+    deadline_rxn_min_seconds: float = 5.0
+    deadline_generation_reserve_seconds: float = 0.05
+    deadline_citation_min_seconds: float = 0.01
+    deadline_similarity_threshold: float = 0.6
+
+    # Idempotency
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_max_entries: int = 10000
+    idempotency_wait_seconds: float = 30.0
+    idempotency_pending_ttl_seconds: float = 300.0
 
 
 settings = Settings()
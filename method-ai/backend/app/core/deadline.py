@@ -0,0 +1,59 @@
+"""Request deadlines.
+
+A client may bound how long a generate-procedure request takes, with the
+``X-Deadline-Ms`` header or the ``deadline_ms`` request field. The deadline
+is fixed when the request arrives and passed through every pipeline stage.
+A stage that lacks the time for its usual work does something cheaper and
+records a degradation code, which is returned in the response.
+"""
+
+import time
+
+# Degradation codes reported in responses
+PLAN_SIMILAR_TARGET = "plan_similar_target"
+PLAN_PLACEHOLDER = "plan_placeholder"
+PLAN_RXN_TIMEOUT = "plan_rxn_timeout"
+CITATIONS_SKIPPED = "citations_skipped"
+
+
+class Deadline:
+    """Point in time by which a request should be answered."""
+
+    def __init__(self, seconds: float) -> None:
+        """
+        Start a deadline.
+
+        Args:
+            seconds: Time budget from now
+        """
+        self.expires_at = time.monotonic() + seconds
+        self.degradations: list[str] = []
+
+    @classmethod
+    def from_ms(cls, *budgets_ms: int | None) -> "Deadline | None":
+        """
+        Start a deadline from the tightest of several optional budgets.
+
+        Args:
+            budgets_ms: Budgets in milliseconds; None means no budget
+
+        Returns:
+            Deadline, or None if no budget was given
+        """
+        given = [budget for budget in budgets_ms if budget is not None]
+        if not given:
+            return None
+        return cls(min(given) / 1000)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least this much time is left."""
+        return self.remaining() >= seconds
+
+    def degrade(self, code: str) -> None:
+        """Record that a stage took a cheaper path."""
+        if code not in self.degradations:
+            self.degradations.append(code)
@@ -0,0 +1,225 @@
+"""Fast JSON serialization for procedure responses.
+
+The default FastAPI path re-validates the returned model against the
+``response_model`` and then re-encodes every field, including the constant
+disclaimer and version strings. Responses built by the pipeline are already
+made of validated parts, so they are rendered here directly, with the
+constant fragments encoded once at import time.
+
+This module is also the API boundary for the service layer's internal
+records. ``encode_procedure_result`` renders a pipeline result straight to
+JSON, without building pydantic models at all; ``to_procedure_response``
+converts one to the response schema for endpoints that need the model.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from pydantic_core import to_json
+from starlette.responses import Response
+
+from app import __version__
+from app.models.records import ProcedureResult
+from app.models.schemas import (
+    GenerateProcedureResponse,
+    PatchProcedureResponse,
+    ProcedureDiff,
+    ProcedureStep,
+)
+
+PROCEDURE_DISCLAIMER = (
+    "DRAFT PROCEDURE - This is a computer-generated draft intended for "
+    "review by qualified professionals. It has not been validated and may "
+    "contain errors. Users must verify all steps, assess risks, and ensure "
+    "compliance with applicable regulations before execution. No warranty "
+    "of safety, accuracy, or fitness for purpose is provided."
+)
+
+# Pre-encoded static fragments, in GenerateProcedureResponse field order
+_OPEN = b'{"procedure":'
+_RISK_FLAGS = b',"risk_flags":'
+_FALLBACK_OPTIONS = b',"fallback_options":'
+_CITATIONS = b',"citations":'
+_DISCLAIMER = b',"disclaimer":'
+_VERSION = b',"version":'
+_REQUEST_ID = b',"request_id":'
+_DEGRADATIONS = b',"degradations":'
+_CLOSE = b"}"
+
+_DISCLAIMER_JSON = to_json(PROCEDURE_DISCLAIMER)
+_VERSION_JSON = to_json(__version__)
+
+
+def to_procedure_response(result: ProcedureResult) -> GenerateProcedureResponse:
+    """
+    Convert a pipeline result to the API response model.
+
+    Args:
+        result: Output of the generation pipeline
+
+    Returns:
+        Response model with the standard disclaimer and version
+    """
+    return build_procedure_response(
+        procedure=[
+            ProcedureStep.model_construct(
+                step_number=step.step_number,
+                action=step.action,
+                parameters=dict(step.parameters),
+                rationale=step.rationale,
+            )
+            for step in result.procedure
+        ],
+        risk_flags=result.risk_flags,
+        fallback_options=result.fallback_options,
+        citations=result.citations,
+        request_id=result.request_id,
+        degradations=list(result.degradations),
+    )
+
+
+def to_patch_response(result: ProcedureResult, diff: ProcedureDiff) -> PatchProcedureResponse:
+    """
+    Convert a patched pipeline result to the API response model.
+
+    Args:
+        result: Regenerated procedure
+        diff: Changes from the previous version
+
+    Returns:
+        Response model including the diff
+    """
+    response = to_procedure_response(result)
+    return PatchProcedureResponse.model_construct(**dict(response), diff=diff)
+
+
+def build_procedure_response(
+    *,
+    procedure: list[Any],
+    risk_flags: list[str],
+    fallback_options: list[str],
+    citations: list[str],
+    request_id: str,
+    degradations: list[str] | None = None,
+) -> GenerateProcedureResponse:
+    """
+    Assemble a response model from trusted, already-validated parts.
+
+    Skips pydantic validation; only use with values produced by the
+    service layer.
+
+    Args:
+        procedure: Validated procedure steps
+        risk_flags: Identified risk factors
+        fallback_options: Alternative approaches
+        citations: References if any
+        request_id: Unique request identifier
+        degradations: Cheaper paths taken to meet the deadline
+
+    Returns:
+        Response model with the standard disclaimer and version
+    """
+    return GenerateProcedureResponse.model_construct(
+        procedure=procedure,
+        risk_flags=risk_flags,
+        fallback_options=fallback_options,
+        citations=citations,
+        disclaimer=PROCEDURE_DISCLAIMER,
+        version=__version__,
+        request_id=request_id,
+        degradations=degradations or [],
+    )
+
+
+def encode_procedure_response(response: GenerateProcedureResponse) -> bytes:
+    """
+    Encode a procedure response to JSON bytes.
+
+    Output is byte-identical to FastAPI's default rendering of the same model.
+
+    Args:
+        response: Response model to encode
+
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    return _encode(
+        to_json(response.procedure),
+        response.risk_flags,
+        response.fallback_options,
+        response.citations,
+        response.request_id,
+        response.degradations,
+        disclaimer=response.disclaimer,
+        version=response.version,
+    )
+
+
+def encode_procedure_result(result: ProcedureResult) -> bytes:
+    """
+    Encode a pipeline result to JSON bytes.
+
+    Output is byte-identical to encoding ``to_procedure_response(result)``.
+
+    Args:
+        result: Output of the generation pipeline
+
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    return _encode(
+        to_json([step.to_dict() for step in result.procedure]),
+        result.risk_flags,
+        result.fallback_options,
+        result.citations,
+        result.request_id,
+        result.degradations,
+    )
+
+
+def _encode(
+    procedure_json: bytes,
+    risk_flags: list[str],
+    fallback_options: list[str],
+    citations: list[str],
+    request_id: str,
+    degradations: Sequence[str],
+    disclaimer: str = PROCEDURE_DISCLAIMER,
+    version: str = __version__,
+) -> bytes:
+    """Join encoded response fields with the precomputed fragments."""
+    return b"".join(
+        (
+            _OPEN,
+            procedure_json,
+            _RISK_FLAGS,
+            to_json(risk_flags),
+            _FALLBACK_OPTIONS,
+            to_json(fallback_options),
+            _CITATIONS,
+            to_json(citations),
+            _DISCLAIMER,
+            _DISCLAIMER_JSON if disclaimer == PROCEDURE_DISCLAIMER else to_json(disclaimer),
+            _VERSION,
+            _VERSION_JSON if version == __version__ else to_json(version),
+            _REQUEST_ID,
+            to_json(request_id),
+            _DEGRADATIONS,
+            to_json(degradations),
+            _CLOSE,
+        )
+    )
+
+
+class ProcedureJSONResponse(Response):
+    """JSON response rendered with the pre-encoded procedure fast path."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        """Render a procedure response or result, or raw bytes already encoded."""
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, ProcedureResult):
+            return encode_procedure_result(content)
+        return encode_procedure_response(content)
@@ -0,0 +1,141 @@
+"""Startup warm-up and readiness state.
+
+Cold workers pay for lazy imports, RXN authentication and schema building on
+their first requests. Warm-up does that work during the application lifespan
+startup, and the worker only reports ready once it has finished.
+"""
+
+import importlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.models.schemas import GenerateProcedureRequest, GenerateProcedureResponse
+from app.services.citation_index import get_citation_index
+from app.services.compound_safety import get_compound_safety_db
+from app.services.inventory import get_inventory
+from app.services.pipeline import untracked
+from app.services.retrosynthesis_adapter import (
+    get_rxn_client,
+    is_rxn_configured,
+    load_plan_cache,
+    rebuild_similarity_index,
+)
+from app.utils.smiles import canonicalize_smiles
+
+logger = logging.getLogger(__name__)
+
+# Request used for the optional end-to-end warm-up call
+SYNTHETIC_REQUEST: dict[str, Any] = {
+    "target_smiles": "CC(=O)OC1=CC=CC=C1C(=O)O",
+    "lab_context": {
+        "scale_mg": 100,
+        "equipment": ["rotovap"],
+        "purification_methods": ["recrystallization"],
+        "safety_constraints": [],
+        "experience_level": "industry",
+        "time_budget_hours": 8,
+    },
+}
+
+_ready = False
+
+
+def is_ready() -> bool:
+    """Check whether warm-up has completed in this process."""
+    return _ready
+
+
+def mark_not_ready() -> None:
+    """Report this process as not ready, e.g. while shutting down."""
+    global _ready
+    _ready = False
+
+
+async def run_warmup(app: FastAPI) -> dict[str, float]:
+    """
+    Warm up the process and mark it ready.
+
+    Each phase is best-effort: a failing phase is logged and skipped, since
+    the service degrades gracefully without it.
+
+    Args:
+        app: Application being started
+
+    Returns:
+        Duration in milliseconds of each phase that ran
+    """
+    global _ready
+
+    phases: list[tuple[str, Callable[[], Awaitable[None]]]] = [
+        ("preload_modules", _preload_modules),
+        ("build_schemas", lambda: _build_schemas(app)),
+        ("load_caches", _load_caches),
+    ]
+    if is_rxn_configured():
+        phases.append(("rxn_auth", _authenticate_rxn))
+    if settings.warmup_synthetic_request:
+        phases.append(("synthetic_request", lambda: _synthetic_request(app)))
+
+    timings = {}
+    for name, phase in phases:
+        started = time.perf_counter()
+        try:
+            await phase()
+        except Exception as e:
+            logger.warning(f"Warm-up phase {name} failed: {e}")
+            continue
+        timings[name] = (time.perf_counter() - started) * 1000
+
+    _ready = True
+    logger.info(
+        "Warm-up complete: "
+        + ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items())
+    )
+    return timings
+
+
+async def _preload_modules() -> None:
+    """Import modules that are otherwise loaded on first use."""
+    if is_rxn_configured():
+        importlib.import_module("rxn4chemistry")
+    canonicalize_smiles(SYNTHETIC_REQUEST["target_smiles"])
+
+
+async def _build_schemas(app: FastAPI) -> None:
+    """Build request validators and the OpenAPI schema up front."""
+    GenerateProcedureRequest.model_validate(SYNTHETIC_REQUEST)
+    GenerateProcedureResponse.model_json_schema()
+    app.openapi()
+
+
+async def _load_caches() -> None:
+    """Load persisted cache snapshots, map the citation and safety indexes, index the inventory."""
+    # Shared caches are already persisted in their own store
+    if settings.cache_backend == "memory":
+        loaded = load_plan_cache(settings.plan_cache_snapshot_path)
+        logger.info(f"Loaded {loaded} cached plans from snapshot")
+    indexed = rebuild_similarity_index()
+    logger.info(f"Indexed {indexed} planned targets for similarity lookup")
+    get_citation_index()
+    get_compound_safety_db()
+    get_inventory()
+
+
+async def _authenticate_rxn() -> None:
+    """Create the RXN client so the first request does not pay for it."""
+    get_rxn_client()
+
+
+async def _synthetic_request(app: FastAPI) -> None:
+    """Send one request through the full ASGI stack, leaving no trace of it."""
+    transport = httpx.ASGITransport(app=app)
+    with untracked():
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            response = await client.post("/v1/generate-procedure", json=SYNTHETIC_REQUEST)
+            response.raise_for_status()
@@ -1,15 +1,47 @@
 """Method.AI FastAPI Application Entry Point."""
 
+import asyncio
+import contextlib
+import logging
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app import __version__
 from app.api.routes import router
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.warmup import is_ready, mark_not_ready, run_warmup
+from app.services.prefetcher import run_prefetcher
+from app.services.retrosynthesis_adapter import save_plan_cache
 
 setup_logging()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm up before serving, prefetch while serving and persist caches on shutdown."""
+    await run_warmup(app)
+    prefetcher = asyncio.create_task(run_prefetcher())
+    yield
+    mark_not_ready()
+    prefetcher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await prefetcher
+    if settings.cache_backend == "memory":
+        try:
+            saved = save_plan_cache(settings.plan_cache_snapshot_path)
+            logger.info(f"Saved {saved} cached plans to snapshot")
+        except Exception as e:
+            logger.warning(f"Failed to save plan cache snapshot: {e}")
+
+
 app = FastAPI(
     title="Method.AI",
     description=(
@@ -19,6 +51,7 @@ app = FastAPI(
     version=__version__,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -44,15 +77,49 @@ async def health_check() -> dict:
     }
 
 
-def run() -> None:
-    """Run the application with uvicorn."""
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """Readiness probe; fails until startup warm-up has completed."""
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"ready": False})
+    return JSONResponse(content={"ready": True})
+
+
+def run(
+    host: str | None = None,
+    port: int | None = None,
+    workers: int | None = None,
+) -> None:
+    """
+    Run the application with uvicorn.
+
+    With more than one worker, uvicorn pre-forks worker processes and the
+    in-memory cache backend is replaced by the shared SQLite backend, so all
+    workers on the machine share one cache.
+
+    Args:
+        host: Bind address, defaults to API_HOST
+        port: Bind port, defaults to API_PORT
+        workers: Number of worker processes, defaults to API_WORKERS
+    """
     import uvicorn
 
+    workers = workers or settings.api_workers
+    if workers > 1:
+        if settings.cache_backend == "memory":
+            # Per-process caches would diverge; workers re-read the environment
+            os.environ["CACHE_BACKEND"] = "sqlite"
+        # Workers split per-process budgets, such as the prefetcher's RXN share
+        os.environ["API_WORKERS"] = str(workers)
+        if settings.debug:
+            logger.warning("Auto-reload is disabled when running multiple workers")
+
     uvicorn.run(
         "app.main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=settings.debug,
+        host=host or settings.api_host,
+        port=port or settings.api_port,
+        reload=settings.debug and workers == 1,
+        workers=workers,
     )
 
 
@@ -0,0 +1,74 @@
+"""Internal records used by the service layer.
+
+Services pass these lightweight, immutable records around instead of pydantic
+models. Step parameters are read-only mappings whose values are immutable
+(tuples rather than lists), so template data can be shared between requests.
+Records are converted to the API schemas once, at the boundary (see
+``app.core.serialization``).
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+
+@dataclass(slots=True, frozen=True)
+class StepRecord:
+    """A single step in a procedure."""
+
+    step_number: int
+    action: str
+    parameters: Mapping[str, Any]
+    rationale: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a JSON-serializable dict shaped like ``ProcedureStep``."""
+        return {
+            "step_number": self.step_number,
+            "action": self.action,
+            "parameters": dict(self.parameters),
+            "rationale": self.rationale,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "StepRecord":
+        """Rebuild a record from ``to_dict`` output."""
+        return cls(
+            step_number=data["step_number"],
+            action=data["action"],
+            parameters=frozen_parameters(data.get("parameters", {})),
+            rationale=data.get("rationale"),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class ProcedureResult:
+    """Output of the generation pipeline for one request."""
+
+    procedure: tuple[StepRecord, ...]
+    risk_flags: list[str]
+    fallback_options: list[str]
+    citations: list[str]
+    request_id: str
+    degradations: tuple[str, ...] = ()
+
+
+def frozen_parameters(parameters: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Make step parameters immutable.
+
+    Args:
+        parameters: Parameter mapping, possibly holding lists
+
+    Returns:
+        Read-only mapping with lists turned into tuples
+    """
+    return MappingProxyType({key: _freeze(value) for key, value in parameters.items()})
+
+
+def _freeze(value: Any) -> Any:
+    """Replace lists with tuples, recursively."""
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -1,9 +1,13 @@
 """Pydantic schemas for API requests and responses."""
 
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from app.utils.smiles import canonicalize_smiles
+from app.utils.text import sanitize_smiles
 
 
 class ExperienceLevel(str, Enum):
@@ -60,11 +64,48 @@ class GenerateProcedureRequest(BaseModel):
     """Request to generate a procedure."""
 
     target_smiles: str = Field(..., description="Target molecule in SMILES format")
-    lab_context: LabContext = Field(..., description="Laboratory constraints")
+    lab_context: LabContext | None = Field(
+        None, description="Laboratory constraints, unless lab_profile_id is given"
+    )
+    lab_profile_id: str | None = Field(
+        None, description="Stored lab profile to use instead of lab_context", max_length=64
+    )
     retrosynthesis_plan: dict[str, Any] | None = Field(
         None, description="Optional pre-computed retrosynthesis plan"
     )
+    plan_id: str | None = Field(
+        None, description="Plan stored with POST /v1/plans, instead of retrosynthesis_plan",
+        max_length=64,
+    )
     notes: str | None = Field(None, description="Additional context or notes")
+    deadline_ms: int | None = Field(
+        None, description="Time budget for the response in milliseconds", gt=0
+    )
+
+    @field_validator("target_smiles")
+    @classmethod
+    def validate_target_smiles(cls, value: str) -> str:
+        """Reject syntactically invalid SMILES and store the canonical form."""
+        return canonicalize_smiles(value)
+
+    @field_validator("retrosynthesis_plan")
+    @classmethod
+    def validate_plan_steps(cls, value: dict[str, Any] | None) -> dict[str, Any] | None:
+        """Reject inline plan steps whose reaction SMILES is not a string."""
+        steps = value.get("steps", []) if value is not None else []
+        for step in steps if isinstance(steps, list) else []:
+            if isinstance(step, dict) and not isinstance(step.get("rxn_smiles") or "", str):
+                raise ValueError("rxn_smiles of retrosynthesis plan steps must be strings")
+        return value
+
+    @model_validator(mode="after")
+    def validate_sources(self) -> "GenerateProcedureRequest":
+        """Require one lab context source and at most one plan source."""
+        if (self.lab_context is None) == (self.lab_profile_id is None):
+            raise ValueError("Provide exactly one of lab_context and lab_profile_id")
+        if self.retrosynthesis_plan is not None and self.plan_id is not None:
+            raise ValueError("Provide at most one of retrosynthesis_plan and plan_id")
+        return self
 
 
 class GenerateProcedureResponse(BaseModel):
@@ -83,6 +124,194 @@ class GenerateProcedureResponse(BaseModel):
     disclaimer: str = Field(..., description="Safety disclaimer")
     version: str = Field(..., description="API version")
     request_id: str = Field(..., description="Unique request identifier")
+    degradations: list[str] = Field(
+        default_factory=list, description="Cheaper paths taken to meet the deadline"
+    )
+
+
+class RetrosynthesisStep(BaseModel):
+    """A single reaction of an uploaded retrosynthesis plan."""
+
+    rxn_smiles: str = Field(..., description="Reaction SMILES (reactants>agents>products)")
+    confidence: float | None = Field(
+        None, description="Predicted confidence of the reaction", ge=0, le=1
+    )
+    notes: str | None = Field(None, description="Additional notes")
+
+    @field_validator("rxn_smiles")
+    @classmethod
+    def validate_rxn_smiles(cls, value: str) -> str:
+        """Reject reactions without products or with invalid molecules."""
+        value = sanitize_smiles(value)
+        parts = value.split(">")
+        if len(parts) != 3 or not parts[2]:
+            raise ValueError("Reaction SMILES must have the form reactants>agents>products")
+        for part in parts:
+            for molecule in part.split("."):
+                if molecule:
+                    canonicalize_smiles(molecule)
+        return value
+
+
+class PlanUploadRequest(BaseModel):
+    """Request to store a retrosynthesis plan."""
+
+    steps: list[RetrosynthesisStep] = Field(
+        ..., description="Retrosynthesis steps, the target-forming reaction first", min_length=1
+    )
+
+
+class PlanUploadResponse(BaseModel):
+    """A stored retrosynthesis plan."""
+
+    plan_id: str = Field(..., description="Content hash to send as plan_id")
+    step_count: int = Field(..., description="Number of steps in the plan")
+    created: bool = Field(..., description="False if the same plan was already stored")
+
+
+class LabProfileRequest(BaseModel):
+    """Request to create or replace a lab profile."""
+
+    name: str = Field(..., description="Display name of the profile", min_length=1, max_length=200)
+    lab_context: LabContext = Field(..., description="Laboratory constraints to store")
+
+
+class LabProfileResponse(BaseModel):
+    """A stored lab profile."""
+
+    lab_profile_id: str = Field(..., description="Identifier to send as lab_profile_id")
+    name: str = Field(..., description="Display name of the profile")
+    version: int = Field(..., description="Incremented on every update")
+    lab_context: LabContext = Field(..., description="Stored laboratory constraints")
+
+
+class LabContextPatch(BaseModel):
+    """Changes to the lab context of a generated procedure."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    scale_mg: float | None = Field(None, description="Target scale in milligrams", gt=0)
+    equipment: list[str] | None = Field(None, description="Available equipment")
+    purification_methods: list[str] | None = Field(
+        None, description="Available purification methods"
+    )
+    safety_constraints: list[str] | None = Field(
+        None, description="Safety limitations or requirements"
+    )
+    experience_level: ExperienceLevel | None = Field(
+        None, description="Experience level of the user"
+    )
+    time_budget_hours: float | None = Field(
+        None, description="Available time in hours", gt=0
+    )
+
+
+class ProcedureDiff(BaseModel):
+    """Differences between a procedure and its regenerated version."""
+
+    changed_fields: list[str] = Field(
+        default_factory=list, description="Lab context fields that changed"
+    )
+    steps_changed: list[int] = Field(
+        default_factory=list, description="Numbers of steps whose content changed"
+    )
+    risk_flags_added: list[str] = Field(default_factory=list, description="New risk flags")
+    risk_flags_removed: list[str] = Field(
+        default_factory=list, description="Risk flags no longer raised"
+    )
+    fallback_options_added: list[str] = Field(
+        default_factory=list, description="New fallback options"
+    )
+    fallback_options_removed: list[str] = Field(
+        default_factory=list, description="Fallback options no longer suggested"
+    )
+
+
+class PatchProcedureResponse(GenerateProcedureResponse):
+    """Regenerated procedure with the differences from the previous version."""
+
+    diff: ProcedureDiff = Field(..., description="Changes from the previous version")
+
+
+class ProcedureVersionSummary(BaseModel):
+    """Metadata of one saved version of a procedure."""
+
+    version: int = Field(..., description="Version number, from 1")
+    created_at: str = Field(..., description="When the version was saved (ISO 8601)")
+    changed_fields: list[str] = Field(
+        default_factory=list, description="Lab context fields edited since the previous version"
+    )
+
+
+class ProcedureHistoryResponse(BaseModel):
+    """A page of the version history of a procedure, newest first."""
+
+    request_id: str = Field(..., description="Identifier of the procedure")
+    versions: list[ProcedureVersionSummary] = Field(..., description="Saved versions")
+    next_cursor: int | None = Field(
+        None, description="Pass as cursor for the next page; null on the last page"
+    )
+
+
+class ProcedureVersionResponse(ProcedureVersionSummary):
+    """One saved version of a procedure."""
+
+    request_id: str = Field(..., description="Identifier of the procedure")
+    lab_context: LabContext = Field(..., description="Lab context of this version")
+    procedure: list[ProcedureStep] = Field(..., description="Procedure steps")
+    risk_flags: list[str] = Field(default_factory=list, description="Identified risk factors")
+    fallback_options: list[str] = Field(
+        default_factory=list, description="Alternative approaches"
+    )
+    citations: list[str] = Field(default_factory=list, description="References if any")
+
+
+class EquipmentBookingRequest(BaseModel):
+    """Request to book an instrument for a time window."""
+
+    equipment: str = Field(
+        ..., description="Instrument name, as used in lab_context.equipment",
+        min_length=1, max_length=100,
+    )
+    start: datetime = Field(..., description="Start of the booking (UTC if no offset)")
+    end: datetime = Field(..., description="End of the booking (UTC if no offset)")
+    booked_by: str | None = Field(None, description="Who the booking is for", max_length=200)
+
+    @field_validator("start", "end")
+    @classmethod
+    def assume_utc(cls, value: datetime) -> datetime:
+        """Read times without an offset as UTC."""
+        return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+    @model_validator(mode="after")
+    def validate_window(self) -> "EquipmentBookingRequest":
+        """Require the booking to end after it starts."""
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+
+class EquipmentBookingResponse(BaseModel):
+    """A stored equipment booking."""
+
+    booking_id: str = Field(..., description="Identifier of the booking")
+    equipment: str = Field(..., description="Instrument name, lowercased")
+    start: datetime = Field(..., description="Start of the booking")
+    end: datetime = Field(..., description="End of the booking")
+    booked_by: str | None = Field(None, description="Who the booking is for")
+
+
+class EquipmentAvailabilityResponse(BaseModel):
+    """Earliest window with all requested instruments free."""
+
+    equipment: list[str] = Field(..., description="Instruments checked")
+    hours: float = Field(..., description="Length of the window")
+    earliest_start: datetime | None = Field(
+        None, description="Earliest start, or null if none within the search horizon"
+    )
+    conflicts: list[EquipmentBookingResponse] = Field(
+        default_factory=list, description="Bookings overlapping a window starting at after"
+    )
 
 
 class FeedbackRequest(BaseModel):
@@ -98,3 +327,63 @@ class FeedbackResponse(BaseModel):
     """Response confirming feedback storage."""
 
     stored: bool = Field(..., description="Whether feedback was stored successfully")
+    known_request_id: bool = Field(
+        ..., description="Whether the request_id was issued by this deployment"
+    )
+
+
+class FeedbackBatchRequest(BaseModel):
+    """Many feedback records, each validated on its own."""
+
+    records: list[dict[str, Any]] = Field(
+        ..., description="Feedback records, each shaped like FeedbackRequest"
+    )
+
+
+class FeedbackBatchResult(BaseModel):
+    """Outcome of one record in a feedback batch."""
+
+    index: int = Field(..., description="Position of the record in the batch")
+    request_id: str | None = Field(None, description="Request ID of the record, if given")
+    stored: bool = Field(..., description="Whether the record was stored")
+    known_request_id: bool | None = Field(
+        None, description="Whether the request_id was issued, for valid records"
+    )
+    error: str | None = Field(None, description="Why the record was rejected")
+
+
+class FeedbackBatchResponse(BaseModel):
+    """Per-record results of a feedback batch."""
+
+    stored: int = Field(..., description="Number of records stored")
+    rejected: int = Field(..., description="Number of records rejected")
+    results: list[FeedbackBatchResult] = Field(..., description="Result of each record")
+
+
+class AdmissionStageStats(BaseModel):
+    """Occupancy and counters of one admission control stage."""
+
+    limit: int = Field(..., description="Maximum requests running at once")
+    active: int = Field(..., description="Requests currently running")
+    queued: int = Field(..., description="Requests waiting for a slot")
+    max_queue: int = Field(..., description="Maximum requests waiting for a slot")
+    admitted: int = Field(..., description="Requests admitted since startup")
+    rejected: int = Field(..., description="Requests rejected because the queue was full")
+    timed_out: int = Field(..., description="Requests rejected after waiting too long")
+
+
+class AdmissionStatsResponse(BaseModel):
+    """Admission control state of this worker process."""
+
+    enabled: bool = Field(..., description="Whether admission control is enabled")
+    stages: dict[str, AdmissionStageStats] = Field(..., description="Stats per pipeline stage")
+
+
+class PrefetchStatsResponse(BaseModel):
+    """Plan prefetcher counters of this worker process."""
+
+    enabled: bool = Field(..., description="Whether the prefetcher runs (needs RXN configured)")
+    refreshed: int = Field(..., description="Plans refreshed since startup")
+    failed: int = Field(..., description="Plan refreshes that failed")
+    skipped_busy: int = Field(..., description="Rounds cut short by interactive requests")
+    tracked_targets: int = Field(..., description="Targets tracked for hotness")
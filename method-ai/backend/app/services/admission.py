@@ -0,0 +1,229 @@
+"""Admission control service.
+
+Bounds the work the API accepts so that overload sheds requests quickly
+instead of slowing down every request. Each pipeline stage has its own
+concurrency limit and a bounded queue of requests waiting for a slot:
+
+- ``plan``: retrosynthesis plan lookup, which may call IBM RXN
+- ``generate``: procedure generation, risk annotation and citations
+
+A request that finds a stage's queue full, or waits longer than the queue
+timeout, is rejected with ``AdmissionRejectedError``; the API turns this into
+``503`` with a ``Retry-After`` estimated from recent service times.
+
+Limits apply per worker process. State is only touched from the event loop.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from app.core.config import settings
+from app.core.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+PLAN_STAGE = "plan"
+GENERATE_STAGE = "generate"
+
+# Weight of the latest slot hold time in the moving average
+_SERVICE_TIME_ALPHA = 0.2
+
+# Bounds of the suggested Retry-After (seconds)
+_MIN_RETRY_AFTER = 1
+_MAX_RETRY_AFTER = 60
+
+_stages: dict[str, "AdmissionStage"] = {}
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a stage cannot take a request."""
+
+    def __init__(self, stage: str, retry_after: int) -> None:
+        super().__init__(f"Stage {stage} is overloaded")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class AdmissionStage:
+    """Concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(self, name: str, limit: int, max_queue: int) -> None:
+        """
+        Create a stage.
+
+        Args:
+            name: Stage name, reported in stats and errors
+            limit: Maximum requests running in the stage at once
+            max_queue: Maximum requests waiting for a slot
+        """
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._service_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, timeout: float) -> AsyncIterator[None]:
+        """
+        Hold a slot in the stage for the duration of the block.
+
+        Args:
+            timeout: Longest time to wait in the queue (seconds)
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or the wait times out
+        """
+        await self._acquire(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_seconds += _SERVICE_TIME_ALPHA * (elapsed - self._service_seconds)
+            self._release()
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is likely to drain."""
+        estimate = (len(self._waiters) + 1) * self._service_seconds / self.limit
+        return min(_MAX_RETRY_AFTER, max(_MIN_RETRY_AFTER, math.ceil(estimate)))
+
+    def stats(self) -> dict[str, Any]:
+        """Current occupancy and counters."""
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    async def _acquire(self, timeout: float) -> None:
+        """Take a free slot, or queue for one."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejectedError(self.name, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise AdmissionRejectedError(self.name, self.retry_after())
+
+    def _abandon(self, waiter: asyncio.Future[None]) -> None:
+        """Leave the queue, passing on a slot that was already handed over."""
+        if waiter.done() and not waiter.cancelled():
+            self._release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        """Hand the slot to the next waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.admitted += 1
+                return
+        self.active -= 1
+
+
+@asynccontextmanager
+async def admit(stage: str, deadline: Deadline | None = None) -> AsyncIterator[None]:
+    """
+    Run a block inside a stage's concurrency limit.
+
+    When ADMISSION_ENABLED is false, the block is only counted as active in
+    the stage (the prefetcher reads this to detect load), never queued or
+    rejected.
+
+    Args:
+        stage: PLAN_STAGE or GENERATE_STAGE
+        deadline: Deadline of the request; queueing never outlasts it
+
+    Raises:
+        AdmissionRejectedError: If the stage is overloaded
+    """
+    admission_stage = get_stage(stage)
+    if not settings.admission_enabled:
+        admission_stage.active += 1
+        try:
+            yield
+        finally:
+            admission_stage.active -= 1
+        return
+
+    timeout = settings.admission_queue_timeout_seconds
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+
+    try:
+        async with admission_stage.slot(timeout):
+            yield
+    except AdmissionRejectedError as e:
+        logger.warning(f"Rejected request at {stage} stage, retry after {e.retry_after}s")
+        raise
+
+
+def get_stage(stage: str) -> AdmissionStage:
+    """
+    Get a stage, creating it from settings on first use.
+
+    Args:
+        stage: PLAN_STAGE or GENERATE_STAGE
+
+    Returns:
+        The stage
+
+    Raises:
+        KeyError: If the stage name is unknown
+    """
+    if stage not in _stages:
+        limits = {
+            PLAN_STAGE: settings.admission_plan_concurrency,
+            GENERATE_STAGE: settings.admission_generate_concurrency,
+        }
+        _stages[stage] = AdmissionStage(stage, limits[stage], settings.admission_max_queue)
+    return _stages[stage]
+
+
+def admission_stats() -> dict[str, dict[str, Any]]:
+    """
+    Get occupancy and counters of every stage.
+
+    Returns:
+        Stats keyed by stage name
+    """
+    return {stage: get_stage(stage).stats() for stage in (PLAN_STAGE, GENERATE_STAGE)}
+
+
+def reset_admission() -> None:
+    """Drop all stages, so they are recreated from current settings."""
+    _stages.clear()
@@ -0,0 +1,186 @@
+"""Offline batch runner.
+
+Streams ``GenerateProcedureRequest`` JSONL through the generation pipeline on
+a process pool and writes one JSONL result per input line, in input order.
+Only a bounded window of chunks is in flight at a time, so memory stays flat
+however long the input is. Progress is checkpointed after every chunk so an
+interrupted run can resume where it stopped.
+"""
+
+import json
+import logging
+import uuid
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO
+
+from pydantic import ValidationError
+
+from app.core.serialization import encode_procedure_result
+from app.models.schemas import GenerateProcedureRequest
+from app.services.lab_profiles import LabProfileNotFoundError
+from app.services.pipeline import run_pipeline
+from app.services.plan_store import PlanNotFoundError
+from app.services.request_registry import register_request_id
+
+logger = logging.getLogger(__name__)
+
+# Chunks kept in flight per worker process
+_CHUNKS_PER_WORKER = 2
+
+
+@dataclass(slots=True)
+class BatchStats:
+    """Counts for a batch run."""
+
+    lines_done: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+@dataclass(slots=True)
+class BatchCheckpoint:
+    """Resume point of a batch run."""
+
+    lines_done: int = 0
+    output_offset: int = 0
+
+    @classmethod
+    def load(cls, path: str) -> "BatchCheckpoint":
+        """Load a checkpoint, or start from the beginning if there is none."""
+        checkpoint_path = Path(path)
+        if not checkpoint_path.exists():
+            return cls()
+        data = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+        return cls(lines_done=data["lines_done"], output_offset=data["output_offset"])
+
+    def save(self, path: str) -> None:
+        """Write the checkpoint atomically."""
+        checkpoint_path = Path(path)
+        tmp_path = checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"lines_done": self.lines_done, "output_offset": self.output_offset}),
+            encoding="utf-8",
+        )
+        tmp_path.replace(checkpoint_path)
+
+
+def run_batch(
+    input_stream: BinaryIO,
+    output_stream: BinaryIO,
+    workers: int = 1,
+    chunk_size: int = 100,
+    checkpoint_path: str | None = None,
+    checkpoint: BatchCheckpoint | None = None,
+) -> BatchStats:
+    """
+    Process a JSONL stream of generate-procedure requests.
+
+    Each non-empty input line produces one output line: the procedure
+    response, or ``{"line": n, "error": ...}`` if the line failed.
+
+    Args:
+        input_stream: JSONL requests, one per line
+        output_stream: Destination for JSONL results
+        workers: Worker processes; 1 runs in the current process
+        chunk_size: Input lines dispatched to a worker at a time
+        checkpoint_path: File updated after each chunk is written
+        checkpoint: Resume point; lines before it are skipped
+
+    Returns:
+        Counts for this run
+    """
+    checkpoint = checkpoint or BatchCheckpoint()
+    stats = BatchStats(lines_done=checkpoint.lines_done)
+    lines: Iterator[tuple[int, bytes]] = enumerate(input_stream, start=1)
+    if checkpoint.lines_done:
+        lines = islice(lines, checkpoint.lines_done, None)
+        logger.info(f"Resuming batch after line {checkpoint.lines_done}")
+
+    def write(chunk_results: list[tuple[bool, bytes]], chunk_lines: int) -> None:
+        for ok, result in chunk_results:
+            output_stream.write(result)
+            checkpoint.output_offset += len(result)
+            if ok:
+                stats.succeeded += 1
+            else:
+                stats.failed += 1
+        output_stream.flush()
+        checkpoint.lines_done += chunk_lines
+        stats.lines_done = checkpoint.lines_done
+        stats.skipped += chunk_lines - len(chunk_results)
+        if checkpoint_path is not None:
+            checkpoint.save(checkpoint_path)
+
+    if workers <= 1:
+        for chunk in _chunked(lines, chunk_size):
+            write(process_chunk(chunk), len(chunk))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight: deque[tuple[Future[list[tuple[bool, bytes]]], int]] = deque()
+        for chunk in _chunked(lines, chunk_size):
+            in_flight.append((executor.submit(process_chunk, chunk), len(chunk)))
+            if len(in_flight) >= workers * _CHUNKS_PER_WORKER:
+                future, chunk_lines = in_flight.popleft()
+                write(future.result(), chunk_lines)
+        while in_flight:
+            future, chunk_lines = in_flight.popleft()
+            write(future.result(), chunk_lines)
+
+    return stats
+
+
+def process_chunk(chunk: list[tuple[int, bytes]]) -> list[tuple[bool, bytes]]:
+    """
+    Run the pipeline for a chunk of numbered input lines.
+
+    Args:
+        chunk: (line_number, raw_line) pairs
+
+    Returns:
+        (succeeded, encoded output line) per non-empty input line
+    """
+    results: list[tuple[bool, bytes]] = []
+    for line_number, raw_line in chunk:
+        if not raw_line.strip():
+            continue
+        try:
+            request = GenerateProcedureRequest.model_validate_json(raw_line)
+            result = run_pipeline(request, str(uuid.uuid4()))
+            # Batch results are not stored for patching, but their IDs are
+            # issued, so feedback on them is accepted
+            register_request_id(result.request_id)
+            results.append((True, encode_procedure_result(result) + b"\n"))
+        except ValidationError as e:
+            message = f"Invalid request: {e.error_count()} validation error(s)"
+            results.append((False, _error_line(line_number, message)))
+        except LabProfileNotFoundError as e:
+            message = f"Unknown lab_profile_id {e}"
+            results.append((False, _error_line(line_number, message)))
+        except PlanNotFoundError as e:
+            message = f"Unknown plan_id {e}"
+            results.append((False, _error_line(line_number, message)))
+        except Exception as e:
+            logger.error(f"Batch line {line_number} failed: {e}")
+            results.append((False, _error_line(line_number, "Internal error")))
+    return results
+
+
+def _error_line(line_number: int, message: str) -> bytes:
+    """Encode an error result for an input line."""
+    return json.dumps({"line": line_number, "error": message}).encode("utf-8") + b"\n"
+
+
+def _chunked(
+    lines: Iterable[tuple[int, bytes]], size: int
+) -> Iterator[list[tuple[int, bytes]]]:
+    """Group numbered lines into lists of at most ``size``."""
+    iterator = iter(lines)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,337 @@
+"""Caching primitives.
+
+Provides bounded LRU caches with per-entry expiry, used by the stores that
+keep short-lived state between requests. ``TTLCache`` lives in process
+memory; ``SQLiteCache`` keeps entries in a local SQLite file so that all
+worker processes on a machine share one coherent cache. Use
+``create_cache`` to get the backend selected by ``CACHE_BACKEND``.
+
+Values stored in caches must be JSON-serializable so that both backends
+behave the same.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import AbstractContextManager
+from typing import Any
+
+from app.core.config import settings
+from app.utils.sqlite import SQLiteConnections, transaction
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (namespace, accessed_at)",
+)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with time-based expiry.
+
+    Entries expire ``ttl_seconds`` after they were written. When the cache is
+    full, the least recently used entry is evicted. All operations are
+    thread-safe.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        """
+        Create a cache.
+
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl_seconds: Default lifetime of an entry in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Get a live entry, marking it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """
+        Store an entry, replacing any existing one.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Lifetime override for this entry
+        """
+        with self._lock:
+            self._put(key, value, ttl_seconds)
+
+    def add(self, key: str, value: Any, ttl_seconds: float | None = None) -> bool:
+        """
+        Store an entry only if no live entry exists for the key.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Lifetime override for this entry
+
+        Returns:
+            True if the entry was stored
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] > time.monotonic():
+                return False
+            self._put(key, value, ttl_seconds)
+            return True
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list[tuple[str, Any, float]]:
+        """
+        Snapshot the live entries.
+
+        Returns:
+            List of (key, value, remaining_ttl_seconds), least recently used first
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires_at - now)
+                for key, (value, expires_at) in self._data.items()
+                if expires_at > now
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def _put(self, key: str, value: Any, ttl_seconds: float | None) -> None:
+        """Insert an entry and evict down to maxsize. Caller holds the lock."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    Bounded LRU cache with time-based expiry, shared through a SQLite file.
+
+    Safe to use from several threads and processes at once: writes run in
+    immediate transactions, so inserts and evictions are atomic across
+    workers. Several caches can share one file under different namespaces.
+    """
+
+    def __init__(self, path: str, namespace: str, maxsize: int, ttl_seconds: float) -> None:
+        """
+        Create a cache.
+
+        Args:
+            path: SQLite database file
+            namespace: Name separating this cache from others in the file
+            maxsize: Maximum number of entries kept in the namespace
+            ttl_seconds: Default lifetime of an entry in seconds
+        """
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._connections = SQLiteConnections(_SCHEMA)
+        # Create the file and schema up front rather than on first use
+        self._connection()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Get a live entry, marking it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (self.namespace, key, now),
+            )
+            return None
+        conn.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key),
+        )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """
+        Store an entry, replacing any existing one.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value to store
+            ttl_seconds: Lifetime override for this entry
+        """
+        encoded = json.dumps(value)
+        with self._transaction() as conn:
+            self._put(conn, key, encoded, ttl_seconds)
+
+    def add(self, key: str, value: Any, ttl_seconds: float | None = None) -> bool:
+        """
+        Store an entry only if no live entry exists for the key.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value to store
+            ttl_seconds: Lifetime override for this entry
+
+        Returns:
+            True if the entry was stored
+        """
+        encoded = json.dumps(value)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is not None and row[0] > time.time():
+                return False
+            self._put(conn, key, encoded, ttl_seconds)
+            return True
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def clear(self) -> None:
+        """Remove all entries in this namespace."""
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        )
+
+    def items(self) -> list[tuple[str, Any, float]]:
+        """
+        Snapshot the live entries.
+
+        Returns:
+            List of (key, value, remaining_ttl_seconds), least recently used first
+        """
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache_entries "
+            "WHERE namespace = ? AND expires_at > ? ORDER BY accessed_at",
+            (self.namespace, now),
+        ).fetchall()
+        return [(key, json.loads(value), expires_at - now) for key, value, expires_at in rows]
+
+    def __len__(self) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time()),
+        ).fetchone()
+        return int(row[0])
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the cache file."""
+        return self._connections.get(self.path)
+
+    def _transaction(self) -> AbstractContextManager[sqlite3.Connection]:
+        """Open a write transaction that locks out other writers."""
+        return transaction(self._connection())
+
+    def _put(self, conn: sqlite3.Connection, key: str, encoded: str, ttl_seconds: float | None) -> None:
+        """Insert an entry and evict down to maxsize. Caller holds a transaction."""
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, encoded, now + ttl, now),
+        )
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now),
+        )
+        count = conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if count > self.maxsize:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? "
+                "ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, count - self.maxsize),
+            )
+
+
+def create_cache(namespace: str, maxsize: int, ttl_seconds: float) -> TTLCache | SQLiteCache:
+    """
+    Create a cache using the configured backend.
+
+    Args:
+        namespace: Name of the cache, unique per store
+        maxsize: Maximum number of entries kept
+        ttl_seconds: Default lifetime of an entry in seconds
+
+    Returns:
+        In-memory cache, or a SQLite-backed cache shared across workers
+
+    Raises:
+        ValueError: If CACHE_BACKEND is not recognized
+    """
+    backend = settings.cache_backend.lower()
+    if backend == "memory":
+        return TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=settings.cache_db_path,
+            namespace=namespace,
+            maxsize=maxsize,
+            ttl_seconds=ttl_seconds,
+        )
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
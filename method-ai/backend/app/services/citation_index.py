@@ -0,0 +1,352 @@
+"""Citation index service.
+
+Retrieves prior procedures from a local corpus to cite alongside generated
+procedures. ``build_citation_index`` ingests procedure records (JSONL, as in
+``data/sample/tiny_procedures.jsonl``) into an inverted index over three kinds
+of terms:
+
+- ``t:`` canonical target SMILES
+- ``c:`` reaction class words
+- ``k:`` step and note keywords
+
+Each posting carries a precomputed BM25 score already multiplied by the
+record's feedback weight, so retrieval is a sum over a few posting lists.
+Postings are stored best-first and only the head of each list is read, which
+keeps very common terms cheap. The index is a memory-mapped table
+(``app.utils.mmap_table``) and opens in constant time.
+"""
+
+import contextlib
+import heapq
+import json
+import logging
+import math
+import re
+import struct
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.utils.mmap_table import MmapTable, write_table
+from app.utils.smiles import smiles_cache_key
+
+logger = logging.getLogger(__name__)
+
+_POSTING = struct.Struct("<If")
+_DOC_KEY = struct.Struct(">I")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Postings read per query term, best-scoring first
+_MAX_POSTINGS_PER_TERM = 2000
+
+# Score contributed by each feedback outcome, averaged into the record weight
+_OUTCOME_SCORES = {"success": 1.0, "partial": 0.5, "failure": -1.0, "unknown": 0.0}
+
+# Largest up- or down-weighting applied from feedback
+_MAX_FEEDBACK_ADJUSTMENT = 0.5
+
+_WORD_PATTERN = re.compile(r"[a-z]{3,}")
+
+_STOPWORDS = frozenset(
+    [
+        "and",
+        "the",
+        "for",
+        "with",
+        "from",
+        "into",
+        "onto",
+        "then",
+        "than",
+        "that",
+        "this",
+        "are",
+        "was",
+        "were",
+        "has",
+        "have",
+        "not",
+        "but",
+        "all",
+        "any",
+        "each",
+        "per",
+        "via",
+        "use",
+        "using",
+        "used",
+        "step",
+        "steps",
+    ]
+)
+
+_index: MmapTable | None = None
+_index_version: tuple[str, int, int] | None = None
+_index_lock = threading.Lock()
+
+
+def build_citation_index(
+    corpus_paths: Iterable[str],
+    output_path: str,
+    feedback_path: str | None = None,
+) -> int:
+    """
+    Build the citation index from procedure corpus files.
+
+    Records without an ``id`` are skipped. Recognised fields are
+    ``target_smiles`` (or ``target``), ``reaction_class`` /
+    ``reaction_classes`` (top level, under ``metadata`` or per step), and
+    ``steps`` (strings, or objects with ``action``/``text``/``description``).
+
+    Args:
+        corpus_paths: JSONL corpus files
+        output_path: Index file to write
+        feedback_path: Feedback JSONL used to weight records by outcome
+
+    Returns:
+        Number of records indexed
+    """
+    outcomes = _load_feedback_outcomes(feedback_path) if feedback_path else {}
+
+    postings: dict[bytes, list[tuple[int, int]]] = defaultdict(list)
+    lengths: list[int] = []
+    weights: list[float] = []
+    entries: list[tuple[bytes, bytes]] = []
+
+    for record in _iter_records(corpus_paths):
+        doc = len(lengths)
+        terms = Counter(_record_terms(record))
+        for term, frequency in terms.items():
+            postings[term].append((doc, frequency))
+        lengths.append(sum(terms.values()))
+        feedback_key = str(record.get("request_id", record["id"]))
+        weights.append(_feedback_weight(outcomes.get(feedback_key, [])))
+        entries.append((b"d:" + _DOC_KEY.pack(doc), _encode_document(record)))
+
+    count = len(lengths)
+    average_length = sum(lengths) / count if count else 0.0
+
+    for term, docs in postings.items():
+        idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+        scored = []
+        for doc, frequency in docs:
+            norm = 1 - _B + _B * lengths[doc] / average_length
+            score = idf * frequency * (_K1 + 1) / (frequency + _K1 * norm)
+            scored.append((doc, score * weights[doc]))
+        scored.sort(key=lambda posting: posting[1], reverse=True)
+        entries.append((term, b"".join(_POSTING.pack(doc, score) for doc, score in scored)))
+
+    entries.append((b"m:", json.dumps({"documents": count}).encode("utf-8")))
+    write_table(output_path, entries)
+
+    logger.info(f"Indexed {count} procedures ({len(postings)} terms) into {output_path}")
+    return count
+
+
+def retrieve_citations(
+    target_smiles: str,
+    plan: dict[str, Any],
+    keywords: Iterable[str] = (),
+    top_k: int | None = None,
+) -> list[str]:
+    """
+    Find prior procedures relevant to a request.
+
+    Args:
+        target_smiles: Target molecule in SMILES format
+        plan: Normalized retrosynthesis plan
+        keywords: Free text describing the request (notes, methods)
+        top_k: Maximum citations returned, defaults to CITATION_TOP_K
+
+    Returns:
+        Citation strings, most relevant first; empty if no index is built
+    """
+    limit = settings.citation_top_k if top_k is None else top_k
+    if limit <= 0:
+        return []
+
+    terms = {_target_term(target_smiles)}
+    for step in plan.get("steps", []):
+        if isinstance(step, dict):
+            terms.update(_class_terms(step.get("reaction_class")))
+    for text in keywords:
+        terms.update(_keyword_terms(text))
+
+    # Read under the lock, so a rebuilt index cannot unmap the table mid-query
+    with _index_lock:
+        index = _mapped_index()
+        if index is None:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+        for term in terms:
+            view = index.get(term)
+            if view is None:
+                continue
+            head = view[: _MAX_POSTINGS_PER_TERM * _POSTING.size]
+            for doc, score in _POSTING.iter_unpack(head):
+                scores[doc] += score
+
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        citations = []
+        for doc, _ in ranked:
+            view = index.get(b"d:" + _DOC_KEY.pack(doc))
+            if view is not None:
+                citations.append(json.loads(bytes(view))["citation"])
+    return citations
+
+
+def get_citation_index() -> MmapTable | None:
+    """
+    Get the configured citation index, mapping it on first use.
+
+    The file is remapped when it is replaced, so a rebuilt index is picked up
+    without a restart.
+
+    Returns:
+        Open index, valid until the file is replaced, or None if no index
+        file exists
+    """
+    with _index_lock:
+        return _mapped_index()
+
+
+def _mapped_index() -> MmapTable | None:
+    """Map the configured index, replacing a stale mapping; hold ``_index_lock``."""
+    global _index, _index_version
+
+    path = settings.citation_index_path
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    version = (path, stat.st_ino, stat.st_mtime_ns)
+
+    if _index is None or _index_version != version:
+        try:
+            table = MmapTable(path)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable citation index: {e}")
+            return None
+        if _index is not None:
+            # Views still held by a caller of get_citation_index keep the old
+            # mapping alive; it is then unmapped when they are collected
+            with contextlib.suppress(BufferError):
+                _index.close()
+        _index, _index_version = table, version
+        logger.info(f"Mapped citation index {path} ({len(_index)} entries)")
+    return _index
+
+
+def _iter_records(corpus_paths: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Yield corpus records with an id, skipping malformed lines."""
+    for path in corpus_paths:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed corpus line {path}:{line_number}")
+                    continue
+                if isinstance(record, dict) and record.get("id") is not None:
+                    yield record
+
+
+def _record_terms(record: dict[str, Any]) -> list[bytes]:
+    """Extract index terms from a corpus record."""
+    terms = []
+
+    target = record.get("target_smiles") or record.get("target")
+    if isinstance(target, str) and target:
+        terms.append(_target_term(target))
+
+    metadata: dict[str, Any] = (
+        record["metadata"] if isinstance(record.get("metadata"), dict) else {}
+    )
+    for source in (record, metadata):
+        terms.extend(_class_terms(source.get("reaction_class")))
+        terms.extend(_class_terms(source.get("reaction_classes")))
+
+    for step in record.get("steps") or []:
+        if isinstance(step, str):
+            terms.extend(_keyword_terms(step))
+        elif isinstance(step, dict):
+            terms.extend(_class_terms(step.get("reaction_class")))
+            for field in ("action", "text", "description"):
+                if isinstance(step.get(field), str):
+                    terms.extend(_keyword_terms(step[field]))
+
+    return terms
+
+
+def _target_term(smiles: str) -> bytes:
+    """Index term for a target, keyed on its canonical form."""
+    return b"t:" + smiles_cache_key(smiles).encode("utf-8")
+
+
+def _class_terms(value: Any) -> list[bytes]:
+    """Reaction class words, from a class name or list of names."""
+    if isinstance(value, str):
+        return [b"c:" + word.encode() for word in _words(value)]
+    if isinstance(value, list):
+        return [term for item in value for term in _class_terms(item)]
+    return []
+
+
+def _keyword_terms(text: str) -> list[bytes]:
+    """Keyword terms of free text."""
+    return [b"k:" + word.encode() for word in _words(text)]
+
+
+def _words(text: str) -> list[str]:
+    """Lowercase words of at least three letters, without stopwords."""
+    return [word for word in _WORD_PATTERN.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _encode_document(record: dict[str, Any]) -> bytes:
+    """Stored form of a record: just what a citation needs."""
+    target = record.get("target_smiles") or record.get("target") or "unknown target"
+    title = record.get("title")
+    if not title:
+        step_count = record.get("step_count") or len(record.get("steps") or []) or None
+        title = f"Prior procedure for {target}"
+        if step_count:
+            title += f" ({step_count} steps)"
+    return json.dumps({"id": record["id"], "citation": f"{record['id']}: {title}"}).encode("utf-8")
+
+
+def _load_feedback_outcomes(path: str) -> dict[str, list[str]]:
+    """Map request ids to their recorded feedback outcomes."""
+    outcomes: dict[str, list[str]] = defaultdict(list)
+    feedback_path = Path(path)
+    if not feedback_path.exists():
+        return outcomes
+
+    with open(feedback_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "request_id" in record:
+                outcomes[str(record["request_id"])].append(str(record.get("outcome", "unknown")))
+    return outcomes
+
+
+def _feedback_weight(outcomes: list[str]) -> float:
+    """
+    Ranking weight from feedback outcomes.
+
+    Outcome scores are averaged with one neutral prior observation, so a
+    single report moves the weight less than a consistent history.
+    """
+    total = sum(_OUTCOME_SCORES.get(outcome, 0.0) for outcome in outcomes)
+    return 1.0 + _MAX_FEEDBACK_ADJUSTMENT * total / (len(outcomes) + 1)
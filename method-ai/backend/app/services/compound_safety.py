@@ -0,0 +1,192 @@
+"""Compound safety database service.
+
+Looks up compound-level safety data (GHS hazard statements, flash point,
+incompatibilities) for the reagents and products of a plan.
+``build_compound_safety_db`` compiles a JSONL dataset, as in
+``data/sample/compound_safety.jsonl``, into a memory-mapped table
+(``app.utils.mmap_table``) keyed by canonical SMILES. The table opens in
+constant time and lives in the page cache, so all workers share one copy.
+
+Salts appear in reaction SMILES as separate ions, so datasets key them by
+the hazardous ion (e.g. ``[N-]=[N+]=[N-]`` for sodium azide).
+"""
+
+import json
+import logging
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.utils.mmap_table import MmapTable, write_table
+from app.utils.smiles import InvalidSmilesError, canonicalize_smiles, smiles_cache_key
+
+logger = logging.getLogger(__name__)
+
+_db: MmapTable | None = None
+_db_version: tuple[str, int, int] | None = None
+_db_lock = threading.Lock()
+
+
+def build_compound_safety_db(dataset_paths: Iterable[str], output_path: str) -> int:
+    """
+    Build the compound safety database from dataset files.
+
+    Each record needs ``smiles``; ``name``, ``cas``, ``ghs`` (hazard
+    statement codes), ``flash_point_c`` and ``incompatibilities`` are
+    optional. Records with invalid SMILES are skipped; a later record for the
+    same compound replaces an earlier one.
+
+    Args:
+        dataset_paths: JSONL dataset files
+        output_path: Database file to write
+
+    Returns:
+        Number of compounds written
+    """
+    compounds: dict[bytes, bytes] = {}
+    for record in _iter_records(dataset_paths):
+        try:
+            key = canonicalize_smiles(record["smiles"])
+        except InvalidSmilesError as e:
+            logger.warning(f"Skipping compound with invalid SMILES: {e}")
+            continue
+        compounds[key.encode("utf-8")] = _encode_compound(record)
+
+    count = write_table(output_path, compounds.items())
+    logger.info(f"Wrote safety data for {count} compounds into {output_path}")
+    return count
+
+
+def lookup_compound(smiles: str) -> dict[str, Any] | None:
+    """
+    Get the safety data of a compound.
+
+    Args:
+        smiles: Compound in SMILES format, in any spelling
+
+    Returns:
+        Safety data, or None if the compound is unknown or no database is built
+    """
+    db = get_compound_safety_db()
+    if db is None:
+        return None
+    view = db.get(smiles_cache_key(smiles).encode("utf-8"))
+    return json.loads(bytes(view)) if view is not None else None
+
+
+def compound_flags(reactions: Iterable[tuple[int, str]]) -> list[str]:
+    """
+    Build one risk flag per known compound in a route.
+
+    Args:
+        reactions: Pairs of (step number, reaction SMILES)
+
+    Returns:
+        Risk flags with each compound's safety data and the steps using it,
+        in order of first use
+    """
+    db = get_compound_safety_db()
+    if db is None:
+        return []
+
+    # Compounds by canonical key: spelling first seen, and steps using it
+    used: dict[str, tuple[str, list[int]]] = {}
+    for step_number, rxn_smiles in reactions:
+        for part in rxn_smiles.split(">"):
+            for molecule in part.split("."):
+                if not molecule:
+                    continue
+                _, steps = used.setdefault(smiles_cache_key(molecule), (molecule, []))
+                if step_number not in steps:
+                    steps.append(step_number)
+
+    flags = []
+    for key, (molecule, steps) in used.items():
+        view = db.get(key.encode("utf-8"))
+        if view is None:
+            continue
+        flag = _describe(molecule, json.loads(bytes(view)), steps)
+        if flag is not None:
+            flags.append(flag)
+    return flags
+
+
+def get_compound_safety_db() -> MmapTable | None:
+    """
+    Get the configured compound safety database, mapping it on first use.
+
+    The file is remapped when it is replaced, so a rebuilt database is picked
+    up without a restart.
+
+    Returns:
+        Open database, or None if no database file exists
+    """
+    global _db, _db_version
+
+    path = settings.compound_safety_db_path
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    version = (path, stat.st_ino, stat.st_mtime_ns)
+
+    with _db_lock:
+        if _db is None or _db_version != version:
+            try:
+                _db = MmapTable(path)
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable compound safety database: {e}")
+                return None
+            _db_version = version
+            logger.info(f"Mapped compound safety database {path} ({len(_db)} compounds)")
+        return _db
+
+
+def _iter_records(dataset_paths: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Yield dataset records with a SMILES string, skipping malformed lines."""
+    for path in dataset_paths:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed dataset line {path}:{line_number}")
+                    continue
+                if isinstance(record, dict) and isinstance(record.get("smiles"), str):
+                    yield record
+
+
+def _encode_compound(record: dict[str, Any]) -> bytes:
+    """Stored form of a dataset record."""
+    flash_point = record.get("flash_point_c")
+    return json.dumps(
+        {
+            "name": record.get("name"),
+            "cas": record.get("cas"),
+            "ghs": [str(code) for code in record.get("ghs") or []],
+            "flash_point_c": flash_point if isinstance(flash_point, int | float) else None,
+            "incompatibilities": [str(item) for item in record.get("incompatibilities") or []],
+        }
+    ).encode("utf-8")
+
+
+def _describe(molecule: str, compound: dict[str, Any], steps: list[int]) -> str | None:
+    """Risk flag for a compound, or None if it has no safety data."""
+    details = []
+    if compound["ghs"]:
+        details.append("GHS " + ", ".join(compound["ghs"]))
+    if compound["flash_point_c"] is not None:
+        details.append(f"flash point {compound['flash_point_c']:g} °C")
+    if compound["incompatibilities"]:
+        details.append("incompatible with " + ", ".join(compound["incompatibilities"]))
+    if not details:
+        return None
+
+    name = f"{compound['name']} ({molecule})" if compound["name"] else molecule
+    plural = "s" if len(steps) > 1 else ""
+    numbers = ", ".join(str(number) for number in steps)
+    return f"{name} in step{plural} {numbers}: " + "; ".join(details)
@@ -0,0 +1,361 @@
+"""Equipment booking service.
+
+Records when shared instruments (rotovap, NMR, ...) are booked, so a
+procedure can be checked against them: the lab equipment it uses must be
+free for the whole session, ``time_budget_hours`` long. Instruments are
+identified by the names used in ``LabContext.equipment``, case-insensitively.
+
+Bookings are kept in a SQLite database (``EQUIPMENT_BOOKINGS_PATH``) shared
+by all workers. Each process indexes them per instrument, sorted by start.
+An instrument's bookings never overlap, so their ends are sorted too, and
+the bookings overlapping a window are found by two bisections: checks take
+logarithmic time plus one step per conflict, even past long bookings.
+Adding or cancelling a booking shifts the lists behind it, which is linear
+but a single memory move per list. A generation counter, bumped by every
+write, tells workers when to rebuild their index.
+"""
+
+import bisect
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.core.config import settings
+from app.utils.sqlite import SQLiteConnections, transaction
+
+logger = logging.getLogger(__name__)
+
+_connections = SQLiteConnections(
+    [
+        "CREATE TABLE IF NOT EXISTS equipment_bookings (booking_id TEXT PRIMARY KEY, "
+        "equipment TEXT NOT NULL, starts_at REAL NOT NULL, ends_at REAL NOT NULL, "
+        "booked_by TEXT) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS booking_generation (generation INTEGER NOT NULL)",
+        "INSERT INTO booking_generation (generation) "
+        "SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM booking_generation)",
+    ]
+)
+_index: dict[str, "_Timeline"] = {}
+_index_version: tuple[str, int] | None = None
+_index_lock = threading.Lock()
+
+
+class BookingNotFoundError(Exception):
+    """Raised when no booking exists for an ID."""
+
+
+class BookingConflictError(Exception):
+    """Raised when a booking overlaps existing bookings of its instrument."""
+
+    def __init__(self, conflicts: list["Booking"]) -> None:
+        super().__init__(", ".join(booking.booking_id for booking in conflicts))
+        self.conflicts = conflicts
+
+
+@dataclass(frozen=True, slots=True)
+class Booking:
+    """A booked time window of one instrument."""
+
+    booking_id: str
+    equipment: str
+    start: datetime
+    end: datetime
+    booked_by: str | None = None
+
+
+class _Timeline:
+    """
+    Bookings of one instrument, sorted by start.
+
+    An instrument's bookings never overlap (``create_booking`` rejects
+    overlaps), so sorting them by start sorts them by end too, and the
+    bookings overlapping a window are one contiguous run.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "owners")
+
+    def __init__(self) -> None:
+        self.starts: list[float] = []
+        self.ends: list[float] = []
+        self.ids: list[str] = []
+        self.owners: list[str | None] = []
+
+    def add(self, booking_id: str, start: float, end: float, owner: str | None) -> None:
+        """Insert a booking in start order."""
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+        self.owners.insert(i, owner)
+
+    def remove(self, booking_id: str, start: float) -> None:
+        """Delete a booking by ID and start."""
+        i = bisect.bisect_left(self.starts, start)
+        while self.ids[i] != booking_id:
+            i += 1
+        for values in (self.starts, self.ends, self.ids, self.owners):
+            del values[i]
+
+    def blocked_until(self, start: float, end: float) -> float | None:
+        """End of the last booking overlapping a window, if any overlaps."""
+        span = self._span(start, end)
+        return self.ends[span[-1]] if span else None
+
+    def overlapping(self, start: float, end: float) -> Iterator[int]:
+        """Positions of the bookings overlapping a window, latest start first."""
+        return reversed(self._span(start, end))
+
+    def _span(self, start: float, end: float) -> range:
+        """Positions of the bookings ending after ``start`` and starting before ``end``."""
+        return range(bisect.bisect_right(self.ends, start), bisect.bisect_left(self.starts, end))
+
+
+def create_booking(
+    equipment: str, start: datetime, end: datetime, booked_by: str | None = None
+) -> Booking:
+    """
+    Book an instrument for a time window.
+
+    Args:
+        equipment: Instrument name, as used in ``LabContext.equipment``
+        start: Start of the window (naive datetimes are taken as UTC)
+        end: End of the window, after ``start``
+        booked_by: Who the booking is for
+
+    Returns:
+        The stored booking
+
+    Raises:
+        BookingConflictError: If the window overlaps a booking of the instrument
+    """
+    booking = Booking(str(uuid.uuid4()), _key(equipment), _utc(start), _utc(end), booked_by)
+    start_ts, end_ts = booking.start.timestamp(), booking.end.timestamp()
+
+    conn = _connection()
+    with transaction(conn), _index_lock:
+        _sync_index(conn)
+        timeline = _index.get(booking.equipment)
+        if timeline is not None:
+            conflicts = [
+                _booking(booking.equipment, timeline, i)
+                for i in timeline.overlapping(start_ts, end_ts)
+            ]
+            if conflicts:
+                raise BookingConflictError(conflicts)
+        conn.execute(
+            "INSERT INTO equipment_bookings "
+            "(booking_id, equipment, starts_at, ends_at, booked_by) VALUES (?, ?, ?, ?, ?)",
+            (booking.booking_id, booking.equipment, start_ts, end_ts, booked_by),
+        )
+        _bump_generation(conn)
+        _index.setdefault(booking.equipment, _Timeline()).add(
+            booking.booking_id, start_ts, end_ts, booked_by
+        )
+    logger.info(f"Booked {booking.equipment} from {booking.start} to {booking.end}")
+    return booking
+
+
+def delete_booking(booking_id: str) -> None:
+    """
+    Cancel a booking.
+
+    Args:
+        booking_id: Booking to cancel
+
+    Raises:
+        BookingNotFoundError: If the booking does not exist
+    """
+    conn = _connection()
+    with transaction(conn), _index_lock:
+        _sync_index(conn)
+        row = conn.execute(
+            "DELETE FROM equipment_bookings WHERE booking_id = ? RETURNING equipment, starts_at",
+            (booking_id,),
+        ).fetchone()
+        if row is None:
+            raise BookingNotFoundError(booking_id)
+        _bump_generation(conn)
+        _index[row[0]].remove(booking_id, row[1])
+    logger.info(f"Cancelled booking {booking_id}")
+
+
+def find_conflicts(equipment: Iterable[str], start: datetime, end: datetime) -> list[Booking]:
+    """
+    Find the bookings overlapping a time window.
+
+    Args:
+        equipment: Instrument names
+        start: Start of the window
+        end: End of the window
+
+    Returns:
+        Overlapping bookings, by instrument, latest start first
+    """
+    start_ts, end_ts = _utc(start).timestamp(), _utc(end).timestamp()
+    conn = _connection()
+    conflicts: list[Booking] = []
+    with _index_lock:
+        _sync_index(conn)
+        for name in dict.fromkeys(_key(name) for name in equipment):
+            timeline = _index.get(name)
+            if timeline is not None:
+                conflicts.extend(
+                    _booking(name, timeline, i) for i in timeline.overlapping(start_ts, end_ts)
+                )
+    return conflicts
+
+
+def earliest_start(
+    equipment: Iterable[str], hours: float, after: datetime, horizon_days: float | None = None
+) -> datetime | None:
+    """
+    Find the earliest time all instruments are free for a whole window.
+
+    Args:
+        equipment: Instrument names
+        hours: Length of the window
+        after: Earliest acceptable start
+        horizon_days: How far past ``after`` to search, defaults to
+            ``EQUIPMENT_BOOKING_HORIZON_DAYS``
+
+    Returns:
+        Earliest start, or None if there is no such window within the horizon
+    """
+    if horizon_days is None:
+        horizon_days = settings.equipment_booking_horizon_days
+    names = {_key(name) for name in equipment}
+    duration = hours * 3600.0
+    start = _utc(after).timestamp()
+    latest = start + horizon_days * 86400.0
+
+    conn = _connection()
+    with _index_lock:
+        _sync_index(conn)
+        timelines = [_index[name] for name in names if name in _index]
+        # Jump past the bookings in the way until none is; no earlier start
+        # can work, since the booking ending last among them would overlap
+        while start <= latest:
+            blocked = [timeline.blocked_until(start, start + duration) for timeline in timelines]
+            ends = [end for end in blocked if end is not None]
+            if not ends:
+                return datetime.fromtimestamp(start, timezone.utc)
+            start = max(ends)
+    return None
+
+
+def booking_flags(
+    equipment: Iterable[str], hours: float, now: datetime | None = None
+) -> list[str]:
+    """
+    Build a risk flag for equipment booked during a session starting now.
+
+    Args:
+        equipment: Instruments the procedure uses (``LabContext.equipment``)
+        hours: Length of the session (``time_budget_hours``)
+        now: Start of the session, defaults to the current time
+
+    Returns:
+        One flag naming the conflicting bookings and the earliest start with
+        all equipment free, or nothing if there is no conflict
+    """
+    equipment = list(equipment)
+    if not equipment or not Path(settings.equipment_bookings_path).exists():
+        return []
+    now = now or datetime.now(timezone.utc)
+    conflicts = find_conflicts(equipment, now, now + timedelta(hours=hours))
+    if not conflicts:
+        return []
+
+    booked = ", ".join(
+        f"{booking.equipment} ({_format(booking.start)} to {_format(booking.end)})"
+        for booking in conflicts
+    )
+    start = earliest_start(equipment, hours, now)
+    if start is None:
+        advice = (
+            f"no {hours:g} h window with all equipment free in the next "
+            f"{settings.equipment_booking_horizon_days:g} days"
+        )
+    else:
+        advice = f"earliest start with all equipment free: {_format(start)}"
+    return [f"Equipment booked within the next {hours:g} h: {booked} - {advice}"]
+
+
+def close_equipment_bookings() -> None:
+    """Forget the booking index and close this thread's connection."""
+    global _index_version
+    with _index_lock:
+        _index.clear()
+        _index_version = None
+    _connections.close()
+
+
+def _sync_index(conn: sqlite3.Connection) -> None:
+    """Rebuild the index if the stored generation moved on; hold ``_index_lock``."""
+    global _index_version
+    (generation,) = conn.execute("SELECT generation FROM booking_generation").fetchone()
+    version = (settings.equipment_bookings_path, generation)
+    if version == _index_version:
+        return
+
+    started = time.perf_counter()
+    _index.clear()
+    rows = conn.execute(
+        "SELECT equipment, booking_id, starts_at, ends_at, booked_by FROM equipment_bookings "
+        "ORDER BY equipment, starts_at"
+    )
+    for equipment, booking_id, start, end, booked_by in rows:
+        _index.setdefault(equipment, _Timeline()).add(booking_id, start, end, booked_by)
+    _index_version = version
+    logger.info(
+        f"Indexed equipment bookings for {len(_index)} instruments "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+
+
+def _bump_generation(conn: sqlite3.Connection) -> None:
+    """Mark the bookings as changed; the caller updates its index to match."""
+    global _index_version
+    (generation,) = conn.execute(
+        "UPDATE booking_generation SET generation = generation + 1 RETURNING generation"
+    ).fetchone()
+    _index_version = (settings.equipment_bookings_path, generation)
+
+
+def _booking(equipment: str, timeline: _Timeline, i: int) -> Booking:
+    """Booking at a position of a timeline."""
+    return Booking(
+        booking_id=timeline.ids[i],
+        equipment=equipment,
+        start=datetime.fromtimestamp(timeline.starts[i], timezone.utc),
+        end=datetime.fromtimestamp(timeline.ends[i], timezone.utc),
+        booked_by=timeline.owners[i],
+    )
+
+
+def _key(equipment: str) -> str:
+    """Instrument name as stored."""
+    return equipment.strip().lower()
+
+
+def _utc(value: datetime) -> datetime:
+    """Timezone-aware UTC datetime; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _format(value: datetime) -> str:
+    """Short UTC timestamp for flags."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+
+def _connection() -> sqlite3.Connection:
+    """Get this thread's connection to the booking database."""
+    return _connections.get(settings.equipment_bookings_path)
@@ -0,0 +1,294 @@
+"""Feedback export service.
+
+Streams stored feedback records as NDJSON, filtered by outcome, time range
+and request_id prefix.
+
+Records are appended in time order, so a sparse timestamp index kept next to
+the feedback file (``feedback.idx``) lets an export seek straight to the
+start of its time range. The index holds one fixed-width
+``(timestamp, byte offset)`` entry roughly every FEEDBACK_INDEX_INTERVAL_BYTES
+of records. It is extended by every append and rebuilt by the next export
+if it is missing or stale.
+
+Exports read the file line by line, in constant memory, and end with a
+trailer line holding a cursor: the byte offset to resume from. An export
+stops at the end of the file as it was when the export started, so records
+appended meanwhile are picked up by resuming from the cursor.
+"""
+
+import json
+import logging
+import struct
+from bisect import bisect_right
+from collections.abc import Collection, Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from filelock import FileLock
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_ENTRY = struct.Struct("<dQ")
+
+# Records can be slightly out of timestamp order when appends race; seeks
+# start this much earlier, and scans stop this much later, to cover them
+_ORDER_SLACK = timedelta(seconds=60)
+
+# Export output is sent in chunks of about this many bytes
+_CHUNK_BYTES = 64 * 1024
+
+
+class InvalidCursorError(ValueError):
+    """Raised when an export cursor does not point at a record."""
+
+
+def index_path(feedback_path: Path) -> Path:
+    """Timestamp index file of a feedback file."""
+    return feedback_path.with_suffix(".idx")
+
+
+def note_append(feedback_path: Path, offset: int, timestamp: str) -> None:
+    """
+    Extend the timestamp index after an append.
+
+    Must be called while holding the feedback file lock.
+
+    Args:
+        feedback_path: Feedback file appended to
+        offset: Byte offset of the first appended record
+        timestamp: Timestamp of the first appended record
+    """
+    path = index_path(feedback_path)
+    entry = _ENTRY.pack(_epoch(timestamp), offset)
+
+    if offset == 0:
+        path.write_bytes(entry)
+        return
+    if not path.exists():
+        # Built from the whole file by the next export
+        return
+
+    with open(path, "r+b") as f:
+        end = f.seek(0, 2)
+        end -= end % _ENTRY.size
+        if end == 0:
+            return
+        f.seek(end - _ENTRY.size)
+        _, last_offset = _ENTRY.unpack(f.read(_ENTRY.size))
+        if offset - last_offset >= settings.feedback_index_interval_bytes:
+            f.seek(end)
+            f.write(entry)
+            f.truncate()
+
+
+def export_feedback(
+    outcomes: Collection[str] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    request_id_prefix: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+) -> Iterator[bytes]:
+    """
+    Stream matching feedback records as NDJSON.
+
+    The last line is a trailer, ``{"next_cursor": ..., "exported": ...,
+    "complete": ...}``; pass ``next_cursor`` back to resume after the last
+    record read. ``complete`` is false if the export stopped at ``limit``.
+
+    Args:
+        outcomes: Only export these outcomes
+        since: Only export records at or after this time
+        until: Only export records at or before this time
+        request_id_prefix: Only export request IDs starting with this
+        cursor: Resume from a previous export's ``next_cursor``
+        limit: Maximum number of records to export
+
+    Yields:
+        Chunks of NDJSON output
+
+    Raises:
+        InvalidCursorError: If the cursor does not point at a record
+    """
+    feedback_path = Path(settings.feedback_storage_path)
+    end = feedback_path.stat().st_size if feedback_path.exists() else 0
+    start = _parse_cursor(feedback_path, cursor, end)
+    since = _as_utc(since) if since is not None else None
+    until = _as_utc(until) if until is not None else None
+    if since is not None:
+        start = max(start, _seek(feedback_path, end, since - _ORDER_SLACK))
+
+    return _stream(
+        feedback_path,
+        start,
+        end,
+        frozenset(outcomes) if outcomes else None,
+        since,
+        until,
+        request_id_prefix,
+        limit,
+    )
+
+
+def _stream(
+    feedback_path: Path,
+    start: int,
+    end: int,
+    outcomes: frozenset[str] | None,
+    since: datetime | None,
+    until: datetime | None,
+    request_id_prefix: str | None,
+    limit: int | None,
+) -> Iterator[bytes]:
+    """Read records from start to end, yielding matches in chunks."""
+    position = start
+    exported = 0
+    complete = True
+    stop_after = until + _ORDER_SLACK if until is not None else None
+    chunk: list[bytes] = []
+    chunk_size = 0
+
+    if start < end:
+        with open(feedback_path, "rb") as f:
+            f.seek(start)
+            while position < end:
+                if limit is not None and exported >= limit:
+                    complete = False
+                    break
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    # Partially written record at the end of the file
+                    break
+                position += len(line)
+
+                try:
+                    record = json.loads(line)
+                    timestamp = _as_utc(datetime.fromisoformat(record["timestamp"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if stop_after is not None and timestamp > stop_after:
+                    break
+                if not _matches(record, timestamp, outcomes, since, until, request_id_prefix):
+                    continue
+
+                chunk.append(line)
+                chunk_size += len(line)
+                exported += 1
+                if chunk_size >= _CHUNK_BYTES:
+                    yield b"".join(chunk)
+                    chunk, chunk_size = [], 0
+
+    trailer = {"next_cursor": str(position), "exported": exported, "complete": complete}
+    chunk.append(json.dumps(trailer).encode("utf-8") + b"\n")
+    yield b"".join(chunk)
+
+
+def _matches(
+    record: dict,
+    timestamp: datetime,
+    outcomes: frozenset[str] | None,
+    since: datetime | None,
+    until: datetime | None,
+    request_id_prefix: str | None,
+) -> bool:
+    """Whether a record passes the export filters."""
+    if outcomes is not None and record.get("outcome") not in outcomes:
+        return False
+    if since is not None and timestamp < since:
+        return False
+    if until is not None and timestamp > until:
+        return False
+    return not request_id_prefix or str(record.get("request_id", "")).startswith(
+        request_id_prefix
+    )
+
+
+def _parse_cursor(feedback_path: Path, cursor: str | None, end: int) -> int:
+    """Byte offset of a cursor, checked to be at the start of a record."""
+    if cursor is None:
+        return 0
+    try:
+        offset = int(cursor)
+    except ValueError:
+        raise InvalidCursorError(f"Malformed cursor: {cursor!r}") from None
+    if offset < 0 or offset > end:
+        raise InvalidCursorError(f"Cursor out of range: {cursor!r}")
+    if offset > 0:
+        with open(feedback_path, "rb") as f:
+            f.seek(offset - 1)
+            if f.read(1) != b"\n":
+                raise InvalidCursorError(f"Cursor does not point at a record: {cursor!r}")
+    return offset
+
+
+def _seek(feedback_path: Path, end: int, since: datetime) -> int:
+    """Offset of the last indexed record before a time."""
+    timestamps, offsets = _load_index(feedback_path, end)
+    position = bisect_right(timestamps, since.timestamp()) - 1
+    return offsets[position] if position >= 0 else 0
+
+
+def _load_index(feedback_path: Path, end: int) -> tuple[list[float], list[int]]:
+    """Read the timestamp index, rebuilding it if missing or stale."""
+    path = index_path(feedback_path)
+    entries = _read_index(path)
+    if entries and entries[-1][1] < end and entries[0][1] == 0:
+        return [ts for ts, _ in entries], [offset for _, offset in entries]
+    if end == 0:
+        return [], []
+
+    with FileLock(feedback_path.with_suffix(".lock")):
+        entries = _rebuild_index(feedback_path, path)
+    return [ts for ts, _ in entries], [offset for _, offset in entries]
+
+
+def _read_index(path: Path) -> list[tuple[float, int]]:
+    """Index entries, or an empty list if there is no index."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    data = data[: len(data) - len(data) % _ENTRY.size]
+    return list(_ENTRY.iter_unpack(data))
+
+
+def _rebuild_index(feedback_path: Path, path: Path) -> list[tuple[float, int]]:
+    """Scan the feedback file and write a fresh index. Caller holds the lock."""
+    interval = settings.feedback_index_interval_bytes
+    entries = []
+    last_offset = None
+    offset = 0
+    with open(feedback_path, "rb") as f:
+        for line in f:
+            if last_offset is None or offset - last_offset >= interval:
+                try:
+                    timestamp = _epoch(json.loads(line)["timestamp"])
+                except (ValueError, KeyError, TypeError):
+                    timestamp = None
+                if timestamp is not None:
+                    entries.append((timestamp, offset))
+                    last_offset = offset
+            offset += len(line)
+
+    if not entries or entries[0][1] != 0:
+        entries.insert(0, (float("-inf"), 0))
+
+    tmp_path = path.with_suffix(".idx.tmp")
+    tmp_path.write_bytes(b"".join(_ENTRY.pack(ts, offset) for ts, offset in entries))
+    tmp_path.replace(path)
+    logger.info(f"Rebuilt feedback index with {len(entries)} entries")
+    return entries
+
+
+def _epoch(timestamp: str) -> float:
+    """Unix time of an ISO 8601 timestamp."""
+    return _as_utc(datetime.fromisoformat(timestamp)).timestamp()
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -7,11 +7,13 @@ import json
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any
 
 from filelock import FileLock
 
 from app.core.config import settings
 from app.models.schemas import FeedbackOutcome
+from app.services.feedback_export import note_append
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,8 @@ def store_feedback(
     edits: str,
     outcome: FeedbackOutcome,
     notes: str | None = None,
+    target_smiles: str | None = None,
+    known_request_id: bool | None = None,
 ) -> None:
     """
     Store feedback to the feedback file.
@@ -32,30 +36,98 @@ def store_feedback(
         edits: Description of edits made
         outcome: Outcome of the procedure
         notes: Additional notes
+        target_smiles: Target of the original request, if known
+        known_request_id: Whether the request_id was issued, if checked
     """
-    feedback_path = Path(settings.feedback_storage_path)
+    record = feedback_record(
+        request_id, edits, outcome, notes, target_smiles, known_request_id=known_request_id
+    )
+    _append_records([record])
+    logger.info(f"Stored feedback for request {request_id}")
 
-    # Ensure directory exists
-    feedback_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Create feedback record
-    record = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+def store_feedback_batch(records: list[dict[str, Any]]) -> int:
+    """
+    Store many feedback records in one locked append.
+
+    Args:
+        records: Records built by ``feedback_record``
+
+    Returns:
+        Number of records stored
+    """
+    if records:
+        _append_records(records)
+        logger.info(f"Stored batch of {len(records)} feedback records")
+    return len(records)
+
+
+def feedback_record(
+    request_id: str,
+    edits: str,
+    outcome: FeedbackOutcome,
+    notes: str | None = None,
+    target_smiles: str | None = None,
+    timestamp: datetime | None = None,
+    known_request_id: bool | None = None,
+) -> dict[str, Any]:
+    """
+    Build a feedback record as stored in the feedback file.
+
+    Args:
+        request_id: Original procedure request ID
+        edits: Description of edits made
+        outcome: Outcome of the procedure
+        notes: Additional notes
+        target_smiles: Target of the original request, if known
+        timestamp: Time of submission, defaults to now
+        known_request_id: Whether the request_id was issued, if checked
+
+    Returns:
+        JSON-serializable record
+    """
+    return {
+        "timestamp": (timestamp or datetime.now(timezone.utc)).isoformat(),
         "request_id": request_id,
         "edits": edits,
         "outcome": outcome.value,
         "notes": notes,
+        "target_smiles": target_smiles,
+        "known_request_id": known_request_id,
     }
 
+
+def _append_records(records: list[dict[str, Any]]) -> None:
+    """
+    Append records under the file lock, with a single write and flush.
+
+    Also extends the timestamp index used to seek exports.
+
+    Args:
+        records: Records built by ``feedback_record``; the first one's
+            timestamp is indexed
+
+    Raises:
+        OSError: If the feedback file or its index cannot be written
+    """
+    feedback_path = Path(settings.feedback_storage_path)
+
+    # Ensure directory exists
+    feedback_path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
     # Write with file lock
     lock_path = feedback_path.with_suffix(".lock")
     lock = FileLock(lock_path)
 
     try:
         with lock:
-            with open(feedback_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(record) + "\n")
-        logger.info(f"Stored feedback for request {request_id}")
+            with open(feedback_path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+            note_append(feedback_path, offset, records[0]["timestamp"])
     except Exception as e:
         logger.error(f"Failed to store feedback: {e}")
         raise
@@ -0,0 +1,258 @@
+"""Hazardous reagent detection in reaction SMILES.
+
+A catalog maps hazard classes (acyl chlorides, azides, pyrophorics, ...) to
+the risk flag raised when a reaction involves one. Each hazard is described
+by SMILES fragments spelling its reactive group. All fragments of all
+hazards are compiled once into an Aho-Corasick automaton over SMILES tokens,
+so scanning a molecule takes one pass over its tokens however large the
+catalog grows.
+
+Fragments match the SMILES as written and in canonical form, which covers
+the common spellings of each group. When RDKit is installed, hazards with a
+SMARTS pattern are also found by substructure search, whatever the spelling.
+Results are memoized per reaction SMILES.
+"""
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.smiles import (
+    InvalidSmilesError,
+    canonicalize_smiles,
+    get_rdkit_chem,
+    tokenize_smiles,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Hazard:
+    """A class of hazardous reagents and the precaution it calls for."""
+
+    name: str
+    label: str
+    precaution: str
+    fragments: tuple[str, ...]
+    smarts: str | None = None
+
+
+_PYROPHORIC = "pyrophoric; transfer under inert atmosphere by syringe or cannula"
+
+HAZARDS: tuple[Hazard, ...] = (
+    Hazard(
+        name="acyl_chloride",
+        label="Acyl chloride",
+        precaution="corrosive and reacts violently with water; keep dry, use a fume hood",
+        fragments=("C(=O)Cl", "C(Cl)=O", "C(Cl)(=O)", "ClC(=O)", "O=C(Cl)"),
+        smarts="[CX3](=O)Cl",
+    ),
+    Hazard(
+        name="inorganic_acid_chloride",
+        label="Thionyl, sulfuryl or phosphorus chloride",
+        precaution="corrosive, releases HCl with moisture; keep dry, quench slowly",
+        fragments=(
+            "ClS(Cl)=O",
+            "ClS(=O)Cl",
+            "O=S(Cl)Cl",
+            "ClS(=O)(=O)Cl",
+            "O=S(=O)(Cl)Cl",
+            "ClP(Cl)Cl",
+            "ClP(Cl)(Cl)=O",
+            "O=P(Cl)(Cl)Cl",
+        ),
+        smarts="[S,P](Cl)Cl",
+    ),
+    Hazard(
+        name="azide",
+        label="Azide",
+        precaution=(
+            "shock- and heat-sensitive, forms explosive metal azides and toxic HN3 with acid"
+            "; avoid metal spatulas, acids and concentrating to dryness"
+        ),
+        fragments=("N=[N+]=[N-]", "[N-]=[N+]=N", "[N-]=[N+]=[N-]", "[N+](=[N-])=[N-]"),
+        smarts="N=[N+]=[N-]",
+    ),
+    Hazard(
+        name="diazo",
+        label="Diazo compound",
+        precaution="toxic and explosive; use a blast shield and avoid ground-glass joints",
+        fragments=("C=[N+]=[N-]", "[N-]=[N+]=C"),
+        smarts="[#6]=[N+]=[N-]",
+    ),
+    Hazard(
+        name="organolithium",
+        label="Organolithium reagent",
+        precaution=_PYROPHORIC,
+        fragments=("[Li]C", "C[Li]", "[Li]c", "c[Li]", ")[Li]", "C([Li])"),
+        smarts="[Li][#6]",
+    ),
+    Hazard(
+        name="metal_alkyl",
+        label="Alkylaluminium or alkylzinc reagent",
+        precaution=_PYROPHORIC,
+        fragments=("[Al]C", "C[Al]", ")[Al]", "[Zn]C", "C[Zn]", "[AlH]"),
+        smarts="[Al,Zn][#6]",
+    ),
+    Hazard(
+        name="grignard",
+        label="Grignard reagent",
+        precaution="reacts violently with water; keep dry under inert gas, away from ignition",
+        fragments=("[Mg]C", "C[Mg]", "[Mg]c", "c[Mg]"),
+        smarts="[Mg][#6]",
+    ),
+    Hazard(
+        name="metal_hydride",
+        label="Reactive metal hydride",
+        precaution="releases flammable hydrogen with water; quench slowly at low temperature",
+        fragments=("[AlH4-]", "[NaH]", "[KH]", "[LiH]", "[CaH2]", "[H-]"),
+    ),
+    Hazard(
+        name="peroxide",
+        label="Peroxide",
+        precaution="may detonate on heating, friction or concentration; never distil to dryness",
+        fragments=("OO",),
+        smarts="[OX2][OX2]",
+    ),
+    Hazard(
+        name="hydrazine",
+        label="Hydrazine",
+        precaution="toxic and a suspected carcinogen; avoid inhalation and skin contact",
+        fragments=("NN", "[NH2][NH2]", "N[NH2]"),
+        smarts="[NX3][NX3]",
+    ),
+    Hazard(
+        name="cyanide",
+        label="Cyanide salt",
+        precaution="highly toxic, releases HCN with acid; keep basic, have an antidote on hand",
+        fragments=("[C-]#N", "N#[C-]", "[Na]C#N", "N#C[Na]", "[K]C#N", "N#C[K]"),
+        smarts="[C-]#N",
+    ),
+    Hazard(
+        name="heavy_metal",
+        label="Toxic heavy metal compound",
+        precaution="highly toxic; avoid skin contact and collect waste separately",
+        fragments=(
+            "[Hg]",
+            "[Hg+]",
+            "[Hg+2]",
+            "[Os]",
+            "[Cd]",
+            "[Cd+2]",
+            "[Tl]",
+            "[Tl+]",
+            "[Cr]",
+            "[Pb]",
+            "[Pb+2]",
+            "[As]",
+        ),
+        smarts="[Hg,Os,Cd,Tl,Cr,Pb,As]",
+    ),
+)
+
+_HAZARD_ORDER = {hazard.name: index for index, hazard in enumerate(HAZARDS)}
+
+
+@lru_cache(maxsize=settings.hazard_scan_cache_size)
+def scan_reaction(rxn_smiles: str) -> tuple[str, ...]:
+    """
+    Find the hazards involved in a reaction.
+
+    Args:
+        rxn_smiles: Reaction SMILES (``reactants>agents>products``) or a
+            single molecule
+
+    Returns:
+        Names of the hazards found, in catalog order
+    """
+    automaton = _automaton()
+    patterns = _substructure_patterns()
+    chem = get_rdkit_chem() if patterns else None
+
+    found: set[str] = set()
+    for part in rxn_smiles.split(">"):
+        for molecule in part.split("."):
+            if not molecule:
+                continue
+            for tokens in _spellings(molecule):
+                found.update(value for _, _, value in automaton.search(tokens))
+            if chem is not None:
+                found.update(_substructure_hazards(chem, molecule, patterns))
+
+    return tuple(sorted(found, key=_HAZARD_ORDER.__getitem__))
+
+
+def hazard_flags(reactions: Iterable[tuple[int, str]]) -> list[str]:
+    """
+    Build one risk flag per hazard found in a route.
+
+    Args:
+        reactions: Pairs of (step number, reaction SMILES)
+
+    Returns:
+        Risk flags naming the steps involved, in catalog order
+    """
+    steps: dict[str, list[int]] = {}
+    for step_number, rxn_smiles in reactions:
+        for name in scan_reaction(rxn_smiles):
+            steps.setdefault(name, []).append(step_number)
+
+    flags = []
+    for name in sorted(steps, key=_HAZARD_ORDER.__getitem__):
+        hazard = HAZARDS[_HAZARD_ORDER[name]]
+        numbers = ", ".join(str(number) for number in steps[name])
+        plural = "s" if len(steps[name]) > 1 else ""
+        flags.append(f"{hazard.label} in step{plural} {numbers} - {hazard.precaution}")
+    return flags
+
+
+def _spellings(molecule: str) -> list[list[str]]:
+    """Tokens of a molecule as written and in canonical form."""
+    try:
+        written = tokenize_smiles(molecule)
+    except InvalidSmilesError:
+        logger.debug(f"Skipping unparseable molecule in hazard scan: {molecule[:50]}")
+        return []
+    try:
+        canonical = canonicalize_smiles(molecule)
+    except InvalidSmilesError:
+        return [written]
+    if canonical == molecule:
+        return [written]
+    return [written, tokenize_smiles(canonical)]
+
+
+def _substructure_hazards(chem: Any, molecule: str, patterns: list[tuple[str, Any]]) -> set[str]:
+    """Hazards whose SMARTS pattern matches a molecule, using RDKit."""
+    mol = chem.MolFromSmiles(molecule)
+    if mol is None:
+        return set()
+    return {name for name, pattern in patterns if mol.HasSubstructMatch(pattern)}
+
+
+@lru_cache(maxsize=1)
+def _automaton() -> AhoCorasick[str]:
+    """Compile the fragments of every hazard."""
+    return AhoCorasick(
+        (tokenize_smiles(fragment), hazard.name)
+        for hazard in HAZARDS
+        for fragment in hazard.fragments
+    )
+
+
+@lru_cache(maxsize=1)
+def _substructure_patterns() -> list[tuple[str, Any]]:
+    """Compiled SMARTS patterns, or none without RDKit."""
+    chem = get_rdkit_chem()
+    if chem is None:
+        return []
+    return [
+        (hazard.name, chem.MolFromSmarts(hazard.smarts))
+        for hazard in HAZARDS
+        if hazard.smarts is not None
+    ]
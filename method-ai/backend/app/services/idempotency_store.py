@@ -0,0 +1,112 @@
+"""Idempotency store service.
+
+Lets clients retry generate-procedure requests safely by sending an
+``Idempotency-Key`` header. The first request for a key runs the pipeline and
+its encoded response is stored for a configurable window; repeats replay the
+stored response, and repeats that arrive while the original is still running
+wait for it instead of running the pipeline again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from app.core.config import settings
+from app.models.schemas import GenerateProcedureRequest
+from app.services.cache import create_cache
+
+logger = logging.getLogger(__name__)
+
+_PENDING = "pending"
+_DONE = "done"
+
+# How often a repeated request checks whether the original has finished
+_POLL_INTERVAL_SECONDS = 0.05
+
+_store = create_cache(
+    "idempotency",
+    maxsize=settings.idempotency_max_entries,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+)
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """Raised when a key is reused with a different request body."""
+
+
+class IdempotencyInProgressError(Exception):
+    """Raised when the original request for a key did not finish in time."""
+
+
+def request_fingerprint(request: GenerateProcedureRequest) -> str:
+    """
+    Compute a stable fingerprint of a request body.
+
+    Args:
+        request: Validated generate-procedure request
+
+    Returns:
+        Hex digest identifying the request payload
+    """
+    # The deadline bounds one attempt; retries may reasonably change it
+    payload = request.model_dump_json(exclude={"deadline_ms"})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def run_idempotent(
+    key: str,
+    fingerprint: str,
+    compute: Callable[[], Awaitable[bytes]],
+) -> tuple[bytes, bool]:
+    """
+    Run ``compute`` at most once per idempotency key.
+
+    Args:
+        key: Client-supplied idempotency key
+        fingerprint: Fingerprint of the request body
+        compute: Produces the encoded response for a first request
+
+    Returns:
+        Tuple of (encoded response, whether it was replayed)
+
+    Raises:
+        IdempotencyKeyMismatchError: If the key was used for another body
+        IdempotencyInProgressError: If the original request is still running
+            after the configured wait
+    """
+    wait_until = time.monotonic() + settings.idempotency_wait_seconds
+
+    while True:
+        record = _store.get(key)
+
+        if record is None:
+            pending = {"state": _PENDING, "fingerprint": fingerprint, "body": None}
+            if not _store.add(key, pending, ttl_seconds=settings.idempotency_pending_ttl_seconds):
+                # Another request claimed the key first
+                continue
+            try:
+                body = await compute()
+            except BaseException:
+                _store.delete(key)
+                raise
+            _store.set(key, {"state": _DONE, "fingerprint": fingerprint, "body": body.decode("utf-8")})
+            return body, False
+
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyKeyMismatchError(key)
+
+        if record["state"] == _DONE:
+            logger.info(f"Replaying stored response for idempotency key {key}")
+            return record["body"].encode("utf-8"), True
+
+        if time.monotonic() >= wait_until:
+            raise IdempotencyInProgressError(key)
+
+        await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+
+
+def clear_idempotency_store() -> None:
+    """Remove all stored idempotency records."""
+    _store.clear()
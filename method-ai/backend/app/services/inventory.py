@@ -0,0 +1,293 @@
+"""Lab reagent inventory service.
+
+Tracks which compounds the lab has on its shelves, so procedures can mark
+each starting material as in stock, low or missing, and routes needing
+fewer purchases can be preferred.
+
+Containers are imported from CSV or JSONL files (``import_inventory``, or
+``method-ai import-inventory``) into a JSONL store at ``INVENTORY_PATH``,
+one line per container. Each process aggregates the store into a hash index
+keyed by canonical SMILES on first use, so a lookup is one memoized
+canonicalization plus one dict probe however many containers are tracked.
+The index is rebuilt when the store file is replaced.
+"""
+
+import csv
+import json
+import logging
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.utils.smiles import InvalidSmilesError, canonicalize_smiles, smiles_cache_key
+
+logger = logging.getLogger(__name__)
+
+IN_STOCK = "in_stock"
+LOW = "low"
+MISSING = "missing"
+
+
+@dataclass(frozen=True, slots=True)
+class StockLevel:
+    """Stock of one compound, summed over its containers."""
+
+    quantity_mg: float
+    containers: int
+    reorder_mg: float
+
+    @property
+    def status(self) -> str:
+        """``IN_STOCK``, or ``LOW`` below the reorder level."""
+        return LOW if self.quantity_mg < self.reorder_mg else IN_STOCK
+
+
+_index: dict[str, StockLevel] | None = None
+_index_version: tuple[str, int, int] | None = None
+_index_lock = threading.Lock()
+
+
+def import_inventory(paths: Iterable[str], store_path: str, replace: bool = False) -> int:
+    """
+    Import containers into the inventory store.
+
+    CSV files need a header row. Each record needs ``smiles`` and
+    ``quantity_mg``; ``container_id``, ``name``, ``location`` and
+    ``reorder_mg`` are optional. A container replaces a stored one with the
+    same ``container_id``. Records with invalid SMILES or quantities are
+    skipped.
+
+    Args:
+        paths: CSV (``.csv``) or JSONL files
+        store_path: Inventory store to write
+        replace: Drop the stored containers instead of merging into them
+
+    Returns:
+        Number of containers imported
+    """
+    store = Path(store_path)
+    containers: dict[str, dict[str, Any]] = {}
+    if not replace and store.exists():
+        for record in _read_jsonl(store):
+            containers[record["container_id"]] = record
+
+    imported = 0
+    for path in paths:
+        for line_number, record in _read_records(Path(path)):
+            container = _parse_container(record, f"{Path(path).name}:{line_number}")
+            if container is not None:
+                containers[container["container_id"]] = container
+                imported += 1
+
+    store.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = store.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for container in containers.values():
+            f.write(json.dumps(container) + "\n")
+    tmp_path.replace(store)
+
+    logger.info(f"Imported {imported} containers into {store_path} ({len(containers)} stored)")
+    return imported
+
+
+def get_inventory() -> dict[str, StockLevel] | None:
+    """
+    Get the stock index, building it from the store on first use.
+
+    The index is rebuilt when the store file is replaced, so an import is
+    picked up without a restart.
+
+    Returns:
+        Stock by canonical SMILES, or None if no inventory has been imported
+    """
+    global _index, _index_version
+
+    path = settings.inventory_path
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    version = (path, stat.st_ino, stat.st_mtime_ns)
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = _build_index(Path(path))
+            _index_version = version
+            logger.info(f"Indexed inventory {path} ({len(_index)} compounds)")
+        return _index
+
+
+def check_stock(molecules: Iterable[str]) -> list[tuple[str, str, float]] | None:
+    """
+    Look up the stock of compounds.
+
+    Args:
+        molecules: Compounds in SMILES format, in any spelling
+
+    Returns:
+        Tuples of (SMILES as given, status, quantity in mg), or None if no
+        inventory has been imported
+    """
+    inventory = get_inventory()
+    if inventory is None:
+        return None
+
+    stock = []
+    for molecule in molecules:
+        level = inventory.get(smiles_cache_key(molecule))
+        if level is None:
+            stock.append((molecule, MISSING, 0.0))
+        else:
+            stock.append((molecule, level.status, level.quantity_mg))
+    return stock
+
+
+def starting_materials(reactions: Iterable[str]) -> list[str]:
+    """
+    Find the compounds a route consumes without making them.
+
+    Args:
+        reactions: Reaction SMILES of the route
+
+    Returns:
+        Reactants and agents not produced by any of the reactions, in order
+        of first appearance, one spelling per compound
+    """
+    consumed: dict[str, str] = {}
+    produced: set[str] = set()
+    for rxn_smiles in reactions:
+        parts = rxn_smiles.split(">")
+        if len(parts) != 3:
+            continue
+        for part in parts[:2]:
+            for molecule in part.split("."):
+                if molecule:
+                    consumed.setdefault(smiles_cache_key(molecule), molecule)
+        produced.update(smiles_cache_key(molecule) for molecule in parts[2].split(".") if molecule)
+    return [molecule for key, molecule in consumed.items() if key not in produced]
+
+
+def inventory_flags(reactions: Iterable[str]) -> list[str]:
+    """
+    Build risk flags for starting materials that are missing or low.
+
+    Args:
+        reactions: Reaction SMILES of the route
+
+    Returns:
+        At most one flag for missing and one for low starting materials
+    """
+    stock = check_stock(starting_materials(reactions))
+    if not stock:
+        return []
+
+    flags = []
+    missing = [molecule for molecule, status, _ in stock if status == MISSING]
+    if missing:
+        flags.append(f"Not in the lab inventory: {', '.join(missing)} - obtain before starting")
+    low = [
+        f"{molecule} ({quantity:g} mg)" for molecule, status, quantity in stock if status == LOW
+    ]
+    if low:
+        flags.append(f"Low in the lab inventory: {', '.join(low)} - confirm quantities suffice")
+    return flags
+
+
+def prefer_stocked_route(plan: dict[str, Any]) -> dict[str, Any]:
+    """
+    Switch a plan to the alternative route needing the fewest purchases.
+
+    Routes are ranked by missing starting materials, then low ones; ties keep
+    the planner's order, so without an inventory the plan is unchanged.
+
+    Args:
+        plan: Normalized plan, with alternative routes under ``routes``
+
+    Returns:
+        The plan, or a copy whose ``steps`` are the best stocked route
+    """
+    routes = plan.get("routes")
+    if not routes or len(routes) < 2 or get_inventory() is None:
+        return plan
+
+    def shortfall(steps: list[dict[str, Any]]) -> tuple[int, int]:
+        reactions = [step.get("rxn_smiles") or "" for step in steps if isinstance(step, dict)]
+        stock = check_stock(starting_materials(reactions)) or []
+        statuses = [status for _, status, _ in stock]
+        return statuses.count(MISSING), statuses.count(LOW)
+
+    best = min(routes, key=shortfall)
+    if best == plan.get("steps"):
+        return plan
+    logger.info(f"Preferring route {routes.index(best) + 1} of {len(routes)} by inventory")
+    return {**plan, "steps": best}
+
+
+def _build_index(store: Path) -> dict[str, StockLevel]:
+    """Sum the stored containers by compound."""
+    totals: dict[str, tuple[float, int, float]] = {}
+    for container in _read_jsonl(store):
+        quantity, count, reorder = totals.get(container["smiles"], (0.0, 0, 0.0))
+        totals[container["smiles"]] = (
+            quantity + container["quantity_mg"],
+            count + 1,
+            max(reorder, container.get("reorder_mg") or 0.0),
+        )
+    return {
+        smiles: StockLevel(quantity, count, reorder or settings.inventory_low_stock_mg)
+        for smiles, (quantity, count, reorder) in totals.items()
+    }
+
+
+def _read_records(path: Path) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Yield (line number, record) pairs from a CSV or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed inventory line {path}:{line_number}")
+                continue
+            if isinstance(record, dict):
+                yield line_number, record
+
+
+def _read_jsonl(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the containers of the store."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parse_container(record: dict[str, Any], default_id: str) -> dict[str, Any] | None:
+    """Stored form of an imported record, or None if it is invalid."""
+    reorder = record.get("reorder_mg")
+    try:
+        smiles = canonicalize_smiles(str(record["smiles"]))
+        quantity = float(record["quantity_mg"])
+        reorder = float(reorder) if reorder not in (None, "") else None
+    except (KeyError, TypeError, ValueError, InvalidSmilesError) as e:
+        logger.warning(f"Skipping invalid inventory record {default_id}: {e}")
+        return None
+    if quantity < 0:
+        logger.warning(f"Skipping inventory record {default_id} with negative quantity")
+        return None
+    return {
+        "container_id": str(record.get("container_id") or default_id),
+        "smiles": smiles,
+        "name": record.get("name") or None,
+        "location": record.get("location") or None,
+        "quantity_mg": quantity,
+        "reorder_mg": reorder,
+    }
@@ -0,0 +1,169 @@
+"""Lab profile service.
+
+A lab profile is a named lab context stored on the server, so requests can
+send a ``lab_profile_id`` instead of the full context. Profiles are kept in a
+SQLite table (``LAB_PROFILE_DB_PATH``) shared by all workers, with a version
+bumped on every update.
+
+Each process compiles a profile once per version: the lab context is
+validated, and everything derived from it alone (context-only risk rules,
+fallbacks, PPE and atmosphere) is precomputed. Requests using the profile
+reuse the compiled state after an indexed lookup of its version, and an update
+invalidates it in every worker.
+"""
+
+import logging
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.models.schemas import LabContext
+from app.services.procedure_generator import derive_step_values
+from app.services.risk_annotator import evaluate_context_rules
+from app.utils.sqlite import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+_connections = SQLiteConnections(
+    [
+        "CREATE TABLE IF NOT EXISTS lab_profiles (lab_profile_id TEXT PRIMARY KEY, "
+        "name TEXT NOT NULL, lab_context TEXT NOT NULL, version INTEGER NOT NULL) "
+        "WITHOUT ROWID"
+    ]
+)
+_compiled: OrderedDict[str, "LabProfile"] = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+class LabProfileNotFoundError(Exception):
+    """Raised when no lab profile exists for an ID."""
+
+
+@dataclass(frozen=True, slots=True)
+class LabProfile:
+    """A stored lab context with the state precomputed from it."""
+
+    lab_profile_id: str
+    name: str
+    version: int
+    lab_context: LabContext
+    risk_rules: Mapping[str, list[str]]
+    step_values: Mapping[str, Any]
+
+
+def create_lab_profile(name: str, lab_context: LabContext) -> LabProfile:
+    """
+    Store a new lab profile.
+
+    Args:
+        name: Display name of the profile
+        lab_context: Lab context to store
+
+    Returns:
+        Compiled profile with its new ID
+    """
+    lab_profile_id = str(uuid.uuid4())
+    _connection().execute(
+        "INSERT INTO lab_profiles (lab_profile_id, name, lab_context, version) "
+        "VALUES (?, ?, ?, 1)",
+        (lab_profile_id, name, lab_context.model_dump_json()),
+    )
+    logger.info(f"Created lab profile {lab_profile_id}")
+    return _compile(lab_profile_id, name, 1, lab_context)
+
+
+def update_lab_profile(lab_profile_id: str, name: str, lab_context: LabContext) -> LabProfile:
+    """
+    Replace the name and lab context of a profile.
+
+    Args:
+        lab_profile_id: Profile to update
+        name: New display name
+        lab_context: New lab context
+
+    Returns:
+        Compiled profile with its bumped version
+
+    Raises:
+        LabProfileNotFoundError: If the profile does not exist
+    """
+    row = _connection().execute(
+        "UPDATE lab_profiles SET name = ?, lab_context = ?, version = version + 1 "
+        "WHERE lab_profile_id = ? RETURNING version",
+        (name, lab_context.model_dump_json(), lab_profile_id),
+    ).fetchone()
+    if row is None:
+        raise LabProfileNotFoundError(lab_profile_id)
+    logger.info(f"Updated lab profile {lab_profile_id} to version {row[0]}")
+    return _compile(lab_profile_id, name, row[0], lab_context)
+
+
+def get_lab_profile(lab_profile_id: str) -> LabProfile:
+    """
+    Get a compiled lab profile.
+
+    Args:
+        lab_profile_id: Profile to get
+
+    Returns:
+        Compiled profile, compiled again if it changed since last use
+
+    Raises:
+        LabProfileNotFoundError: If the profile does not exist
+    """
+    row = _connection().execute(
+        "SELECT version, name, lab_context FROM lab_profiles WHERE lab_profile_id = ?",
+        (lab_profile_id,),
+    ).fetchone()
+    if row is None:
+        raise LabProfileNotFoundError(lab_profile_id)
+    version, name, lab_context_json = row
+
+    with _compiled_lock:
+        profile = _compiled.get(lab_profile_id)
+        if profile is not None and profile.version == version:
+            _compiled.move_to_end(lab_profile_id)
+            return profile
+
+    lab_context = LabContext.model_validate_json(lab_context_json)
+    return _compile(lab_profile_id, name, version, lab_context)
+
+
+def close_lab_profiles() -> None:
+    """Forget compiled profiles and close this thread's connection."""
+    with _compiled_lock:
+        _compiled.clear()
+    _connections.close()
+
+
+def _compile(
+    lab_profile_id: str, name: str, version: int, lab_context: LabContext
+) -> LabProfile:
+    """Precompute the state derived from a profile's lab context and remember it."""
+    profile = LabProfile(
+        lab_profile_id=lab_profile_id,
+        name=name,
+        version=version,
+        lab_context=lab_context,
+        risk_rules=evaluate_context_rules(lab_context),
+        step_values=derive_step_values(lab_context),
+    )
+    with _compiled_lock:
+        current = _compiled.get(lab_profile_id)
+        # A concurrent request may already have compiled a newer version
+        if current is None or current.version <= version:
+            _compiled[lab_profile_id] = profile
+            _compiled.move_to_end(lab_profile_id)
+            while len(_compiled) > settings.lab_profile_cache_size:
+                _compiled.popitem(last=False)
+    return profile
+
+
+def _connection() -> sqlite3.Connection:
+    """Get this thread's connection to the profile database."""
+    return _connections.get(settings.lab_profile_db_path)
@@ -0,0 +1,341 @@
+"""Procedure generation pipeline.
+
+Runs plan lookup, procedure generation, risk annotation and citation
+retrieval for one request.
+Shared by the API routes and the offline batch runner.
+
+A request may carry a deadline (see ``app.core.deadline``); stages that run
+short of time take cheaper paths and record them as degradations.
+
+Procedures generated for the API are remembered in the procedure store, so
+that ``patch_procedure`` can apply a lab context edit by recomputing only the
+steps and risk rules that depend on the changed fields. Each of these
+procedures, and each edit that changes it, is also saved as a version in the
+procedure history. Requests run inside ``untracked()`` leave none of these
+traces.
+"""
+
+import logging
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from app.core.config import settings
+from app.core.deadline import CITATIONS_SKIPPED, Deadline
+from app.models.records import ProcedureResult, StepRecord
+from app.models.schemas import (
+    GenerateProcedureRequest,
+    LabContext,
+    LabContextPatch,
+    ProcedureDiff,
+)
+from app.services.citation_index import retrieve_citations
+from app.services.inventory import prefer_stocked_route
+from app.services.lab_profiles import LabProfile, get_lab_profile
+from app.services.plan_store import get_plan_steps
+from app.services.prefetcher import record_target_request
+from app.services.procedure_generator import generate_procedure, regenerate_procedure
+from app.services.procedure_history import record_version
+from app.services.procedure_store import get_procedure_state, save_procedure_state
+from app.services.request_registry import register_request_id
+from app.services.retrosynthesis_adapter import get_retrosynthesis_plan
+from app.services.risk_annotator import assemble_risks, evaluate_risk_rules
+
+logger = logging.getLogger(__name__)
+
+# Lab context fields used to retrieve citations
+_CITATION_DEPENDENCIES = frozenset({"purification_methods"})
+
+# Set while running requests that must not be recorded, see ``untracked``
+_untracked: ContextVar[bool] = ContextVar("untracked", default=False)
+
+
+@contextmanager
+def untracked() -> Iterator[None]:
+    """
+    Run requests without recording them.
+
+    Requests run in this context, including in threads started from it, are
+    not stored for patching, saved to the version history, registered as
+    issued or counted towards target hotness. Used for synthetic requests.
+
+    Yields:
+        Nothing; recording resumes when the block exits
+    """
+    token = _untracked.set(True)
+    try:
+        yield
+    finally:
+        _untracked.reset(token)
+
+
+def run_pipeline(
+    request: GenerateProcedureRequest,
+    request_id: str,
+    store_state: bool = False,
+    plan: dict[str, Any] | None = None,
+    deadline: Deadline | None = None,
+    lab_profile: LabProfile | None = None,
+) -> ProcedureResult:
+    """
+    Generate a procedure response for a validated request.
+
+    Requests naming a lab profile use its lab context, and reuse its
+    precomputed context-only risk rules and step values.
+
+    Args:
+        request: Validated generate-procedure request
+        request_id: Identifier to issue for this response
+        store_state: Remember the result so it can be patched later, and
+            register its request_id as issued
+        plan: Plan from ``resolve_plan``, resolved here if not given
+        deadline: Deadline of the request, started from ``request.deadline_ms``
+            if not given
+        lab_profile: Profile named by ``request.lab_profile_id``, looked up
+            here if not given
+
+    Returns:
+        Pipeline result, converted to the response schema by the caller
+
+    Raises:
+        LabProfileNotFoundError: If the request names an unknown lab profile
+        PlanNotFoundError: If the request names an unknown plan and ``plan`` is
+            not given
+    """
+    if deadline is None:
+        deadline = Deadline.from_ms(request.deadline_ms)
+    if lab_profile is None and request.lab_profile_id is not None:
+        lab_profile = get_lab_profile(request.lab_profile_id)
+    lab_context = lab_profile.lab_context if lab_profile is not None else request.lab_context
+    if lab_context is None:
+        # The request model requires one of the two
+        raise ValueError("Request has neither lab_context nor lab_profile_id")
+    if lab_profile is not None:
+        request = request.model_copy(update={"lab_context": lab_context})
+    if plan is None:
+        plan = resolve_plan(request, request_id, deadline)
+
+    # Generate procedure
+    procedure = generate_procedure(
+        plan=plan,
+        lab_context=lab_context,
+        notes=request.notes,
+        step_values=lab_profile.step_values if lab_profile is not None else None,
+    )
+
+    # Annotate risks, keeping the profile's context-only results
+    risk_rules = evaluate_risk_rules(
+        procedure,
+        lab_context,
+        previous=dict(lab_profile.risk_rules) if lab_profile is not None else None,
+    )
+    risk_flags, fallback_options = assemble_risks(risk_rules)
+
+    # Risk annotation is never skipped; citations are optional
+    if deadline is None or deadline.allows(settings.deadline_citation_min_seconds):
+        citations = _retrieve_citations(request, lab_context, plan, request_id)
+    else:
+        logger.info(f"Skipping citations for {request_id}, deadline reached")
+        deadline.degrade(CITATIONS_SKIPPED)
+        citations = []
+    degradations = tuple(deadline.degradations) if deadline is not None else ()
+
+    result = ProcedureResult(
+        procedure=tuple(procedure),
+        risk_flags=risk_flags,
+        fallback_options=fallback_options,
+        citations=citations,
+        request_id=request_id,
+        degradations=degradations,
+    )
+
+    if store_state and not _untracked.get():
+        save_procedure_state(
+            request_id,
+            {
+                "request": request.model_dump(mode="json"),
+                "plan": plan,
+                "procedure": [step.to_dict() for step in procedure],
+                "risk_rules": risk_rules,
+                "citations": citations,
+                "degradations": list(degradations),
+            },
+        )
+        register_request_id(request_id)
+        _record_version(result, lab_context)
+
+    return result
+
+
+def resolve_plan(
+    request: GenerateProcedureRequest,
+    request_id: str,
+    deadline: Deadline | None = None,
+) -> dict[str, Any]:
+    """
+    Get the retrosynthesis plan for a request.
+
+    This is the stage that may call IBM RXN; the API runs it under its own
+    concurrency limit, separately from the rest of the pipeline.
+
+    Args:
+        request: Validated generate-procedure request
+        request_id: Identifier of the request, for logging
+        deadline: Deadline of the request, if any
+
+    Returns:
+        Normalized retrosynthesis plan
+
+    Raises:
+        PlanNotFoundError: If the request names an unknown plan
+    """
+    if request.retrosynthesis_plan is not None:
+        logger.info(f"Using user-provided retrosynthesis plan for {request_id}")
+        return {
+            "source": "user_provided",
+            "target_smiles": request.target_smiles,
+            "steps": request.retrosynthesis_plan.get("steps", []),
+        }
+    if request.plan_id is not None:
+        logger.info(f"Using stored retrosynthesis plan {request.plan_id} for {request_id}")
+        return {
+            "source": "user_provided",
+            "target_smiles": request.target_smiles,
+            "steps": get_plan_steps(request.plan_id),
+        }
+
+    if not _untracked.get():
+        record_target_request(request.target_smiles)
+    plan = prefer_stocked_route(get_retrosynthesis_plan(request.target_smiles, deadline))
+    logger.info(f"Retrieved retrosynthesis plan from {plan['source']} for {request_id}")
+    return plan
+
+
+def patch_procedure(
+    request_id: str, patch: LabContextPatch
+) -> tuple[ProcedureResult, ProcedureDiff]:
+    """
+    Regenerate a stored procedure after a lab context edit.
+
+    The stored plan is reused, and only steps and risk rules that depend on
+    changed fields are recomputed. The procedure keeps its request_id.
+
+    Args:
+        request_id: Identifier of the stored procedure
+        patch: Lab context fields to change
+
+    Returns:
+        Tuple of (regenerated procedure, diff against the previous version)
+
+    Raises:
+        ProcedureNotFoundError: If the procedure is unknown or has expired
+    """
+    state = get_procedure_state(request_id)
+    previous_context = LabContext.model_validate(state["request"]["lab_context"])
+    updates = patch.model_dump(exclude_unset=True, exclude_none=True)
+    lab_context = previous_context.model_copy(update=updates)
+    changed = sorted(
+        field for field in updates if getattr(lab_context, field) != getattr(previous_context, field)
+    )
+
+    previous_procedure = [StepRecord.from_dict(step) for step in state["procedure"]]
+    procedure = regenerate_procedure(state["plan"], lab_context, previous_procedure, changed)
+    risk_rules = evaluate_risk_rules(
+        procedure, lab_context, previous=state["risk_rules"], changed_fields=changed
+    )
+    risk_flags, fallback_options = assemble_risks(risk_rules)
+    previous_flags, previous_fallbacks = assemble_risks(state["risk_rules"])
+
+    # Degradations of the reused plan carry over to the regenerated procedure
+    citations = state["citations"]
+    degradations = state.get("degradations", [])
+    if _CITATION_DEPENDENCIES.intersection(changed):
+        request = GenerateProcedureRequest.model_construct(
+            **{**state["request"], "lab_context": lab_context}
+        )
+        citations = _retrieve_citations(request, lab_context, state["plan"], request_id)
+        degradations = [code for code in degradations if code != CITATIONS_SKIPPED]
+
+    diff = ProcedureDiff(
+        changed_fields=changed,
+        steps_changed=[
+            step.step_number
+            for step, before in zip(procedure, previous_procedure, strict=True)
+            if step is not before and step != before
+        ],
+        risk_flags_added=[flag for flag in risk_flags if flag not in previous_flags],
+        risk_flags_removed=[flag for flag in previous_flags if flag not in risk_flags],
+        fallback_options_added=[
+            option for option in fallback_options if option not in previous_fallbacks
+        ],
+        fallback_options_removed=[
+            option for option in previous_fallbacks if option not in fallback_options
+        ],
+    )
+
+    result = ProcedureResult(
+        procedure=tuple(procedure),
+        risk_flags=risk_flags,
+        fallback_options=fallback_options,
+        citations=citations,
+        request_id=request_id,
+        degradations=tuple(degradations),
+    )
+
+    if changed:
+        save_procedure_state(
+            request_id,
+            {
+                **state,
+                "request": {**state["request"], "lab_context": lab_context.model_dump(mode="json")},
+                "procedure": [step.to_dict() for step in procedure],
+                "risk_rules": risk_rules,
+                "citations": citations,
+                "degradations": degradations,
+            },
+        )
+        _record_version(result, lab_context, changed)
+    logger.info(f"Patched procedure {request_id}: changed {', '.join(changed) or 'nothing'}")
+    return result, diff
+
+
+def _record_version(
+    result: ProcedureResult, lab_context: LabContext, changed_fields: list[str] | None = None
+) -> None:
+    """Save a procedure to its version history; history is optional."""
+    if not settings.procedure_history_enabled:
+        return
+    try:
+        record_version(
+            result.request_id,
+            {
+                "lab_context": lab_context.model_dump(mode="json"),
+                "procedure": [step.to_dict() for step in result.procedure],
+                "risk_flags": result.risk_flags,
+                "fallback_options": result.fallback_options,
+                "citations": result.citations,
+            },
+            changed_fields or (),
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"Could not save version history for {result.request_id}: {e}")
+
+
+def _retrieve_citations(
+    request: GenerateProcedureRequest,
+    lab_context: LabContext,
+    plan: dict[str, Any],
+    request_id: str,
+) -> list[str]:
+    """Cite prior procedures from the local corpus; citations are optional."""
+    try:
+        return retrieve_citations(
+            request.target_smiles,
+            plan,
+            keywords=[request.notes or "", *lab_context.purification_methods],
+        )
+    except Exception as e:
+        logger.warning(f"Citation retrieval failed for {request_id}: {e}")
+        return []
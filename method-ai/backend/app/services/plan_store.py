@@ -0,0 +1,120 @@
+"""Content-addressed retrosynthesis plan store.
+
+Clients upload a plan once with ``POST /v1/plans`` and send the returned
+``plan_id`` instead of the plan itself. The ID is the SHA-256 of the plan's
+normalized steps, so identical uploads share one stored copy, and a plan is
+validated once however many requests use it.
+
+Plans are kept in a SQLite table (``PLAN_STORE_PATH``) shared by all
+workers. Stored plans never change, so each process keeps decoded plans in
+an LRU (``PLAN_STORE_CACHE_SIZE``) that needs no invalidation.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from app.core.config import settings
+from app.utils.sqlite import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+_connections = SQLiteConnections(
+    [
+        "CREATE TABLE IF NOT EXISTS plans (plan_id TEXT PRIMARY KEY, steps TEXT NOT NULL) "
+        "WITHOUT ROWID"
+    ]
+)
+_decoded: OrderedDict[str, tuple[dict[str, Any], ...]] = OrderedDict()
+_decoded_lock = threading.Lock()
+
+
+class PlanNotFoundError(Exception):
+    """Raised when no plan is stored under an ID."""
+
+
+def store_plan(steps: Sequence[Mapping[str, Any]]) -> tuple[str, bool]:
+    """
+    Store a plan under its content hash.
+
+    Args:
+        steps: Validated retrosynthesis steps, the target-forming reaction first
+
+    Returns:
+        Tuple of (plan_id, whether the plan was not stored before)
+    """
+    normalized = tuple(dict(step) for step in steps)
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    plan_id = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    with _decoded_lock:
+        if plan_id in _decoded:
+            _decoded.move_to_end(plan_id)
+            return plan_id, False
+
+    cursor = _connection().execute(
+        "INSERT INTO plans (plan_id, steps) VALUES (?, ?) ON CONFLICT DO NOTHING",
+        (plan_id, payload),
+    )
+    created = cursor.rowcount == 1
+    if created:
+        logger.info(f"Stored plan {plan_id} ({len(normalized)} steps)")
+    _remember(plan_id, normalized)
+    return plan_id, created
+
+
+def get_plan_steps(plan_id: str) -> tuple[dict[str, Any], ...]:
+    """
+    Get the steps of a stored plan.
+
+    The steps are shared between requests and must not be modified.
+
+    Args:
+        plan_id: ID returned by ``store_plan``
+
+    Returns:
+        Retrosynthesis steps, the target-forming reaction first
+
+    Raises:
+        PlanNotFoundError: If no plan is stored under the ID
+    """
+    with _decoded_lock:
+        steps = _decoded.get(plan_id)
+        if steps is not None:
+            _decoded.move_to_end(plan_id)
+            return steps
+
+    row = _connection().execute(
+        "SELECT steps FROM plans WHERE plan_id = ?", (plan_id,)
+    ).fetchone()
+    if row is None:
+        raise PlanNotFoundError(plan_id)
+    steps = tuple(json.loads(row[0]))
+    _remember(plan_id, steps)
+    return steps
+
+
+def close_plan_store() -> None:
+    """Forget decoded plans and close this thread's connection."""
+    with _decoded_lock:
+        _decoded.clear()
+    _connections.close()
+
+
+def _remember(plan_id: str, steps: tuple[dict[str, Any], ...]) -> None:
+    """Keep decoded steps, evicting the least recently used plans."""
+    with _decoded_lock:
+        _decoded[plan_id] = steps
+        _decoded.move_to_end(plan_id)
+        while len(_decoded) > settings.plan_store_cache_size:
+            _decoded.popitem(last=False)
+
+
+def _connection() -> sqlite3.Connection:
+    """Get this thread's connection to the plan database."""
+    return _connections.get(settings.plan_store_path)
@@ -0,0 +1,287 @@
+"""Background plan prefetcher.
+
+Keeps the RXN plans of frequently requested targets cached, so that popular
+targets do not pay RXN latency when their cached plan expires.
+
+Hot targets are learned from request history (every planned target is
+recorded by the pipeline) and, at startup, from feedback records that name a
+target. Request counts decay exponentially, so targets that stop being
+requested cool down.
+
+While the worker is idle, ``run_prefetcher`` periodically refreshes hot
+targets whose cached plan is missing or about to expire. RXN calls are
+limited to a share of the RXN rate budget and stop as soon as interactive
+requests arrive. History is per worker process; the share is split evenly
+between the ``API_WORKERS`` workers, and each refresh is claimed in the
+shared cache first, so workers do not fetch the same target in one interval.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.admission import GENERATE_STAGE, PLAN_STAGE, get_stage
+from app.services.cache import create_cache
+from app.services.retrosynthesis_adapter import (
+    cached_plan_ttls,
+    is_rxn_configured,
+    refresh_plan,
+)
+from app.utils.smiles import smiles_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Share of the history dropped, coldest first, when it is full
+_PRUNE_FRACTION = 0.1
+
+
+class TargetHistory:
+    """Exponentially decaying request counts per canonical target."""
+
+    def __init__(self, half_life_seconds: float, max_targets: int) -> None:
+        """
+        Create an empty history.
+
+        Args:
+            half_life_seconds: Time for a request's weight to halve
+            max_targets: Maximum number of targets tracked
+        """
+        self.half_life_seconds = half_life_seconds
+        self.max_targets = max_targets
+        self._scores: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, weight: float = 1.0, age_seconds: float = 0.0) -> None:
+        """
+        Record a request for a target.
+
+        Args:
+            key: Canonical target SMILES
+            weight: Weight of the request
+            age_seconds: How long ago the request was made
+        """
+        now = time.monotonic()
+        weight *= self._decay(age_seconds)
+        with self._lock:
+            score, updated = self._scores.get(key, (0.0, now))
+            self._scores[key] = (score * self._decay(now - updated) + weight, now)
+            if len(self._scores) > self.max_targets:
+                self._prune(now)
+
+    def top(self, count: int, min_score: float = 0.0) -> list[tuple[str, float]]:
+        """
+        Get the hottest targets.
+
+        Args:
+            count: Maximum number of targets returned
+            min_score: Minimum current score
+
+        Returns:
+            List of (key, score), hottest first
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = [
+                (key, score * self._decay(now - updated))
+                for key, (score, updated) in self._scores.items()
+            ]
+        scored = [entry for entry in scored if entry[1] >= min_score]
+        scored.sort(key=lambda entry: entry[1], reverse=True)
+        return scored[:count]
+
+    def clear(self) -> None:
+        """Forget all targets."""
+        with self._lock:
+            self._scores.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._scores)
+
+    def _decay(self, elapsed_seconds: float) -> float:
+        """Factor a score decays by over a period."""
+        return math.pow(0.5, max(0.0, elapsed_seconds) / self.half_life_seconds)
+
+    def _prune(self, now: float) -> None:
+        """Drop the coldest targets. Caller holds the lock."""
+        ranked = sorted(
+            self._scores,
+            key=lambda key: self._scores[key][0] * self._decay(now - self._scores[key][1]),
+        )
+        for key in ranked[: max(1, int(len(ranked) * _PRUNE_FRACTION))]:
+            del self._scores[key]
+
+
+class _RateBudget:
+    """Token bucket holding at most one call."""
+
+    def __init__(self) -> None:
+        self._next_allowed = 0.0
+
+    def try_acquire(self) -> bool:
+        """Take the token if available."""
+        share = settings.prefetch_rxn_share / max(1, settings.api_workers)
+        rate_per_second = settings.rxn_requests_per_minute * share / 60
+        now = time.monotonic()
+        if rate_per_second <= 0 or now < self._next_allowed:
+            return False
+        self._next_allowed = now + 1 / rate_per_second
+        return True
+
+
+target_history = TargetHistory(
+    half_life_seconds=settings.prefetch_history_half_life_seconds,
+    max_targets=settings.prefetch_history_max_targets,
+)
+
+_budget = _RateBudget()
+
+# Targets being refreshed by any worker sharing the cache, claimed for one interval
+_claims = create_cache(
+    "prefetch_claims",
+    maxsize=settings.prefetch_top_targets,
+    ttl_seconds=settings.prefetch_interval_seconds,
+)
+
+_stats = {"refreshed": 0, "failed": 0, "skipped_busy": 0}
+
+
+def record_target_request(target_smiles: str) -> None:
+    """
+    Count a request for a target towards its hotness.
+
+    Args:
+        target_smiles: Target molecule in SMILES format
+    """
+    target_history.record(smiles_cache_key(target_smiles))
+
+
+def seed_from_feedback(path: str) -> int:
+    """
+    Learn hot targets from feedback records that name their target.
+
+    Args:
+        path: Feedback JSONL file
+
+    Returns:
+        Number of records counted
+    """
+    feedback_path = Path(path)
+    if not feedback_path.exists():
+        return 0
+
+    now = datetime.now(timezone.utc)
+    seeded = 0
+    with open(feedback_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                target = record.get("target_smiles")
+                if not target:
+                    continue
+                age = (now - datetime.fromisoformat(record["timestamp"])).total_seconds()
+                target_history.record(smiles_cache_key(target), age_seconds=age)
+            except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
+                continue
+            seeded += 1
+    return seeded
+
+
+async def prefetch_once() -> int:
+    """
+    Refresh hot targets whose cached plan is missing or about to expire.
+
+    Stops early when the worker becomes busy or the rate budget runs out.
+    Targets claimed by another worker in this interval are skipped.
+
+    Returns:
+        Number of plans refreshed
+    """
+    hot = target_history.top(settings.prefetch_top_targets, settings.prefetch_min_score)
+    if not hot:
+        return 0
+
+    ttls = cached_plan_ttls()
+    due = [
+        key
+        for key, _ in hot
+        if ttls.get(key, 0.0) < settings.prefetch_refresh_ahead_seconds
+    ]
+
+    refreshed = 0
+    for key in due:
+        if _is_busy():
+            _stats["skipped_busy"] += 1
+            break
+        if not _claims.add(key, True):
+            continue
+        if not _budget.try_acquire():
+            _claims.delete(key)
+            break
+        try:
+            await asyncio.to_thread(refresh_plan, key)
+        except Exception as e:
+            _stats["failed"] += 1
+            logger.warning(f"Prefetch of plan for {key[:50]} failed: {e}")
+            continue
+        _stats["refreshed"] += 1
+        refreshed += 1
+
+    if refreshed:
+        logger.info(f"Prefetched {refreshed} of {len(due)} due plans")
+    return refreshed
+
+
+async def run_prefetcher() -> None:
+    """Prefetch plans periodically until cancelled."""
+    if not settings.prefetch_enabled or not is_rxn_configured():
+        return
+
+    seeded = seed_from_feedback(settings.feedback_storage_path)
+    logger.info(f"Plan prefetcher started with {seeded} feedback records")
+    while True:
+        await asyncio.sleep(settings.prefetch_interval_seconds)
+        try:
+            await prefetch_once()
+        except Exception as e:
+            logger.warning(f"Plan prefetch round failed: {e}")
+
+
+def prefetch_stats() -> dict[str, int]:
+    """
+    Get prefetcher counters.
+
+    Returns:
+        Plans refreshed and failed, rounds cut short by load, and targets tracked
+    """
+    return {**_stats, "tracked_targets": len(target_history)}
+
+
+def clear_prefetch_state() -> None:
+    """Forget request history and claims and reset counters and budget."""
+    global _budget
+    target_history.clear()
+    _claims.clear()
+    _budget = _RateBudget()
+    for name in _stats:
+        _stats[name] = 0
+
+
+def _is_busy() -> bool:
+    """
+    Whether interactive requests are running or waiting.
+
+    Read from the admission stages, which count running requests even when
+    ADMISSION_ENABLED is false.
+    """
+    in_flight = 0
+    for stage in (PLAN_STAGE, GENERATE_STAGE):
+        stats = get_stage(stage).stats()
+        in_flight += stats["active"] + stats["queued"]
+    return in_flight > settings.prefetch_idle_max_active
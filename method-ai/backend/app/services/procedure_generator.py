@@ -2,18 +2,103 @@
 
 Generates draft lab procedures from retrosynthesis plans and lab context.
 Uses deterministic, template-based generation.
+
+Each reaction in the plan is expanded into its own block of steps, in
+forward-synthesis order, between shared preparation and finishing steps.
+Steps are produced lazily by ``iter_procedure``, and reaction blocks are
+memoized by reaction SMILES so routes sharing reactions reuse them.
+
+Steps are immutable ``StepRecord``s. Parameters that do not depend on the
+request are module-level constants or memoized, so they are shared between
+requests rather than rebuilt for each one.
 """
 
+from collections.abc import Callable, Collection, Iterator, Mapping, Sequence
+from functools import lru_cache, partial
+from types import MappingProxyType
 from typing import Any
 
-from app.models.schemas import LabContext, ProcedureStep
+from app.core.config import settings
+from app.models.records import StepRecord, frozen_parameters
+from app.models.schemas import LabContext
+from app.services.inventory import IN_STOCK, LOW, MISSING, check_stock, starting_materials
+from app.services.stoichiometry import reagent_quantities
+
+# Below this predicted confidence, a reaction's steps carry a warning
+_LOW_CONFIDENCE = 0.5
+
+# Steps in each reaction block: setup, monitoring, completion, workup
+_BLOCK_LENGTH = 4
+
+# (action, parameters, rationale) of a memoized reaction block step
+_StepTemplate = tuple[str, Mapping[str, Any], str]
+
+# Builds the step at a given step number for a lab context
+_StepBuilder = Callable[[int, LabContext], StepRecord]
+
+_REVIEW = ("sds_sheets", "institutional_protocols")
+
+_ANALYTICAL_WEIGHING: Mapping[str, Any] = MappingProxyType(
+    {"balance_type": "analytical", "record": "laboratory_notebook"}
+)
+_STANDARD_WEIGHING: Mapping[str, Any] = MappingProxyType(
+    {"balance_type": "standard", "record": "laboratory_notebook"}
+)
+
+_CHARACTERIZATION: Mapping[str, Any] = MappingProxyType(
+    {
+        "characterization": "available_analytical_methods",
+        "storage": "appropriate_container_and_conditions",
+        "labeling": "complete_information",
+    }
+)
+
+_MONITORING: Mapping[str, Any] = MappingProxyType(
+    {
+        "methods": ("visual_observation", "analytical_if_available"),
+        "interval": "periodic",
+        "documentation": "record_observations",
+    }
+)
+
+_COMPLETION: Mapping[str, Any] = MappingProxyType(
+    {"confirmation": "appropriate_analytical_method", "quench": "as_required_by_reaction_type"}
+)
+
+_WORKUP: Mapping[str, Any] = MappingProxyType(
+    {
+        "steps": ("cool_if_needed", "transfer", "separate_phases_if_applicable"),
+        "waste_handling": "follow_institutional_guidelines",
+    }
+)
+
+# Materials step parameters listing the starting materials with each stock status
+_STOCK_PARAMETERS = {IN_STOCK: "in_stock", LOW: "low_stock", MISSING: "not_in_stock"}
+
+# Lab context fields read by each kind of step. Steps of a kind whose fields
+# did not change can be reused when the lab context is edited.
+STEP_DEPENDENCIES: dict[str, frozenset[str]] = {
+    "preparation": frozenset({"experience_level"}),  # _get_ppe_list
+    "materials": frozenset({"scale_mg"}),  # and the lab inventory, see UNCACHED_STEPS
+    "apparatus": frozenset({"equipment"}),
+    "weighing": frozenset({"scale_mg"}),
+    "reaction": frozenset({"safety_constraints"}),  # _get_atmosphere
+    "intermediate": frozenset(),
+    "purification": frozenset({"purification_methods"}),
+    "characterization": frozenset(),
+}
+
+# Kinds of steps that also read the lab inventory, which can be re-imported
+# at any time. They are rebuilt on every edit.
+UNCACHED_STEPS = frozenset({"materials"})
 
 
 def generate_procedure(
     plan: dict[str, Any],
     lab_context: LabContext,
     notes: str | None = None,
-) -> list[ProcedureStep]:
+    step_values: Mapping[str, Any] | None = None,
+) -> list[StepRecord]:
     """
     Generate a draft procedure from a retrosynthesis plan and lab context.
 
@@ -24,156 +109,340 @@ def generate_procedure(
         plan: Normalized retrosynthesis plan
         lab_context: Laboratory constraints and context
         notes: Optional additional notes
+        step_values: Output of ``derive_step_values`` for the lab context,
+            if precomputed
 
     Returns:
         List of procedure steps
     """
-    steps: list[ProcedureStep] = []
+    return list(iter_procedure(plan, lab_context, notes, step_values))
+
+
+def iter_procedure(
+    plan: dict[str, Any],
+    lab_context: LabContext,
+    notes: str | None = None,
+    step_values: Mapping[str, Any] | None = None,
+) -> Iterator[StepRecord]:
+    """
+    Generate a draft procedure one step at a time.
+
+    Plan steps are in retrosynthetic order (the first step forms the
+    target), so they are expanded last to first. A plan without steps gets a
+    single generic reaction block.
+
+    Args:
+        plan: Normalized retrosynthesis plan
+        lab_context: Laboratory constraints and context
+        notes: Optional additional notes
+        step_values: Output of ``derive_step_values`` for the lab context,
+            if precomputed
+
+    Yields:
+        Procedure steps, numbered from 1
+    """
+    if step_values is None:
+        step_values = derive_step_values(lab_context)
+    for step_number, (_, build) in enumerate(_procedure_slots(plan, step_values), start=1):
+        yield build(step_number, lab_context)
+
+
+def regenerate_procedure(
+    plan: dict[str, Any],
+    lab_context: LabContext,
+    previous: Sequence[StepRecord],
+    changed_fields: Collection[str],
+) -> list[StepRecord]:
+    """
+    Regenerate a procedure after a lab context edit.
+
+    Only steps whose kind depends on a changed field (see
+    ``STEP_DEPENDENCIES``) or is in ``UNCACHED_STEPS`` are rebuilt; the rest
+    are reused from the previous procedure for the same plan.
+
+    Args:
+        plan: Retrosynthesis plan the previous procedure was generated from
+        lab_context: Edited lab context
+        previous: Procedure generated from the plan before the edit
+        changed_fields: Names of the lab context fields that changed
+
+    Returns:
+        List of procedure steps
+    """
+    changed = frozenset(changed_fields)
+    slots = _procedure_slots(plan, derive_step_values(lab_context))
+    steps = []
+    for step_number, (kind, build) in enumerate(slots, start=1):
+        reusable = (
+            step_number <= len(previous)
+            and kind not in UNCACHED_STEPS
+            and not STEP_DEPENDENCIES[kind] & changed
+        )
+        steps.append(previous[step_number - 1] if reusable else build(step_number, lab_context))
+    return steps
+
+
+def derive_step_values(lab_context: LabContext) -> Mapping[str, Any]:
+    """
+    Compute the step values that depend on the lab context alone.
+
+    Args:
+        lab_context: Laboratory constraints and context
+
+    Returns:
+        Read-only mapping with the ``ppe`` list and reaction ``atmosphere``
+    """
+    return MappingProxyType(
+        {"ppe": tuple(_get_ppe_list(lab_context)), "atmosphere": _get_atmosphere(lab_context)}
+    )
+
+
+def _procedure_slots(
+    plan: dict[str, Any], step_values: Mapping[str, Any]
+) -> Iterator[tuple[str, _StepBuilder]]:
+    """Lay out a plan's procedure as (step kind, builder) pairs, in order."""
     source = plan.get("source", "unknown")
 
     # Determine rationale suffix based on source
     source_note = ""
     if source == "ibm_rxn":
         source_note = " (Derived from IBM RXN plan - requires verification)"
+    elif source == "similar_target":
+        source_note = " (Adapted from the plan of a similar target - requires verification)"
     elif source == "placeholder":
         source_note = " (Placeholder procedure - requires full development)"
 
-    # Step 1: Preparation
-    steps.append(
-        ProcedureStep(
-            step_number=1,
-            action="Prepare workspace and review safety requirements",
-            parameters={
+    # Reaction blocks, in forward order
+    atmosphere = step_values["atmosphere"]
+    reactions = [step for step in plan.get("steps", []) if isinstance(step, dict)]
+    stages = len(reactions)
+    rxn_smiles_list = tuple(reaction.get("rxn_smiles") or "" for reaction in reactions)
+    materials = tuple(starting_materials(reversed(rxn_smiles_list)))
+
+    yield "preparation", partial(_preparation_step, source_note, step_values["ppe"])
+    yield "materials", partial(_materials_step, materials)
+    yield "apparatus", _apparatus_step
+    yield "weighing", partial(_weighing_step, rxn_smiles_list)
+
+    if not reactions:
+        for index in range(_BLOCK_LENGTH):
+            yield "reaction", partial(_reaction_step, None, None, "", atmosphere, index)
+
+    for stage, reaction in enumerate(reversed(reactions), start=1):
+        rxn_smiles = reaction.get("rxn_smiles") or None
+        confidence = reaction.get("confidence")
+        confidence = float(confidence) if isinstance(confidence, int | float) else None
+        label = f"Stage {stage}/{stages}: " if stages > 1 else ""
+        for index in range(_BLOCK_LENGTH):
+            yield "reaction", partial(
+                _reaction_step, rxn_smiles, confidence, label, atmosphere, index
+            )
+        if stage < stages:
+            yield "intermediate", partial(_intermediate_step, rxn_smiles or "", label)
+
+    yield "purification", _purification_step
+    yield "characterization", _characterization_step
+
+
+def _preparation_step(
+    source_note: str, ppe: tuple[str, ...], step_number: int, lab_context: LabContext
+) -> StepRecord:
+    """Workspace and safety preparation."""
+    return StepRecord(
+        step_number=step_number,
+        action="Prepare workspace and review safety requirements",
+        parameters=MappingProxyType(
+            {
                 "location": "appropriate_workspace",
-                "ppe": _get_ppe_list(lab_context),
-                "review": ["sds_sheets", "institutional_protocols"],
-            },
-            rationale=f"Ensure proper safety setup before beginning{source_note}",
-        )
+                "ppe": ppe,
+                "review": _REVIEW,
+            }
+        ),
+        rationale=f"Ensure proper safety setup before beginning{source_note}",
     )
 
-    # Step 2: Materials
-    steps.append(
-        ProcedureStep(
-            step_number=2,
-            action="Gather and verify all materials",
-            parameters={
-                "verification": "check_labels_and_purity",
-                "scale": f"{lab_context.scale_mg}mg",
-            },
-            rationale="Confirm all materials are available and appropriate",
-        )
+
+def _materials_step(
+    materials: tuple[str, ...], step_number: int, lab_context: LabContext
+) -> StepRecord:
+    """Gathering materials, marked with their stock in the lab inventory."""
+    parameters: dict[str, Any] = {
+        "verification": "check_labels_and_purity",
+        "scale": f"{lab_context.scale_mg}mg",
+    }
+    rationale = "Confirm all materials are available and appropriate"
+
+    stock = check_stock(materials) if materials else None
+    if stock is not None:
+        for status, key in _STOCK_PARAMETERS.items():
+            parameters[key] = tuple(molecule for molecule, level, _ in stock if level == status)
+        missing = len(parameters[_STOCK_PARAMETERS[MISSING]])
+        if missing:
+            rationale += f" ({missing} of {len(stock)} starting materials not in stock)"
+
+    return StepRecord(
+        step_number=step_number,
+        action="Gather and verify all materials",
+        parameters=MappingProxyType(parameters),
+        rationale=rationale,
     )
 
-    # Step 3: Equipment setup
-    steps.append(
-        ProcedureStep(
-            step_number=3,
-            action="Set up reaction apparatus",
-            parameters={
+
+def _apparatus_step(step_number: int, lab_context: LabContext) -> StepRecord:
+    """Equipment setup."""
+    return StepRecord(
+        step_number=step_number,
+        action="Set up reaction apparatus",
+        parameters=frozen_parameters(
+            {
                 "equipment": lab_context.equipment[:5] if lab_context.equipment else ["standard_glassware"],
                 "verification": "check_integrity",
-            },
-            rationale="Proper equipment setup ensures reproducibility",
-        )
+            }
+        ),
+        rationale="Proper equipment setup ensures reproducibility",
     )
 
-    # Step 4: Weighing
-    steps.append(
-        ProcedureStep(
-            step_number=4,
-            action="Weigh starting materials accurately",
-            parameters={
-                "balance_type": "analytical" if lab_context.scale_mg < 100 else "standard",
-                "record": "laboratory_notebook",
-            },
-            rationale="Accurate measurement is essential for stoichiometry",
-        )
-    )
 
-    # Step 5: Reaction setup
-    steps.append(
-        ProcedureStep(
-            step_number=5,
-            action="Combine reagents according to protocol",
-            parameters={
-                "order": "as_specified",
-                "mixing": "appropriate_method",
-                "atmosphere": _get_atmosphere(lab_context),
-            },
-            rationale="Order and conditions of addition affect outcome",
+def _weighing_step(
+    rxn_smiles_list: tuple[str, ...], step_number: int, lab_context: LabContext
+) -> StepRecord:
+    """Weighing starting materials, with quantities back-calculated from the scale."""
+    parameters = _ANALYTICAL_WEIGHING if lab_context.scale_mg < 100 else _STANDARD_WEIGHING
+    (quantities,) = reagent_quantities(rxn_smiles_list, [lab_context.scale_mg])
+    if quantities:
+        parameters = MappingProxyType(
+            {
+                **parameters,
+                "quantities": tuple(
+                    (molecule, round(mass_mg, 3), round(mmol, 4))
+                    for molecule, mass_mg, mmol in quantities
+                ),
+            }
         )
+    return StepRecord(
+        step_number=step_number,
+        action="Weigh starting materials accurately",
+        parameters=parameters,
+        rationale="Accurate measurement is essential for stoichiometry",
     )
 
-    # Step 6: Reaction monitoring
-    steps.append(
-        ProcedureStep(
-            step_number=6,
-            action="Monitor reaction progress",
-            parameters={
-                "methods": ["visual_observation", "analytical_if_available"],
-                "interval": "periodic",
-                "documentation": "record_observations",
-            },
-            rationale="Monitoring ensures reaction proceeds as expected",
-        )
-    )
 
-    # Step 7: Reaction completion
-    steps.append(
-        ProcedureStep(
-            step_number=7,
-            action="Confirm reaction completion and quench if needed",
-            parameters={
+def _reaction_step(
+    rxn_smiles: str | None,
+    confidence: float | None,
+    label: str,
+    atmosphere: str,
+    index: int,
+    step_number: int,
+    lab_context: LabContext,
+) -> StepRecord:
+    """One step of a memoized reaction block."""
+    action, parameters, rationale = _reaction_block(rxn_smiles, confidence, atmosphere)[index]
+    return StepRecord(step_number, label + action, parameters, rationale)
+
+
+def _intermediate_step(
+    rxn_smiles: str, label: str, step_number: int, lab_context: LabContext
+) -> StepRecord:
+    """Isolating the intermediate between two stages."""
+    return StepRecord(
+        step_number=step_number,
+        action=f"{label}Isolate intermediate and confirm identity",
+        parameters=MappingProxyType(
+            {
+                "intermediate": _split_reaction(rxn_smiles)[1],
                 "confirmation": "appropriate_analytical_method",
-                "quench": "as_required_by_reaction_type",
-            },
-            rationale="Proper quenching ensures safety and product stability",
-        )
+                "purity_check": "before_next_stage",
+            }
+        ),
+        rationale="Carrying an impure or misassigned intermediate forward compounds errors",
     )
 
-    # Step 8: Workup
-    steps.append(
-        ProcedureStep(
-            step_number=8,
-            action="Perform workup procedure",
-            parameters={
-                "steps": ["cool_if_needed", "transfer", "separate_phases_if_applicable"],
-                "waste_handling": "follow_institutional_guidelines",
-            },
-            rationale="Workup isolates crude product from reaction mixture",
-        )
-    )
 
-    # Step 9: Purification
+def _purification_step(step_number: int, lab_context: LabContext) -> StepRecord:
+    """Final purification."""
     purification = lab_context.purification_methods[0] if lab_context.purification_methods else "appropriate_method"
-    steps.append(
-        ProcedureStep(
-            step_number=9,
-            action="Purify product",
-            parameters={
+    return StepRecord(
+        step_number=step_number,
+        action="Purify product",
+        parameters=frozen_parameters(
+            {
                 "primary_method": purification,
                 "alternatives": lab_context.purification_methods[1:3] if len(lab_context.purification_methods) > 1 else [],
-            },
-            rationale="Purification removes impurities to obtain clean product",
-        )
+            }
+        ),
+        rationale="Purification removes impurities to obtain clean product",
     )
 
-    # Step 10: Characterization and storage
-    steps.append(
-        ProcedureStep(
-            step_number=10,
-            action="Characterize and store product",
-            parameters={
-                "characterization": "available_analytical_methods",
-                "storage": "appropriate_container_and_conditions",
-                "labeling": "complete_information",
-            },
-            rationale="Proper characterization confirms identity; proper storage ensures stability",
-        )
+
+def _characterization_step(step_number: int, lab_context: LabContext) -> StepRecord:
+    """Characterization and storage."""
+    return StepRecord(
+        step_number=step_number,
+        action="Characterize and store product",
+        parameters=_CHARACTERIZATION,
+        rationale="Proper characterization confirms identity; proper storage ensures stability",
     )
 
-    return steps
+
+@lru_cache(maxsize=settings.procedure_block_cache_size)
+def _reaction_block(
+    rxn_smiles: str | None,
+    confidence: float | None,
+    atmosphere: str,
+) -> tuple[_StepTemplate, ...]:
+    """
+    Build the steps that carry out one reaction.
+
+    Args:
+        rxn_smiles: Reaction SMILES, or None for a generic reaction
+        confidence: Predicted confidence of the reaction
+        atmosphere: Atmosphere required by the lab context
+
+    Returns:
+        Step templates: setup, monitoring, completion and workup
+    """
+    setup: dict[str, Any] = {
+        "order": "as_specified",
+        "mixing": "appropriate_method",
+        "atmosphere": atmosphere,
+    }
+    setup_rationale = "Order and conditions of addition affect outcome"
+
+    if rxn_smiles is not None:
+        reactants, products = _split_reaction(rxn_smiles)
+        setup = {
+            "reaction_smiles": rxn_smiles,
+            "reactants": reactants,
+            "products": products,
+            "predicted_confidence": confidence,
+            **setup,
+        }
+        if confidence is not None and confidence < _LOW_CONFIDENCE:
+            setup_rationale += (
+                f" (Low predicted confidence {confidence:.2f} - consider an alternative route)"
+            )
+
+    return (
+        ("Combine reagents according to protocol", MappingProxyType(setup), setup_rationale),
+        ("Monitor reaction progress", _MONITORING, "Monitoring ensures reaction proceeds as expected"),
+        (
+            "Confirm reaction completion and quench if needed",
+            _COMPLETION,
+            "Proper quenching ensures safety and product stability",
+        ),
+        ("Perform workup procedure", _WORKUP, "Workup isolates crude product from reaction mixture"),
+    )
+
+
+def _split_reaction(rxn_smiles: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Split reaction SMILES (``reactants>agents>products``) into molecules."""
+    parts = rxn_smiles.split(">")
+    if len(parts) != 3:
+        return (), ()
+    reactants = tuple(m for m in parts[0].split(".") if m)
+    products = tuple(m for m in parts[2].split(".") if m)
+    return reactants, products
 
 
 def _get_ppe_list(lab_context: LabContext) -> list[str]:
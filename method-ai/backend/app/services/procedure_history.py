@@ -0,0 +1,256 @@
+"""Procedure version history.
+
+Every generated procedure and every lab context edit that changes it is
+saved as a version, keyed by ``request_id`` and numbered from 1. Unlike the
+procedure store, which keeps working state for a limited time, history is
+persistent: a SQLite database at ``PROCEDURE_HISTORY_PATH``, shared by all
+workers.
+
+A version is a document with the lab context, steps, risk flags, fallback
+options and citations. Most edits change a few steps of a long procedure,
+so each version is stored as a delta against its parent holding only the
+top-level fields and steps that changed, plus the new step count. Every
+``PROCEDURE_HISTORY_SNAPSHOT_INTERVAL`` versions a full snapshot is stored
+instead, so reading any version replays fewer than that many deltas. The
+latest version of each procedure is also kept whole (``procedure_heads``),
+so reading it, or saving a new version against it, replays nothing.
+"""
+
+import json
+import logging
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.config import settings
+from app.utils.sqlite import SQLiteConnections, transaction
+
+logger = logging.getLogger(__name__)
+
+_connections = SQLiteConnections(
+    [
+        # base is the snapshot version a row is replayed from (its own for snapshots)
+        "CREATE TABLE IF NOT EXISTS procedure_versions (request_id TEXT NOT NULL, "
+        "version INTEGER NOT NULL, base INTEGER NOT NULL, payload TEXT NOT NULL, "
+        "created_at TEXT NOT NULL, changed_fields TEXT NOT NULL, "
+        "PRIMARY KEY (request_id, version)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS procedure_heads (request_id TEXT PRIMARY KEY, "
+        "version INTEGER NOT NULL, base INTEGER NOT NULL, document TEXT NOT NULL) "
+        "WITHOUT ROWID",
+    ]
+)
+
+# Version document field diffed step by step; other fields are replaced whole
+_STEPS = "procedure"
+
+
+class ProcedureVersionNotFoundError(Exception):
+    """Raised when no version of a procedure is stored."""
+
+
+@dataclass(frozen=True, slots=True)
+class ProcedureVersionInfo:
+    """Metadata of one stored version."""
+
+    version: int
+    created_at: str
+    changed_fields: tuple[str, ...]
+    snapshot: bool
+
+
+def record_version(
+    request_id: str, document: dict[str, Any], changed_fields: Iterable[str] = ()
+) -> int:
+    """
+    Save a new version of a procedure.
+
+    Args:
+        request_id: Identifier of the procedure
+        document: JSON-serializable version with keys ``lab_context``,
+            ``procedure``, ``risk_flags``, ``fallback_options`` and ``citations``
+        changed_fields: Lab context fields edited since the parent version
+
+    Returns:
+        Number of the new version
+    """
+    # Round-trip so tuples compare equal to the lists read back from storage
+    body = json.dumps(document, separators=(",", ":"))
+    document = json.loads(body)
+    conn = _connection()
+    with transaction(conn):
+        head = conn.execute(
+            "SELECT version, base, document FROM procedure_heads WHERE request_id = ?",
+            (request_id,),
+        ).fetchone()
+        version = 1 if head is None else head[0] + 1
+        if head is None or version - head[1] >= settings.procedure_history_snapshot_interval:
+            base, payload = version, body
+        else:
+            base = head[1]
+            payload = json.dumps(_delta(json.loads(head[2]), document), separators=(",", ":"))
+        conn.execute(
+            "INSERT INTO procedure_versions (request_id, version, base, payload, created_at, "
+            "changed_fields) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                request_id,
+                version,
+                base,
+                payload,
+                datetime.now(timezone.utc).isoformat(),
+                json.dumps(list(changed_fields)),
+            ),
+        )
+        conn.execute(
+            "INSERT INTO procedure_heads (request_id, version, base, document) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (request_id) DO UPDATE SET "
+            "version = excluded.version, base = excluded.base, document = excluded.document",
+            (request_id, version, base, body),
+        )
+    logger.debug(
+        f"Saved version {version} of {request_id} "
+        f"({'snapshot' if base == version else 'delta'}, {len(payload)} bytes)"
+    )
+    return version
+
+
+def get_version(
+    request_id: str, version: int | None = None
+) -> tuple[ProcedureVersionInfo, dict[str, Any]]:
+    """
+    Read one version of a procedure.
+
+    Args:
+        request_id: Identifier of the procedure
+        version: Version number, or None for the latest
+
+    Returns:
+        Tuple of (version metadata, version document)
+
+    Raises:
+        ProcedureVersionNotFoundError: If the procedure or version is not stored
+    """
+    conn = _connection()
+    with transaction(conn, "BEGIN"):
+        head = conn.execute(
+            "SELECT version, document FROM procedure_heads WHERE request_id = ?", (request_id,)
+        ).fetchone()
+        if head is None or (version is not None and not 1 <= version <= head[0]):
+            raise ProcedureVersionNotFoundError(f"{request_id} version {version}")
+        if version is None or version == head[0]:
+            row = conn.execute(
+                "SELECT version, created_at, changed_fields, base FROM procedure_versions "
+                "WHERE request_id = ? AND version = ?",
+                (request_id, head[0]),
+            ).fetchone()
+            return _info(row), json.loads(head[1])
+
+        (base,) = conn.execute(
+            "SELECT base FROM procedure_versions WHERE request_id = ? AND version = ?",
+            (request_id, version),
+        ).fetchone()
+        rows = conn.execute(
+            "SELECT version, created_at, changed_fields, base, payload FROM procedure_versions "
+            "WHERE request_id = ? AND version BETWEEN ? AND ? ORDER BY version",
+            (request_id, base, version),
+        ).fetchall()
+
+    document = json.loads(rows[0][4])
+    for row in rows[1:]:
+        document = _apply(document, json.loads(row[4]))
+    return _info(rows[-1]), document
+
+
+def list_versions(
+    request_id: str, before: int | None = None, limit: int = 50
+) -> tuple[list[ProcedureVersionInfo], int | None]:
+    """
+    List the versions of a procedure, newest first.
+
+    Pages are read by keyset (``version < before``), so every page costs the
+    same however deep into the history it is.
+
+    Args:
+        request_id: Identifier of the procedure
+        before: Only list versions older than this, e.g. the cursor of the
+            previous page
+        limit: Maximum versions to list
+
+    Returns:
+        Tuple of (versions, cursor for the next page or None on the last)
+
+    Raises:
+        ProcedureVersionNotFoundError: If the procedure has no versions
+    """
+    query = (
+        "SELECT version, created_at, changed_fields, base FROM procedure_versions "
+        "WHERE request_id = ?"
+    )
+    params: list[Any] = [request_id]
+    if before is not None:
+        query += " AND version < ?"
+        params.append(before)
+    rows = _connection().execute(
+        query + " ORDER BY version DESC LIMIT ?", (*params, limit + 1)
+    ).fetchall()
+    if not rows and before is None:
+        raise ProcedureVersionNotFoundError(request_id)
+
+    versions = [_info(row) for row in rows[:limit]]
+    next_cursor = versions[-1].version if len(rows) > limit else None
+    return versions, next_cursor
+
+
+def close_procedure_history() -> None:
+    """Close this thread's connection."""
+    _connections.close()
+
+
+def _delta(parent: dict[str, Any], document: dict[str, Any]) -> dict[str, Any]:
+    """Structural delta turning the parent document into the new one."""
+    delta: dict[str, Any] = {}
+    changed = {
+        key: value for key, value in document.items() if key != _STEPS and parent.get(key) != value
+    }
+    if changed:
+        delta["set"] = changed
+
+    before, after = parent[_STEPS], document[_STEPS]
+    steps = {
+        str(index): step
+        for index, step in enumerate(after)
+        if index >= len(before) or before[index] != step
+    }
+    if steps:
+        delta["steps"] = steps
+    if len(after) != len(before):
+        delta["step_count"] = len(after)
+    return delta
+
+
+def _apply(parent: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Apply a delta from ``_delta`` to its parent document."""
+    document = {**parent, **delta.get("set", {})}
+    steps = parent[_STEPS]
+    count = delta.get("step_count", len(steps))
+    steps = steps[:count] + [None] * (count - len(steps))
+    for index, step in delta.get("steps", {}).items():
+        steps[int(index)] = step
+    document[_STEPS] = steps
+    return document
+
+
+def _info(row: tuple[Any, ...]) -> ProcedureVersionInfo:
+    """Metadata from a ``procedure_versions`` row."""
+    return ProcedureVersionInfo(
+        version=row[0],
+        created_at=row[1],
+        changed_fields=tuple(json.loads(row[2])),
+        snapshot=row[3] == row[0],
+    )
+
+
+def _connection() -> sqlite3.Connection:
+    """Get this thread's connection to the history database."""
+    return _connections.get(settings.procedure_history_path)
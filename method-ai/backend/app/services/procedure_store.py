@@ -0,0 +1,61 @@
+"""Procedure store service.
+
+Keeps the working state of recently generated procedures (request, plan,
+steps and per-rule risk results) by ``request_id``, so a procedure can be
+regenerated incrementally when its lab context is edited instead of running
+the whole pipeline again.
+"""
+
+import logging
+from typing import Any
+
+from app.core.config import settings
+from app.services.cache import create_cache
+
+logger = logging.getLogger(__name__)
+
+_store = create_cache(
+    "procedures",
+    maxsize=settings.procedure_store_max_entries,
+    ttl_seconds=settings.procedure_store_ttl_seconds,
+)
+
+
+class ProcedureNotFoundError(Exception):
+    """Raised when no stored procedure exists for a request_id."""
+
+
+def save_procedure_state(request_id: str, state: dict[str, Any]) -> None:
+    """
+    Store the working state of a generated procedure.
+
+    Args:
+        request_id: Identifier issued for the procedure
+        state: JSON-serializable state with keys ``request``, ``plan``,
+            ``procedure``, ``risk_rules`` and ``citations``
+    """
+    _store.set(request_id, state)
+
+
+def get_procedure_state(request_id: str) -> dict[str, Any]:
+    """
+    Get the working state of a generated procedure.
+
+    Args:
+        request_id: Identifier issued for the procedure
+
+    Returns:
+        Stored state
+
+    Raises:
+        ProcedureNotFoundError: If the procedure is unknown or has expired
+    """
+    state: dict[str, Any] | None = _store.get(request_id)
+    if state is None:
+        raise ProcedureNotFoundError(request_id)
+    return state
+
+
+def clear_procedure_store() -> None:
+    """Remove all stored procedures."""
+    _store.clear()
@@ -0,0 +1,169 @@
+"""Registry of issued request IDs.
+
+Every ``request_id`` returned by the generate-procedure endpoint or written
+by a batch run is recorded here, so feedback can be checked against IDs that
+were actually issued.
+
+IDs are kept in two structures next to each other:
+
+- an exact set, a SQLite table keyed by ID (``REQUEST_REGISTRY_PATH``)
+- a persistent Bloom filter (same path with a ``.bloom`` suffix), sized by
+  ``REQUEST_REGISTRY_CAPACITY`` and ``REQUEST_REGISTRY_ERROR_RATE``
+
+A lookup first probes the filter, which rules out unknown IDs in memory;
+only IDs the filter lets through cost an indexed SQLite lookup. Both answers
+take constant work however many IDs were issued.
+
+Filter bits are set inside the SQLite write transaction that inserts the ID,
+so concurrent workers never lose each other's bits, and the filter can only
+err towards "possibly present". A missing or damaged filter is rebuilt from
+the exact set.
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.core.config import settings
+from app.utils.bloom import BloomFilter, create_bloom_filter
+from app.utils.sqlite import SQLiteConnections, transaction
+
+logger = logging.getLogger(__name__)
+
+_registry: "RequestRegistry | None" = None
+_registry_lock = threading.Lock()
+
+
+class RequestRegistry:
+    """Exact set of request IDs fronted by a Bloom filter."""
+
+    def __init__(self, path: str, capacity: int, error_rate: float) -> None:
+        """
+        Open a registry, creating it if needed.
+
+        Args:
+            path: SQLite database file of the exact set
+            capacity: Number of IDs the filter is sized for
+            error_rate: Filter false positive rate at capacity
+        """
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._connections = SQLiteConnections(
+            [
+                "CREATE TABLE IF NOT EXISTS issued_request_ids "
+                "(request_id TEXT PRIMARY KEY) WITHOUT ROWID"
+            ]
+        )
+        self._bloom = self._open_filter()
+
+    def register(self, request_id: str) -> None:
+        """
+        Record an issued request ID.
+
+        Args:
+            request_id: Request ID returned to a client
+        """
+        with transaction(self._connection()) as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO issued_request_ids (request_id) VALUES (?)",
+                (request_id,),
+            ).rowcount
+            if inserted:
+                self._bloom.add(request_id.encode("utf-8"))
+
+    def contains(self, request_id: str) -> bool:
+        """
+        Check whether a request ID was issued.
+
+        Args:
+            request_id: Request ID to check
+
+        Returns:
+            Whether the ID is in the registry
+        """
+        if request_id.encode("utf-8") not in self._bloom:
+            return False
+        row = self._connection().execute(
+            "SELECT 1 FROM issued_request_ids WHERE request_id = ?", (request_id,)
+        ).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        """Unmap the filter and close this thread's connection."""
+        self._bloom.close()
+        self._connections.close()
+
+    def _open_filter(self) -> BloomFilter:
+        """Map the filter, rebuilding it from the exact set if missing or damaged."""
+        bloom_path = str(Path(self.path).with_suffix(".bloom"))
+        try:
+            return BloomFilter(bloom_path)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        with transaction(self._connection()) as conn:
+            # Another worker may have rebuilt it while we waited for the lock
+            try:
+                return BloomFilter(bloom_path)
+            except (FileNotFoundError, ValueError):
+                pass
+            bloom = create_bloom_filter(bloom_path, self.capacity, self.error_rate)
+            for (request_id,) in conn.execute("SELECT request_id FROM issued_request_ids"):
+                bloom.add(request_id.encode("utf-8"))
+            bloom.flush()
+
+        if len(bloom):
+            logger.info(f"Rebuilt request ID filter with {len(bloom)} IDs")
+        return bloom
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the exact set."""
+        return self._connections.get(self.path)
+
+
+def get_request_registry() -> RequestRegistry:
+    """Get the registry, opening it from settings on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RequestRegistry(
+                    settings.request_registry_path,
+                    capacity=settings.request_registry_capacity,
+                    error_rate=settings.request_registry_error_rate,
+                )
+    return _registry
+
+
+def register_request_id(request_id: str) -> None:
+    """
+    Record a request ID issued to a client.
+
+    Args:
+        request_id: Request ID of a generated procedure
+    """
+    get_request_registry().register(request_id)
+
+
+def is_known_request_id(request_id: str) -> bool:
+    """
+    Check whether a request ID was issued by this deployment.
+
+    Args:
+        request_id: Request ID to check
+
+    Returns:
+        Whether the ID was registered
+    """
+    return get_request_registry().contains(request_id)
+
+
+def close_request_registry() -> None:
+    """Close the registry, so it is reopened from current settings."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
@@ -4,38 +4,87 @@ Integrates with IBM RXN for Chemistry via rxn4chemistry package.
 Falls back to deterministic placeholder when RXN is not available.
 """
 
+import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
 from app.core.config import settings
+from app.core.deadline import PLAN_PLACEHOLDER, PLAN_RXN_TIMEOUT, PLAN_SIMILAR_TARGET, Deadline
+from app.services.cache import create_cache
+from app.services.similarity_index import similarity_index
+from app.utils.smiles import smiles_cache_key
 
 logger = logging.getLogger(__name__)
 
+# RXN plans keyed by canonical target SMILES
+_plan_cache = create_cache(
+    "plans",
+    maxsize=settings.plan_cache_max_entries,
+    ttl_seconds=settings.plan_cache_ttl_seconds,
+)
+
+# Runs RXN calls for requests with a deadline; a call that outlives its
+# request finishes here and still caches its plan
+_rxn_executor = ThreadPoolExecutor(
+    max_workers=settings.admission_plan_concurrency, thread_name_prefix="rxn"
+)
+
 # Normalized plan schema:
 # {
-#     "source": "ibm_rxn" | "placeholder",
+#     "source": "ibm_rxn" | "similar_target" | "placeholder",
 #     "target_smiles": str,
-#     "steps": [
+#     "steps": [  # retrosynthetic order: the first step forms the target
 #         {"rxn_smiles": str, "confidence": float, "notes": str}
-#     ]
+#     ],
+#     # ibm_rxn only, when RXN proposed several pathways:
+#     "routes": [[{"rxn_smiles": str, ...}, ...], ...],  # all of them, best first
+#     # similar_target only:
+#     "similar_to": str,      # canonical SMILES of the neighbour
+#     "similarity": float,    # estimated Jaccard similarity
 # }
 
 
-def get_retrosynthesis_plan(target_smiles: str) -> dict[str, Any]:
+def get_retrosynthesis_plan(
+    target_smiles: str, deadline: Deadline | None = None
+) -> dict[str, Any]:
     """
     Get a retrosynthesis plan for the target molecule.
 
     Attempts to use IBM RXN if configured, otherwise returns a placeholder.
+    RXN plans are cached by canonical SMILES, so equivalent spellings of a
+    target share one prediction. Before calling RXN, a near-identical
+    previously planned target is looked up and its plan offered as a draft.
+
+    With a deadline, RXN is only called if enough time is left, and is
+    abandoned when the time runs out. The plan then falls back to a looser
+    similar-target match or the placeholder, recorded as a degradation.
 
     Args:
         target_smiles: Target molecule in SMILES format
+        deadline: Deadline of the request, if any
 
     Returns:
         Normalized retrosynthesis plan dictionary
     """
     if settings.rxn_api_key:
+        cache_key = smiles_cache_key(target_smiles)
+        cached = _plan_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached RXN plan for target: {cache_key[:50]}")
+            return {**cached, "target_smiles": target_smiles}
+        if settings.similarity_reuse_enabled:
+            similar = _get_similar_target_plan(target_smiles, cache_key)
+            if similar is not None:
+                return similar
+        if deadline is not None:
+            return _get_plan_before_deadline(target_smiles, cache_key, deadline)
         try:
-            return _get_rxn_plan(target_smiles)
+            return _fetch_rxn_plan(target_smiles, cache_key)
         except Exception as e:
             logger.warning(f"RXN API call failed, using placeholder: {e}")
             return _get_placeholder_plan(target_smiles)
@@ -44,6 +93,94 @@ def get_retrosynthesis_plan(target_smiles: str) -> dict[str, Any]:
         return _get_placeholder_plan(target_smiles)
 
 
+def _fetch_rxn_plan(target_smiles: str, cache_key: str) -> dict[str, Any]:
+    """Call RXN and cache the plan."""
+    plan = _get_rxn_plan(target_smiles)
+    _plan_cache.set(cache_key, plan)
+    similarity_index.add(cache_key, plan)
+    return plan
+
+
+def _get_plan_before_deadline(
+    target_smiles: str, cache_key: str, deadline: Deadline
+) -> dict[str, Any]:
+    """
+    Call RXN within the time left, degrading if it cannot answer in time.
+
+    Args:
+        target_smiles: Target molecule in SMILES format
+        cache_key: Canonical form of the target
+        deadline: Deadline of the request
+
+    Returns:
+        RXN plan, or a degraded similar-target or placeholder plan
+    """
+    budget = deadline.remaining() - settings.deadline_generation_reserve_seconds
+    if budget < settings.deadline_rxn_min_seconds:
+        logger.info(f"Skipping RXN call, {budget:.3f}s left before deadline")
+        return _get_degraded_plan(target_smiles, cache_key, deadline)
+
+    future = _rxn_executor.submit(_fetch_rxn_plan, target_smiles, cache_key)
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeoutError:
+        logger.warning(f"RXN call did not finish within {budget:.3f}s, degrading plan")
+        deadline.degrade(PLAN_RXN_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"RXN API call failed, using placeholder: {e}")
+        return _get_placeholder_plan(target_smiles)
+    return _get_degraded_plan(target_smiles, cache_key, deadline)
+
+
+def _get_degraded_plan(
+    target_smiles: str, cache_key: str, deadline: Deadline
+) -> dict[str, Any]:
+    """Best plan available without RXN: a looser similar-target match, or the placeholder."""
+    if settings.similarity_reuse_enabled:
+        similar = _get_similar_target_plan(
+            target_smiles, cache_key, threshold=settings.deadline_similarity_threshold
+        )
+        if similar is not None:
+            deadline.degrade(PLAN_SIMILAR_TARGET)
+            return similar
+
+    deadline.degrade(PLAN_PLACEHOLDER)
+    return _get_placeholder_plan(target_smiles)
+
+
+def _get_similar_target_plan(
+    target_smiles: str, cache_key: str, threshold: float | None = None
+) -> dict[str, Any] | None:
+    """
+    Reuse the plan of a near-identical previously planned target.
+
+    Args:
+        target_smiles: Target molecule in SMILES format
+        cache_key: Canonical form of the target
+        threshold: Minimum similarity, defaults to SIMILARITY_REUSE_THRESHOLD
+
+    Returns:
+        Draft plan marked with source "similar_target", or None
+    """
+    if threshold is None:
+        threshold = settings.similarity_reuse_threshold
+    match = similarity_index.query(cache_key, threshold)
+    if match is None:
+        return None
+
+    neighbour, similarity, neighbour_plan = match
+    logger.info(
+        f"Reusing plan of similar target {neighbour[:50]} (similarity {similarity:.2f})"
+    )
+    return {
+        "source": "similar_target",
+        "target_smiles": target_smiles,
+        "steps": neighbour_plan.get("steps", []),
+        "similar_to": neighbour,
+        "similarity": round(similarity, 3),
+    }
+
+
 def _get_rxn_plan(target_smiles: str) -> dict[str, Any]:
     """
     Fetch retrosynthesis plan from IBM RXN.
@@ -57,11 +194,34 @@ def _get_rxn_plan(target_smiles: str) -> dict[str, Any]:
     Raises:
         Exception: If RXN API call fails
     """
+    logger.info(f"Calling IBM RXN for target: {target_smiles[:50]}...")
+
+    rxn = get_rxn_client()
+
+    # Request retrosynthesis prediction
+    response = rxn.predict_automatic_retrosynthesis(product=target_smiles)
+
+    # Wait for results (with timeout handling)
+    results = rxn.get_predict_automatic_retrosynthesis_results(response["prediction_id"])
+
+    # Normalize the response
+    return _normalize_rxn_response(target_smiles, results)
+
+
+@lru_cache(maxsize=1)
+def get_rxn_client() -> Any:
+    """
+    Get the authenticated IBM RXN client, creating it on first use.
+
+    The client and its project are set up once per process rather than on
+    every prediction.
+
+    Returns:
+        Configured RXN4ChemistryWrapper
+    """
     # Import here to avoid import errors when rxn4chemistry is not needed
     from rxn4chemistry import RXN4ChemistryWrapper
 
-    logger.info(f"Calling IBM RXN for target: {target_smiles[:50]}...")
-
     # Initialize RXN wrapper
     rxn = RXN4ChemistryWrapper(api_key=settings.rxn_api_key)
 
@@ -72,14 +232,7 @@ def _get_rxn_plan(target_smiles: str) -> dict[str, Any]:
         # Create or use default project
         rxn.create_project("method-ai-default")
 
-    # Request retrosynthesis prediction
-    response = rxn.predict_automatic_retrosynthesis(product=target_smiles)
-
-    # Wait for results (with timeout handling)
-    results = rxn.get_predict_automatic_retrosynthesis_results(response["prediction_id"])
-
-    # Normalize the response
-    return _normalize_rxn_response(target_smiles, results)
+    return rxn
 
 
 def _normalize_rxn_response(target_smiles: str, rxn_results: dict[str, Any]) -> dict[str, Any]:
@@ -93,28 +246,31 @@ def _normalize_rxn_response(target_smiles: str, rxn_results: dict[str, Any]) ->
     Returns:
         Normalized plan dictionary
     """
-    steps = []
-
     # Extract retrosynthetic pathways
     retrosynthetic_paths = rxn_results.get("retrosynthetic_paths", [])
 
-    if retrosynthetic_paths:
-        # Use the first (typically best) pathway
-        best_path = retrosynthetic_paths[0] if retrosynthetic_paths else {}
-        reactions = best_path.get("reactions", [])
-
-        for idx, reaction in enumerate(reactions):
-            steps.append({
+    routes = [
+        [
+            {
                 "rxn_smiles": reaction.get("rxn_smiles", ""),
                 "confidence": reaction.get("confidence", 0.0),
                 "notes": f"Step {idx + 1} from IBM RXN",
-            })
+            }
+            for idx, reaction in enumerate(path.get("reactions", []))
+        ]
+        for path in retrosynthetic_paths
+    ]
 
-    return {
+    plan: dict[str, Any] = {
         "source": "ibm_rxn",
         "target_smiles": target_smiles,
-        "steps": steps,
+        # Use the first (typically best) pathway
+        "steps": routes[0] if routes else [],
     }
+    # Keep the alternatives, so a route the lab has stock for can be preferred
+    if len(routes) > 1:
+        plan["routes"] = routes
+    return plan
 
 
 def _get_placeholder_plan(target_smiles: str) -> dict[str, Any]:
@@ -136,6 +292,108 @@ def _get_placeholder_plan(target_smiles: str) -> dict[str, Any]:
     }
 
 
+def refresh_plan(target_smiles: str) -> dict[str, Any]:
+    """
+    Fetch a fresh RXN plan for a target and cache it, replacing any cached plan.
+
+    Args:
+        target_smiles: Target molecule in SMILES format
+
+    Returns:
+        Normalized plan from RXN
+
+    Raises:
+        Exception: If RXN is not configured or the call fails
+    """
+    if not settings.rxn_api_key:
+        raise RuntimeError("RXN API key not configured")
+    return _fetch_rxn_plan(target_smiles, smiles_cache_key(target_smiles))
+
+
+def cached_plan_ttls() -> dict[str, float]:
+    """
+    Get the remaining lifetime of every cached plan.
+
+    Returns:
+        Seconds until expiry, keyed by canonical target SMILES
+    """
+    return {key: remaining for key, _, remaining in _plan_cache.items()}
+
+
+def clear_plan_cache() -> None:
+    """Remove all cached RXN plans and the similarity index built from them."""
+    _plan_cache.clear()
+    similarity_index.clear()
+
+
+def rebuild_similarity_index() -> int:
+    """
+    Index every cached RXN plan for similar-target reuse.
+
+    Returns:
+        Number of targets indexed
+    """
+    entries = _plan_cache.items()
+    for key, plan, _ in entries:
+        similarity_index.add(key, plan)
+    return len(entries)
+
+
+def save_plan_cache(path: str) -> int:
+    """
+    Persist live cached plans to a JSONL snapshot.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Number of plans written
+    """
+    snapshot_path = Path(path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    entries = _plan_cache.items()
+
+    tmp_path = snapshot_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for key, plan, remaining in entries:
+            f.write(json.dumps({"key": key, "plan": plan, "expires_at": now + remaining}) + "\n")
+    tmp_path.replace(snapshot_path)
+
+    return len(entries)
+
+
+def load_plan_cache(path: str) -> int:
+    """
+    Load unexpired plans from a JSONL snapshot into the cache.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Number of plans loaded
+    """
+    snapshot_path = Path(path)
+    if not snapshot_path.exists():
+        return 0
+
+    now = time.time()
+    loaded = 0
+    with open(snapshot_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed plan cache entry in {path}")
+                continue
+            remaining = entry["expires_at"] - now
+            if remaining > 0:
+                _plan_cache.set(entry["key"], entry["plan"], ttl_seconds=remaining)
+                loaded += 1
+
+    return loaded
+
+
 def is_rxn_configured() -> bool:
     """Check if IBM RXN is configured."""
     return settings.rxn_api_key is not None
@@ -3,11 +3,48 @@
 Analyzes lab context and procedures to identify potential risks and suggest fallbacks.
 """
 
-from app.models.schemas import LabContext, ProcedureStep
+from collections.abc import Callable, Collection, Sequence
+
+from app.models.records import StepRecord
+from app.models.schemas import LabContext
+from app.services.compound_safety import compound_flags
+from app.services.equipment_bookings import booking_flags
+from app.services.hazard_catalog import hazard_flags
+from app.services.inventory import inventory_flags
+
+_RiskRule = Callable[[LabContext, Sequence[StepRecord]], list[str]]
+
+# Lab context fields read by each risk rule. Rules whose fields did not
+# change can keep their previous results when the lab context is edited.
+RISK_RULE_DEPENDENCIES: dict[str, frozenset[str]] = {
+    "safety_constraints": frozenset({"safety_constraints"}),  # _analyze_safety_constraints
+    "hazards": frozenset(),  # _analyze_hazards, reads only the reactions of the procedure
+    "compounds": frozenset(),  # _analyze_compounds, likewise
+    "inventory": frozenset(),  # _analyze_inventory, and the lab inventory
+    "equipment": frozenset({"equipment", "purification_methods"}),  # _analyze_equipment
+    "experience": frozenset({"experience_level"}),  # _analyze_experience
+    "time": frozenset({"time_budget_hours"}),  # _analyze_time
+    "bookings": frozenset({"equipment", "time_budget_hours"}),  # _analyze_bookings
+    "scale": frozenset({"scale_mg"}),  # _analyze_scale
+    "fallbacks": frozenset({"purification_methods"}),  # _generate_fallbacks
+}
+
+# Rules that also read state outside the request (the lab inventory, the
+# booking store and the clock). Their results are never reused, whatever changed.
+UNCACHED_RULES = frozenset({"inventory", "bookings"})
+
+# Rules reading the lab context alone, which lab profiles precompute
+CONTEXT_RULES = frozenset(
+    {"safety_constraints", "equipment", "experience", "time", "scale", "fallbacks"}
+)
+
+_VERIFICATION_REMINDER = (
+    "All procedures require verification by qualified personnel before execution"
+)
 
 
 def annotate_risks(
-    procedure: list[ProcedureStep],
+    procedure: Sequence[StepRecord],
     lab_context: LabContext,
 ) -> tuple[list[str], list[str]]:
     """
@@ -20,33 +57,88 @@ def annotate_risks(
     Returns:
         Tuple of (risk_flags, fallback_options)
     """
-    risk_flags = []
-    fallback_options = []
+    return assemble_risks(evaluate_risk_rules(procedure, lab_context))
 
-    # Analyze safety constraints
-    risk_flags.extend(_analyze_safety_constraints(lab_context))
 
-    # Analyze equipment limitations
-    risk_flags.extend(_analyze_equipment(lab_context))
+def evaluate_risk_rules(
+    procedure: Sequence[StepRecord],
+    lab_context: LabContext,
+    previous: dict[str, list[str]] | None = None,
+    changed_fields: Collection[str] | None = None,
+) -> dict[str, list[str]]:
+    """
+    Run the risk rules, reusing previous results where possible.
+
+    Args:
+        procedure: Generated procedure steps
+        lab_context: Laboratory constraints and context
+        previous: Results of an earlier evaluation, by rule name
+        changed_fields: Lab context fields changed since ``previous``; rules
+            not depending on any of them keep their previous results, except
+            those in ``UNCACHED_RULES``
+
+    Returns:
+        Flags produced by each rule, by rule name
+    """
+    changed = frozenset(changed_fields or ())
+    results = {}
+    for name, rule in _RISK_RULES.items():
+        reusable = name not in UNCACHED_RULES and not RISK_RULE_DEPENDENCIES[name] & changed
+        if previous is not None and name in previous and reusable:
+            results[name] = previous[name]
+        else:
+            results[name] = rule(lab_context, procedure)
+    return results
+
+
+def evaluate_context_rules(lab_context: LabContext) -> dict[str, list[str]]:
+    """
+    Run the rules that read only the lab context.
 
-    # Analyze experience level
-    risk_flags.extend(_analyze_experience(lab_context))
+    The result can be passed as ``previous`` to ``evaluate_risk_rules`` for
+    any procedure with the same lab context.
 
-    # Analyze time constraints
-    risk_flags.extend(_analyze_time(lab_context, procedure))
+    Args:
+        lab_context: Laboratory constraints and context
 
-    # Analyze scale
-    risk_flags.extend(_analyze_scale(lab_context))
+    Returns:
+        Flags produced by each context-only rule, by rule name
+    """
+    return {
+        name: rule(lab_context, ()) for name, rule in _RISK_RULES.items() if name in CONTEXT_RULES
+    }
 
-    # Generate fallback options
-    fallback_options = _generate_fallbacks(lab_context)
+
+def assemble_risks(results: dict[str, list[str]]) -> tuple[list[str], list[str]]:
+    """
+    Combine rule results into risk flags and fallback options.
+
+    Args:
+        results: Output of ``evaluate_risk_rules``
+
+    Returns:
+        Tuple of (risk_flags, fallback_options)
+    """
+    risk_flags = [
+        flag
+        for name in (
+            "safety_constraints",
+            "hazards",
+            "compounds",
+            "inventory",
+            "equipment",
+            "experience",
+            "time",
+            "bookings",
+            "scale",
+        )
+        for flag in results.get(name, ())
+    ]
 
     # Always add verification reminder
-    risk_flags.append(
-        "All procedures require verification by qualified personnel before execution"
-    )
+    risk_flags.append(_VERIFICATION_REMINDER)
 
-    return risk_flags, fallback_options
+    return risk_flags, list(results["fallbacks"])
 
 
 def _analyze_safety_constraints(lab_context: LabContext) -> list[str]:
@@ -69,6 +161,30 @@ def _analyze_safety_constraints(lab_context: LabContext) -> list[str]:
     return flags
 
 
+def _analyze_hazards(lab_context: LabContext, procedure: Sequence[StepRecord]) -> list[str]:
+    """Flag hazardous reagents in the procedure's reactions."""
+    return hazard_flags(_reactions(procedure))
+
+
+def _analyze_compounds(lab_context: LabContext, procedure: Sequence[StepRecord]) -> list[str]:
+    """Flag the safety data of every known reagent and product."""
+    return compound_flags(_reactions(procedure))
+
+
+def _analyze_inventory(lab_context: LabContext, procedure: Sequence[StepRecord]) -> list[str]:
+    """Flag starting materials missing or low in the lab inventory."""
+    return inventory_flags(rxn_smiles for _, rxn_smiles in _reactions(procedure))
+
+
+def _reactions(procedure: Sequence[StepRecord]) -> list[tuple[int, str]]:
+    """Step numbers and reaction SMILES of the procedure's reaction steps."""
+    return [
+        (step.step_number, step.parameters["reaction_smiles"])
+        for step in procedure
+        if step.parameters.get("reaction_smiles")
+    ]
+
+
 def _analyze_equipment(lab_context: LabContext) -> list[str]:
     """Analyze equipment availability for risks."""
     flags = []
@@ -108,7 +224,7 @@ def _analyze_experience(lab_context: LabContext) -> list[str]:
     return flags
 
 
-def _analyze_time(lab_context: LabContext, procedure: list[ProcedureStep]) -> list[str]:
+def _analyze_time(lab_context: LabContext, procedure: Sequence[StepRecord]) -> list[str]:
     """Analyze time constraints."""
     flags = []
     time_hours = lab_context.time_budget_hours
@@ -122,6 +238,11 @@ def _analyze_time(lab_context: LabContext, procedure: list[ProcedureStep]) -> li
     return flags
 
 
+def _analyze_bookings(lab_context: LabContext) -> list[str]:
+    """Flag lab equipment booked during a session starting now."""
+    return booking_flags(lab_context.equipment, lab_context.time_budget_hours)
+
+
 def _analyze_scale(lab_context: LabContext) -> list[str]:
     """Analyze scale-related considerations."""
     flags = []
@@ -154,3 +275,17 @@ def _generate_fallbacks(lab_context: LabContext) -> list[str]:
         fallbacks.append("Consider alternative purification approach if primary method insufficient")
 
     return fallbacks
+
+
+_RISK_RULES: dict[str, _RiskRule] = {
+    "safety_constraints": lambda lab_context, _: _analyze_safety_constraints(lab_context),
+    "hazards": _analyze_hazards,
+    "compounds": _analyze_compounds,
+    "inventory": _analyze_inventory,
+    "equipment": lambda lab_context, _: _analyze_equipment(lab_context),
+    "experience": lambda lab_context, _: _analyze_experience(lab_context),
+    "time": _analyze_time,
+    "bookings": lambda lab_context, _: _analyze_bookings(lab_context),
+    "scale": lambda lab_context, _: _analyze_scale(lab_context),
+    "fallbacks": lambda lab_context, _: _generate_fallbacks(lab_context),
+}
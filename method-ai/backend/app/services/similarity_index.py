@@ -0,0 +1,219 @@
+"""Similarity index over planned targets.
+
+Indexes every target that received an RXN plan so that a new target that is a
+near-identical analogue of a past one can reuse its plan as a fast draft.
+
+Targets are sketched as MinHash signatures over character n-grams of their
+canonical SMILES, using one-permutation hashing (one hash per n-gram, binned)
+so that sketching costs a single pass. Each n-gram is numbered by its
+occurrence, so repeats count: a chain one carbon longer adds a shingle
+instead of looking identical. Signatures are split into LSH bands; targets
+sharing any band bucket become candidates and are ranked by the fraction of
+matching signature bins, which estimates Jaccard similarity. Lookups touch a
+handful of buckets regardless of index size.
+
+Only candidates with the target's molecular formula are returned, so a
+homologue or a substituted analogue never lends its route, and reagent
+quantities, to a different product.
+"""
+
+import json
+import logging
+import operator
+import threading
+import zlib
+from array import array
+from typing import Any
+
+from app.core.config import settings
+from app.utils.formula import molecular_formula
+from app.utils.smiles import InvalidSmilesError
+
+logger = logging.getLogger(__name__)
+
+_NGRAM = 3
+_BANDS = 8
+_ROWS = 4
+_BINS = _BANDS * _ROWS
+
+# Candidates kept per LSH bucket; very common fragments would otherwise
+# make buckets, and lookups, unbounded
+_MAX_BUCKET_SIZE = 32
+
+# Candidates scored per lookup, taken in order of shared bands
+_MAX_SCORED_CANDIDATES = 32
+
+_EMPTY = 0xFFFFFFFF
+
+# Element counts of a target, compared for equality only
+_Formula = frozenset[tuple[str, int]]
+
+
+class SimilarityIndex:
+    """MinHash-LSH index from canonical target SMILES to plans."""
+
+    def __init__(self, max_entries: int) -> None:
+        """
+        Create an empty index.
+
+        Args:
+            max_entries: Maximum number of targets indexed
+        """
+        self.max_entries = max_entries
+        self._keys: list[str] = []
+        self._plans: list[bytes] = []
+        self._signatures: list[array] = []
+        self._formulas: list[_Formula | None] = []
+        self._ids: dict[str, int] = {}
+        self._buckets: dict[int, int | list[int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, plan: dict[str, Any]) -> None:
+        """
+        Index a target and its plan, replacing the plan if already indexed.
+
+        Args:
+            key: Canonical target SMILES
+            plan: Normalized retrosynthesis plan
+        """
+        encoded = json.dumps(plan, separators=(",", ":")).encode("utf-8")
+        signature = minhash_signature(key)
+        formula = _formula(key)
+
+        with self._lock:
+            existing = self._ids.get(key)
+            if existing is not None:
+                self._plans[existing] = encoded
+                return
+            if len(self._keys) >= self.max_entries:
+                return
+
+            target_id = len(self._keys)
+            self._keys.append(key)
+            self._plans.append(encoded)
+            self._signatures.append(signature)
+            self._formulas.append(formula)
+            self._ids[key] = target_id
+
+            for bucket in _band_hashes(signature):
+                members = self._buckets.get(bucket)
+                if members is None:
+                    self._buckets[bucket] = target_id
+                elif isinstance(members, int):
+                    self._buckets[bucket] = [members, target_id]
+                elif len(members) < _MAX_BUCKET_SIZE:
+                    members.append(target_id)
+
+    def query(self, key: str, threshold: float) -> tuple[str, float, dict[str, Any]] | None:
+        """
+        Find the most similar other indexed target with the same formula.
+
+        Args:
+            key: Canonical target SMILES
+            threshold: Minimum estimated Jaccard similarity
+
+        Returns:
+            Tuple of (neighbour key, similarity, neighbour plan), or None
+        """
+        formula = _formula(key)
+        if formula is None:
+            return None
+        signature = minhash_signature(key)
+
+        band_hits: dict[int, int] = {}
+        for bucket in _band_hashes(signature):
+            members = self._buckets.get(bucket)
+            if members is None:
+                continue
+            for candidate in (members,) if isinstance(members, int) else members:
+                band_hits[candidate] = band_hits.get(candidate, 0) + 1
+
+        # Close neighbours share most bands, so score those first
+        candidates = sorted(band_hits, key=band_hits.__getitem__, reverse=True)
+
+        best_id = -1
+        best_similarity = threshold
+        for candidate in candidates[:_MAX_SCORED_CANDIDATES]:
+            if self._keys[candidate] == key or self._formulas[candidate] != formula:
+                continue
+            matches = sum(map(operator.eq, signature, self._signatures[candidate]))
+            similarity = matches / _BINS
+            if similarity >= best_similarity:
+                best_id, best_similarity = candidate, similarity
+
+        if best_id < 0:
+            return None
+        return self._keys[best_id], best_similarity, json.loads(self._plans[best_id])
+
+    def clear(self) -> None:
+        """Remove all indexed targets."""
+        with self._lock:
+            self._keys.clear()
+            self._plans.clear()
+            self._signatures.clear()
+            self._formulas.clear()
+            self._ids.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def minhash_signature(smiles: str) -> array:
+    """
+    Compute the one-permutation MinHash signature of a SMILES string.
+
+    Shingles are character n-grams numbered by occurrence (the second
+    ``CCC`` is a different shingle from the first), so the signature
+    estimates the Jaccard similarity of n-gram multisets.
+
+    Args:
+        smiles: Canonical SMILES
+
+    Returns:
+        Unsigned 32-bit minimum per bin
+    """
+    padded = f"^{smiles}$"
+    mins = array("I", [_EMPTY]) * _BINS
+    seen: dict[str, int] = {}
+    for start in range(max(len(padded) - _NGRAM + 1, 1)):
+        gram = padded[start : start + _NGRAM]
+        occurrence = seen.get(gram, 0)
+        seen[gram] = occurrence + 1
+        value = zlib.crc32(gram.encode("utf-8"), occurrence)
+        bin_index = value % _BINS
+        if value < mins[bin_index]:
+            mins[bin_index] = value
+
+    # Densify: empty bins borrow from the next filled bin, salted by distance
+    filled = mins[:]
+    for bin_index in range(_BINS):
+        if filled[bin_index] != _EMPTY:
+            continue
+        for offset in range(1, _BINS):
+            donor = filled[(bin_index + offset) % _BINS]
+            if donor != _EMPTY:
+                mins[bin_index] = zlib.crc32(donor.to_bytes(4, "little"), offset)
+                break
+    return mins
+
+
+def _formula(smiles: str) -> "_Formula | None":
+    """Molecular formula as a comparable value, or None if it cannot be computed."""
+    try:
+        return frozenset(molecular_formula(smiles).items())
+    except InvalidSmilesError:
+        return None
+
+
+def _band_hashes(signature: array) -> list[int]:
+    """Hash each LSH band of a signature to a bucket id."""
+    raw = signature.tobytes()
+    width = _ROWS * signature.itemsize
+    return [
+        zlib.crc32(raw[band * width : (band + 1) * width], band) | (band << 32)
+        for band in range(_BANDS)
+    ]
+
+
+similarity_index = SimilarityIndex(max_entries=settings.similarity_index_max_entries)
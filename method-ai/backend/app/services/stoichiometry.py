@@ -0,0 +1,97 @@
+"""Reagent quantities back-calculated from the target scale.
+
+The last reaction of a route must make ``scale_mg`` of the target. Walking
+the route backwards, each reaction is run on the amount of product the next
+one needs, divided by ``STOICHIOMETRY_ASSUMED_YIELD``, with one equivalent
+of each reactant. Intermediates are made by earlier reactions; what remains
+are the starting materials to weigh out. Agents (catalysts, solvents) are
+not quantified.
+
+Quantities are linear in the scale, so a route is solved once, as mmol of
+each starting material per mg of target, and memoized. Any number of scales
+of the same route, e.g. a batch of requests or a scale sweep, then cost one
+multiplication per reagent.
+"""
+
+import logging
+from collections.abc import Sequence
+from functools import lru_cache
+
+from app.core.config import settings
+from app.utils.formula import molecular_weight
+from app.utils.smiles import InvalidSmilesError, smiles_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def reagent_quantities(
+    reactions: Sequence[str], scales_mg: Sequence[float]
+) -> list[list[tuple[str, float, float]]]:
+    """
+    Compute the starting material quantities of a route at several scales.
+
+    Args:
+        reactions: Reaction SMILES in retrosynthetic order (the first
+            reaction forms the target)
+        scales_mg: Target amounts in milligrams
+
+    Returns:
+        Per scale, tuples of (SMILES, mass in mg, amount in mmol) for each
+        starting material, in order of first use; empty lists if the route
+        cannot be solved
+    """
+    factors = route_factors(tuple(reactions))
+    return [
+        [(molecule, mmol * weight * scale, mmol * scale) for molecule, weight, mmol in factors]
+        for scale in scales_mg
+    ]
+
+
+@lru_cache(maxsize=settings.procedure_block_cache_size)
+def route_factors(reactions: tuple[str, ...]) -> tuple[tuple[str, float, float], ...]:
+    """
+    Solve a route per milligram of target.
+
+    Args:
+        reactions: Reaction SMILES in retrosynthetic order
+
+    Returns:
+        Tuples of (SMILES, molecular weight, mmol per mg of target) for each
+        starting material, or nothing if the route has no reactions or a
+        compound has no molecular weight
+    """
+    parsed = [_split(rxn_smiles) for rxn_smiles in reactions]
+    parsed = [(reactants, products) for reactants, products in parsed if products]
+    if not parsed:
+        return ()
+
+    try:
+        target = parsed[0][1][0]
+        demand = {smiles_cache_key(target): 1.0 / molecular_weight(target)}
+        for reactants, products in parsed:
+            run = demand.pop(smiles_cache_key(products[0]), 0.0)
+            for reactant in reactants:
+                key = smiles_cache_key(reactant)
+                demand[key] = demand.get(key, 0.0) + run / settings.stoichiometry_assumed_yield
+
+        # Starting materials in forward order: first needed, first weighed
+        spellings: dict[str, str] = {}
+        for reactants, _ in reversed(parsed):
+            for reactant in reactants:
+                spellings.setdefault(smiles_cache_key(reactant), reactant)
+        return tuple(
+            (molecule, molecular_weight(molecule), demand[key])
+            for key, molecule in spellings.items()
+            if demand.get(key)
+        )
+    except InvalidSmilesError as e:
+        logger.debug(f"Cannot compute quantities for route: {e}")
+        return ()
+
+
+def _split(rxn_smiles: str) -> tuple[list[str], list[str]]:
+    """Reactants and products of reaction SMILES (``reactants>agents>products``)."""
+    parts = rxn_smiles.split(">")
+    if len(parts) != 3:
+        return [], []
+    return [m for m in parts[0].split(".") if m], [m for m in parts[2].split(".") if m]
@@ -0,0 +1,82 @@
+"""Aho-Corasick multi-pattern matching over token sequences.
+
+Compiles any number of patterns into one automaton that finds every
+occurrence of every pattern in a single left-to-right pass. Search time is
+linear in the input plus the number of matches, independent of how many
+patterns were compiled. Tokens can be any hashable values, e.g. SMILES
+tokens from ``tokenize_smiles``.
+"""
+
+from collections import deque
+from collections.abc import Hashable, Iterable, Iterator, Sequence
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """Automaton matching a fixed set of token patterns."""
+
+    def __init__(self, patterns: Iterable[tuple[Sequence[Hashable], T]]) -> None:
+        """
+        Compile patterns.
+
+        Args:
+            patterns: Pairs of (token sequence, value reported on a match);
+                empty sequences are ignored
+        """
+        self._goto: list[dict[Hashable, int]] = [{}]
+        outputs: list[list[tuple[int, T]]] = [[]]
+
+        for tokens, value in patterns:
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                next_state = self._goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][token] = next_state
+                    self._goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append((len(tokens), value))
+
+        # Breadth-first, so fail links of shorter prefixes are set first
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(token, 0)
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+                queue.append(next_state)
+
+        self._outputs = [tuple(output) for output in outputs]
+
+    def search(self, tokens: Iterable[Hashable]) -> Iterator[tuple[int, int, T]]:
+        """
+        Find all pattern occurrences, including overlapping ones.
+
+        Args:
+            tokens: Token sequence to scan
+
+        Yields:
+            Tuples of (start index, end index, value), ordered by end index
+        """
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length, value in self._outputs[state]:
+                yield index + 1 - length, index + 1, value
+
+    def __len__(self) -> int:
+        """Number of automaton states."""
+        return len(self._goto)
@@ -0,0 +1,163 @@
+"""Persistent Bloom filters.
+
+A Bloom filter answers "definitely absent" or "possibly present" for byte
+keys using a fixed bit array, about 9.6 bits per key at a 1% false positive
+rate whatever the key length. The array lives in a file that is memory-mapped
+read-write, so it persists across restarts, opens in constant time, and
+changes made by one process are seen by every process mapping the file.
+
+File layout (little-endian)::
+
+    magic   b"BLM1"
+    bits    u64   size of the bit array
+    hashes  u32   probes per key
+    count   u64   keys added
+    array   ceil(bits / 8) bytes
+
+Adding keys is not atomic across threads or processes; callers serialize
+writers.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any
+
+_MAGIC = b"BLM1"
+_HEADER = struct.Struct("<4sQIQ")
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = 16
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> tuple[int, int]:
+    """
+    Size a filter.
+
+    Args:
+        capacity: Number of keys the filter is sized for
+        error_rate: False positive rate at capacity, between 0 and 1
+
+    Returns:
+        Tuple of (bits in the array, probes per key)
+
+    Raises:
+        ValueError: If capacity or error_rate is out of range
+    """
+    if capacity < 1 or not 0 < error_rate < 1:
+        raise ValueError("capacity must be positive and error_rate between 0 and 1")
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """Memory-mapped Bloom filter."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Map a filter file.
+
+        Args:
+            path: Filter file written by ``create_bloom_filter``
+
+        Raises:
+            ValueError: If the file is not a filter
+        """
+        self.path = path
+        with open(path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a Bloom filter file: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0)
+
+        magic, self.bits, self.hashes, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or self.hashes < 1 or _HEADER.size + (self.bits + 7) // 8 > size:
+            self._mm.close()
+            raise ValueError(f"Not a Bloom filter file: {path}")
+
+    def add(self, key: bytes) -> bool:
+        """
+        Add a key.
+
+        Args:
+            key: Key to add
+
+        Returns:
+            Whether the key was possibly present already
+        """
+        present = True
+        for position in self._positions(key):
+            byte = _HEADER.size + (position >> 3)
+            mask = 1 << (position & 7)
+            value = self._mm[byte]
+            if not value & mask:
+                self._mm[byte] = value | mask
+                present = False
+        if not present:
+            _COUNT.pack_into(self._mm, _COUNT_OFFSET, len(self) + 1)
+        return present
+
+    def flush(self) -> None:
+        """Write changes through to the file."""
+        self._mm.flush()
+
+    def close(self) -> None:
+        """Flush and unmap the file."""
+        if not self._mm.closed:
+            self._mm.flush()
+            self._mm.close()
+
+    def __contains__(self, key: bytes) -> bool:
+        mm = self._mm
+        for position in self._positions(key):
+            if not mm[_HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        """Number of distinct keys added, undercounting false positives."""
+        count: int = _COUNT.unpack_from(self._mm, _COUNT_OFFSET)[0]
+        return count
+
+    def __enter__(self) -> "BloomFilter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
+
+    def _positions(self, key: bytes) -> list[int]:
+        """Bit positions probed for a key, by double hashing."""
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * step) % self.bits for index in range(self.hashes)]
+
+
+def create_bloom_filter(path: str, capacity: int, error_rate: float) -> BloomFilter:
+    """
+    Create an empty filter file atomically, replacing any existing one.
+
+    The bit array is allocated sparsely, so disk use grows as bits are set.
+
+    Args:
+        path: Destination file
+        capacity: Number of keys the filter is sized for
+        error_rate: False positive rate at capacity
+
+    Returns:
+        The new filter, mapped
+    """
+    bits, hashes = bloom_parameters(capacity, error_rate)
+    filter_path = Path(path)
+    filter_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = filter_path.with_suffix(filter_path.suffix + ".tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, bits, hashes, 0))
+        f.truncate(_HEADER.size + (bits + 7) // 8)
+    tmp_path.replace(filter_path)
+
+    return BloomFilter(path)
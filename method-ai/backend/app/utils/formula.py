@@ -0,0 +1,141 @@
+"""Molecular formulas and weights from SMILES.
+
+Formulas are read off the parsed SMILES graph (``parse_smiles``): each atom
+counts once, plus its hydrogens. Bracket atoms state their hydrogens; atoms
+of the organic subset get implicit hydrogens up to their lowest normal
+valence that fits their bonds, as in the OpenSMILES specification;
+aromatic atoms give one valence to the aromatic system.
+
+Results are memoized per dot-separated fragment, so salts, mixtures and
+whole reactions reuse the weights of fragments seen before.
+"""
+
+from collections import Counter
+from functools import lru_cache
+
+from app.core.config import settings
+from app.utils.smiles import InvalidSmilesError, parse_smiles
+
+# Standard atomic weights (IUPAC, abridged), in g/mol
+ATOMIC_WEIGHTS: dict[str, float] = {
+    "H": 1.008, "He": 4.0026, "Li": 6.94, "Be": 9.0122, "B": 10.81, "C": 12.011,
+    "N": 14.007, "O": 15.999, "F": 18.998, "Ne": 20.180, "Na": 22.990, "Mg": 24.305,
+    "Al": 26.982, "Si": 28.085, "P": 30.974, "S": 32.06, "Cl": 35.45, "Ar": 39.95,
+    "K": 39.098, "Ca": 40.078, "Sc": 44.956, "Ti": 47.867, "V": 50.942, "Cr": 51.996,
+    "Mn": 54.938, "Fe": 55.845, "Co": 58.933, "Ni": 58.693, "Cu": 63.546, "Zn": 65.38,
+    "Ga": 69.723, "Ge": 72.630, "As": 74.922, "Se": 78.971, "Br": 79.904, "Kr": 83.798,
+    "Rb": 85.468, "Sr": 87.62, "Y": 88.906, "Zr": 91.224, "Nb": 92.906, "Mo": 95.95,
+    "Ru": 101.07, "Rh": 102.91, "Pd": 106.42, "Ag": 107.87, "Cd": 112.41, "In": 114.82,
+    "Sn": 118.71, "Sb": 121.76, "Te": 127.60, "I": 126.90, "Xe": 131.29, "Cs": 132.91,
+    "Ba": 137.33, "La": 138.91, "Ce": 140.12, "Pr": 140.91, "Nd": 144.24, "Sm": 150.36,
+    "Eu": 151.96, "Gd": 157.25, "Tb": 158.93, "Dy": 162.50, "Ho": 164.93, "Er": 167.26,
+    "Tm": 168.93, "Yb": 173.05, "Lu": 174.97, "Hf": 178.49, "Ta": 180.95, "W": 183.84,
+    "Re": 186.21, "Os": 190.23, "Ir": 192.22, "Pt": 195.08, "Au": 196.97, "Hg": 200.59,
+    "Tl": 204.38, "Pb": 207.2, "Bi": 208.98, "Th": 232.04, "U": 238.03,
+}  # fmt: skip
+
+# Normal valences of the organic subset, lowest first
+_VALENCES: dict[str, tuple[int, ...]] = {
+    "B": (3,),
+    "C": (4,),
+    "N": (3, 5),
+    "O": (2,),
+    "P": (3, 5),
+    "S": (2, 4, 6),
+    "F": (1,),
+    "Cl": (1,),
+    "Br": (1,),
+    "I": (1,),
+}
+
+# Valence used by each bond order; aromatic bonds count as single bonds
+_BOND_ORDERS = {"-": 1, ":": 1, "=": 2, "#": 3, "$": 4}
+
+
+def molecular_formula(smiles: str) -> dict[str, int]:
+    """
+    Count the atoms of each element in a molecule, hydrogens included.
+
+    Args:
+        smiles: SMILES string, possibly with several fragments
+
+    Returns:
+        Atom counts by element symbol
+
+    Raises:
+        InvalidSmilesError: If the SMILES is invalid or has wildcard atoms
+    """
+    counts: Counter[str] = Counter()
+    for fragment in smiles.split("."):
+        for (element, _), count in _fragment_atoms(fragment):
+            counts[element] += count
+    return dict(counts)
+
+
+def molecular_weight(smiles: str) -> float:
+    """
+    Compute the average molecular weight of a molecule.
+
+    Isotope-labelled atoms weigh their mass number.
+
+    Args:
+        smiles: SMILES string, possibly with several fragments
+
+    Returns:
+        Molecular weight in g/mol
+
+    Raises:
+        InvalidSmilesError: If the SMILES is invalid or has unknown elements
+    """
+    return sum(_fragment_weight(fragment) for fragment in smiles.split("."))
+
+
+@lru_cache(maxsize=settings.smiles_cache_size)
+def _fragment_weight(fragment: str) -> float:
+    """Molecular weight of one fragment."""
+    weight = 0.0
+    for (element, isotope), count in _fragment_atoms(fragment):
+        if isotope:
+            weight += isotope * count
+        elif element in ATOMIC_WEIGHTS:
+            weight += ATOMIC_WEIGHTS[element] * count
+        else:
+            raise InvalidSmilesError(f"No atomic weight for element {element}")
+    return weight
+
+
+@lru_cache(maxsize=settings.smiles_cache_size)
+def _fragment_atoms(fragment: str) -> tuple[tuple[tuple[str, int | None], int], ...]:
+    """Atom counts of one fragment, by (element, isotope mass number)."""
+    mol = parse_smiles(fragment)
+    bond_valence = [0] * len(mol.atoms)
+    for bond in mol.bonds:
+        order = _BOND_ORDERS[bond.order]
+        bond_valence[bond.begin] += order
+        bond_valence[bond.end] += order
+
+    counts: Counter[tuple[str, int | None]] = Counter()
+    for atom, valence in zip(mol.atoms, bond_valence, strict=True):
+        if atom.element == "*":
+            raise InvalidSmilesError("Wildcard atoms have no formula")
+        counts[atom.element, atom.isotope] += 1
+        if atom.bracketed:
+            hydrogens = atom.hcount or 0
+        else:
+            hydrogens = _implicit_hydrogens(atom.element, atom.aromatic, valence)
+        if hydrogens:
+            counts["H", None] += hydrogens
+    return tuple(counts.items())
+
+
+@lru_cache(maxsize=256)
+def _implicit_hydrogens(element: str, aromatic: bool, bond_valence: int) -> int:
+    """Implicit hydrogens of an organic-subset atom with the given bonds."""
+    valences = _VALENCES.get(element, ())
+    if aromatic:
+        # One valence goes to the aromatic system; only the lowest valence applies
+        return max(0, valences[0] - bond_valence - 1) if valences else 0
+    for valence in valences:
+        if valence >= bond_valence:
+            return valence - bond_valence
+    return 0
@@ -0,0 +1,176 @@
+"""Memory-mapped sorted key/value tables.
+
+A table is a single immutable file of byte keys and byte values, sorted by
+key. Opening one maps the file instead of reading it, so large tables open in
+constant time and their contents stay in the page cache rather than on the
+Python heap. Lookups binary-search a fixed-width offset array.
+
+File layout (little-endian)::
+
+    magic   b"MTB1"
+    count   u64
+    index   count x (key_offset u64, value_offset u64)
+    data    key0 value0 key1 value1 ...
+
+A key runs from its key offset to its value offset; a value runs to the next
+key offset, or to the end of the file for the last entry.
+"""
+
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from itertools import pairwise
+from pathlib import Path
+from typing import Any
+
+_MAGIC = b"MTB1"
+_HEADER = struct.Struct("<4sQ")
+_ENTRY = struct.Struct("<QQ")
+
+
+class MmapTable:
+    """Read-only view of a memory-mapped sorted key/value table."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Map a table file.
+
+        Args:
+            path: Table file written by ``write_table``
+
+        Raises:
+            ValueError: If the file is not a table
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a table file: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = _HEADER.unpack_from(self._mm, 0)
+        self._count: int = count
+        if magic != _MAGIC or _HEADER.size + self._count * _ENTRY.size > size:
+            self._mm.close()
+            raise ValueError(f"Not a table file: {path}")
+        self._view = memoryview(self._mm)
+        self._keys = _KeySequence(self)
+
+    def get(self, key: bytes) -> memoryview | None:
+        """
+        Look up a key.
+
+        Args:
+            key: Key to find
+
+        Returns:
+            Zero-copy view of the value, valid until the table is closed,
+            or None if the key is absent
+        """
+        position = bisect_left(self._keys, key)
+        if position < self._count and self._key_at(position) == key:
+            return self._value_at(position)
+        return None
+
+    def items(self, prefix: bytes = b"") -> Iterator[tuple[bytes, memoryview]]:
+        """
+        Iterate over entries in key order.
+
+        Args:
+            prefix: Only yield keys starting with this prefix
+
+        Yields:
+            Tuples of (key, value view)
+        """
+        position = bisect_left(self._keys, prefix) if prefix else 0
+        while position < self._count:
+            key = self._key_at(position)
+            if not key.startswith(prefix):
+                return
+            yield key, self._value_at(position)
+            position += 1
+
+    def close(self) -> None:
+        """Unmap the file. Value views must no longer be in use."""
+        self._view.release()
+        self._mm.close()
+
+    def __contains__(self, key: bytes) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "MmapTable":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
+
+    def _offsets(self, position: int) -> tuple[int, int]:
+        """Key and value offsets of an entry."""
+        return _ENTRY.unpack_from(self._mm, _HEADER.size + position * _ENTRY.size)
+
+    def _key_at(self, position: int) -> bytes:
+        key_offset, value_offset = self._offsets(position)
+        return self._mm[key_offset:value_offset]
+
+    def _value_at(self, position: int) -> memoryview:
+        _, value_offset = self._offsets(position)
+        if position + 1 < self._count:
+            end = self._offsets(position + 1)[0]
+        else:
+            end = len(self._mm)
+        return self._view[value_offset:end]
+
+
+class _KeySequence:
+    """Sequence of a table's keys, so ``bisect`` can search them in place."""
+
+    def __init__(self, table: MmapTable) -> None:
+        self._table = table
+
+    def __getitem__(self, position: int) -> bytes:
+        return self._table._key_at(position)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+def write_table(path: str, entries: Iterable[tuple[bytes, bytes]]) -> int:
+    """
+    Write a table file atomically.
+
+    Args:
+        path: Destination file
+        entries: Key/value pairs in any order; keys must be unique
+
+    Returns:
+        Number of entries written
+
+    Raises:
+        ValueError: If a key appears more than once
+    """
+    ordered = sorted(entries, key=lambda entry: entry[0])
+    for previous, current in pairwise(ordered):
+        if previous[0] == current[0]:
+            raise ValueError(f"Duplicate table key: {current[0]!r}")
+
+    table_path = Path(path)
+    table_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = table_path.with_suffix(table_path.suffix + ".tmp")
+
+    offset = _HEADER.size + len(ordered) * _ENTRY.size
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(ordered)))
+        for key, value in ordered:
+            f.write(_ENTRY.pack(offset, offset + len(key)))
+            offset += len(key) + len(value)
+        for key, value in ordered:
+            f.write(key)
+            f.write(value)
+    tmp_path.replace(table_path)
+
+    return len(ordered)
@@ -0,0 +1,575 @@
+"""SMILES parsing and canonicalization utilities.
+
+Canonical SMILES give every spelling of a molecule (``OCC``, ``CCO``,
+``C(O)C``) the same key, so caches and indexes keyed on them hit regardless of
+how a client wrote the target. RDKit is used when installed; otherwise a
+built-in parser and canonical writer handle the common forms (organic subset,
+bracket atoms, branches, ring closures, aromatic atoms, disconnected parts).
+The built-in writer reads six-membered Kekulé rings of carbon and nitrogen
+(benzene, pyridine, naphthalene, ...) as aromatic; five-membered
+heteroaromatics such as pyrrole or furan match only when written aromatic.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import pairwise
+from typing import Any
+
+from app.core.config import settings
+from app.utils.text import sanitize_smiles
+
+
+class InvalidSmilesError(ValueError):
+    """Raised when a SMILES string is not syntactically valid."""
+
+
+_TOKEN_PATTERN = re.compile(
+    r"\[[^\[\]]*\]|Br|Cl|[BCNOPSFI]|[bcnops]|\*|\(|\)|\.|[-=#$:/\\]|%\d{2}|\d|(.)"
+)
+
+_BRACKET_PATTERN = re.compile(
+    r"^\[(?P<isotope>\d+)?"
+    r"(?P<symbol>\*|[A-Z][a-z]?|se|as|te|[bcnops])"
+    r"(?P<chirality>@@?(?:TH[12]|AL[12]|SP[1-3]|TB\d{1,2}|OH\d{1,2})?)?"
+    r"(?P<hcount>H\d*)?"
+    r"(?P<charge>[+-]+\d*)?"
+    r"(?:\:(?P<atom_class>\d+))?\]$"
+)
+
+_ELEMENTS = frozenset(
+    """H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni
+    Cu Zn Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe
+    Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg
+    Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf Db Sg
+    Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og""".split()
+)
+
+_BOND_TOKENS = frozenset("-=#$:/\\")
+
+# Numeric codes used when ranking atoms by their bonds
+_BOND_CODES = {"-": 1, "=": 2, "#": 3, "$": 4, ":": 5}
+
+# Elements of the Kekulé rings rewritten as aromatic
+_KEKULE_ELEMENTS = frozenset({"C", "N"})
+
+
+@dataclass(slots=True)
+class SmilesAtom:
+    """An atom as written in a SMILES string."""
+
+    text: str
+    element: str
+    aromatic: bool
+    isotope: int | None = None
+    hcount: int | None = None
+    charge: int = 0
+    chirality: str | None = None
+
+    @property
+    def bracketed(self) -> bool:
+        """Whether the atom was written in brackets."""
+        return self.text.startswith("[")
+
+
+@dataclass(slots=True)
+class SmilesBond:
+    """A bond between two atoms, by atom index."""
+
+    begin: int
+    end: int
+    order: str
+    directional: bool = False
+
+
+@dataclass(slots=True)
+class ParsedSmiles:
+    """Molecular graph parsed from a SMILES string."""
+
+    atoms: list[SmilesAtom] = field(default_factory=list)
+    bonds: list[SmilesBond] = field(default_factory=list)
+
+    @property
+    def has_stereo(self) -> bool:
+        """Whether the SMILES carries tetrahedral or double-bond stereo."""
+        return any(atom.chirality for atom in self.atoms) or any(
+            bond.directional for bond in self.bonds
+        )
+
+
+def tokenize_smiles(smiles: str) -> list[str]:
+    """
+    Split a SMILES string into atom, bond, branch and ring-closure tokens.
+
+    Args:
+        smiles: SMILES string
+
+    Returns:
+        List of tokens
+
+    Raises:
+        InvalidSmilesError: If the string contains unrecognized characters
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(smiles):
+        if match.group(1) is not None:
+            raise InvalidSmilesError(
+                f"Unexpected character {match.group(1)!r} at position {match.start()}"
+            )
+        tokens.append(match.group(0))
+    return tokens
+
+
+def parse_smiles(smiles: str) -> ParsedSmiles:
+    """
+    Parse a SMILES string into a molecular graph.
+
+    Checks syntax only (tokens, branches, ring closures, bracket atoms and
+    element symbols); valences are not checked.
+
+    Args:
+        smiles: SMILES string
+
+    Returns:
+        Parsed molecule
+
+    Raises:
+        InvalidSmilesError: If the SMILES is not syntactically valid
+    """
+    tokens = tokenize_smiles(smiles)
+    if not tokens:
+        raise InvalidSmilesError("Empty SMILES")
+
+    mol = ParsedSmiles()
+    bonded: set[tuple[int, int]] = set()
+    branch_points: list[int] = []
+    open_rings: dict[str, tuple[int, str | None]] = {}
+    prev: int | None = None
+    pending_bond: str | None = None
+    last_token = ""
+
+    def add_bond(begin: int, end: int, symbol: str | None) -> None:
+        pair = (min(begin, end), max(begin, end))
+        if begin == end or pair in bonded:
+            raise InvalidSmilesError("Duplicate bond or ring closure to the same atom")
+        bonded.add(pair)
+        if symbol is None:
+            both_aromatic = mol.atoms[begin].aromatic and mol.atoms[end].aromatic
+            order = ":" if both_aromatic else "-"
+        elif symbol in "/\\":
+            order = "-"
+        else:
+            order = symbol
+        mol.bonds.append(SmilesBond(begin, end, order, directional=symbol in ("/", "\\")))
+
+    for token in tokens:
+        if token == "(":
+            if prev is None or pending_bond is not None:
+                raise InvalidSmilesError("Branch must follow an atom")
+            branch_points.append(prev)
+        elif token == ")":
+            if not branch_points or pending_bond is not None or last_token == "(":
+                raise InvalidSmilesError("Unbalanced or empty branch")
+            prev = branch_points.pop()
+        elif token in _BOND_TOKENS:
+            if prev is None or pending_bond is not None:
+                raise InvalidSmilesError(f"Misplaced bond symbol {token!r}")
+            pending_bond = token
+        elif token == ".":
+            if prev is None or pending_bond is not None:
+                raise InvalidSmilesError("Misplaced '.'")
+            prev = None
+        elif token[0].isdigit() or token[0] == "%":
+            if prev is None:
+                raise InvalidSmilesError(f"Ring closure {token!r} must follow an atom")
+            label = token.lstrip("%")
+            if label in open_rings:
+                partner, opening_bond = open_rings.pop(label)
+                if (
+                    opening_bond is not None
+                    and pending_bond is not None
+                    and opening_bond != pending_bond
+                    and not {opening_bond, pending_bond} <= {"/", "\\"}
+                ):
+                    raise InvalidSmilesError(f"Conflicting bond orders on ring closure {label}")
+                add_bond(partner, prev, pending_bond or opening_bond)
+            else:
+                open_rings[label] = (prev, pending_bond)
+            pending_bond = None
+        else:
+            mol.atoms.append(_parse_atom(token))
+            index = len(mol.atoms) - 1
+            if prev is not None:
+                add_bond(prev, index, pending_bond)
+            pending_bond = None
+            prev = index
+        last_token = token
+
+    if branch_points:
+        raise InvalidSmilesError("Unclosed branch")
+    if open_rings:
+        raise InvalidSmilesError(f"Unclosed ring bond(s): {', '.join(sorted(open_rings))}")
+    if pending_bond is not None:
+        raise InvalidSmilesError("SMILES ends with a bond symbol")
+    if last_token == ".":
+        raise InvalidSmilesError("SMILES ends with '.'")
+
+    return mol
+
+
+def canonicalize_smiles(smiles: str) -> str:
+    """
+    Return the canonical form of a SMILES string.
+
+    Results are memoized in an LRU cache. Uses RDKit when installed,
+    otherwise the built-in canonical writer. Without RDKit, SMILES carrying
+    stereo descriptors are validated but returned as written.
+
+    Args:
+        smiles: SMILES string
+
+    Returns:
+        Canonical SMILES
+
+    Raises:
+        InvalidSmilesError: If the SMILES is not syntactically valid
+    """
+    return _canonicalize_cached(sanitize_smiles(smiles))
+
+
+def is_valid_smiles(smiles: str) -> bool:
+    """Check whether a SMILES string is syntactically valid."""
+    try:
+        canonicalize_smiles(smiles)
+    except InvalidSmilesError:
+        return False
+    return True
+
+
+def smiles_cache_key(smiles: str) -> str:
+    """
+    Key for caches and indexes over molecules.
+
+    Returns the canonical SMILES, or the sanitized input if it cannot be
+    parsed, so callers behind the API boundary never fail on a key.
+
+    Args:
+        smiles: SMILES string
+
+    Returns:
+        Cache key
+    """
+    try:
+        return canonicalize_smiles(smiles)
+    except InvalidSmilesError:
+        return sanitize_smiles(smiles)
+
+
+@lru_cache(maxsize=settings.smiles_cache_size)
+def _canonicalize_cached(smiles: str) -> str:
+    """Canonicalize an already sanitized SMILES string."""
+    chem = get_rdkit_chem()
+    if chem is not None:
+        mol = chem.MolFromSmiles(smiles)
+        if mol is None:
+            raise InvalidSmilesError(f"RDKit could not parse SMILES {smiles!r}")
+        return str(chem.MolToSmiles(mol))
+
+    mol = parse_smiles(smiles)
+    if mol.has_stereo:
+        return smiles
+    _aromatize(mol)
+    return _write_canonical(mol)
+
+
+@lru_cache(maxsize=1)
+def get_rdkit_chem() -> Any | None:
+    """Import RDKit's Chem module if it is installed."""
+    try:
+        from rdkit import Chem, RDLogger
+    except ImportError:
+        return None
+    RDLogger.DisableLog("rdApp.*")
+    return Chem
+
+
+def _parse_atom(token: str) -> SmilesAtom:
+    """Parse an organic-subset or bracket atom token."""
+    if not token.startswith("["):
+        return SmilesAtom(
+            text=token,
+            element=token.capitalize(),
+            aromatic=token.islower(),
+        )
+
+    match = _BRACKET_PATTERN.match(token)
+    if match is None:
+        raise InvalidSmilesError(f"Invalid bracket atom {token}")
+
+    symbol = match.group("symbol")
+    element = symbol if symbol == "*" else symbol.capitalize()
+    if symbol != "*" and element not in _ELEMENTS:
+        raise InvalidSmilesError(f"Unknown element in {token}")
+
+    hcount = match.group("hcount")
+    return SmilesAtom(
+        text=token,
+        element=element,
+        aromatic=symbol.islower(),
+        isotope=int(match.group("isotope")) if match.group("isotope") else None,
+        hcount=(int(hcount[1:]) if len(hcount) > 1 else 1) if hcount else 0,
+        charge=_parse_charge(match.group("charge")),
+        chirality=match.group("chirality"),
+    )
+
+
+def _parse_charge(text: str | None) -> int:
+    """Parse a bracket-atom charge such as ``+``, ``--`` or ``+2``."""
+    if not text:
+        return 0
+    sign = 1 if text[0] == "+" else -1
+    digits = text.lstrip("+-")
+    if digits:
+        return sign * int(digits)
+    return sign * len(text)
+
+
+def _aromatize(mol: ParsedSmiles) -> None:
+    """
+    Rewrite six-membered Kekulé rings of carbon and nitrogen as aromatic.
+
+    A ring qualifies when each of its atoms has exactly one double bond,
+    either within the ring or within a fused ring that qualified, so
+    ``C1=CC=CC=C1`` and ``c1ccccc1`` are written alike. Rings with an
+    exocyclic double bond (quinones) are left as written.
+    """
+    partners: dict[int, int] = {}
+    excluded: set[int] = set()
+    for bond in mol.bonds:
+        if bond.order == "=":
+            for index, partner in ((bond.begin, bond.end), (bond.end, bond.begin)):
+                if index in partners:
+                    excluded.add(index)
+                partners[index] = partner
+        elif bond.order != "-":
+            excluded.update((bond.begin, bond.end))
+
+    candidates = {
+        index
+        for index, atom in enumerate(mol.atoms)
+        if index in partners
+        and index not in excluded
+        and not atom.bracketed
+        and not atom.aromatic
+        and atom.element in _KEKULE_ELEMENTS
+    }
+    adjacent: dict[int, list[int]] = {index: [] for index in candidates}
+    for bond in mol.bonds:
+        if bond.begin in candidates and bond.end in candidates:
+            adjacent[bond.begin].append(bond.end)
+            adjacent[bond.end].append(bond.begin)
+
+    # Six-membered rings as sets of bonds, each found from its lowest atom
+    rings: set[frozenset[frozenset[int]]] = set()
+    for start in candidates:
+        paths: list[tuple[int, ...]] = [(start,)]
+        while paths:
+            path = paths.pop()
+            for neighbor in adjacent[path[-1]]:
+                if len(path) == 6:
+                    if neighbor == start:
+                        closed = (*path, start)
+                        rings.add(frozenset(map(frozenset, pairwise(closed))))
+                elif neighbor > start and neighbor not in path:
+                    paths.append((*path, neighbor))
+
+    aromatic_bonds: set[frozenset[int]] = set()
+    pending = list(rings)
+    progressed = True
+    while progressed:
+        progressed = False
+        for ring in list(pending):
+            ring_bonds = ring | aromatic_bonds
+            atoms = {index for bond in ring for index in bond}
+            if all(frozenset((index, partners[index])) in ring_bonds for index in atoms):
+                aromatic_bonds |= ring
+                pending.remove(ring)
+                progressed = True
+
+    for bond in mol.bonds:
+        if frozenset((bond.begin, bond.end)) in aromatic_bonds:
+            bond.order = ":"
+            for index in (bond.begin, bond.end):
+                atom = mol.atoms[index]
+                atom.text = atom.text.lower()
+                atom.aromatic = True
+
+
+def _write_canonical(mol: ParsedSmiles) -> str:
+    """Write a parsed molecule as canonical SMILES."""
+    atom_count = len(mol.atoms)
+    neighbors: list[list[tuple[int, str]]] = [[] for _ in range(atom_count)]
+    for bond in mol.bonds:
+        neighbors[bond.begin].append((bond.end, bond.order))
+        neighbors[bond.end].append((bond.begin, bond.order))
+
+    ranks = _canonical_ranks(mol, neighbors)
+
+    for atom_neighbors in neighbors:
+        atom_neighbors.sort(key=lambda item: ranks[item[0]])
+
+    # Pass 1: depth-first traversal to fix the spanning tree and ring closures
+    visited = [False] * atom_count
+    parent = [-1] * atom_count
+    children: list[list[int]] = [[] for _ in range(atom_count)]
+    preorder = [0] * atom_count
+    ring_closures: list[list[int]] = [[] for _ in range(atom_count)]
+    starts = []
+    position = 0
+
+    for start in sorted(range(atom_count), key=ranks.__getitem__):
+        if visited[start]:
+            continue
+        starts.append(start)
+        visited[start] = True
+        preorder[start] = position
+        position += 1
+        stack = [(start, iter(neighbors[start]))]
+        while stack:
+            node, remaining = stack[-1]
+            for neighbor, _ in remaining:
+                if neighbor == parent[node]:
+                    continue
+                if visited[neighbor]:
+                    if neighbor not in ring_closures[node]:
+                        ring_closures[node].append(neighbor)
+                        ring_closures[neighbor].append(node)
+                    continue
+                visited[neighbor] = True
+                parent[neighbor] = node
+                preorder[neighbor] = position
+                position += 1
+                children[node].append(neighbor)
+                stack.append((neighbor, iter(neighbors[neighbor])))
+                break
+            else:
+                stack.pop()
+
+    bond_orders = {}
+    for bond in mol.bonds:
+        bond_orders[(bond.begin, bond.end)] = bond.order
+        bond_orders[(bond.end, bond.begin)] = bond.order
+
+    # Pass 2: emit atoms in the same preorder, allocating ring labels
+    components = []
+    open_labels: dict[tuple[int, int], int] = {}
+    free_labels: list[int] = []
+    next_label = 1
+
+    for start in starts:
+        out: list[str] = []
+        work: list[tuple[str, int]] = [("atom", start)]
+        while work:
+            kind, node = work.pop()
+            if kind == "(" or kind == ")":
+                out.append(kind)
+                continue
+
+            if parent[node] >= 0:
+                out.append(_bond_symbol(mol, parent[node], node, bond_orders))
+            out.append(mol.atoms[node].text)
+
+            for partner in sorted(ring_closures[node], key=preorder.__getitem__):
+                pair = (min(node, partner), max(node, partner))
+                if preorder[partner] < preorder[node]:
+                    label = open_labels.pop(pair)
+                    free_labels.append(label)
+                    free_labels.sort()
+                    out.append(_ring_label(label))
+                else:
+                    if free_labels:
+                        label = free_labels.pop(0)
+                    else:
+                        label = next_label
+                        next_label += 1
+                    open_labels[pair] = label
+                    out.append(_bond_symbol(mol, node, partner, bond_orders))
+                    out.append(_ring_label(label))
+
+            branches = children[node]
+            if branches:
+                work.append(("atom", branches[-1]))
+                for child in reversed(branches[:-1]):
+                    work.append((")", -1))
+                    work.append(("atom", child))
+                    work.append(("(", -1))
+
+        components.append("".join(out))
+
+    return ".".join(components)
+
+
+def _canonical_ranks(mol: ParsedSmiles, neighbors: list[list[tuple[int, str]]]) -> list[int]:
+    """Rank atoms by iteratively refined graph invariants, breaking ties."""
+    invariants = [
+        (
+            atom.text,
+            len(neighbors[index]),
+            tuple(sorted(_BOND_CODES[order] for _, order in neighbors[index])),
+        )
+        for index, atom in enumerate(mol.atoms)
+    ]
+    ranks = _dense_ranks(invariants)
+
+    while True:
+        ranks = _refine_ranks(ranks, neighbors)
+        if len(set(ranks)) == len(ranks):
+            return ranks
+        # Break the lowest tie; symmetric atoms give the same output either way
+        tied = min(rank for rank in set(ranks) if ranks.count(rank) > 1)
+        chosen = ranks.index(tied)
+        ranks = [
+            rank * 2 - (1 if index == chosen else 0) for index, rank in enumerate(ranks)
+        ]
+
+
+def _refine_ranks(ranks: list[int], neighbors: list[list[tuple[int, str]]]) -> list[int]:
+    """Refine ranks by neighbor ranks until the partition stops changing."""
+    classes = len(set(ranks))
+    while True:
+        keys = [
+            (
+                ranks[index],
+                tuple(sorted((ranks[other], _BOND_CODES[order]) for other, order in atom_neighbors)),
+            )
+            for index, atom_neighbors in enumerate(neighbors)
+        ]
+        refined = _dense_ranks(keys)
+        refined_classes = len(set(refined))
+        if refined_classes == classes:
+            return refined
+        ranks, classes = refined, refined_classes
+
+
+def _dense_ranks(keys: list[Any]) -> list[int]:
+    """Map sortable keys to dense integer ranks."""
+    lookup = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+    return [lookup[key] for key in keys]
+
+
+def _bond_symbol(
+    mol: ParsedSmiles, begin: int, end: int, bond_orders: dict[tuple[int, int], str]
+) -> str:
+    """Symbol to write for a bond, omitting implied ones."""
+    order = bond_orders[(begin, end)]
+    both_aromatic = mol.atoms[begin].aromatic and mol.atoms[end].aromatic
+    if order == "-":
+        return "-" if both_aromatic else ""
+    if order == ":":
+        return "" if both_aromatic else ":"
+    return order
+
+
+def _ring_label(label: int) -> str:
+    """Format a ring-closure label."""
+    return str(label) if label < 10 else f"%{label}"
@@ -0,0 +1,91 @@
+"""SQLite connections for stores shared by worker processes.
+
+Each store keeps one connection per thread, opened on first use in each
+process, since SQLite connections must not cross threads or a fork. The
+connections run in autocommit mode with WAL journaling, so readers never
+block the single writer; writes that need several statements use
+``transaction``.
+"""
+
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class SQLiteConnections:
+    """Per-thread, per-process connections to a store's database."""
+
+    def __init__(self, schema: Iterable[str] = ()) -> None:
+        """
+        Create an empty set of connections.
+
+        Args:
+            schema: Idempotent statements (``CREATE TABLE IF NOT EXISTS``, ...)
+                run on every new connection
+        """
+        self.schema = tuple(schema)
+        self._local = threading.local()
+
+    def get(self, path: str) -> sqlite3.Connection:
+        """
+        Get this thread's connection, opening it on first use in each process.
+
+        The connection is reopened when ``path`` changes, e.g. when settings
+        point the store at another file.
+
+        Args:
+            path: SQLite database file, created with its directory if missing
+
+        Returns:
+            Autocommit connection with the schema applied
+        """
+        local = self._local
+        conn: sqlite3.Connection | None = getattr(local, "conn", None)
+        if conn is None or local.pid != os.getpid() or local.path != path:
+            # A connection inherited across a fork belongs to the parent
+            if conn is not None and local.pid == os.getpid():
+                conn.close()
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            local.conn = conn
+            local.pid = os.getpid()
+            local.path = path
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+@contextmanager
+def transaction(
+    conn: sqlite3.Connection, begin: str = "BEGIN IMMEDIATE"
+) -> Iterator[sqlite3.Connection]:
+    """
+    Run statements on an autocommit connection in one transaction.
+
+    Args:
+        conn: Connection from ``SQLiteConnections.get``
+        begin: Statement starting the transaction; the default takes the
+            write lock up front, ``BEGIN`` gives a consistent read
+
+    Yields:
+        The connection, committed on exit or rolled back on error
+    """
+    conn.execute(begin)
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -3,5 +3,57 @@
 import os
 import sys
 
+import pytest
+
 # Add backend to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    """Point file-backed stores at a per-test temporary directory."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "feedback_storage_path", str(tmp_path / "feedback.jsonl"))
+    monkeypatch.setattr(settings, "plan_cache_snapshot_path", str(tmp_path / "plan_cache.jsonl"))
+    monkeypatch.setattr(settings, "citation_index_path", str(tmp_path / "citations.idx"))
+    monkeypatch.setattr(
+        settings, "compound_safety_db_path", str(tmp_path / "compound_safety.idx")
+    )
+    monkeypatch.setattr(settings, "inventory_path", str(tmp_path / "inventory.jsonl"))
+    monkeypatch.setattr(settings, "request_registry_path", str(tmp_path / "request_ids.sqlite3"))
+    monkeypatch.setattr(settings, "request_registry_capacity", 10000)
+    monkeypatch.setattr(settings, "lab_profile_db_path", str(tmp_path / "lab_profiles.sqlite3"))
+    monkeypatch.setattr(settings, "plan_store_path", str(tmp_path / "plans.sqlite3"))
+    monkeypatch.setattr(
+        settings, "procedure_history_path", str(tmp_path / "procedure_history.sqlite3")
+    )
+    monkeypatch.setattr(
+        settings, "equipment_bookings_path", str(tmp_path / "equipment_bookings.sqlite3")
+    )
+    yield tmp_path
+
+    from app.services.equipment_bookings import close_equipment_bookings
+    from app.services.lab_profiles import close_lab_profiles
+    from app.services.plan_store import close_plan_store
+    from app.services.procedure_history import close_procedure_history
+    from app.services.request_registry import close_request_registry
+
+    close_request_registry()
+    close_lab_profiles()
+    close_plan_store()
+    close_procedure_history()
+    close_equipment_bookings()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep cached plans and stored procedures from leaking between tests."""
+    from app.services.procedure_store import clear_procedure_store
+    from app.services.retrosynthesis_adapter import clear_plan_cache
+
+    clear_plan_cache()
+    clear_procedure_store()
+    yield
+    clear_plan_cache()
+    clear_procedure_store()
@@ -0,0 +1,167 @@
+"""Tests for admission control service."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.admission import (
+    GENERATE_STAGE,
+    AdmissionRejectedError,
+    AdmissionStage,
+    admit,
+    get_stage,
+    reset_admission,
+)
+
+_REQUEST_BODY = {
+    "target_smiles": "CCO",
+    "lab_context": {
+        "scale_mg": 100,
+        "equipment": ["rotovap"],
+        "purification_methods": ["filtration"],
+        "safety_constraints": [],
+        "experience_level": "grad",
+        "time_budget_hours": 4,
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_stages():
+    """Recreate stages from settings for every test."""
+    reset_admission()
+    yield
+    reset_admission()
+
+
+async def _hold(stage: AdmissionStage, release: asyncio.Event, timeout: float = 1.0) -> None:
+    """Hold a slot until released."""
+    async with stage.slot(timeout):
+        await release.wait()
+
+
+class TestAdmissionStage:
+    """Tests for AdmissionStage."""
+
+    async def test_admits_up_to_limit_then_queues(self):
+        """Test that requests beyond the limit wait, and run in order."""
+        stage = AdmissionStage("test", limit=1, max_queue=2)
+        release = asyncio.Event()
+        order = []
+
+        async def queued(name: str) -> None:
+            async with stage.slot(1.0):
+                order.append(name)
+
+        holder = asyncio.create_task(_hold(stage, release))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(queued(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+
+        assert stage.stats()["active"] == 1
+        assert stage.stats()["queued"] == 2
+
+        release.set()
+        await asyncio.gather(holder, *waiters)
+
+        assert order == ["a", "b"]
+        assert stage.stats()["active"] == 0
+        assert stage.stats()["admitted"] == 3
+
+    async def test_rejects_when_queue_full(self):
+        """Test that a full queue rejects immediately with a Retry-After."""
+        stage = AdmissionStage("test", limit=1, max_queue=0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(stage, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as excinfo:
+            async with stage.slot(1.0):
+                pass
+
+        assert excinfo.value.retry_after >= 1
+        assert stage.stats()["rejected"] == 1
+        release.set()
+        await holder
+
+    async def test_queue_timeout_rejects_and_frees_queue(self):
+        """Test that a waiter gives up after the timeout and leaves the queue."""
+        stage = AdmissionStage("test", limit=1, max_queue=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(stage, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError):
+            async with stage.slot(0.01):
+                pass
+
+        assert stage.stats()["queued"] == 0
+        assert stage.stats()["timed_out"] == 1
+        release.set()
+        await holder
+        assert stage.stats()["active"] == 0
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Test that cancelling a queued request keeps the slot count right."""
+        stage = AdmissionStage("test", limit=1, max_queue=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(stage, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(stage, asyncio.Event()))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        release.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert stage.stats()["active"] == 0
+        assert stage.stats()["queued"] == 0
+
+
+class TestAdmit:
+    """Tests for admit."""
+
+    async def test_disabled_admission_counts_active(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that without admission control requests are counted but never limited."""
+        monkeypatch.setattr(settings, "admission_enabled", False)
+        stage = get_stage(GENERATE_STAGE)
+        stage.active = stage.limit
+
+        async with admit(GENERATE_STAGE):
+            assert stage.active == stage.limit + 1
+
+        assert stage.active == stage.limit
+
+
+class TestAdmissionEndpoints:
+    """Tests for admission control on the API."""
+
+    def test_overloaded_generate_returns_503(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that a saturated stage sheds requests with Retry-After."""
+        monkeypatch.setattr(settings, "admission_max_queue", 0)
+        stage = get_stage(GENERATE_STAGE)
+        stage.active = stage.limit
+        client = TestClient(app)
+
+        response = client.post("/v1/generate-procedure", json=_REQUEST_BODY)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        stats = client.get("/v1/admission").json()
+        assert stats["stages"][GENERATE_STAGE]["rejected"] == 1
+        assert stats["stages"]["plan"]["admitted"] == 1
+
+    def test_disabled_admission_skips_limits(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that disabling admission control lets requests through."""
+        monkeypatch.setattr(settings, "admission_enabled", False)
+        stage = get_stage(GENERATE_STAGE)
+        stage.active = stage.limit
+
+        response = TestClient(app).post("/v1/generate-procedure", json=_REQUEST_BODY)
+
+        assert response.status_code == 200
@@ -1,9 +1,13 @@
 """Tests for API endpoints."""
 
+import uuid
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.utils.smiles import canonicalize_smiles
 
 
 @pytest.fixture
@@ -125,6 +129,84 @@ class TestGenerateProcedureEndpoint:
 
         assert response.status_code == 200
 
+    def test_generate_procedure_rejects_non_string_reactions(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that plan steps with a non-string rxn_smiles return 422."""
+        for rxn_smiles in (123, ["CC>>CCO"], {"smiles": "CC>>CCO"}):
+            sample_request_body["retrosynthesis_plan"] = {"steps": [{"rxn_smiles": rxn_smiles}]}
+            response = client.post("/v1/generate-procedure", json=sample_request_body)
+
+            assert response.status_code == 422
+
+    def test_generate_procedure_cites_indexed_corpus(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that prior procedures for the target are cited."""
+        from pathlib import Path
+
+        from app.core.config import settings
+        from app.services.citation_index import build_citation_index
+
+        corpus = Path(__file__).parents[2] / "data" / "sample" / "tiny_procedures.jsonl"
+        build_citation_index([str(corpus)], settings.citation_index_path)
+
+        response = client.post("/v1/generate-procedure", json=sample_request_body)
+
+        assert response.json()["citations"][0].startswith("sample-001: ")
+
+    def test_generate_procedure_without_deadline_not_degraded(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that requests without a deadline report no degradations."""
+        response = client.post("/v1/generate-procedure", json=sample_request_body)
+
+        assert response.json()["degradations"] == []
+
+    def test_generate_procedure_deadline_header_degrades(
+        self, client: TestClient, sample_request_body: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that stages short of time are skipped and reported."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "deadline_citation_min_seconds", 3600.0)
+
+        response = client.post(
+            "/v1/generate-procedure",
+            json=sample_request_body,
+            headers={"X-Deadline-Ms": "500"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["degradations"] == ["citations_skipped"]
+        assert data["risk_flags"]
+
+    def test_generate_procedure_deadline_field_degrades(
+        self, client: TestClient, sample_request_body: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that the deadline_ms field is honoured like the header."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "deadline_citation_min_seconds", 3600.0)
+        sample_request_body["deadline_ms"] = 500
+
+        response = client.post("/v1/generate-procedure", json=sample_request_body)
+
+        assert response.json()["degradations"] == ["citations_skipped"]
+
+    def test_generate_procedure_invalid_deadline(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that a non-positive deadline returns 422."""
+        response = client.post(
+            "/v1/generate-procedure",
+            json=sample_request_body,
+            headers={"X-Deadline-Ms": "0"},
+        )
+
+        assert response.status_code == 422
+
     def test_generate_procedure_invalid_request(self, client: TestClient):
         """Test that invalid request returns 422."""
         response = client.post("/v1/generate-procedure", json={})
@@ -140,6 +222,15 @@ class TestGenerateProcedureEndpoint:
 
         assert response.status_code == 422
 
+    def test_generate_procedure_invalid_smiles(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that syntactically invalid SMILES returns 422."""
+        sample_request_body["target_smiles"] = "CC(=O"
+        response = client.post("/v1/generate-procedure", json=sample_request_body)
+
+        assert response.status_code == 422
+
     def test_generate_procedure_invalid_experience_level(
         self, client: TestClient, sample_request_body: dict
     ):
@@ -199,6 +290,68 @@ class TestFeedbackEndpoint:
             )
             assert response.status_code == 200
 
+    def test_feedback_records_target_of_known_request(
+        self, client: TestClient, sample_request_body: dict, isolated_storage
+    ):
+        """Test that feedback on a generated procedure records its target."""
+        import json
+
+        generated = client.post("/v1/generate-procedure", json=sample_request_body).json()
+
+        client.post(
+            "/v1/feedback",
+            json={"request_id": generated["request_id"], "edits": "None", "outcome": "success"},
+        )
+
+        record = json.loads((isolated_storage / "feedback.jsonl").read_text().splitlines()[-1])
+        assert record["target_smiles"] == canonicalize_smiles(sample_request_body["target_smiles"])
+        assert record["known_request_id"] is True
+
+    def test_feedback_unknown_request_id_flagged(self, client: TestClient, isolated_storage):
+        """Test that feedback for a never-issued request_id is stored but flagged."""
+        import json
+
+        response = client.post(
+            "/v1/feedback",
+            json={"request_id": "typo-request", "edits": "None", "outcome": "success"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"stored": True, "known_request_id": False}
+        record = json.loads((isolated_storage / "feedback.jsonl").read_text())
+        assert record["known_request_id"] is False
+
+    def test_feedback_unknown_request_id_rejected_when_required(
+        self, client: TestClient, sample_request_body: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that unknown request_ids return 422 when known IDs are required."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "feedback_require_known_request_id", True)
+        generated = client.post("/v1/generate-procedure", json=sample_request_body).json()
+
+        unknown = client.post(
+            "/v1/feedback", json={"request_id": "typo", "edits": "None", "outcome": "success"}
+        )
+        known = client.post(
+            "/v1/feedback",
+            json={"request_id": generated["request_id"], "edits": "None", "outcome": "success"},
+        )
+        batch = client.post(
+            "/v1/feedback:batch",
+            json={
+                "records": [
+                    {"request_id": "typo", "edits": "None", "outcome": "success"},
+                    {"request_id": generated["request_id"], "edits": "", "outcome": "failure"},
+                ]
+            },
+        ).json()
+
+        assert unknown.status_code == 422
+        assert known.json() == {"stored": True, "known_request_id": True}
+        assert batch["stored"] == 1
+        assert batch["results"][0]["error"].startswith("request_id:")
+
     def test_feedback_invalid_outcome(self, client: TestClient):
         """Test that invalid outcome returns 422."""
         response = client.post(
@@ -220,3 +373,572 @@ class TestFeedbackEndpoint:
         )
 
         assert response.status_code == 422
+
+
+class TestFeedbackBatchEndpoint:
+    """Tests for /v1/feedback:batch endpoint."""
+
+    def test_batch_stores_valid_records_in_order(self, client: TestClient, isolated_storage):
+        """Test that valid records are appended in one batch, in order."""
+        import json
+
+        records = [
+            {"request_id": f"batch-{index}", "edits": "Edit", "outcome": "success"}
+            for index in range(3)
+        ]
+
+        response = client.post("/v1/feedback:batch", json={"records": records})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["stored"] == 3
+        assert data["rejected"] == 0
+        assert [result["stored"] for result in data["results"]] == [True, True, True]
+        lines = (isolated_storage / "feedback.jsonl").read_text().splitlines()
+        assert [json.loads(line)["request_id"] for line in lines] == [
+            "batch-0",
+            "batch-1",
+            "batch-2",
+        ]
+
+    def test_batch_reports_invalid_records(self, client: TestClient, isolated_storage):
+        """Test that invalid records are rejected individually."""
+        records = [
+            {"request_id": "ok", "edits": "Edit", "outcome": "partial"},
+            {"request_id": "bad-outcome", "edits": "Edit", "outcome": "great"},
+            {"edits": "Missing request id", "outcome": "success"},
+        ]
+
+        data = client.post("/v1/feedback:batch", json={"records": records}).json()
+
+        assert data["stored"] == 1
+        assert data["rejected"] == 2
+        results = data["results"]
+        assert results[0] == {
+            "index": 0,
+            "request_id": "ok",
+            "stored": True,
+            "known_request_id": False,
+            "error": None,
+        }
+        assert results[1]["request_id"] == "bad-outcome"
+        assert results[1]["error"].startswith("outcome:")
+        assert results[2]["request_id"] is None
+        assert "request_id" in results[2]["error"]
+        assert len((isolated_storage / "feedback.jsonl").read_text().splitlines()) == 1
+
+    def test_batch_too_large_rejected(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that batches above the configured maximum return 422."""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "feedback_batch_max_records", 2)
+        records = [{"request_id": "r", "edits": "Edit", "outcome": "success"}] * 3
+
+        response = client.post("/v1/feedback:batch", json={"records": records})
+
+        assert response.status_code == 422
+
+
+class TestFeedbackExportEndpoint:
+    """Tests for /v1/feedback/export endpoint."""
+
+    def test_export_streams_filtered_ndjson(self, client: TestClient):
+        """Test that matching records stream as NDJSON followed by a trailer."""
+        import json
+
+        records = [
+            {"request_id": "eln-1", "edits": "Edit", "outcome": "success"},
+            {"request_id": "eln-2", "edits": "Edit", "outcome": "failure"},
+            {"request_id": "lab-3", "edits": "Edit", "outcome": "success"},
+        ]
+        client.post("/v1/feedback:batch", json={"records": records})
+
+        response = client.get(
+            "/v1/feedback/export",
+            params={"outcome": "success", "request_id_prefix": "eln-"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["request_id"] for line in lines[:-1]] == ["eln-1"]
+        assert lines[-1]["exported"] == 1
+        assert lines[-1]["complete"] is True
+
+    def test_export_invalid_cursor_returns_422(self, client: TestClient):
+        """Test that a cursor not pointing at a record is rejected."""
+        response = client.get("/v1/feedback/export", params={"cursor": "12"})
+
+        assert response.status_code == 422
+
+
+class TestGenerateProcedureIdempotency:
+    """Tests for Idempotency-Key handling on /v1/generate-procedure."""
+
+    def test_retry_replays_original_response(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that a retry returns the stored response and request_id."""
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+        first = client.post("/v1/generate-procedure", json=sample_request_body, headers=headers)
+        second = client.post("/v1/generate-procedure", json=sample_request_body, headers=headers)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers.get("Idempotent-Replayed") == "true"
+        assert "Idempotent-Replayed" not in first.headers
+
+    def test_different_keys_run_separately(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that distinct keys produce distinct request_ids."""
+        first = client.post(
+            "/v1/generate-procedure",
+            json=sample_request_body,
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+        )
+        second = client.post(
+            "/v1/generate-procedure",
+            json=sample_request_body,
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+        )
+
+        assert first.json()["request_id"] != second.json()["request_id"]
+
+    def test_retry_with_different_deadline_replays(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that changing only the deadline on retry still replays."""
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        first = client.post("/v1/generate-procedure", json=sample_request_body, headers=headers)
+
+        sample_request_body["deadline_ms"] = 2000
+        second = client.post("/v1/generate-procedure", json=sample_request_body, headers=headers)
+
+        assert second.status_code == 200
+        assert second.content == first.content
+
+    def test_key_reuse_with_different_body_rejected(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that reusing a key for another payload returns 422."""
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        client.post("/v1/generate-procedure", json=sample_request_body, headers=headers)
+
+        sample_request_body["notes"] = "Different payload"
+        response = client.post(
+            "/v1/generate-procedure", json=sample_request_body, headers=headers
+        )
+
+        assert response.status_code == 422
+
+
+class TestPatchProcedureEndpoint:
+    """Tests for PATCH /v1/procedures/{request_id}."""
+
+    def _generate(self, client: TestClient, body: dict) -> dict:
+        """Generate a procedure and return the response body."""
+        response = client.post("/v1/generate-procedure", json=body)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_patch_keeps_request_id_and_updates_steps(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that a scale change rebuilds only scale-dependent steps."""
+        original = self._generate(client, sample_request_body)
+
+        response = client.patch(
+            f"/v1/procedures/{original['request_id']}", json={"scale_mg": 50}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["request_id"] == original["request_id"]
+        assert data["diff"]["changed_fields"] == ["scale_mg"]
+        assert data["diff"]["steps_changed"] == [2, 4]
+        assert data["procedure"][1]["parameters"]["scale"] == "50.0mg"
+        assert data["procedure"][0] == original["procedure"][0]
+
+    def test_patch_matches_full_regeneration(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that an incremental result equals generating from scratch."""
+        original = self._generate(client, sample_request_body)
+        patch = {
+            "equipment": ["nmr"],
+            "purification_methods": ["column_chromatography", "filtration"],
+            "safety_constraints": ["inert_atmosphere_required"],
+            "time_budget_hours": 1,
+        }
+
+        patched = client.patch(f"/v1/procedures/{original['request_id']}", json=patch).json()
+
+        sample_request_body["lab_context"].update(patch)
+        fresh = self._generate(client, sample_request_body)
+        for field in ("procedure", "risk_flags", "fallback_options"):
+            assert patched[field] == fresh[field]
+        assert "Very short time window - consider breaking into multiple sessions" in (
+            patched["diff"]["risk_flags_added"]
+        )
+
+    def test_patches_accumulate(self, client: TestClient, sample_request_body: dict):
+        """Test that a second patch builds on the first."""
+        original = self._generate(client, sample_request_body)
+        url = f"/v1/procedures/{original['request_id']}"
+
+        client.patch(url, json={"experience_level": "undergrad"})
+        data = client.patch(url, json={"scale_mg": 20000}).json()
+
+        assert "supervisor_notification" in data["procedure"][0]["parameters"]["ppe"]
+        assert data["diff"]["changed_fields"] == ["scale_mg"]
+
+    def test_unchanged_patch_has_empty_diff(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that patching a field to its current value changes nothing."""
+        original = self._generate(client, sample_request_body)
+
+        data = client.patch(
+            f"/v1/procedures/{original['request_id']}", json={"scale_mg": 500}
+        ).json()
+
+        assert data["diff"]["changed_fields"] == []
+        assert data["diff"]["steps_changed"] == []
+        assert data["procedure"] == original["procedure"]
+
+    def test_patch_rechecks_inventory(self, client: TestClient, sample_request_body: dict):
+        """Test that a PATCH marks stock from an inventory imported after generation."""
+        from pathlib import Path
+
+        from app.core.config import settings
+        from app.services.inventory import import_inventory
+
+        sample_request_body["retrosynthesis_plan"] = {
+            "steps": [{"rxn_smiles": "CC(=O)Cl.NC1CCCCC1>CCN(CC)CC>CC(=O)NC1CCCCC1"}]
+        }
+        original = self._generate(client, sample_request_body)
+        inventory = Path(__file__).parents[2] / "data" / "sample" / "inventory.csv"
+        import_inventory([str(inventory)], settings.inventory_path)
+
+        data = client.patch(
+            f"/v1/procedures/{original['request_id']}", json={"experience_level": "undergrad"}
+        ).json()
+
+        assert data["procedure"][1]["parameters"]["not_in_stock"] == ["NC1CCCCC1"]
+        assert 2 in data["diff"]["steps_changed"]
+        assert "Not in the lab inventory: NC1CCCCC1 - obtain before starting" in (
+            data["diff"]["risk_flags_added"]
+        )
+
+    def test_unknown_request_id(self, client: TestClient):
+        """Test that patching an unknown procedure returns 404."""
+        response = client.patch(f"/v1/procedures/{uuid.uuid4()}", json={"scale_mg": 5})
+
+        assert response.status_code == 404
+
+    def test_invalid_patch_rejected(self, client: TestClient, sample_request_body: dict):
+        """Test that invalid values and unknown fields are rejected."""
+        original = self._generate(client, sample_request_body)
+        url = f"/v1/procedures/{original['request_id']}"
+
+        assert client.patch(url, json={"scale_mg": -1}).status_code == 422
+        assert client.patch(url, json={"colour": "blue"}).status_code == 422
+
+
+class TestLabProfileEndpoints:
+    """Tests for /v1/lab-profiles and generating from a profile."""
+
+    def _create(self, client: TestClient, lab_context: dict) -> dict:
+        """Create a lab profile and return the response body."""
+        response = client.post(
+            "/v1/lab-profiles", json={"name": "Teaching lab", "lab_context": lab_context}
+        )
+        assert response.status_code == 201
+        return response.json()
+
+    def test_create_get_update(self, client: TestClient, sample_request_body: dict):
+        """Test that a profile can be created, read back and updated."""
+        created = self._create(client, sample_request_body["lab_context"])
+        url = f"/v1/lab-profiles/{created['lab_profile_id']}"
+
+        assert created["version"] == 1
+        assert client.get(url).json() == created
+
+        lab_context = {**sample_request_body["lab_context"], "scale_mg": 50}
+        updated = client.put(url, json={"name": "Small scale", "lab_context": lab_context})
+
+        assert updated.status_code == 200
+        assert updated.json()["version"] == 2
+        assert client.get(url).json()["lab_context"]["scale_mg"] == 50
+
+    def test_unknown_profile(self, client: TestClient, sample_request_body: dict):
+        """Test that reading or updating an unknown profile returns 404."""
+        url = f"/v1/lab-profiles/{uuid.uuid4()}"
+        body = {"name": "Lab", "lab_context": sample_request_body["lab_context"]}
+
+        assert client.get(url).status_code == 404
+        assert client.put(url, json=body).status_code == 404
+
+    def test_generate_from_profile(self, client: TestClient, sample_request_body: dict):
+        """Test that generating from a profile matches sending its context."""
+        created = self._create(client, sample_request_body["lab_context"])
+        expected = client.post("/v1/generate-procedure", json=sample_request_body).json()
+
+        body = {**sample_request_body, "lab_profile_id": created["lab_profile_id"]}
+        del body["lab_context"]
+        response = client.post("/v1/generate-procedure", json=body)
+
+        assert response.status_code == 200
+        data = response.json()
+        for field in ("procedure", "risk_flags", "fallback_options"):
+            assert data[field] == expected[field]
+
+    def test_generate_from_unknown_profile(self, client: TestClient, sample_request_body: dict):
+        """Test that naming an unknown profile returns 422."""
+        body = {**sample_request_body, "lab_profile_id": "missing"}
+        del body["lab_context"]
+
+        assert client.post("/v1/generate-procedure", json=body).status_code == 422
+
+    def test_exactly_one_context_source(self, client: TestClient, sample_request_body: dict):
+        """Test that requests need exactly one of lab_context and lab_profile_id."""
+        both = {**sample_request_body, "lab_profile_id": "teaching"}
+        neither = {**sample_request_body}
+        del neither["lab_context"]
+
+        assert client.post("/v1/generate-procedure", json=both).status_code == 422
+        assert client.post("/v1/generate-procedure", json=neither).status_code == 422
+
+    def test_patch_procedure_from_profile(self, client: TestClient, sample_request_body: dict):
+        """Test that a procedure generated from a profile can be patched."""
+        created = self._create(client, sample_request_body["lab_context"])
+        body = {**sample_request_body, "lab_profile_id": created["lab_profile_id"]}
+        del body["lab_context"]
+        original = client.post("/v1/generate-procedure", json=body).json()
+
+        response = client.patch(
+            f"/v1/procedures/{original['request_id']}", json={"scale_mg": 50}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["procedure"][1]["parameters"]["scale"] == "50.0mg"
+
+
+class TestPlanEndpoints:
+    """Tests for POST /v1/plans and generating from a stored plan."""
+
+    PLAN = {
+        "steps": [
+            {"rxn_smiles": "CC(=O)Cl.OCC>>CC(=O)OCC", "confidence": 0.9},
+            {"rxn_smiles": "CC(=O)O.ClS(Cl)=O>>CC(=O)Cl", "confidence": 0.8},
+        ]
+    }
+
+    def test_upload_deduplicated(self, client: TestClient):
+        """Test that uploading the same plan twice returns the same plan_id."""
+        first = client.post("/v1/plans", json=self.PLAN)
+        second = client.post("/v1/plans", json=self.PLAN)
+
+        assert first.status_code == 201
+        assert first.json()["created"] is True
+        assert first.json()["step_count"] == 2
+        assert second.status_code == 200
+        assert second.json() == {**first.json(), "created": False}
+
+    def test_invalid_plans_rejected(self, client: TestClient):
+        """Test that plans with invalid reactions or no steps are rejected."""
+        for steps in (
+            [],
+            [{"rxn_smiles": "CCO"}],
+            [{"rxn_smiles": "C((>>CCO"}],
+            [{"rxn_smiles": "CC>>CCO", "confidence": 2}],
+        ):
+            assert client.post("/v1/plans", json={"steps": steps}).status_code == 422
+
+    def test_generate_from_plan_id(self, client: TestClient, sample_request_body: dict):
+        """Test that generating from a plan_id matches sending the plan inline."""
+        plan_id = client.post("/v1/plans", json=self.PLAN).json()["plan_id"]
+        inline = {**sample_request_body, "retrosynthesis_plan": self.PLAN}
+        expected = client.post("/v1/generate-procedure", json=inline).json()
+
+        response = client.post(
+            "/v1/generate-procedure", json={**sample_request_body, "plan_id": plan_id}
+        )
+
+        assert response.status_code == 200
+        for field in ("procedure", "risk_flags", "fallback_options"):
+            assert response.json()[field] == expected[field]
+
+    def test_generate_from_unknown_plan(self, client: TestClient, sample_request_body: dict):
+        """Test that an unknown plan_id returns 422."""
+        body = {**sample_request_body, "plan_id": "0" * 64}
+
+        assert client.post("/v1/generate-procedure", json=body).status_code == 422
+
+    def test_plan_and_plan_id_exclusive(self, client: TestClient, sample_request_body: dict):
+        """Test that a request cannot send both a plan and a plan_id."""
+        plan_id = client.post("/v1/plans", json=self.PLAN).json()["plan_id"]
+        body = {**sample_request_body, "retrosynthesis_plan": self.PLAN, "plan_id": plan_id}
+
+        assert client.post("/v1/generate-procedure", json=body).status_code == 422
+
+
+class TestProcedureHistoryEndpoints:
+    """Tests for reading saved procedure versions."""
+
+    def test_generated_procedure_saved(self, client: TestClient, sample_request_body: dict):
+        """Test that a generated procedure is saved as version 1."""
+        original = client.post("/v1/generate-procedure", json=sample_request_body).json()
+
+        response = client.get(f"/v1/procedures/{original['request_id']}")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["version"] == 1
+        assert data["changed_fields"] == []
+        assert data["lab_context"]["scale_mg"] == 500
+        for field in ("procedure", "risk_flags", "fallback_options", "citations"):
+            assert data[field] == original[field]
+
+    def test_edits_saved_as_versions(self, client: TestClient, sample_request_body: dict):
+        """Test that each changing edit adds a version and old versions stay readable."""
+        original = client.post("/v1/generate-procedure", json=sample_request_body).json()
+        url = f"/v1/procedures/{original['request_id']}"
+        patched = client.patch(url, json={"scale_mg": 50}).json()
+        client.patch(url, json={"scale_mg": 50})
+        client.patch(url, json={"experience_level": "undergrad"})
+
+        history = client.get(f"{url}/versions").json()
+
+        assert [v["version"] for v in history["versions"]] == [3, 2, 1]
+        assert [v["changed_fields"] for v in history["versions"]] == [
+            ["experience_level"],
+            ["scale_mg"],
+            [],
+        ]
+        assert history["next_cursor"] is None
+        assert client.get(f"{url}/versions/1").json()["procedure"] == original["procedure"]
+        assert client.get(f"{url}/versions/2").json()["procedure"] == patched["procedure"]
+        assert client.get(url).json()["lab_context"]["experience_level"] == "undergrad"
+
+    def test_history_pages(self, client: TestClient, sample_request_body: dict):
+        """Test that the history is paginated with next_cursor."""
+        original = client.post("/v1/generate-procedure", json=sample_request_body).json()
+        url = f"/v1/procedures/{original['request_id']}"
+        for scale_mg in (10, 20, 30):
+            client.patch(url, json={"scale_mg": scale_mg})
+
+        first = client.get(f"{url}/versions", params={"limit": 3}).json()
+        second = client.get(
+            f"{url}/versions", params={"limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+
+        assert [v["version"] for v in first["versions"]] == [4, 3, 2]
+        assert [v["version"] for v in second["versions"]] == [1]
+        assert second["next_cursor"] is None
+
+    def test_unknown_procedure_or_version(self, client: TestClient, sample_request_body: dict):
+        """Test that unknown procedures and versions return 404."""
+        original = client.post("/v1/generate-procedure", json=sample_request_body).json()
+        url = f"/v1/procedures/{original['request_id']}"
+        unknown = f"/v1/procedures/{uuid.uuid4()}"
+
+        assert client.get(f"{url}/versions/2").status_code == 404
+        assert client.get(unknown).status_code == 404
+        assert client.get(f"{unknown}/versions").status_code == 404
+
+
+class TestEquipmentBookingEndpoints:
+    """Tests for /v1/equipment bookings and availability."""
+
+    def _book(self, client: TestClient, equipment: str, start: str, end: str):
+        """Post a booking and return the response."""
+        return client.post(
+            "/v1/equipment/bookings", json={"equipment": equipment, "start": start, "end": end}
+        )
+
+    def test_book_and_cancel(self, client: TestClient):
+        """Test that bookings are created, rejected when overlapping and cancelled."""
+        created = self._book(client, "NMR", "2026-03-02T08:00:00Z", "2026-03-02T10:00:00Z")
+
+        assert created.status_code == 201
+        assert created.json()["equipment"] == "nmr"
+        overlap = self._book(client, "nmr", "2026-03-02T09:00:00Z", "2026-03-02T11:00:00Z")
+        assert overlap.status_code == 409
+
+        url = f"/v1/equipment/bookings/{created.json()['booking_id']}"
+        assert client.delete(url).status_code == 204
+        assert client.delete(url).status_code == 404
+        assert self._book(client, "nmr", "2026-03-02T09:00", "2026-03-02T11:00").status_code == 201
+
+    def test_invalid_booking_rejected(self, client: TestClient):
+        """Test that a booking must end after it starts."""
+        response = self._book(client, "nmr", "2026-03-02T10:00:00Z", "2026-03-02T08:00:00Z")
+
+        assert response.status_code == 422
+
+    def test_availability(self, client: TestClient):
+        """Test the earliest start with every instrument free."""
+        self._book(client, "rotovap", "2026-03-02T08:00:00Z", "2026-03-02T10:00:00Z")
+        self._book(client, "nmr", "2026-03-02T11:00:00Z", "2026-03-02T12:00:00Z")
+
+        response = client.get(
+            "/v1/equipment/availability",
+            params={
+                "equipment": ["rotovap", "nmr"],
+                "hours": 2,
+                "after": "2026-03-02T08:00:00Z",
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert datetime.fromisoformat(data["earliest_start"]) == datetime.fromisoformat(
+            "2026-03-02T12:00:00+00:00"
+        )
+        assert [booking["equipment"] for booking in data["conflicts"]] == ["rotovap"]
+
+    def test_generate_flags_booked_equipment(
+        self, client: TestClient, sample_request_body: dict
+    ):
+        """Test that a procedure is flagged when its equipment is booked now."""
+        now = datetime.now(timezone.utc)
+        self._book(
+            client,
+            "heating_mantle",
+            (now - timedelta(hours=1)).isoformat(),
+            (now + timedelta(hours=2)).isoformat(),
+        )
+
+        data = client.post("/v1/generate-procedure", json=sample_request_body).json()
+
+        assert any(
+            flag.startswith("Equipment booked within the next 8 h: heating_mantle")
+            for flag in data["risk_flags"]
+        )
+
+    def test_patch_rechecks_bookings(self, client: TestClient, sample_request_body: dict):
+        """Test that a PATCH drops the flag of a booking cancelled since generation."""
+        now = datetime.now(timezone.utc)
+        booking = self._book(
+            client,
+            "heating_mantle",
+            (now - timedelta(hours=1)).isoformat(),
+            (now + timedelta(hours=2)).isoformat(),
+        ).json()
+        original = client.post("/v1/generate-procedure", json=sample_request_body).json()
+        client.delete(f"/v1/equipment/bookings/{booking['booking_id']}")
+
+        data = client.patch(
+            f"/v1/procedures/{original['request_id']}", json={"scale_mg": 75}
+        ).json()
+
+        assert not any(flag.startswith("Equipment booked") for flag in data["risk_flags"])
+        assert any(
+            flag.startswith("Equipment booked") for flag in data["diff"]["risk_flags_removed"]
+        )
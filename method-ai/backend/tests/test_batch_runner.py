@@ -0,0 +1,166 @@
+"""Tests for the offline batch runner."""
+
+import io
+import json
+
+import pytest
+
+from app.cli import main
+from app.services.batch_runner import BatchCheckpoint, run_batch
+from app.services.request_registry import is_known_request_id
+
+
+def _request_line(scale_mg: float) -> bytes:
+    """Build one JSONL request line."""
+    body = {
+        "target_smiles": "CCO",
+        "lab_context": {
+            "scale_mg": scale_mg,
+            "experience_level": "grad",
+            "time_budget_hours": 8,
+        },
+    }
+    return json.dumps(body).encode("utf-8") + b"\n"
+
+
+@pytest.fixture
+def requests_jsonl() -> bytes:
+    """Create a small JSONL input with one invalid and one blank line."""
+    return b"".join(
+        [
+            _request_line(5),
+            _request_line(50),
+            b'{"target_smiles": "C(("}\n',
+            b"\n",
+            _request_line(20000),
+        ]
+    )
+
+
+def _scales(output: bytes) -> list:
+    """Extract the materials scale (or error line) from each result."""
+    results = []
+    for line in output.splitlines():
+        record = json.loads(line)
+        if "error" in record:
+            results.append(("error", record["line"]))
+        else:
+            results.append(record["procedure"][1]["parameters"]["scale"])
+    return results
+
+
+class TestRunBatch:
+    """Tests for run_batch."""
+
+    def test_in_process_preserves_order(self, requests_jsonl: bytes):
+        """Test results come out in input order with errors inline."""
+        output = io.BytesIO()
+
+        stats = run_batch(io.BytesIO(requests_jsonl), output, workers=1, chunk_size=2)
+
+        assert _scales(output.getvalue()) == ["5.0mg", "50.0mg", ("error", 3), "20000.0mg"]
+        assert (stats.succeeded, stats.failed, stats.skipped, stats.lines_done) == (3, 1, 1, 5)
+
+    def test_process_pool_preserves_order(self):
+        """Test ordering across a process pool with small chunks."""
+        lines = b"".join(_request_line(scale) for scale in range(1, 41))
+        output = io.BytesIO()
+
+        stats = run_batch(io.BytesIO(lines), output, workers=2, chunk_size=3)
+
+        assert _scales(output.getvalue()) == [f"{float(scale)}mg" for scale in range(1, 41)]
+        assert stats.succeeded == 40
+
+    def test_results_have_unique_request_ids(self, requests_jsonl: bytes):
+        """Test that each result is issued its own request_id."""
+        output = io.BytesIO()
+        run_batch(io.BytesIO(requests_jsonl), output)
+
+        ids = [
+            json.loads(line)["request_id"]
+            for line in output.getvalue().splitlines()
+            if b"request_id" in line
+        ]
+        assert len(set(ids)) == len(ids) == 3
+
+    def test_request_ids_registered(self):
+        """Test that IDs issued by a worker pool are known to feedback checks."""
+        lines = b"".join(_request_line(scale) for scale in range(1, 5))
+        output = io.BytesIO()
+        run_batch(io.BytesIO(lines), output, workers=2, chunk_size=1)
+
+        ids = [json.loads(line)["request_id"] for line in output.getvalue().splitlines()]
+        assert len(ids) == 4
+        assert all(is_known_request_id(request_id) for request_id in ids)
+        assert not is_known_request_id("not-issued")
+
+    def test_checkpoint_written_per_chunk(self, requests_jsonl: bytes, tmp_path):
+        """Test that the checkpoint tracks lines and output bytes."""
+        checkpoint_path = str(tmp_path / "run.ckpt")
+        output = io.BytesIO()
+
+        run_batch(io.BytesIO(requests_jsonl), output, chunk_size=2, checkpoint_path=checkpoint_path)
+
+        checkpoint = BatchCheckpoint.load(checkpoint_path)
+        assert checkpoint.lines_done == 5
+        assert checkpoint.output_offset == len(output.getvalue())
+
+    def test_unknown_lab_profile_is_error_line(self):
+        """Test that a request naming an unknown lab profile fails on its own."""
+        lines = _request_line(5) + b'{"target_smiles": "CCO", "lab_profile_id": "missing"}\n'
+        output = io.BytesIO()
+
+        stats = run_batch(io.BytesIO(lines), output)
+
+        assert _scales(output.getvalue()) == ["5.0mg", ("error", 2)]
+        assert b"Unknown lab_profile_id missing" in output.getvalue()
+        assert stats.failed == 1
+
+    def test_unknown_plan_is_error_line(self):
+        """Test that a request naming an unknown plan fails on its own."""
+        body = json.loads(_request_line(5))
+        body["plan_id"] = "missing"
+        lines = json.dumps(body).encode("utf-8") + b"\n" + _request_line(50)
+        output = io.BytesIO()
+
+        run_batch(io.BytesIO(lines), output)
+
+        assert _scales(output.getvalue()) == [("error", 1), "50.0mg"]
+        assert b"Unknown plan_id missing" in output.getvalue()
+
+
+class TestBatchCommand:
+    """Tests for the batch CLI subcommand."""
+
+    def test_resumes_from_checkpoint(self, requests_jsonl: bytes, tmp_path):
+        """Test that a resumed run drops partial output and continues."""
+        input_path = tmp_path / "requests.jsonl"
+        output_path = tmp_path / "results.jsonl"
+        checkpoint_path = tmp_path / "run.ckpt"
+        input_path.write_bytes(requests_jsonl)
+
+        # Simulate a run interrupted after the first two lines, with a
+        # partially written third result
+        first = io.BytesIO()
+        run_batch(io.BytesIO(b"".join(requests_jsonl.splitlines(keepends=True)[:2])), first)
+        output_path.write_bytes(first.getvalue() + b'{"partial')
+        BatchCheckpoint(lines_done=2, output_offset=len(first.getvalue())).save(
+            str(checkpoint_path)
+        )
+
+        exit_code = main(
+            [
+                "batch",
+                str(input_path),
+                "-o",
+                str(output_path),
+                "--workers",
+                "1",
+                "--checkpoint",
+                str(checkpoint_path),
+            ]
+        )
+
+        assert exit_code == 0
+        assert _scales(output_path.read_bytes()) == ["5.0mg", "50.0mg", ("error", 3), "20000.0mg"]
+        assert BatchCheckpoint.load(str(checkpoint_path)).lines_done == 5
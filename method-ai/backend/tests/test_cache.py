@@ -0,0 +1,153 @@
+"""Tests for caching primitives."""
+
+import multiprocessing
+
+import pytest
+
+from app.services.cache import SQLiteCache, TTLCache, create_cache
+
+
+def _claim(path: str, key: str, results) -> None:
+    """Try to claim a key from another process."""
+    cache = SQLiteCache(path, "claims", maxsize=100, ttl_seconds=60)
+    results.put(cache.add(key, {"pid": multiprocessing.current_process().name}))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    """Create a cache for each backend."""
+    if request.param == "memory":
+        return TTLCache(maxsize=2, ttl_seconds=60)
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), "test", maxsize=2, ttl_seconds=60)
+
+
+class TestCacheBackends:
+    """Behaviour shared by both cache backends."""
+
+    def test_set_and_get(self, cache):
+        """Test that stored values are returned."""
+        cache.set("a", {"steps": [1, 2]})
+
+        assert cache.get("a") == {"steps": [1, 2]}
+        assert cache.get("missing") is None
+
+    def test_evicts_least_recently_used(self, cache):
+        """Test that the oldest unused entry is evicted when full."""
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_expired_entries_are_missing(self, cache):
+        """Test that expired entries are not returned."""
+        cache.set("a", 1, ttl_seconds=0)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_add_only_when_absent(self, cache):
+        """Test that add does not replace a live entry."""
+        assert cache.add("a", 1) is True
+        assert cache.add("a", 2) is False
+        assert cache.get("a") == 1
+
+    def test_add_replaces_expired_entry(self, cache):
+        """Test that add succeeds over an expired entry."""
+        cache.set("a", 1, ttl_seconds=0)
+
+        assert cache.add("a", 2) is True
+        assert cache.get("a") == 2
+
+    def test_delete_and_clear(self, cache):
+        """Test removing entries."""
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+
+        assert cache.get("a") is None
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_items_reports_remaining_ttl(self, cache):
+        """Test the live-entry snapshot."""
+        cache.set("a", 1, ttl_seconds=30)
+
+        [(key, value, remaining)] = cache.items()
+        assert (key, value) == ("a", 1)
+        assert 0 < remaining <= 30
+
+
+class TestSQLiteCache:
+    """Tests specific to the shared SQLite backend."""
+
+    def test_namespaces_are_separate(self, tmp_path):
+        """Test that caches sharing a file do not see each other's keys."""
+        path = str(tmp_path / "cache.sqlite3")
+        plans = SQLiteCache(path, "plans", maxsize=10, ttl_seconds=60)
+        keys = SQLiteCache(path, "idempotency", maxsize=10, ttl_seconds=60)
+
+        plans.set("k", "plan")
+
+        assert keys.get("k") is None
+        assert plans.get("k") == "plan"
+
+    def test_shared_between_instances(self, tmp_path):
+        """Test that a second handle on the file sees the same entries."""
+        path = str(tmp_path / "cache.sqlite3")
+        SQLiteCache(path, "plans", maxsize=10, ttl_seconds=60).set("k", [1])
+
+        assert SQLiteCache(path, "plans", maxsize=10, ttl_seconds=60).get("k") == [1]
+
+    def test_add_is_atomic_across_processes(self, tmp_path):
+        """Test that exactly one process claims a key."""
+        path = str(tmp_path / "cache.sqlite3")
+        SQLiteCache(path, "claims", maxsize=100, ttl_seconds=60)
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_claim, args=(path, "key", results)) for _ in range(4)]
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        claims = [results.get(timeout=5) for _ in workers]
+        assert claims.count(True) == 1
+
+
+class TestCreateCache:
+    """Tests for create_cache."""
+
+    def test_memory_backend(self, monkeypatch):
+        """Test that the default backend is in-memory."""
+        from app.services import cache as cache_module
+
+        monkeypatch.setattr(cache_module.settings, "cache_backend", "memory")
+
+        assert isinstance(create_cache("plans", 10, 60), TTLCache)
+
+    def test_sqlite_backend(self, monkeypatch, tmp_path):
+        """Test that the sqlite backend uses the configured file."""
+        from app.services import cache as cache_module
+
+        monkeypatch.setattr(cache_module.settings, "cache_backend", "sqlite")
+        monkeypatch.setattr(cache_module.settings, "cache_db_path", str(tmp_path / "c.sqlite3"))
+
+        created = create_cache("plans", 10, 60)
+
+        assert isinstance(created, SQLiteCache)
+        assert created.path == str(tmp_path / "c.sqlite3")
+
+    def test_unknown_backend(self, monkeypatch):
+        """Test that an unknown backend raises."""
+        from app.services import cache as cache_module
+
+        monkeypatch.setattr(cache_module.settings, "cache_backend", "redis")
+
+        with pytest.raises(ValueError):
+            create_cache("plans", 10, 60)
@@ -0,0 +1,138 @@
+"""Tests for the citation index service."""
+
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.citation_index import (
+    build_citation_index,
+    get_citation_index,
+    retrieve_citations,
+)
+
+
+def _write_jsonl(path, records: list[dict]) -> str:
+    """Write records as JSONL and return the path."""
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def corpus(tmp_path) -> str:
+    """Create a small procedure corpus."""
+    return _write_jsonl(
+        tmp_path / "corpus.jsonl",
+        [
+            {"id": "p-1", "target_smiles": "CC(=O)OC1=CC=CC=C1C(=O)O", "step_count": 10},
+            {"id": "p-2", "target_smiles": "CCO", "title": "Ethanol by fermentation"},
+            {
+                "id": "p-3",
+                "target_smiles": "CC(=O)OCC",
+                "reaction_class": "Fischer esterification",
+                "steps": [{"action": "Reflux with sulfuric acid"}, "Purify by distillation"],
+            },
+            {
+                "id": "p-4",
+                "target_smiles": "CC(=O)OC",
+                "metadata": {"reaction_classes": ["Fischer esterification"]},
+                "steps": ["Purify by distillation"],
+            },
+            {"target_smiles": "C"},
+        ],
+    )
+
+
+class TestBuildCitationIndex:
+    """Tests for build_citation_index."""
+
+    def test_counts_records_with_ids(self, corpus, tmp_path):
+        """Test that records without an id are skipped."""
+        assert build_citation_index([corpus], str(tmp_path / "index.idx")) == 4
+
+    def test_skips_malformed_lines(self, tmp_path):
+        """Test that malformed JSON lines are ignored."""
+        path = tmp_path / "corpus.jsonl"
+        path.write_text('{"id": "a", "target_smiles": "CCO"}\nnot json\n\n', encoding="utf-8")
+
+        assert build_citation_index([str(path)], str(tmp_path / "index.idx")) == 1
+
+
+class TestRetrieveCitations:
+    """Tests for retrieve_citations."""
+
+    def test_no_index_returns_empty(self):
+        """Test that retrieval without a built index returns no citations."""
+        assert retrieve_citations("CCO", {"steps": []}) == []
+
+    def test_matches_equivalent_target_smiles(self, corpus):
+        """Test that targets match on their canonical form."""
+        build_citation_index([corpus], settings.citation_index_path)
+
+        citations = retrieve_citations("OCC", {"steps": []})
+
+        assert citations[0] == "p-2: Ethanol by fermentation"
+
+    def test_default_citation_title(self, corpus):
+        """Test that records without a title get a descriptive one."""
+        build_citation_index([corpus], settings.citation_index_path)
+
+        citations = retrieve_citations("CC(=O)OC1=CC=CC=C1C(=O)O", {"steps": []})
+
+        assert citations[0] == "p-1: Prior procedure for CC(=O)OC1=CC=CC=C1C(=O)O (10 steps)"
+
+    def test_matches_reaction_class_and_keywords(self, corpus):
+        """Test that reaction classes and keywords retrieve related records."""
+        build_citation_index([corpus], settings.citation_index_path)
+
+        plan = {"steps": [{"rxn_smiles": "", "reaction_class": "Esterification"}]}
+        citations = retrieve_citations("c1ccccc1", plan, keywords=["distillation"])
+
+        assert {citation.split(":")[0] for citation in citations} == {"p-3", "p-4"}
+
+    def test_respects_top_k(self, corpus):
+        """Test that at most top_k citations are returned."""
+        build_citation_index([corpus], settings.citation_index_path)
+
+        plan = {"steps": [{"reaction_class": "esterification"}]}
+
+        assert len(retrieve_citations("CCO", plan, keywords=["distillation"], top_k=1)) == 1
+
+    def test_feedback_outcomes_reorder_results(self, corpus, tmp_path):
+        """Test that successful procedures outrank failed ones."""
+        feedback = _write_jsonl(
+            tmp_path / "feedback.jsonl",
+            [
+                {"request_id": "p-3", "outcome": "failure"},
+                {"request_id": "p-4", "outcome": "success"},
+                {"request_id": "p-4", "outcome": "success"},
+            ],
+        )
+        build_citation_index([corpus], settings.citation_index_path, feedback_path=feedback)
+
+        citations = retrieve_citations("c1ccccc1", {"steps": []}, keywords=["distillation"])
+
+        assert [citation.split(":")[0] for citation in citations] == ["p-4", "p-3"]
+
+    def test_rebuilt_index_is_picked_up(self, corpus, tmp_path):
+        """Test that replacing the index file remaps it."""
+        build_citation_index([corpus], settings.citation_index_path)
+        assert retrieve_citations("CCN", {"steps": []}) == []
+
+        other = _write_jsonl(tmp_path / "other.jsonl", [{"id": "n-1", "target_smiles": "NCC"}])
+        build_citation_index([other], settings.citation_index_path)
+
+        assert retrieve_citations("CCN", {"steps": []})[0].startswith("n-1:")
+
+    def test_rebuilt_index_unmaps_previous(self, corpus, tmp_path):
+        """Test that remapping a rebuilt index closes the previous table."""
+        build_citation_index([corpus], settings.citation_index_path)
+        previous = get_citation_index()
+        assert previous is not None
+
+        other = _write_jsonl(tmp_path / "other.jsonl", [{"id": "n-1", "target_smiles": "NCC"}])
+        build_citation_index([other], settings.citation_index_path)
+
+        assert get_citation_index() is not previous
+        with pytest.raises(ValueError):
+            previous.get(b"t:NCC")
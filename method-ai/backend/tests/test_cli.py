@@ -0,0 +1,127 @@
+"""Tests for the command-line interface."""
+
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.cli import main
+
+
+class TestModuleEntryPoint:
+    """Tests for running the CLI with ``python -m app.cli``."""
+
+    def test_help(self):
+        """Test that the module runs and lists every subcommand."""
+        result = subprocess.run(
+            [sys.executable, "-m", "app.cli", "--help"],
+            cwd=Path(__file__).parents[1],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+        assert result.returncode == 0, result.stderr
+        for command in ("serve", "batch", "index-corpus", "build-safety-db", "import-inventory"):
+            assert command in result.stdout
+
+
+class TestServeCommand:
+    """Tests for the serve subcommand."""
+
+    @patch("app.main.run")
+    def test_serve_with_workers(self, mock_run):
+        """Test that worker count and bind options are passed through."""
+        assert main(["serve", "--workers", "4", "--port", "9000"]) == 0
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args.kwargs["workers"] == 4
+        assert mock_run.call_args.kwargs["port"] == 9000
+
+    @patch("app.main.run")
+    def test_no_command_serves(self, mock_run):
+        """Test that running without a subcommand starts the server."""
+        assert main([]) == 0
+
+        assert mock_run.call_args.kwargs["workers"] == 1
+
+    def test_rejects_zero_workers(self):
+        """Test that an invalid worker count is rejected."""
+        with pytest.raises(SystemExit):
+            main(["serve", "--workers", "0"])
+
+
+class TestRun:
+    """Tests for app.main.run."""
+
+    @patch("uvicorn.run")
+    def test_multiple_workers_use_shared_cache(self, mock_uvicorn, monkeypatch):
+        """Test that multi-worker mode switches caches to SQLite."""
+        from app.main import run
+
+        monkeypatch.delenv("CACHE_BACKEND", raising=False)
+        monkeypatch.delenv("API_WORKERS", raising=False)
+
+        run(workers=3)
+
+        import os
+
+        assert os.environ["CACHE_BACKEND"] == "sqlite"
+        assert os.environ["API_WORKERS"] == "3"
+        assert mock_uvicorn.call_args.kwargs["workers"] == 3
+        assert mock_uvicorn.call_args.kwargs["reload"] is False
+        monkeypatch.delenv("CACHE_BACKEND")
+        monkeypatch.delenv("API_WORKERS")
+
+
+class TestIndexCorpusCommand:
+    """Tests for the index-corpus subcommand."""
+
+    def test_builds_index(self, tmp_path):
+        """Test that the sample corpus is indexed and searchable."""
+        from pathlib import Path
+
+        from app.utils.mmap_table import MmapTable
+
+        corpus = Path(__file__).parents[2] / "data" / "sample" / "tiny_procedures.jsonl"
+        output = tmp_path / "citations.idx"
+
+        assert main(["index-corpus", str(corpus), "-o", str(output), "--no-feedback"]) == 0
+
+        with MmapTable(str(output)) as table:
+            assert table.get(b"t:CCO") is not None
+
+
+class TestBuildSafetyDb:
+    """Tests for the build-safety-db subcommand."""
+
+    def test_builds_database(self, tmp_path):
+        """Test that the sample dataset is written to the requested file."""
+        from pathlib import Path
+
+        from app.utils.mmap_table import MmapTable
+        from app.utils.smiles import canonicalize_smiles
+
+        dataset = Path(__file__).parents[2] / "data" / "sample" / "compound_safety.jsonl"
+        output = tmp_path / "compound_safety.idx"
+
+        assert main(["build-safety-db", str(dataset), "-o", str(output)]) == 0
+
+        with MmapTable(str(output)) as table:
+            assert table.get(canonicalize_smiles("ClS(Cl)=O").encode("utf-8")) is not None
+
+
+class TestImportInventory:
+    """Tests for the import-inventory subcommand."""
+
+    def test_imports_containers(self, tmp_path):
+        """Test that the sample inventory is written to the requested store."""
+        from pathlib import Path
+
+        source = Path(__file__).parents[2] / "data" / "sample" / "inventory.csv"
+        output = tmp_path / "inventory.jsonl"
+
+        assert main(["import-inventory", str(source), "-o", str(output)]) == 0
+        assert len(output.read_text().splitlines()) == 9
@@ -0,0 +1,116 @@
+"""Tests for the compound safety database."""
+
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.models.schemas import LabContext
+from app.services.compound_safety import (
+    build_compound_safety_db,
+    compound_flags,
+    get_compound_safety_db,
+    lookup_compound,
+)
+from app.services.procedure_generator import generate_procedure
+from app.services.risk_annotator import annotate_risks
+
+SAMPLE_DATASET = Path(__file__).parents[2] / "data" / "sample" / "compound_safety.jsonl"
+
+
+def _write_dataset(path: Path, records: list[dict]) -> str:
+    """Write dataset records as JSONL."""
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return str(path)
+
+
+class TestBuildCompoundSafetyDb:
+    """Tests for build_compound_safety_db and lookup_compound."""
+
+    def test_sample_dataset(self):
+        """Test that the sample dataset builds and is looked up in any spelling."""
+        count = build_compound_safety_db([str(SAMPLE_DATASET)], settings.compound_safety_db_path)
+
+        assert count == sum(1 for line in SAMPLE_DATASET.open() if line.strip())
+        compound = lookup_compound("O=S(Cl)Cl")
+        assert compound["name"] == "Thionyl chloride"
+        assert "H314" in compound["ghs"]
+        assert lookup_compound("OCC")["flash_point_c"] == 13
+        assert lookup_compound("CC(C)(C)C") is None
+
+    def test_invalid_and_duplicate_records(self, tmp_path):
+        """Test that invalid SMILES are skipped and later records win."""
+        dataset = _write_dataset(
+            tmp_path / "compounds.jsonl",
+            [
+                {"smiles": "CCO", "name": "Ethanol", "ghs": ["H225"]},
+                {"smiles": "not smiles!!", "name": "Broken"},
+                {"name": "No SMILES"},
+                {"smiles": "OCC", "name": "Ethyl alcohol", "ghs": ["H225", "H319"]},
+            ],
+        )
+
+        count = build_compound_safety_db([dataset], settings.compound_safety_db_path)
+
+        assert count == 1
+        assert lookup_compound("CCO")["name"] == "Ethyl alcohol"
+
+    def test_no_database(self):
+        """Test that nothing is flagged before a database is built."""
+        assert get_compound_safety_db() is None
+        assert lookup_compound("CCO") is None
+        assert compound_flags([(1, "CCO>>CC=O")]) == []
+
+    def test_rebuilt_database_is_remapped(self, tmp_path):
+        """Test that replacing the database file takes effect without a restart."""
+        first = _write_dataset(tmp_path / "a.jsonl", [{"smiles": "CCO", "ghs": ["H225"]}])
+        second = _write_dataset(tmp_path / "b.jsonl", [{"smiles": "CO", "ghs": ["H301"]}])
+
+        build_compound_safety_db([first], settings.compound_safety_db_path)
+        assert lookup_compound("CCO") is not None
+
+        build_compound_safety_db([second], settings.compound_safety_db_path)
+        assert lookup_compound("CCO") is None
+        assert lookup_compound("CO") is not None
+
+
+class TestCompoundFlags:
+    """Tests for compound_flags and the risk annotator rule."""
+
+    def test_one_flag_per_compound_listing_steps(self):
+        """Test that each known compound gets one flag naming the steps using it."""
+        build_compound_safety_db([str(SAMPLE_DATASET)], settings.compound_safety_db_path)
+
+        flags = compound_flags(
+            [
+                (5, "CC(=O)O.ClS(Cl)=O>ClCCl>CC(=O)Cl"),
+                (9, "CC(=O)Cl.OCC>ClCCl>CCOC(C)=O"),
+            ]
+        )
+
+        assert flags[0] == (
+            "Thionyl chloride (ClS(Cl)=O) in step 5: GHS H302, H314, H331, EUH014; "
+            "incompatible with water, alcohols, bases, amines"
+        )
+        assert [flag.split(" (")[0] for flag in flags] == [
+            "Thionyl chloride",
+            "Dichloromethane",
+            "Acetyl chloride",
+            "Ethanol",
+        ]
+        assert flags[1].startswith("Dichloromethane (ClCCl) in steps 5, 9: ")
+        assert "flash point 4 °C" in flags[2]
+
+    def test_annotate_risks_flags_plan_compounds(self):
+        """Test that reagents and products of the plan produce risk flags."""
+        build_compound_safety_db([str(SAMPLE_DATASET)], settings.compound_safety_db_path)
+        plan = {
+            "source": "ibm_rxn",
+            "steps": [{"rxn_smiles": "CC(=O)Cl.Nc1ccccc1>>CC(=O)Nc1ccccc1", "confidence": 0.9}],
+        }
+        lab_context = LabContext(scale_mg=500, experience_level="grad", time_budget_hours=8)
+        procedure = generate_procedure(plan=plan, lab_context=lab_context)
+
+        risk_flags, _ = annotate_risks(procedure, lab_context)
+
+        assert any(flag.startswith("Acetyl chloride (CC(=O)Cl) in step ") for flag in risk_flags)
+        assert any(flag.startswith("Aniline (Nc1ccccc1) in step ") for flag in risk_flags)
@@ -0,0 +1,206 @@
+"""Tests for equipment bookings."""
+
+import sqlite3
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import LabContext
+from app.services.equipment_bookings import (
+    BookingConflictError,
+    BookingNotFoundError,
+    booking_flags,
+    create_booking,
+    delete_booking,
+    earliest_start,
+    find_conflicts,
+)
+from app.services.procedure_generator import generate_procedure
+from app.services.risk_annotator import annotate_risks
+
+T0 = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _at(hours: float) -> datetime:
+    """Time a number of hours after T0."""
+    return T0 + timedelta(hours=hours)
+
+
+class TestBookings:
+    """Tests for creating, cancelling and finding bookings."""
+
+    def test_overlapping_booking_rejected(self):
+        """Test that an instrument cannot be double-booked, but back-to-back is fine."""
+        first = create_booking("Rotovap", _at(0), _at(2), booked_by="ada")
+
+        with pytest.raises(BookingConflictError) as excinfo:
+            create_booking("rotovap", _at(1), _at(3))
+        create_booking("rotovap", _at(2), _at(3))
+        create_booking("nmr", _at(1), _at(3))
+
+        assert excinfo.value.conflicts == [first]
+        assert first.equipment == "rotovap"
+
+    def test_find_conflicts(self):
+        """Test that only bookings overlapping the window are found."""
+        create_booking("rotovap", _at(0), _at(1))
+        late = create_booking("rotovap", _at(3), _at(4))
+        nmr = create_booking("nmr", _at(2), _at(5))
+
+        conflicts = find_conflicts(["rotovap", "NMR", "hplc"], _at(1), _at(3.5))
+
+        assert conflicts == [late, nmr]
+
+    def test_naive_times_are_utc(self):
+        """Test that times without an offset are read as UTC."""
+        booking = create_booking("nmr", datetime(2026, 3, 2, 8), datetime(2026, 3, 2, 9))
+
+        assert booking.start == T0
+
+    def test_delete_booking(self):
+        """Test that a cancelled booking no longer conflicts."""
+        booking = create_booking("rotovap", _at(0), _at(2))
+
+        delete_booking(booking.booking_id)
+
+        assert find_conflicts(["rotovap"], _at(0), _at(2)) == []
+        with pytest.raises(BookingNotFoundError):
+            delete_booking(booking.booking_id)
+
+    def test_bookings_by_another_worker(self):
+        """Test that bookings written by another process are picked up."""
+        create_booking("rotovap", _at(0), _at(1))
+        conn = sqlite3.connect(settings.equipment_bookings_path)
+        with conn:
+            conn.execute(
+                "INSERT INTO equipment_bookings VALUES (?, 'nmr', ?, ?, NULL)",
+                (str(uuid.uuid4()), _at(0).timestamp(), _at(1).timestamp()),
+            )
+            conn.execute("UPDATE booking_generation SET generation = generation + 1")
+        conn.close()
+
+        assert [b.equipment for b in find_conflicts(["nmr"], _at(0), _at(1))] == ["nmr"]
+
+
+class TestEarliestStart:
+    """Tests for earliest_start."""
+
+    def test_free_now(self):
+        """Test that free equipment can start right away."""
+        create_booking("rotovap", _at(5), _at(6))
+
+        assert earliest_start(["rotovap", "nmr"], 4, _at(0)) == _at(0)
+
+    def test_window_across_instruments(self):
+        """Test that the window must fit around every instrument's bookings."""
+        create_booking("rotovap", _at(0), _at(2))
+        create_booking("nmr", _at(3), _at(4))
+        create_booking("rotovap", _at(5), _at(9))
+        create_booking("nmr", _at(10), _at(11))
+
+        assert earliest_start(["rotovap", "nmr"], 1, _at(0)) == _at(2)
+        assert earliest_start(["rotovap", "nmr"], 2, _at(0)) == _at(11)
+
+    def test_no_window_within_horizon(self):
+        """Test that None is returned if the equipment stays booked."""
+        create_booking("nmr", _at(0), _at(24 * 10))
+
+        assert earliest_start(["nmr"], 1, _at(0), horizon_days=5) is None
+        assert earliest_start(["nmr"], 1, _at(0), horizon_days=11) == _at(240)
+
+    def test_year_of_bookings(self):
+        """Test a busy year: hourly bookings with one free three-hour gap."""
+        conn = sqlite3.connect(settings.equipment_bookings_path)
+        create_booking("rotovap", _at(-1), _at(0))
+        with conn:
+            conn.executemany(
+                "INSERT INTO equipment_bookings VALUES (?, 'rotovap', ?, ?, NULL)",
+                (
+                    (str(uuid.uuid4()), _at(hour).timestamp(), _at(hour + 1).timestamp())
+                    for hour in range(24 * 365)
+                    if not 6000 <= hour < 6003
+                ),
+            )
+            conn.execute("UPDATE booking_generation SET generation = generation + 1")
+        conn.close()
+
+        assert earliest_start(["rotovap"], 3, _at(0), horizon_days=366) == _at(6000)
+        assert earliest_start(["rotovap"], 4, _at(0), horizon_days=366) == _at(24 * 365)
+        assert len(find_conflicts(["rotovap"], _at(5999.5), _at(6003.5))) == 2
+
+    def test_long_booking_then_short_ones(self):
+        """Test that a long booking does not hide or add conflicts after it ends."""
+        create_booking("rotovap", _at(0), _at(24 * 30))
+        for hour in range(24 * 30, 24 * 60, 2):
+            create_booking("rotovap", _at(hour), _at(hour + 1))
+
+        assert [b.start for b in find_conflicts(["rotovap"], _at(1000.5), _at(1004))] == [
+            _at(1002),
+            _at(1000),
+        ]
+        assert len(find_conflicts(["rotovap"], _at(719), _at(721))) == 2
+        assert earliest_start(["rotovap"], 1, _at(0), horizon_days=90) == _at(721)
+
+
+class TestBookingFlags:
+    """Tests for booking risk flags."""
+
+    def test_conflict_flag(self):
+        """Test that the flag names the booking and the earliest free start."""
+        create_booking("nmr", _at(1), _at(2))
+
+        flags = booking_flags(["rotovap", "nmr"], 4, now=_at(0))
+
+        assert flags == [
+            "Equipment booked within the next 4 h: nmr (2026-03-02 09:00 UTC to "
+            "2026-03-02 10:00 UTC) - earliest start with all equipment free: "
+            "2026-03-02 10:00 UTC"
+        ]
+
+    def test_no_flags_without_conflicts(self):
+        """Test that free equipment and an empty store raise nothing."""
+        assert booking_flags(["nmr"], 4, now=_at(0)) == []
+
+        create_booking("nmr", _at(5), _at(6))
+
+        assert booking_flags(["nmr"], 4, now=_at(0)) == []
+
+    def test_procedure_equipment_flagged(self):
+        """Test that a procedure is flagged for its booked equipment."""
+        now = datetime.now(timezone.utc)
+        create_booking("rotovap", now - timedelta(hours=1), now + timedelta(hours=1))
+        lab_context = LabContext(
+            scale_mg=500,
+            equipment=["rotovap", "nmr"],
+            experience_level="grad",
+            time_budget_hours=8,
+        )
+
+        procedure = generate_procedure(
+            {"source": "placeholder", "target_smiles": "CCO", "steps": []}, lab_context
+        )
+        risk_flags, _ = annotate_risks(procedure, lab_context)
+
+        prefix = "Equipment booked within the next 8 h: rotovap"
+        assert any(flag.startswith(prefix) for flag in risk_flags)
+
+    def test_all_lab_equipment_checked(self):
+        """Test that equipment beyond the five set up in the apparatus step is checked."""
+        now = datetime.now(timezone.utc)
+        create_booking("nmr", now - timedelta(hours=1), now + timedelta(hours=1))
+        lab_context = LabContext(
+            scale_mg=500,
+            equipment=["rotovap", "stir_plate", "oil_bath", "condenser", "balance", "nmr"],
+            experience_level="grad",
+            time_budget_hours=8,
+        )
+
+        procedure = generate_procedure(
+            {"source": "placeholder", "target_smiles": "CCO", "steps": []}, lab_context
+        )
+        risk_flags, _ = annotate_risks(procedure, lab_context)
+
+        prefix = "Equipment booked within the next 8 h: nmr"
+        assert any(flag.startswith(prefix) for flag in risk_flags)
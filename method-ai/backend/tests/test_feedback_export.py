@@ -0,0 +1,160 @@
+"""Tests for streaming feedback export."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import FeedbackOutcome
+from app.services.feedback_export import (
+    InvalidCursorError,
+    export_feedback,
+    index_path,
+)
+from app.services.feedback_store import feedback_record, store_feedback_batch
+
+_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+_OUTCOMES = [FeedbackOutcome.SUCCESS, FeedbackOutcome.FAILURE, FeedbackOutcome.PARTIAL]
+
+
+@pytest.fixture
+def stored(monkeypatch: pytest.MonkeyPatch) -> int:
+    """Store 300 records a minute apart, in batches, with a dense index."""
+    monkeypatch.setattr(settings, "feedback_index_interval_bytes", 1024)
+    for batch in range(30):
+        store_feedback_batch(
+            [
+                feedback_record(
+                    request_id=f"{'lab' if index % 2 else 'eln'}-{index}",
+                    edits="Edit",
+                    outcome=_OUTCOMES[index % 3],
+                    timestamp=_START + timedelta(minutes=index),
+                )
+                for index in range(batch * 10, batch * 10 + 10)
+            ]
+        )
+    return 300
+
+
+def _export(**filters) -> tuple[list[dict], dict]:
+    """Run an export, returning its records and trailer."""
+    lines = b"".join(export_feedback(**filters)).decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines[:-1]], json.loads(lines[-1])
+
+
+def _indices(records: list[dict]) -> list[int]:
+    """Record numbers encoded in the request IDs."""
+    return [int(record["request_id"].split("-")[1]) for record in records]
+
+
+class TestExportFeedback:
+    """Tests for export_feedback."""
+
+    def test_exports_everything_without_filters(self, stored):
+        """Test that all records are exported in order, then a trailer."""
+        records, trailer = _export()
+
+        assert _indices(records) == list(range(stored))
+        assert trailer["exported"] == stored
+        assert trailer["complete"] is True
+
+    def test_empty_store(self):
+        """Test that an empty store exports only the trailer."""
+        records, trailer = _export()
+
+        assert records == []
+        assert trailer == {"next_cursor": "0", "exported": 0, "complete": True}
+
+    @pytest.mark.usefixtures("stored")
+    def test_filters_combine(self):
+        """Test outcome, time range and request_id prefix filters together."""
+        records, _ = _export(
+            outcomes=["success", "partial"],
+            since=_START + timedelta(minutes=100),
+            until=_START + timedelta(minutes=119),
+            request_id_prefix="lab-",
+        )
+
+        expected = [index for index in range(100, 120) if index % 2 and index % 3 != 1]
+        assert _indices(records) == expected
+
+    @pytest.mark.usefixtures("stored")
+    def test_naive_times_are_utc(self):
+        """Test that time bounds without a timezone are taken as UTC."""
+        records, _ = _export(
+            since=datetime(2026, 1, 1, 1, 0), until=datetime(2026, 1, 1, 1, 4)
+        )
+
+        assert _indices(records) == [60, 61, 62, 63, 64]
+
+    @pytest.mark.usefixtures("stored")
+    def test_since_seeks_with_index(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that a time range starts reading near its start, not at the top."""
+        import app.services.feedback_export as feedback_export
+
+        parsed = []
+        real_loads = json.loads
+        monkeypatch.setattr(
+            feedback_export.json,
+            "loads",
+            lambda data: parsed.append(data) or real_loads(data),
+        )
+
+        records = list(
+            export_feedback(
+                since=_START + timedelta(minutes=250), until=_START + timedelta(minutes=259)
+            )
+        )
+
+        assert records
+        assert len(parsed) < 150
+
+    def test_rebuilds_missing_index(self, stored):
+        """Test that a time-range export works after the index is lost."""
+        path = index_path(Path(settings.feedback_storage_path))
+        path.unlink()
+
+        records, _ = _export(since=_START + timedelta(minutes=200))
+
+        assert _indices(records) == list(range(200, stored))
+        assert path.exists()
+
+    def test_limit_and_cursor_resume(self, stored):
+        """Test that resuming from the cursor continues where the limit stopped."""
+        first, trailer = _export(outcomes=["failure"], limit=40)
+        assert trailer["complete"] is False
+        assert trailer["exported"] == 40
+
+        rest, final = _export(outcomes=["failure"], cursor=trailer["next_cursor"])
+
+        assert _indices(first + rest) == list(range(1, stored, 3))
+        assert final["complete"] is True
+
+    @pytest.mark.usefixtures("stored")
+    def test_cursor_picks_up_new_records(self):
+        """Test that resuming from a completed export returns only later records."""
+        _, trailer = _export()
+        store_feedback_batch(
+            [
+                feedback_record(
+                    request_id="lab-300",
+                    edits="Edit",
+                    outcome=FeedbackOutcome.UNKNOWN,
+                    timestamp=_START + timedelta(minutes=300),
+                )
+            ]
+        )
+
+        records, _ = _export(cursor=trailer["next_cursor"])
+
+        assert _indices(records) == [300]
+
+    @pytest.mark.usefixtures("stored")
+    @pytest.mark.parametrize("cursor", ["abc", "-1", "1", "99999999"])
+    def test_invalid_cursor_rejected(self, cursor):
+        """Test that malformed, out-of-range and mid-record cursors raise."""
+        with pytest.raises(InvalidCursorError):
+            export_feedback(cursor=cursor)
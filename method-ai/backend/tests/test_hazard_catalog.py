@@ -0,0 +1,95 @@
+"""Tests for hazardous reagent detection."""
+
+from app.models.schemas import LabContext
+from app.services.hazard_catalog import hazard_flags, scan_reaction
+from app.services.procedure_generator import generate_procedure
+from app.services.risk_annotator import annotate_risks
+from app.utils.aho_corasick import AhoCorasick
+
+
+class TestAhoCorasick:
+    """Tests for AhoCorasick."""
+
+    def test_finds_overlapping_matches(self):
+        """Test that every occurrence is found, including nested ones."""
+        automaton = AhoCorasick([("he", "he"), ("she", "she"), ("hers", "hers"), ("his", "his")])
+
+        matches = sorted(automaton.search("ushers"))
+
+        assert matches == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+    def test_token_sequences(self):
+        """Test matching over multi-character tokens."""
+        automaton = AhoCorasick([(["C", "[Li]"], "rli"), (["Cl"], "cl")])
+
+        assert [value for _, _, value in automaton.search(["Cl", "C", "C", "[Li]"])] == [
+            "cl",
+            "rli",
+        ]
+        assert list(automaton.search(["C", "[Na]"])) == []
+
+
+class TestScanReaction:
+    """Tests for scan_reaction."""
+
+    def test_detects_hazard_classes(self):
+        """Test that common hazardous reagents are recognised in any part of a reaction."""
+        assert scan_reaction("CC(=O)Cl.Nc1ccccc1>>CC(=O)Nc1ccccc1") == ("acyl_chloride",)
+        assert scan_reaction("BrCCCC.[Na+].[N-]=[N+]=[N-]>>CCCCN=[N+]=[N-]") == ("azide",)
+        assert scan_reaction("O=Cc1ccccc1>CCCC[Li]>CCCCC(O)c1ccccc1") == ("organolithium",)
+        assert scan_reaction("CC(=O)OC>[Li+].[AlH4-]>CCO") == ("metal_hydride",)
+
+    def test_canonical_spelling_matched(self):
+        """Test that a group written in an unlisted order is found via the canonical form."""
+        assert scan_reaction("ClC(C)=O.OCC>>CCOC(C)=O") == ("acyl_chloride",)
+
+    def test_benign_and_invalid_reactions(self):
+        """Test that ordinary and unparseable reactions raise nothing."""
+        assert scan_reaction("CC(=O)O.CCO>>CC(=O)OCC") == ()
+        assert scan_reaction("not smiles!!>>CCO") == ()
+
+    def test_results_in_catalog_order(self):
+        """Test that several hazards in one reaction are reported in catalog order."""
+        hazards = scan_reaction("O=C(O)c1ccccc1.O=S(Cl)Cl>>O=C(Cl)c1ccccc1")
+
+        assert hazards == ("acyl_chloride", "inorganic_acid_chloride")
+
+    def test_memoized(self):
+        """Test that repeated reactions are answered from the cache."""
+        rxn_smiles = "CC(=O)Cl.OCCC>>CCCOC(C)=O"
+        scan_reaction(rxn_smiles)
+        hits = scan_reaction.cache_info().hits
+
+        scan_reaction(rxn_smiles)
+
+        assert scan_reaction.cache_info().hits == hits + 1
+
+
+class TestHazardFlags:
+    """Tests for hazard_flags and the risk annotator rule."""
+
+    def test_one_flag_per_hazard_listing_steps(self):
+        """Test that a hazard found in several steps gives one flag naming them."""
+        flags = hazard_flags(
+            [(5, "CC(=O)Cl.N>>CC(N)=O"), (9, "CC(=O)Cl.O>>CC(=O)O"), (13, "CCO>>CC=O")]
+        )
+
+        assert len(flags) == 1
+        assert flags[0].startswith("Acyl chloride in steps 5, 9 - ")
+
+    def test_annotate_risks_flags_plan_reactions(self):
+        """Test that hazardous reactions in the plan produce risk flags."""
+        plan = {
+            "source": "ibm_rxn",
+            "steps": [
+                {"rxn_smiles": "CCCCN=[N+]=[N-]>>CCCCN", "confidence": 0.9},
+                {"rxn_smiles": "BrCCCC.[Na+].[N-]=[N+]=[N-]>>CCCCN=[N+]=[N-]", "confidence": 0.9},
+            ],
+        }
+        lab_context = LabContext(scale_mg=500, experience_level="grad", time_budget_hours=8)
+        procedure = generate_procedure(plan=plan, lab_context=lab_context)
+
+        risk_flags, _ = annotate_risks(procedure, lab_context)
+
+        azide_flags = [flag for flag in risk_flags if flag.startswith("Azide in steps ")]
+        assert len(azide_flags) == 1
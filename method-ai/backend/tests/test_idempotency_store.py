@@ -0,0 +1,106 @@
+"""Tests for idempotency store service."""
+
+import asyncio
+
+import pytest
+
+from app.services.idempotency_store import (
+    IdempotencyInProgressError,
+    IdempotencyKeyMismatchError,
+    clear_idempotency_store,
+    run_idempotent,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    """Start every test with an empty store."""
+    clear_idempotency_store()
+    yield
+    clear_idempotency_store()
+
+
+class TestRunIdempotent:
+    """Tests for run_idempotent."""
+
+    async def test_computes_once_and_replays(self):
+        """Test that the second call replays the stored body."""
+        calls = 0
+
+        async def compute() -> bytes:
+            nonlocal calls
+            calls += 1
+            return b'{"n":1}'
+
+        first = await run_idempotent("key-1", "fp", compute)
+        second = await run_idempotent("key-1", "fp", compute)
+
+        assert first == (b'{"n":1}', False)
+        assert second == (b'{"n":1}', True)
+        assert calls == 1
+
+    async def test_concurrent_repeat_waits_for_original(self):
+        """Test that an in-progress key is awaited, not recomputed."""
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute() -> bytes:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return b"done"
+
+        original = asyncio.create_task(run_idempotent("key-2", "fp", compute))
+        await asyncio.sleep(0)
+        repeat = asyncio.create_task(run_idempotent("key-2", "fp", compute))
+        await asyncio.sleep(0.1)
+        release.set()
+
+        assert await original == (b"done", False)
+        assert await repeat == (b"done", True)
+        assert calls == 1
+
+    async def test_fingerprint_mismatch_raises(self):
+        """Test that reusing a key for another body raises."""
+
+        async def compute() -> bytes:
+            return b"x"
+
+        await run_idempotent("key-3", "fp-a", compute)
+
+        with pytest.raises(IdempotencyKeyMismatchError):
+            await run_idempotent("key-3", "fp-b", compute)
+
+    async def test_failed_compute_releases_key(self):
+        """Test that a failure lets a retry run the pipeline again."""
+
+        async def failing() -> bytes:
+            raise RuntimeError("boom")
+
+        async def succeeding() -> bytes:
+            return b"ok"
+
+        with pytest.raises(RuntimeError):
+            await run_idempotent("key-4", "fp", failing)
+
+        assert await run_idempotent("key-4", "fp", succeeding) == (b"ok", False)
+
+    async def test_wait_times_out(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that waiting on a stuck original eventually gives up."""
+        from app.services import idempotency_store
+
+        monkeypatch.setattr(idempotency_store.settings, "idempotency_wait_seconds", 0.1)
+        release = asyncio.Event()
+
+        async def compute() -> bytes:
+            await release.wait()
+            return b"late"
+
+        original = asyncio.create_task(run_idempotent("key-5", "fp", compute))
+        await asyncio.sleep(0)
+
+        with pytest.raises(IdempotencyInProgressError):
+            await run_idempotent("key-5", "fp", compute)
+
+        release.set()
+        await original
@@ -0,0 +1,171 @@
+"""Tests for the lab inventory."""
+
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.models.schemas import LabContext
+from app.services.inventory import (
+    IN_STOCK,
+    LOW,
+    MISSING,
+    check_stock,
+    get_inventory,
+    import_inventory,
+    inventory_flags,
+    prefer_stocked_route,
+    starting_materials,
+)
+from app.services.procedure_generator import generate_procedure
+from app.services.risk_annotator import annotate_risks
+
+SAMPLE_INVENTORY = Path(__file__).parents[2] / "data" / "sample" / "inventory.csv"
+
+LAB_CONTEXT = LabContext(scale_mg=500, experience_level="grad", time_budget_hours=8)
+
+
+def _import_sample() -> int:
+    """Import the sample inventory into the configured store."""
+    return import_inventory([str(SAMPLE_INVENTORY)], settings.inventory_path)
+
+
+class TestImportInventory:
+    """Tests for import_inventory and the stock index."""
+
+    def test_sample_inventory(self):
+        """Test that containers are summed per compound, whatever the spelling."""
+        assert _import_sample() == 9
+
+        stock = check_stock(["c1ccc(N)cc1", "CCN(CC)CC", "OCC", "CC(C)(C)C"])
+
+        assert stock == [
+            ("c1ccc(N)cc1", IN_STOCK, 60000.0),
+            ("CCN(CC)CC", LOW, 40.0),
+            ("OCC", IN_STOCK, 1000000.0),
+            ("CC(C)(C)C", MISSING, 0.0),
+        ]
+
+    def test_reorder_level_overrides_default(self, tmp_path):
+        """Test that a container's reorder level sets when its compound is low."""
+        source = tmp_path / "containers.jsonl"
+        source.write_text(
+            json.dumps({"smiles": "CCO", "quantity_mg": 5000, "reorder_mg": 10000})
+            + "\n"
+            + json.dumps({"smiles": "CO", "quantity_mg": 150})
+            + "\n"
+        )
+
+        import_inventory([str(source)], settings.inventory_path)
+
+        assert check_stock(["CCO", "CO"]) == [("CCO", LOW, 5000.0), ("CO", IN_STOCK, 150.0)]
+
+    def test_merge_and_replace(self, tmp_path):
+        """Test that imports merge by container ID unless replacing."""
+        update = tmp_path / "update.jsonl"
+        update.write_text(
+            json.dumps({"container_id": "C-0005", "smiles": "CCN(CC)CC", "quantity_mg": 5000})
+            + "\n"
+            + json.dumps({"smiles": "not smiles!!", "quantity_mg": 1})
+            + "\n"
+            + json.dumps({"smiles": "CO", "quantity_mg": "lots"})
+            + "\n"
+        )
+        _import_sample()
+
+        assert import_inventory([str(update)], settings.inventory_path) == 1
+        assert check_stock(["CCN(CC)CC", "CCO"]) == [
+            ("CCN(CC)CC", IN_STOCK, 5000.0),
+            ("CCO", IN_STOCK, 1000000.0),
+        ]
+
+        import_inventory([str(update)], settings.inventory_path, replace=True)
+        assert check_stock(["CCO"]) == [("CCO", MISSING, 0.0)]
+
+    def test_no_inventory(self):
+        """Test that stock is unknown before an inventory is imported."""
+        assert get_inventory() is None
+        assert check_stock(["CCO"]) is None
+        assert inventory_flags(["CCO>>CC=O"]) == []
+
+
+class TestStartingMaterials:
+    """Tests for starting_materials."""
+
+    def test_excludes_intermediates(self):
+        """Test that compounds made within the route are not starting materials."""
+        materials = starting_materials(
+            ["OC(=O)c1ccccc1O.CC(=O)Cl>ClCCl>CC(=O)Oc1ccccc1C(=O)O", "CC(=O)O.ClS(Cl)=O>>CC(=O)Cl"]
+        )
+
+        assert materials == ["OC(=O)c1ccccc1O", "ClCCl", "CC(=O)O", "ClS(Cl)=O"]
+
+    def test_one_spelling_per_compound(self):
+        """Test that a compound written two ways is listed once."""
+        assert starting_materials(["CCO.Nc1ccccc1>>CCNc1ccccc1", "OCC>>CC=O"]) == [
+            "CCO",
+            "Nc1ccccc1",
+        ]
+
+
+class TestInventoryInProcedures:
+    """Tests for stock marks, risk flags and route preference."""
+
+    PLAN = {
+        "source": "ibm_rxn",
+        "steps": [
+            {"rxn_smiles": "CC(=O)Cl.Nc1ccccc1>CCN(CC)CC>CC(=O)Nc1ccccc1", "confidence": 0.9}
+        ],
+    }
+
+    def test_materials_step_marks_stock(self):
+        """Test that the materials step lists starting materials by stock status."""
+        _import_sample()
+        plan = {
+            "source": "ibm_rxn",
+            "steps": [{"rxn_smiles": "CC(=O)Cl.NC1CCCCC1>CCN(CC)CC>CC(=O)NC1CCCCC1"}],
+        }
+
+        materials = generate_procedure(plan=plan, lab_context=LAB_CONTEXT)[1]
+
+        assert materials.parameters["in_stock"] == ("CC(=O)Cl",)
+        assert materials.parameters["low_stock"] == ("CCN(CC)CC",)
+        assert materials.parameters["not_in_stock"] == ("NC1CCCCC1",)
+        assert "(1 of 3 starting materials not in stock)" in materials.rationale
+
+    def test_no_stock_marks_without_inventory(self):
+        """Test that the materials step is unchanged when no inventory is imported."""
+        materials = generate_procedure(plan=self.PLAN, lab_context=LAB_CONTEXT)[1]
+
+        assert "in_stock" not in materials.parameters
+        assert materials.rationale == "Confirm all materials are available and appropriate"
+
+    def test_risk_flags(self):
+        """Test that missing and low starting materials are flagged."""
+        _import_sample()
+        plan = {"source": "ibm_rxn", "steps": [{"rxn_smiles": "CC(=O)Cl.NC1CCCCC1>CCN(CC)CC>"}]}
+        procedure = generate_procedure(plan=plan, lab_context=LAB_CONTEXT)
+
+        risk_flags, _ = annotate_risks(procedure, LAB_CONTEXT)
+
+        assert "Not in the lab inventory: NC1CCCCC1 - obtain before starting" in risk_flags
+        assert (
+            "Low in the lab inventory: CCN(CC)CC (40 mg) - confirm quantities suffice"
+            in risk_flags
+        )
+
+    def test_prefers_stocked_route(self):
+        """Test that the route with fewest missing starting materials is chosen."""
+        _import_sample()
+        unstocked = [{"rxn_smiles": "CC(=O)Br.Nc1ccccc1>>CC(=O)Nc1ccccc1"}]
+        stocked = [{"rxn_smiles": "CC(=O)OC(C)=O.Nc1ccccc1>>CC(=O)Nc1ccccc1"}]
+        plan = {"source": "ibm_rxn", "steps": unstocked, "routes": [unstocked, stocked]}
+
+        assert prefer_stocked_route(plan)["steps"] == stocked
+        assert prefer_stocked_route({**plan, "routes": [stocked, unstocked]})["steps"] == stocked
+        assert plan["steps"] == unstocked
+
+    def test_route_order_kept_without_inventory(self):
+        """Test that the planner's choice stands when no inventory is imported."""
+        plan = {"source": "ibm_rxn", "steps": [{"rxn_smiles": "A>>B"}], "routes": [[], []]}
+
+        assert prefer_stocked_route(plan) is plan
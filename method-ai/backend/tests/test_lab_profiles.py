@@ -0,0 +1,124 @@
+"""Tests for stored lab profiles."""
+
+import sqlite3
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import GenerateProcedureRequest, LabContext
+from app.services.lab_profiles import (
+    LabProfileNotFoundError,
+    close_lab_profiles,
+    create_lab_profile,
+    get_lab_profile,
+    update_lab_profile,
+)
+from app.services.pipeline import run_pipeline
+from app.services.procedure_generator import derive_step_values
+from app.services.risk_annotator import evaluate_context_rules
+
+LAB_CONTEXT = LabContext(
+    scale_mg=500,
+    equipment=["rotovap"],
+    purification_methods=["recrystallization"],
+    safety_constraints=["inert_atmosphere_required"],
+    experience_level="undergrad",
+    time_budget_hours=8,
+)
+
+
+class TestLabProfileStore:
+    """Tests for creating, updating and compiling lab profiles."""
+
+    def test_create_and_get(self):
+        """Test that a created profile can be read back."""
+        created = create_lab_profile("Teaching lab", LAB_CONTEXT)
+
+        profile = get_lab_profile(created.lab_profile_id)
+
+        assert profile.name == "Teaching lab"
+        assert profile.version == 1
+        assert profile.lab_context == LAB_CONTEXT
+
+    def test_update_bumps_version(self):
+        """Test that an update replaces the context and bumps the version."""
+        created = create_lab_profile("Teaching lab", LAB_CONTEXT)
+        context = LabContext(**{**LAB_CONTEXT.model_dump(), "experience_level": "postdoc"})
+
+        updated = update_lab_profile(created.lab_profile_id, "Research lab", context)
+
+        assert updated.version == 2
+        assert get_lab_profile(created.lab_profile_id).lab_context.experience_level == "postdoc"
+        assert get_lab_profile(created.lab_profile_id).name == "Research lab"
+
+    def test_unknown_profile(self):
+        """Test that unknown IDs raise LabProfileNotFoundError."""
+        with pytest.raises(LabProfileNotFoundError):
+            get_lab_profile(str(uuid.uuid4()))
+        with pytest.raises(LabProfileNotFoundError):
+            update_lab_profile(str(uuid.uuid4()), "Lab", LAB_CONTEXT)
+
+    def test_compiled_profile_reused(self):
+        """Test that an unchanged profile is not compiled again."""
+        created = create_lab_profile("Teaching lab", LAB_CONTEXT)
+
+        assert get_lab_profile(created.lab_profile_id) is get_lab_profile(created.lab_profile_id)
+
+    def test_update_by_another_worker_invalidates(self):
+        """Test that a version bumped outside this process is picked up."""
+        created = create_lab_profile("Teaching lab", LAB_CONTEXT)
+        context = LabContext(**{**LAB_CONTEXT.model_dump(), "safety_constraints": []})
+        conn = sqlite3.connect(settings.lab_profile_db_path)
+        with conn:
+            conn.execute(
+                "UPDATE lab_profiles SET lab_context = ?, version = version + 1 "
+                "WHERE lab_profile_id = ?",
+                (context.model_dump_json(), created.lab_profile_id),
+            )
+        conn.close()
+
+        profile = get_lab_profile(created.lab_profile_id)
+
+        assert profile.version == 2
+        assert profile.step_values["atmosphere"] == derive_step_values(context)["atmosphere"]
+
+    def test_profiles_persist(self):
+        """Test that profiles outlive the compiled cache and connection."""
+        created = create_lab_profile("Teaching lab", LAB_CONTEXT)
+        close_lab_profiles()
+
+        assert get_lab_profile(created.lab_profile_id).lab_context == LAB_CONTEXT
+
+    def test_precomputed_state(self):
+        """Test that the compiled state matches evaluating the context directly."""
+        profile = create_lab_profile("Teaching lab", LAB_CONTEXT)
+
+        assert dict(profile.risk_rules) == evaluate_context_rules(LAB_CONTEXT)
+        assert profile.step_values == derive_step_values(LAB_CONTEXT)
+
+
+class TestRunPipelineWithProfile:
+    """Tests for generating procedures from a lab profile."""
+
+    def test_matches_inline_context(self):
+        """Test that a profile gives the same output as sending its context."""
+        profile = create_lab_profile("Teaching lab", LAB_CONTEXT)
+        inline = GenerateProcedureRequest(target_smiles="CCO", lab_context=LAB_CONTEXT)
+        by_profile = GenerateProcedureRequest(
+            target_smiles="CCO", lab_profile_id=profile.lab_profile_id
+        )
+
+        expected = run_pipeline(inline, "inline")
+        result = run_pipeline(by_profile, "profile")
+
+        assert result.procedure == expected.procedure
+        assert result.risk_flags == expected.risk_flags
+        assert result.fallback_options == expected.fallback_options
+
+    def test_unknown_profile(self):
+        """Test that the pipeline raises for an unknown profile."""
+        request = GenerateProcedureRequest(target_smiles="CCO", lab_profile_id="missing")
+
+        with pytest.raises(LabProfileNotFoundError):
+            run_pipeline(request, "profile")
@@ -0,0 +1,55 @@
+"""Tests for memory-mapped key/value tables."""
+
+import pytest
+
+from app.utils.mmap_table import MmapTable, write_table
+
+
+class TestMmapTable:
+    """Tests for write_table and MmapTable."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that written entries can be looked up."""
+        path = str(tmp_path / "table.mtbl")
+        write_table(path, [(b"b", b"2"), (b"a", b"1"), (b"c", b"")])
+
+        with MmapTable(path) as table:
+            assert len(table) == 3
+            assert bytes(table.get(b"a")) == b"1"
+            assert bytes(table.get(b"b")) == b"2"
+            assert bytes(table.get(b"c")) == b""
+            assert table.get(b"d") is None
+            assert b"a" in table
+
+    def test_prefix_scan(self, tmp_path):
+        """Test that items() yields only keys under the prefix, in order."""
+        path = str(tmp_path / "table.mtbl")
+        write_table(path, [(b"x:2", b"b"), (b"x:1", b"a"), (b"y:1", b"c"), (b"w", b"d")])
+
+        with MmapTable(path) as table:
+            scanned = [(key, bytes(value)) for key, value in table.items(b"x:")]
+
+        assert scanned == [(b"x:1", b"a"), (b"x:2", b"b")]
+
+    def test_empty_table(self, tmp_path):
+        """Test that an empty table opens and finds nothing."""
+        path = str(tmp_path / "table.mtbl")
+        write_table(path, [])
+
+        with MmapTable(path) as table:
+            assert len(table) == 0
+            assert table.get(b"a") is None
+            assert list(table.items()) == []
+
+    def test_duplicate_keys_rejected(self, tmp_path):
+        """Test that duplicate keys are an error."""
+        with pytest.raises(ValueError):
+            write_table(str(tmp_path / "table.mtbl"), [(b"a", b"1"), (b"a", b"2")])
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a non-table file is rejected."""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a table at all")
+
+        with pytest.raises(ValueError):
+            MmapTable(str(path))
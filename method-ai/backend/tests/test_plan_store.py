@@ -0,0 +1,112 @@
+"""Tests for the content-addressed plan store."""
+
+import sqlite3
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import GenerateProcedureRequest, LabContext
+from app.services.pipeline import resolve_plan, run_pipeline
+from app.services.plan_store import (
+    PlanNotFoundError,
+    close_plan_store,
+    get_plan_steps,
+    store_plan,
+)
+from app.utils.smiles import canonicalize_smiles
+
+STEPS = [
+    {"rxn_smiles": "CC(=O)Cl.OCC>>CC(=O)OCC", "confidence": 0.9, "notes": None},
+    {"rxn_smiles": "CC(=O)O.ClS(Cl)=O>>CC(=O)Cl", "confidence": 0.8, "notes": "Esterify"},
+]
+
+LAB_CONTEXT = LabContext(scale_mg=500, experience_level="grad", time_budget_hours=8)
+
+
+class TestStorePlan:
+    """Tests for store_plan and get_plan_steps."""
+
+    def test_round_trip(self):
+        """Test that stored steps are returned unchanged."""
+        plan_id, created = store_plan(STEPS)
+
+        assert created
+        assert len(plan_id) == 64
+        assert list(get_plan_steps(plan_id)) == STEPS
+
+    def test_identical_plans_deduplicated(self):
+        """Test that the same steps, in any key order, get the same ID once."""
+        plan_id, _ = store_plan(STEPS)
+        reordered = [dict(reversed(list(step.items()))) for step in STEPS]
+
+        assert store_plan(reordered) == (plan_id, False)
+        close_plan_store()
+        assert store_plan(STEPS) == (plan_id, False)
+
+        conn = sqlite3.connect(settings.plan_store_path)
+        assert conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0] == 1
+        conn.close()
+
+    def test_different_plans_get_different_ids(self):
+        """Test that any change to the steps changes the ID."""
+        plan_id, _ = store_plan(STEPS)
+        changed = [{**STEPS[0], "confidence": 0.5}, STEPS[1]]
+
+        assert store_plan(changed)[0] != plan_id
+        assert store_plan(STEPS[:1])[0] != plan_id
+
+    def test_decoded_steps_reused(self):
+        """Test that a plan is decoded once per process."""
+        plan_id, _ = store_plan(STEPS)
+        close_plan_store()
+
+        assert get_plan_steps(plan_id) is get_plan_steps(plan_id)
+
+    def test_unknown_plan(self):
+        """Test that unknown IDs raise PlanNotFoundError."""
+        with pytest.raises(PlanNotFoundError):
+            get_plan_steps("0" * 64)
+
+
+class TestPipelineWithStoredPlan:
+    """Tests for generating procedures from a stored plan."""
+
+    def test_resolve_plan(self):
+        """Test that a plan_id resolves to the stored steps."""
+        plan_id, _ = store_plan(STEPS)
+        request = GenerateProcedureRequest(
+            target_smiles="CC(=O)OCC", lab_context=LAB_CONTEXT, plan_id=plan_id
+        )
+
+        plan = resolve_plan(request, "stored")
+
+        assert plan["source"] == "user_provided"
+        assert plan["target_smiles"] == canonicalize_smiles("CC(=O)OCC")
+        assert list(plan["steps"]) == STEPS
+
+    def test_matches_inline_plan(self):
+        """Test that a stored plan gives the same output as sending it inline."""
+        plan_id, _ = store_plan(STEPS)
+        inline = GenerateProcedureRequest(
+            target_smiles="CC(=O)OCC",
+            lab_context=LAB_CONTEXT,
+            retrosynthesis_plan={"steps": STEPS},
+        )
+        stored = GenerateProcedureRequest(
+            target_smiles="CC(=O)OCC", lab_context=LAB_CONTEXT, plan_id=plan_id
+        )
+
+        expected = run_pipeline(inline, "inline")
+        result = run_pipeline(stored, "stored")
+
+        assert result.procedure == expected.procedure
+        assert result.risk_flags == expected.risk_flags
+
+    def test_unknown_plan(self):
+        """Test that the pipeline raises for an unknown plan."""
+        request = GenerateProcedureRequest(
+            target_smiles="CCO", lab_context=LAB_CONTEXT, plan_id="missing"
+        )
+
+        with pytest.raises(PlanNotFoundError):
+            run_pipeline(request, "stored")
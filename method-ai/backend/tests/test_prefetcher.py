@@ -0,0 +1,240 @@
+"""Tests for background plan prefetcher."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.admission import GENERATE_STAGE, admit, get_stage, reset_admission
+from app.services.prefetcher import (
+    TargetHistory,
+    _RateBudget,
+    clear_prefetch_state,
+    prefetch_once,
+    prefetch_stats,
+    record_target_request,
+    seed_from_feedback,
+    target_history,
+)
+from app.services.retrosynthesis_adapter import cached_plan_ttls, get_retrosynthesis_plan
+
+
+@pytest.fixture(autouse=True)
+def prefetch_settings(monkeypatch: pytest.MonkeyPatch):
+    """Configure RXN and an unthrottled prefetcher with empty history."""
+    monkeypatch.setattr(settings, "rxn_api_key", "test-key")
+    monkeypatch.setattr(settings, "rxn_requests_per_minute", 1e9)
+    monkeypatch.setattr(settings, "prefetch_rxn_share", 1.0)
+    monkeypatch.setattr(settings, "prefetch_min_score", 1.5)
+    clear_prefetch_state()
+    reset_admission()
+    yield
+    clear_prefetch_state()
+    reset_admission()
+
+
+def _rxn_plan(target_smiles: str) -> dict:
+    """Plan as returned by RXN."""
+    return {"source": "ibm_rxn", "target_smiles": target_smiles, "steps": []}
+
+
+class TestTargetHistory:
+    """Tests for TargetHistory."""
+
+    def test_top_orders_by_score(self):
+        """Test that the most requested targets come first."""
+        history = TargetHistory(half_life_seconds=3600, max_targets=10)
+        for key, count in (("A", 1), ("B", 3), ("C", 2)):
+            for _ in range(count):
+                history.record(key)
+
+        assert [key for key, _ in history.top(2)] == ["B", "C"]
+        assert [key for key, _ in history.top(10, min_score=1.5)] == ["B", "C"]
+
+    def test_old_requests_decay(self):
+        """Test that a request one half-life ago counts half."""
+        history = TargetHistory(half_life_seconds=3600, max_targets=10)
+        history.record("A", age_seconds=3600)
+
+        assert history.top(1)[0][1] == pytest.approx(0.5, rel=1e-3)
+
+    def test_prunes_coldest_when_full(self):
+        """Test that the history stays bounded, keeping hot targets."""
+        history = TargetHistory(half_life_seconds=3600, max_targets=5)
+        for _ in range(3):
+            history.record("hot")
+        for index in range(10):
+            history.record(f"cold-{index}")
+
+        assert len(history) <= 5
+        assert history.top(1)[0][0] == "hot"
+
+
+class TestSeedFromFeedback:
+    """Tests for seed_from_feedback."""
+
+    def test_counts_records_with_targets(self, tmp_path):
+        """Test that feedback naming a target makes it hot."""
+        now = datetime.now(timezone.utc)
+        records = [
+            {"timestamp": now.isoformat(), "request_id": "r1", "target_smiles": "CCO"},
+            {"timestamp": now.isoformat(), "request_id": "r2", "target_smiles": "OCC"},
+            {"timestamp": (now - timedelta(days=1)).isoformat(), "request_id": "r3"},
+        ]
+        path = tmp_path / "feedback.jsonl"
+        path.write_text("".join(json.dumps(record) + "\n" for record in records) + "not json\n")
+
+        assert seed_from_feedback(str(path)) == 2
+        assert target_history.top(10, min_score=1.5) == [("CCO", pytest.approx(2.0, rel=1e-3))]
+
+
+class TestPrefetchOnce:
+    """Tests for prefetch_once."""
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_refreshes_hot_uncached_targets(self, mock_get_rxn):
+        """Test that hot targets get cached plans and cold ones do not."""
+        mock_get_rxn.side_effect = _rxn_plan
+        for _ in range(3):
+            record_target_request("CCO")
+        record_target_request("CCN")
+
+        assert await prefetch_once() == 1
+
+        mock_get_rxn.assert_called_once_with("CCO")
+        assert get_retrosynthesis_plan("OCC")["source"] == "ibm_rxn"
+        assert prefetch_stats()["refreshed"] == 1
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_skips_fresh_cached_plans(self, mock_get_rxn):
+        """Test that plans far from expiry are left alone."""
+        mock_get_rxn.side_effect = _rxn_plan
+        for _ in range(3):
+            get_retrosynthesis_plan("CCO")
+            record_target_request("CCO")
+
+        assert await prefetch_once() == 0
+        assert mock_get_rxn.call_count == 1
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_refreshes_plans_about_to_expire(
+        self, mock_get_rxn, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a plan expiring within the refresh window is renewed."""
+        mock_get_rxn.side_effect = _rxn_plan
+        monkeypatch.setattr(
+            settings, "prefetch_refresh_ahead_seconds", settings.plan_cache_ttl_seconds + 1
+        )
+        for _ in range(3):
+            get_retrosynthesis_plan("CCO")
+            record_target_request("CCO")
+
+        assert await prefetch_once() == 1
+        assert mock_get_rxn.call_count == 2
+        assert "CCO" in cached_plan_ttls()
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_stops_when_busy(self, mock_get_rxn):
+        """Test that interactive requests in flight pause prefetching."""
+        mock_get_rxn.side_effect = _rxn_plan
+        for _ in range(3):
+            record_target_request("CCO")
+        get_stage(GENERATE_STAGE).active = 1
+
+        assert await prefetch_once() == 0
+        mock_get_rxn.assert_not_called()
+        assert prefetch_stats()["skipped_busy"] == 1
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_stops_when_busy_without_admission(
+        self, mock_get_rxn, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that requests in flight pause prefetching with admission control off."""
+        mock_get_rxn.side_effect = _rxn_plan
+        monkeypatch.setattr(settings, "admission_enabled", False)
+        for _ in range(3):
+            record_target_request("CCO")
+
+        async with admit(GENERATE_STAGE):
+            assert await prefetch_once() == 0
+        mock_get_rxn.assert_not_called()
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_respects_rate_budget(self, mock_get_rxn, monkeypatch: pytest.MonkeyPatch):
+        """Test that the prefetcher's share of the RXN budget caps its calls."""
+        mock_get_rxn.side_effect = _rxn_plan
+        monkeypatch.setattr(settings, "rxn_requests_per_minute", 5.0)
+        monkeypatch.setattr(settings, "prefetch_rxn_share", 0.2)
+        for target in ("CCO", "CCN", "CCC"):
+            for _ in range(3):
+                record_target_request(target)
+
+        assert await prefetch_once() == 1
+        assert await prefetch_once() == 0
+        assert mock_get_rxn.call_count == 1
+
+    def test_rate_budget_split_between_workers(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that each API worker gets its part of the prefetcher's share."""
+        monkeypatch.setattr(settings, "rxn_requests_per_minute", 60.0)
+        monkeypatch.setattr(settings, "prefetch_rxn_share", 0.5)
+        monkeypatch.setattr(settings, "api_workers", 3)
+        budget = _RateBudget()
+
+        with patch("app.services.prefetcher.time") as mock_time:
+            # 30 calls a minute split three ways: one call every 6 s per worker
+            mock_time.monotonic.side_effect = [100.0, 105.9, 106.0]
+            assert [budget.try_acquire() for _ in range(3)] == [True, False, True]
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_claimed_targets_skipped(
+        self, mock_get_rxn, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test that a target refreshed by any worker this interval is not fetched again."""
+        mock_get_rxn.side_effect = _rxn_plan
+        monkeypatch.setattr(
+            settings, "prefetch_refresh_ahead_seconds", settings.plan_cache_ttl_seconds + 1
+        )
+        for _ in range(3):
+            record_target_request("CCO")
+
+        assert await prefetch_once() == 1
+        assert await prefetch_once() == 0
+        mock_get_rxn.assert_called_once_with("CCO")
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_failed_refresh_counted(self, mock_get_rxn):
+        """Test that an RXN failure is counted and does not stop the round."""
+        mock_get_rxn.side_effect = [Exception("API Error"), _rxn_plan("CCN")]
+        for target in ("CCO", "CCN"):
+            for _ in range(3):
+                record_target_request(target)
+
+        assert await prefetch_once() == 1
+        assert prefetch_stats()["failed"] == 1
+
+
+class TestPrefetchEndpoint:
+    """Tests for the prefetch stats endpoint."""
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    async def test_reports_counters(self, mock_get_rxn):
+        """Test that the endpoint reports this worker's prefetch counters."""
+        mock_get_rxn.side_effect = _rxn_plan
+        for _ in range(3):
+            record_target_request("CCO")
+        await prefetch_once()
+
+        response = TestClient(app).get("/v1/prefetch")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "enabled": True,
+            "refreshed": 1,
+            "failed": 0,
+            "skipped_busy": 0,
+            "tracked_targets": 1,
+        }
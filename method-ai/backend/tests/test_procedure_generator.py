@@ -3,7 +3,11 @@
 import pytest
 
 from app.models.schemas import ExperienceLevel, LabContext
-from app.services.procedure_generator import generate_procedure
+from app.services.procedure_generator import (
+    generate_procedure,
+    iter_procedure,
+    regenerate_procedure,
+)
 
 
 @pytest.fixture
@@ -45,6 +49,19 @@ def rxn_plan() -> dict:
     }
 
 
+@pytest.fixture
+def multistep_plan() -> dict:
+    """Create a two-step plan, target-forming reaction first."""
+    return {
+        "source": "ibm_rxn",
+        "target_smiles": "CC(=O)Nc1ccc(O)cc1",
+        "steps": [
+            {"rxn_smiles": "Nc1ccc(O)cc1.CC(=O)Cl>>CC(=O)Nc1ccc(O)cc1", "confidence": 0.9},
+            {"rxn_smiles": "O=[N+]([O-])c1ccc(O)cc1>>Nc1ccc(O)cc1", "confidence": 0.4},
+        ],
+    }
+
+
 class TestGenerateProcedure:
     """Tests for generate_procedure function."""
 
@@ -186,3 +203,93 @@ class TestGenerateProcedure:
         first_step = procedure[0]
         ppe = first_step.parameters.get("ppe", [])
         assert "supervisor_notification" not in ppe
+
+
+class TestReactionBlocks:
+    """Tests for per-reaction procedure blocks."""
+
+    def test_one_block_per_reaction(
+        self, multistep_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that each reaction gets its own block and an intermediate isolation."""
+        procedure = generate_procedure(plan=multistep_plan, lab_context=sample_lab_context)
+
+        actions = [step.action for step in procedure]
+        assert sum("Combine reagents" in action for action in actions) == 2
+        assert sum("workup" in action.lower() for action in actions) == 2
+        assert any("Isolate intermediate" in action for action in actions)
+        assert [step.step_number for step in procedure] == list(range(1, len(procedure) + 1))
+
+    def test_blocks_in_forward_order(
+        self, multistep_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that the last retrosynthesis step is run first."""
+        procedure = generate_procedure(plan=multistep_plan, lab_context=sample_lab_context)
+
+        setups = [step for step in procedure if "Combine reagents" in step.action]
+        assert setups[0].action.startswith("Stage 1/2:")
+        assert setups[0].parameters["products"] == ("Nc1ccc(O)cc1",)
+        assert setups[1].parameters["products"] == ("CC(=O)Nc1ccc(O)cc1",)
+
+    def test_low_confidence_reaction_flagged(
+        self, multistep_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that low-confidence reactions carry a warning."""
+        procedure = generate_procedure(plan=multistep_plan, lab_context=sample_lab_context)
+
+        setups = [step for step in procedure if "Combine reagents" in step.action]
+        assert "Low predicted confidence" in (setups[0].rationale or "")
+        assert "Low predicted confidence" not in (setups[1].rationale or "")
+
+    def test_single_reaction_keeps_ten_steps(
+        self, rxn_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that a one-reaction plan has no stage labels."""
+        procedure = generate_procedure(plan=rxn_plan, lab_context=sample_lab_context)
+
+        assert len(procedure) == 10
+        assert not any(step.action.startswith("Stage") for step in procedure)
+        assert procedure[4].parameters["reaction_smiles"] == rxn_plan["steps"][0]["rxn_smiles"]
+
+    def test_iter_procedure_is_lazy(
+        self, multistep_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that steps are produced on demand."""
+        steps = iter_procedure(multistep_plan, sample_lab_context)
+
+        assert next(steps).step_number == 1
+        assert next(steps).step_number == 2
+
+    def test_memoized_blocks_are_immutable(
+        self, rxn_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that shared memoized parameters cannot be edited in place."""
+        first = generate_procedure(plan=rxn_plan, lab_context=sample_lab_context)
+
+        with pytest.raises(TypeError):
+            first[4].parameters["reactants"] = ["O"]
+        assert isinstance(first[4].parameters["reactants"], tuple)
+
+        second = generate_procedure(plan=rxn_plan, lab_context=sample_lab_context)
+        assert second[4].parameters is first[4].parameters
+
+
+class TestRegenerateProcedure:
+    """Tests for regenerate_procedure."""
+
+    def test_reuses_steps_independent_of_changed_fields(
+        self, multistep_plan: dict, sample_lab_context: LabContext
+    ):
+        """Test that only dependent steps are rebuilt, and match a full rebuild."""
+        previous = generate_procedure(plan=multistep_plan, lab_context=sample_lab_context)
+        edited = sample_lab_context.model_copy(
+            update={"safety_constraints": ["inert_atmosphere_required"]}
+        )
+
+        steps = regenerate_procedure(multistep_plan, edited, previous, ["safety_constraints"])
+
+        assert steps[0] is previous[0]
+        assert steps[-1] is previous[-1]
+        assert steps == generate_procedure(plan=multistep_plan, lab_context=edited)
+        setups = [step for step in steps if "Combine reagents" in step.action]
+        assert all(step.parameters["atmosphere"] == "inert_gas" for step in setups)
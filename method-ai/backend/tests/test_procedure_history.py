@@ -0,0 +1,135 @@
+"""Tests for the procedure version history."""
+
+import json
+import sqlite3
+
+import pytest
+
+from app.core.config import settings
+from app.services.procedure_history import (
+    ProcedureVersionNotFoundError,
+    get_version,
+    list_versions,
+    record_version,
+)
+
+
+def _document(scale_mg: float, steps: int = 10, flags: tuple[str, ...] = ()) -> dict:
+    """Build a version document whose step 2 depends on the scale."""
+    procedure = [
+        {"step_number": i + 1, "action": f"Step {i + 1}", "parameters": {}, "rationale": None}
+        for i in range(steps)
+    ]
+    if steps > 1:
+        procedure[1]["parameters"] = {"scale": f"{scale_mg}mg", "quantities": (("CCO", 1.0),)}
+    return {
+        "lab_context": {"scale_mg": scale_mg},
+        "procedure": procedure,
+        "risk_flags": list(flags),
+        "fallback_options": [],
+        "citations": [],
+    }
+
+
+def _payload_sizes(request_id: str) -> list[int]:
+    """Stored payload size of each version, oldest first."""
+    conn = sqlite3.connect(settings.procedure_history_path)
+    rows = conn.execute(
+        "SELECT length(payload) FROM procedure_versions WHERE request_id = ? ORDER BY version",
+        (request_id,),
+    ).fetchall()
+    conn.close()
+    return [size for (size,) in rows]
+
+
+class TestRecordVersion:
+    """Tests for record_version and get_version."""
+
+    def test_every_version_readable(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that each version reads back as saved, across several snapshots."""
+        monkeypatch.setattr(settings, "procedure_history_snapshot_interval", 4)
+        documents = [_document(scale, flags=("Large",) * (scale > 5)) for scale in range(1, 12)]
+        for document in documents:
+            record_version("r1", document, ["scale_mg"])
+
+        for version, document in enumerate(documents, start=1):
+            info, stored = get_version("r1", version)
+            assert info.version == version
+            assert info.changed_fields == ("scale_mg",)
+            assert stored == json.loads(json.dumps(document))
+
+    def test_latest_version(self):
+        """Test that the latest version is returned without a version number."""
+        record_version("r1", _document(1))
+        record_version("r1", _document(2))
+
+        info, document = get_version("r1")
+
+        assert info.version == 2
+        assert document["lab_context"] == {"scale_mg": 2}
+
+    def test_steps_added_and_removed(self):
+        """Test deltas that change the number of steps."""
+        for steps in (5, 8, 3, 6):
+            record_version("r1", _document(1, steps=steps))
+
+        for version, steps in enumerate((5, 8, 3, 6), start=1):
+            document = get_version("r1", version)[1]
+            assert [step["step_number"] for step in document["procedure"]] == list(
+                range(1, steps + 1)
+            )
+
+    def test_deltas_grow_with_edit_size(self):
+        """Test that a small edit stores much less than a snapshot."""
+        record_version("r1", _document(1, steps=50))
+        record_version("r1", _document(2, steps=50))
+
+        snapshot, delta = _payload_sizes("r1")
+        assert delta * 10 < snapshot
+
+    def test_snapshot_interval(self, monkeypatch: pytest.MonkeyPatch):
+        """Test that a full snapshot is stored every interval versions."""
+        monkeypatch.setattr(settings, "procedure_history_snapshot_interval", 3)
+        for scale in range(1, 8):
+            record_version("r1", _document(scale))
+
+        versions, _ = list_versions("r1")
+
+        assert [info.version for info in versions if info.snapshot] == [7, 4, 1]
+
+    def test_histories_are_separate(self):
+        """Test that versions are numbered per procedure."""
+        assert record_version("r1", _document(1)) == 1
+        assert record_version("r2", _document(2)) == 1
+        assert record_version("r1", _document(3)) == 2
+
+        assert get_version("r2")[1]["lab_context"] == {"scale_mg": 2}
+
+    def test_unknown_version(self):
+        """Test that unknown procedures and versions raise."""
+        record_version("r1", _document(1))
+
+        for request_id, version in (("r2", None), ("r1", 2), ("r1", 0)):
+            with pytest.raises(ProcedureVersionNotFoundError):
+                get_version(request_id, version)
+
+
+class TestListVersions:
+    """Tests for list_versions."""
+
+    def test_keyset_pages(self):
+        """Test that pages follow each other newest first without gaps."""
+        for scale in range(1, 8):
+            record_version("r1", _document(scale))
+
+        first, cursor = list_versions("r1", limit=3)
+        second, cursor = list_versions("r1", before=cursor, limit=3)
+        third, cursor = list_versions("r1", before=cursor, limit=3)
+
+        assert [info.version for info in first + second + third] == [7, 6, 5, 4, 3, 2, 1]
+        assert cursor is None
+
+    def test_unknown_procedure(self):
+        """Test that a procedure without versions raises."""
+        with pytest.raises(ProcedureVersionNotFoundError):
+            list_versions("missing")
@@ -0,0 +1,105 @@
+"""Tests for the Bloom filter and the registry of issued request IDs."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services.request_registry import RequestRegistry
+from app.utils.bloom import BloomFilter, bloom_parameters, create_bloom_filter
+
+
+class TestBloomFilter:
+    """Tests for create_bloom_filter and BloomFilter."""
+
+    def test_no_false_negatives(self, tmp_path):
+        """Test that every added key is reported present."""
+        path = str(tmp_path / "keys.bloom")
+        keys = [f"key-{index}".encode() for index in range(2000)]
+
+        with create_bloom_filter(path, capacity=2000, error_rate=0.01) as bloom:
+            assert [bloom.add(key) for key in keys[:3]] == [False, False, False]
+            for key in keys[3:]:
+                bloom.add(key)
+
+            assert all(key in bloom for key in keys)
+            assert bloom.add(keys[0]) is True
+
+    def test_false_positive_rate_near_target(self, tmp_path):
+        """Test that absent keys are rarely reported present at capacity."""
+        path = str(tmp_path / "keys.bloom")
+        with create_bloom_filter(path, capacity=5000, error_rate=0.01) as bloom:
+            for index in range(5000):
+                bloom.add(f"in-{index}".encode())
+
+            false_positives = sum(f"out-{index}".encode() in bloom for index in range(20000))
+
+        assert false_positives / 20000 < 0.02
+
+    def test_persists_across_reopen(self, tmp_path):
+        """Test that keys and count survive closing and mapping the file again."""
+        path = str(tmp_path / "keys.bloom")
+        with create_bloom_filter(path, capacity=100, error_rate=0.01) as bloom:
+            bloom.add(b"a")
+            bloom.add(b"b")
+
+        with BloomFilter(path) as bloom:
+            assert b"a" in bloom
+            assert b"b" in bloom
+            assert len(bloom) == 2
+
+    def test_parameters(self):
+        """Test the textbook sizing: ~9.6 bits and 7 probes per key at 1%."""
+        bits, hashes = bloom_parameters(1000000, 0.01)
+
+        assert 9500000 < bits < 9700000
+        assert hashes == 7
+        with pytest.raises(ValueError):
+            bloom_parameters(0, 0.01)
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a non-filter file is rejected."""
+        path = tmp_path / "other.bloom"
+        path.write_bytes(b"not a bloom filter at all")
+
+        with pytest.raises(ValueError):
+            BloomFilter(str(path))
+
+
+class TestRequestRegistry:
+    """Tests for RequestRegistry."""
+
+    def test_registered_ids_are_known(self, tmp_path):
+        """Test that registered IDs are found and others are not."""
+        registry = RequestRegistry(str(tmp_path / "ids.sqlite3"), capacity=1000, error_rate=0.01)
+        registry.register("req-1")
+        registry.register("req-1")
+
+        assert registry.contains("req-1")
+        assert not registry.contains("req-2")
+        registry.close()
+
+    def test_filter_answers_unknown_ids_without_sqlite(self, tmp_path):
+        """Test that IDs the filter rules out never reach the exact set."""
+        registry = RequestRegistry(str(tmp_path / "ids.sqlite3"), capacity=1000, error_rate=0.001)
+        registry.register("req-1")
+
+        with patch.object(registry, "_connection") as mock_connection:
+            assert not any(registry.contains(f"unknown-{index}") for index in range(100))
+
+        assert mock_connection.call_count <= 1
+        registry.close()
+
+    def test_filter_rebuilt_from_exact_set(self, tmp_path):
+        """Test that a lost filter is rebuilt from the SQLite set on open."""
+        path = tmp_path / "ids.sqlite3"
+        registry = RequestRegistry(str(path), capacity=1000, error_rate=0.01)
+        for index in range(50):
+            registry.register(f"req-{index}")
+        registry.close()
+        path.with_suffix(".bloom").unlink()
+
+        reopened = RequestRegistry(str(path), capacity=1000, error_rate=0.01)
+
+        assert all(reopened.contains(f"req-{index}") for index in range(50))
+        assert path.with_suffix(".bloom").exists()
+        reopened.close()
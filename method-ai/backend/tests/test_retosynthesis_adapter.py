@@ -4,10 +4,18 @@ Note: These tests only test the fallback path unless RXN_API_KEY is set.
 """
 
 import os
-from unittest.mock import MagicMock, patch
+import threading
+import time
+from unittest.mock import patch
 
 import pytest
 
+from app.core.deadline import (
+    PLAN_PLACEHOLDER,
+    PLAN_RXN_TIMEOUT,
+    PLAN_SIMILAR_TARGET,
+    Deadline,
+)
 from app.services.retrosynthesis_adapter import (
     _get_placeholder_plan,
     _normalize_rxn_response,
@@ -76,6 +84,20 @@ class TestNormalizeRxnResponse:
         assert result["steps"][0]["rxn_smiles"] == "A>>B"
         assert result["steps"][0]["confidence"] == 0.9
 
+    def test_normalize_keeps_alternative_routes(self):
+        """Test that every pathway is kept when RXN proposes several."""
+        rxn_response = {
+            "retrosynthetic_paths": [
+                {"reactions": [{"rxn_smiles": "A>>C", "confidence": 0.9}]},
+                {"reactions": [{"rxn_smiles": "B>>C", "confidence": 0.7}]},
+            ]
+        }
+
+        result = _normalize_rxn_response("CCO", rxn_response)
+
+        assert result["steps"][0]["rxn_smiles"] == "A>>C"
+        assert [route[0]["rxn_smiles"] for route in result["routes"]] == ["A>>C", "B>>C"]
+
     def test_normalize_with_empty_paths(self):
         """Test normalization with empty paths list."""
         rxn_response = {"retrosynthetic_paths": []}
@@ -136,6 +158,125 @@ class TestGetRetrosynthesisPlan:
         assert plan["source"] == "ibm_rxn"
         mock_get_rxn.assert_called_once_with("CCO")
 
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    @patch("app.services.retrosynthesis_adapter.settings")
+    def test_equivalent_smiles_share_cached_plan(self, mock_settings, mock_get_rxn):
+        """Test that equivalent spellings of a target hit the plan cache."""
+        mock_settings.rxn_api_key = "test-key"
+        mock_get_rxn.return_value = {
+            "source": "ibm_rxn",
+            "target_smiles": "CCO",
+            "steps": [{"rxn_smiles": "A>>B", "confidence": 0.9, "notes": ""}],
+        }
+
+        get_retrosynthesis_plan("CCO")
+        plan = get_retrosynthesis_plan("C(O)C")
+
+        mock_get_rxn.assert_called_once_with("CCO")
+        assert plan["source"] == "ibm_rxn"
+        assert plan["target_smiles"] == "C(O)C"
+        assert plan["steps"][0]["rxn_smiles"] == "A>>B"
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    @patch("app.services.retrosynthesis_adapter.settings")
+    def test_placeholder_fallback_not_cached(self, mock_settings, mock_get_rxn):
+        """Test that a failed RXN call is retried on the next request."""
+        mock_settings.rxn_api_key = "test-key"
+        mock_get_rxn.side_effect = Exception("API Error")
+
+        get_retrosynthesis_plan("CCO")
+        get_retrosynthesis_plan("CCO")
+
+        assert mock_get_rxn.call_count == 2
+
+
+class TestGetRetrosynthesisPlanWithDeadline:
+    """Tests for plan lookup under a request deadline."""
+
+    @pytest.fixture
+    def mock_settings(self):
+        """Settings with RXN configured and small deadline budgets."""
+        with patch("app.services.retrosynthesis_adapter.settings") as mock_settings:
+            mock_settings.rxn_api_key = "test-key"
+            mock_settings.similarity_reuse_enabled = True
+            mock_settings.similarity_reuse_threshold = 0.95
+            mock_settings.deadline_similarity_threshold = 0.6
+            mock_settings.deadline_rxn_min_seconds = 0.05
+            mock_settings.deadline_generation_reserve_seconds = 0.01
+            yield mock_settings
+
+    @pytest.mark.usefixtures("mock_settings")
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    def test_skips_rxn_without_enough_time(self, mock_get_rxn):
+        """Test that a tight deadline uses the placeholder without calling RXN."""
+        deadline = Deadline(0.01)
+
+        plan = get_retrosynthesis_plan("CCO", deadline)
+
+        assert plan["source"] == "placeholder"
+        assert deadline.degradations == [PLAN_PLACEHOLDER]
+        mock_get_rxn.assert_not_called()
+
+    @pytest.mark.usefixtures("mock_settings")
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    def test_slow_rxn_call_is_abandoned_and_cached(self, mock_get_rxn):
+        """Test that an RXN call past the deadline degrades, then caches its plan."""
+        finished = threading.Event()
+
+        def slow_rxn(target_smiles: str) -> dict:
+            time.sleep(0.2)
+            return {"source": "ibm_rxn", "target_smiles": target_smiles, "steps": []}
+
+        mock_get_rxn.side_effect = slow_rxn
+        deadline = Deadline(0.1)
+
+        started = time.monotonic()
+        plan = get_retrosynthesis_plan("CCO", deadline)
+
+        assert time.monotonic() - started < 0.2
+        assert plan["source"] == "placeholder"
+        assert deadline.degradations == [PLAN_RXN_TIMEOUT, PLAN_PLACEHOLDER]
+
+        for _ in range(50):
+            if get_retrosynthesis_plan("CCO", Deadline(0.01))["source"] == "ibm_rxn":
+                finished.set()
+                break
+            time.sleep(0.02)
+        assert finished.is_set()
+        assert mock_get_rxn.call_count == 1
+
+    @pytest.mark.usefixtures("mock_settings")
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    def test_degrades_to_looser_similar_target(self, mock_get_rxn):
+        """Test that a tight deadline accepts a less similar neighbour's plan."""
+        first = "CCCCOC(=O)c1ccc(Cl)cc1NC(=O)C"
+        mock_get_rxn.return_value = {
+            "source": "ibm_rxn",
+            "target_smiles": first,
+            "steps": [{"rxn_smiles": "A>>B", "confidence": 0.9, "notes": ""}],
+        }
+        get_retrosynthesis_plan(first)
+        deadline = Deadline(0.01)
+
+        # An isomer with the acetamide moved: too far for normal reuse
+        plan = get_retrosynthesis_plan("CCCCOC(=O)c1ccc(Cl)c(NC(C)=O)c1", deadline)
+
+        assert plan["source"] == "similar_target"
+        assert deadline.degradations == [PLAN_SIMILAR_TARGET]
+        assert mock_get_rxn.call_count == 1
+
+    @pytest.mark.usefixtures("mock_settings")
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    def test_generous_deadline_calls_rxn(self, mock_get_rxn):
+        """Test that RXN is used normally when there is enough time."""
+        mock_get_rxn.return_value = {"source": "ibm_rxn", "target_smiles": "CCO", "steps": []}
+        deadline = Deadline(5.0)
+
+        plan = get_retrosynthesis_plan("CCO", deadline)
+
+        assert plan["source"] == "ibm_rxn"
+        assert deadline.degradations == []
+
 
 class TestIsRxnConfigured:
     """Tests for is_rxn_configured function."""
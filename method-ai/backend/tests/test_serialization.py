@@ -0,0 +1,140 @@
+"""Tests for the procedure response fast serialization path."""
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import (
+    PROCEDURE_DISCLAIMER,
+    ProcedureJSONResponse,
+    build_procedure_response,
+    encode_procedure_response,
+    encode_procedure_result,
+    to_procedure_response,
+)
+from app.models.records import ProcedureResult
+from app.models.schemas import (
+    ExperienceLevel,
+    GenerateProcedureResponse,
+    LabContext,
+    ProcedureStep,
+)
+from app.services.procedure_generator import generate_procedure
+
+
+@pytest.fixture
+def sample_result() -> ProcedureResult:
+    """Create a pipeline result from generated step records."""
+    lab_context = LabContext(
+        scale_mg=12.5,
+        equipment=["rotovap", "nmr"],
+        purification_methods=["column_chromatography"],
+        safety_constraints=["no_glovebox"],
+        experience_level=ExperienceLevel.UNDERGRAD,
+        time_budget_hours=3,
+    )
+    procedure = generate_procedure(
+        plan={"source": "placeholder", "target_smiles": "CCO", "steps": []},
+        lab_context=lab_context,
+    )
+    return ProcedureResult(
+        procedure=tuple(procedure),
+        risk_flags=["Flag with unicode: 10 °C – \"quoted\""],
+        fallback_options=["Fallback"],
+        citations=[],
+        request_id="req-001",
+    )
+
+
+@pytest.fixture
+def sample_response(sample_result: ProcedureResult) -> GenerateProcedureResponse:
+    """Create a response model from the sample result."""
+    return to_procedure_response(sample_result)
+
+
+def _default_render(response: GenerateProcedureResponse) -> bytes:
+    """Render a response the way FastAPI does by default."""
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+class TestEncodeProcedureResponse:
+    """Tests for encode_procedure_response."""
+
+    def test_matches_default_rendering(self, sample_response: GenerateProcedureResponse):
+        """Test output is byte-identical to the default FastAPI path."""
+        assert encode_procedure_response(sample_response) == _default_render(sample_response)
+
+    def test_non_default_constants_are_encoded(self):
+        """Test custom disclaimer and version values are still encoded."""
+        response = GenerateProcedureResponse(
+            procedure=[ProcedureStep(step_number=1, action="Act")],
+            disclaimer="Custom disclaimer",
+            version="9.9.9",
+            request_id="req-002",
+        )
+
+        assert encode_procedure_response(response) == _default_render(response)
+
+    def test_build_uses_standard_constants(self, sample_response: GenerateProcedureResponse):
+        """Test that built responses carry the standard disclaimer."""
+        assert sample_response.disclaimer == PROCEDURE_DISCLAIMER
+        assert sample_response.version == "0.1.0"
+
+
+class TestEncodeProcedureResult:
+    """Tests for encode_procedure_result."""
+
+    def test_matches_response_encoding(
+        self, sample_result: ProcedureResult, sample_response: GenerateProcedureResponse
+    ):
+        """Test that encoding records directly matches encoding the model."""
+        assert encode_procedure_result(sample_result) == encode_procedure_response(
+            sample_response
+        )
+
+    def test_response_class_renders_result(self, sample_result: ProcedureResult):
+        """Test that the response class renders a pipeline result."""
+        response = ProcedureJSONResponse(sample_result)
+
+        assert response.body == encode_procedure_result(sample_result)
+
+
+class TestToProcedureResponse:
+    """Tests for to_procedure_response."""
+
+    def test_converts_step_records(self, sample_response: GenerateProcedureResponse):
+        """Test that records become validated steps with plain dict parameters."""
+        step = sample_response.procedure[0]
+
+        assert isinstance(step, ProcedureStep)
+        assert type(step.parameters) is dict
+        assert step.parameters["ppe"]
+
+    def test_matches_direct_build(self, sample_response: GenerateProcedureResponse):
+        """Test that converting records encodes like building from models."""
+        direct = build_procedure_response(
+            procedure=[ProcedureStep(**step.model_dump()) for step in sample_response.procedure],
+            risk_flags=sample_response.risk_flags,
+            fallback_options=sample_response.fallback_options,
+            citations=sample_response.citations,
+            request_id=sample_response.request_id,
+        )
+
+        assert encode_procedure_response(sample_response) == encode_procedure_response(direct)
+
+
+class TestProcedureJSONResponse:
+    """Tests for ProcedureJSONResponse."""
+
+    def test_renders_model(self, sample_response: GenerateProcedureResponse):
+        """Test that the response class renders a model."""
+        response = ProcedureJSONResponse(sample_response)
+
+        assert response.media_type == "application/json"
+        assert response.body == encode_procedure_response(sample_response)
+
+    def test_passes_through_bytes(self):
+        """Test that pre-encoded bodies are sent unchanged."""
+        response = ProcedureJSONResponse(b'{"cached":true}')
+
+        assert response.body == b'{"cached":true}'
@@ -0,0 +1,148 @@
+"""Tests for the similar-target similarity index."""
+
+import operator
+from unittest.mock import patch
+
+from app.services.retrosynthesis_adapter import get_retrosynthesis_plan
+from app.services.similarity_index import SimilarityIndex, minhash_signature
+
+BUTYL = "CCCCOC(=O)c1ccc(Cl)cc1NC(C)=O"
+ISOBUTYL = "CC(C)COC(=O)c1ccc(Cl)cc1NC(C)=O"
+PENTYL = "CCCCCOC(=O)c1ccc(Cl)cc1NC(C)=O"
+
+
+def _plan(smiles: str) -> dict:
+    """Create an RXN-style plan."""
+    return {
+        "source": "ibm_rxn",
+        "target_smiles": smiles,
+        "steps": [{"rxn_smiles": f"{smiles}>>CC", "confidence": 0.9, "notes": ""}],
+    }
+
+
+class TestMinhashSignature:
+    """Tests for minhash_signature."""
+
+    def test_deterministic(self):
+        """Test that signatures are stable across calls."""
+        assert minhash_signature("CCOC(=O)c1ccccc1") == minhash_signature("CCOC(=O)c1ccccc1")
+
+    def test_fixed_length_for_short_input(self):
+        """Test that even a one-atom SMILES fills every bin."""
+        assert len(minhash_signature("C")) == 32
+        assert 0xFFFFFFFF not in minhash_signature("C")
+
+    def test_repeated_ngrams_count(self):
+        """Test that homologues differing only in chain length get different signatures."""
+        for first, second in (("CCCCCCCCCO", "CCCCCCCCO"), ("C" * 14, "C" * 12)):
+            matches = sum(map(operator.eq, minhash_signature(first), minhash_signature(second)))
+            assert matches < 32
+
+
+class TestSimilarityIndex:
+    """Tests for SimilarityIndex."""
+
+    def test_finds_near_identical_target(self):
+        """Test that an isomeric analogue finds its neighbour."""
+        index = SimilarityIndex(max_entries=100)
+        index.add(BUTYL, _plan("a"))
+        index.add("c1ccncc1", _plan("b"))
+
+        match = index.query(ISOBUTYL, threshold=0.5)
+
+        assert match is not None
+        neighbour, similarity, plan = match
+        assert neighbour == BUTYL
+        assert 0.5 <= similarity <= 1.0
+        assert plan["steps"][0]["rxn_smiles"] == "a>>CC"
+
+    def test_unrelated_target_not_matched(self):
+        """Test that dissimilar targets are not returned."""
+        index = SimilarityIndex(max_entries=100)
+        index.add(BUTYL, _plan("a"))
+
+        assert index.query("[Na+].[Cl-]", threshold=0.85) is None
+
+    def test_homologues_not_matched(self):
+        """Test that targets with another formula never lend their plan."""
+        index = SimilarityIndex(max_entries=100)
+        for smiles in ("CCCCCCCCO", "C" * 12, "CCN(CC)CC", BUTYL):
+            index.add(smiles, _plan(smiles))
+
+        for smiles in ("CCCCCCCCCO", "C" * 14, "CCCN(CCC)CCC", PENTYL):
+            assert index.query(smiles, threshold=0.0) is None
+
+    def test_excludes_exact_key(self):
+        """Test that a target is not its own neighbour."""
+        index = SimilarityIndex(max_entries=100)
+        index.add("CCO", _plan("a"))
+
+        assert index.query("CCO", threshold=0.0) is None
+
+    def test_respects_max_entries(self):
+        """Test that the index stops growing at its limit."""
+        index = SimilarityIndex(max_entries=2)
+        for smiles in ["CCO", "CCN", "CCC"]:
+            index.add(smiles, _plan(smiles))
+
+        assert len(index) == 2
+
+    def test_re_adding_updates_plan(self):
+        """Test that re-indexing a target replaces its plan."""
+        index = SimilarityIndex(max_entries=10)
+        index.add("CCCCCCCCO", _plan("old"))
+        index.add("CCCCCCCCO", _plan("new"))
+
+        _, _, plan = index.query("CCCCCCC(C)O", threshold=0.3)
+        assert len(index) == 1
+        assert plan["steps"][0]["rxn_smiles"] == "new>>CC"
+
+
+class TestSimilarTargetReuse:
+    """Tests for similar-target plan reuse in the retrosynthesis adapter."""
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    @patch("app.services.retrosynthesis_adapter.settings")
+    def test_reuses_neighbour_plan(self, mock_settings, mock_get_rxn):
+        """Test that an analogue gets the neighbour's plan without RXN."""
+        mock_settings.rxn_api_key = "test-key"
+        mock_settings.similarity_reuse_enabled = True
+        mock_settings.similarity_reuse_threshold = 0.6
+        mock_get_rxn.return_value = _plan(BUTYL)
+
+        get_retrosynthesis_plan(BUTYL)
+        plan = get_retrosynthesis_plan(ISOBUTYL)
+
+        assert mock_get_rxn.call_count == 1
+        assert plan["source"] == "similar_target"
+        assert plan["target_smiles"] == ISOBUTYL
+        assert plan["steps"] == _plan(BUTYL)["steps"]
+        assert plan["similarity"] >= 0.6
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    @patch("app.services.retrosynthesis_adapter.settings")
+    def test_homologue_calls_rxn(self, mock_settings, mock_get_rxn):
+        """Test that a homologue is planned by RXN instead of reusing a route."""
+        mock_settings.rxn_api_key = "test-key"
+        mock_settings.similarity_reuse_enabled = True
+        mock_settings.similarity_reuse_threshold = 0.6
+        mock_get_rxn.side_effect = _plan
+
+        get_retrosynthesis_plan(BUTYL)
+        plan = get_retrosynthesis_plan(PENTYL)
+
+        assert mock_get_rxn.call_count == 2
+        assert plan["source"] == "ibm_rxn"
+
+    @patch("app.services.retrosynthesis_adapter._get_rxn_plan")
+    @patch("app.services.retrosynthesis_adapter.settings")
+    def test_disabled_reuse_calls_rxn(self, mock_settings, mock_get_rxn):
+        """Test that disabling reuse always calls RXN."""
+        mock_settings.rxn_api_key = "test-key"
+        mock_settings.similarity_reuse_enabled = False
+        mock_get_rxn.return_value = _plan("x")
+
+        get_retrosynthesis_plan("CCCCOC(=O)c1ccc(Cl)cc1NC(=O)C")
+        get_retrosynthesis_plan("CCCCCOC(=O)c1ccc(Cl)cc1NC(=O)C")
+
+        assert mock_get_rxn.call_count == 2
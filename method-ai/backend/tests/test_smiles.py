@@ -0,0 +1,124 @@
+"""Tests for SMILES parsing and canonicalization utilities."""
+
+import pytest
+
+from app.utils.smiles import (
+    InvalidSmilesError,
+    canonicalize_smiles,
+    is_valid_smiles,
+    parse_smiles,
+    smiles_cache_key,
+    tokenize_smiles,
+)
+
+
+class TestTokenizeSmiles:
+    """Tests for tokenize_smiles."""
+
+    def test_splits_two_letter_atoms_and_brackets(self):
+        """Test that Cl, Br and bracket atoms are single tokens."""
+        assert tokenize_smiles("ClC[NH4+]Br") == ["Cl", "C", "[NH4+]", "Br"]
+
+    def test_splits_ring_labels(self):
+        """Test that ring labels, including %nn, are tokens."""
+        assert tokenize_smiles("C%12CC%12") == ["C", "%12", "C", "C", "%12"]
+
+    def test_rejects_unknown_characters(self):
+        """Test that unknown characters raise."""
+        with pytest.raises(InvalidSmilesError):
+            tokenize_smiles("CC>>O")
+
+
+class TestParseSmiles:
+    """Tests for parse_smiles."""
+
+    def test_builds_graph(self):
+        """Test atoms and bonds of a branched ring molecule."""
+        mol = parse_smiles("CC1=CC=CC=C1O")
+
+        assert len(mol.atoms) == 8
+        assert len(mol.bonds) == 8
+        assert sum(1 for bond in mol.bonds if bond.order == "=") == 3
+
+    def test_bracket_atom_fields(self):
+        """Test bracket atom isotope, hydrogens and charge."""
+        atom = parse_smiles("[13CH3-]").atoms[0]
+
+        assert atom.isotope == 13
+        assert atom.hcount == 3
+        assert atom.charge == -1
+
+    def test_detects_stereo(self):
+        """Test that stereo descriptors are detected."""
+        assert parse_smiles("C[C@H](O)N").has_stereo
+        assert parse_smiles("F/C=C/F").has_stereo
+        assert not parse_smiles("CC(O)N").has_stereo
+
+    @pytest.mark.parametrize(
+        "smiles",
+        ["", "C(C", "CC)", "C()C", "(C)", "C1CC", "C==C", "C=", "C.", ".C", "C11", "[Xy]", "C=1CC#1"],
+    )
+    def test_rejects_invalid_syntax(self, smiles: str):
+        """Test that syntax errors raise InvalidSmilesError."""
+        with pytest.raises(InvalidSmilesError):
+            parse_smiles(smiles)
+
+
+class TestCanonicalizeSmiles:
+    """Tests for canonicalize_smiles."""
+
+    @pytest.mark.parametrize(
+        "spellings",
+        [
+            ["OCC", "CCO", "C(O)C"],
+            ["C1=CC=CC=C1", "C=1C=CC=CC=1", "C1C=CC=CC=1"],
+            ["Oc1ccccc1", "c1ccccc1O", "c1cc(O)ccc1"],
+            ["CC(=O)OC1=CC=CC=C1C(=O)O", "OC(=O)C1=CC=CC=C1OC(C)=O"],
+            ["C1CCC(CC1)C1CCCCC1", "C1CCCCC1C2CCCCC2"],
+            ["[NH4+].[Cl-]", "[Cl-].[NH4+]"],
+            ["C1=CC=CC=C1", "c1ccccc1"],
+            ["C1=CC=NC=C1", "c1ccncc1"],
+            ["CC(=O)OC1=CC=CC=C1C(=O)O", "CC(=O)Oc1ccccc1C(=O)O"],
+            ["C1=CC=C2C=CC=CC2=C1", "C1=CC2=CC=CC=C2C=C1", "c1ccc2ccccc2c1"],
+        ],
+    )
+    def test_equivalent_spellings_match(self, spellings: list[str]):
+        """Test that different spellings of a molecule canonicalize equally."""
+        assert len({canonicalize_smiles(smiles) for smiles in spellings}) == 1
+
+    @pytest.mark.parametrize("smiles", ["O=C1C=CC(=O)C=C1", "C1=CCCC=C1", "C1=CC=CC=CC=C1"])
+    def test_non_aromatic_rings_kept(self, smiles: str):
+        """Test that quinones, dienes and other ring sizes are not made aromatic."""
+        assert canonicalize_smiles(smiles).isupper()
+
+    def test_canonical_form_is_stable(self):
+        """Test that canonicalizing a canonical SMILES is a no-op."""
+        canonical = canonicalize_smiles("CN1C=NC2=C1C(=O)N(C(=O)N2C)C")
+
+        assert canonicalize_smiles(canonical) == canonical
+
+    def test_strips_whitespace(self):
+        """Test that surrounding whitespace is ignored."""
+        assert canonicalize_smiles("  CCO\n") == canonicalize_smiles("OCC")
+
+    def test_invalid_raises(self):
+        """Test that invalid SMILES raise."""
+        with pytest.raises(InvalidSmilesError):
+            canonicalize_smiles("C1CC(")
+
+    def test_is_valid_smiles(self):
+        """Test the boolean validity helper."""
+        assert is_valid_smiles("CCO") is True
+        assert is_valid_smiles("C(") is False
+
+
+class TestSmilesCacheKey:
+    """Tests for smiles_cache_key."""
+
+    def test_uses_canonical_form(self):
+        """Test that equivalent SMILES share a key."""
+        assert smiles_cache_key("OCC") == smiles_cache_key("C(O)C")
+
+    def test_falls_back_for_invalid(self):
+        """Test that unparseable input falls back to the sanitized string."""
+        assert smiles_cache_key(" A>>B ") == "A>>B"
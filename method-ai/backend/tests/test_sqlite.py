@@ -0,0 +1,65 @@
+"""Tests for shared SQLite connection helpers."""
+
+import threading
+
+import pytest
+
+from app.utils.sqlite import SQLiteConnections, transaction
+
+SCHEMA = ["CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY)"]
+
+
+class TestSQLiteConnections:
+    """Tests for SQLiteConnections."""
+
+    def test_opens_with_schema(self, tmp_path):
+        """Test that a new file gets its directory, WAL journaling and schema."""
+        connections = SQLiteConnections(SCHEMA)
+        conn = connections.get(str(tmp_path / "nested" / "store.sqlite3"))
+
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
+        connections.close()
+
+    def test_reuses_per_thread(self, tmp_path):
+        """Test that a thread keeps its connection and other threads get their own."""
+        connections = SQLiteConnections(SCHEMA)
+        path = str(tmp_path / "store.sqlite3")
+        other = []
+        thread = threading.Thread(target=lambda: other.append(connections.get(path)))
+        thread.start()
+        thread.join()
+
+        assert connections.get(path) is connections.get(path)
+        assert other[0] is not connections.get(path)
+        connections.close()
+
+    def test_reopens_on_new_path(self, tmp_path):
+        """Test that pointing the store at another file opens a new connection."""
+        connections = SQLiteConnections(SCHEMA)
+        first = connections.get(str(tmp_path / "a.sqlite3"))
+        first.execute("INSERT INTO items VALUES ('a')")
+
+        second = connections.get(str(tmp_path / "b.sqlite3"))
+
+        assert second is not first
+        assert second.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
+        connections.close()
+
+
+class TestTransaction:
+    """Tests for transaction."""
+
+    def test_commits_or_rolls_back(self, tmp_path):
+        """Test that statements commit together and an error undoes them."""
+        connections = SQLiteConnections(SCHEMA)
+        conn = connections.get(str(tmp_path / "store.sqlite3"))
+
+        with transaction(conn):
+            conn.execute("INSERT INTO items VALUES ('a')")
+        with pytest.raises(RuntimeError), transaction(conn):
+            conn.execute("INSERT INTO items VALUES ('b')")
+            raise RuntimeError("abort")
+
+        assert conn.execute("SELECT name FROM items").fetchall() == [("a",)]
+        connections.close()
@@ -0,0 +1,128 @@
+"""Tests for molecular weights and reagent quantities."""
+
+import pytest
+
+from app.core.config import settings
+from app.models.schemas import LabContext
+from app.services.procedure_generator import generate_procedure
+from app.services.stoichiometry import reagent_quantities, route_factors
+from app.utils.formula import molecular_formula, molecular_weight
+from app.utils.smiles import InvalidSmilesError
+
+ACETANILIDE_ROUTE = [
+    "CC(=O)Cl.Nc1ccccc1>CCN(CC)CC>CC(=O)Nc1ccccc1",
+    "O=[N+]([O-])c1ccccc1.[H][H]>[Pd]>Nc1ccccc1",
+]
+
+
+class TestMolecularWeight:
+    """Tests for molecular_formula and molecular_weight."""
+
+    @pytest.mark.parametrize(
+        "smiles,formula",
+        [
+            ("CCO", {"C": 2, "H": 6, "O": 1}),
+            ("c1ccncc1", {"C": 5, "H": 5, "N": 1}),
+            ("c1ccsc1", {"C": 4, "H": 4, "S": 1}),
+            ("c1cc[nH]c1", {"C": 4, "H": 5, "N": 1}),
+            ("CS(=O)(=O)C", {"C": 2, "H": 6, "S": 1, "O": 2}),
+            ("C[N+](=O)[O-]", {"C": 1, "H": 3, "N": 1, "O": 2}),
+            ("[Na+].[Cl-]", {"Na": 1, "Cl": 1}),
+        ],
+    )
+    def test_formula_with_implicit_hydrogens(self, smiles, formula):
+        """Test that implicit hydrogens follow the lowest fitting valence."""
+        assert molecular_formula(smiles) == formula
+
+    def test_weights(self):
+        """Test weights against known values."""
+        assert molecular_weight("CC(=O)Oc1ccccc1C(=O)O") == pytest.approx(180.159, abs=0.01)
+        assert molecular_weight("OC(=O)C(=O)O.O.O") == pytest.approx(126.07, abs=0.01)
+        assert molecular_weight("[13CH4]") == pytest.approx(17.03, abs=0.01)
+
+    def test_invalid(self):
+        """Test that unparseable SMILES and wildcards raise."""
+        with pytest.raises(InvalidSmilesError):
+            molecular_weight("C1CC")
+        with pytest.raises(InvalidSmilesError):
+            molecular_weight("*CC")
+
+
+class TestReagentQuantities:
+    """Tests for reagent_quantities."""
+
+    def test_single_reaction(self):
+        """Test that each reactant is one equivalent of the target amount."""
+        ((acetyl_chloride, aniline),) = reagent_quantities(
+            ["CC(=O)Cl.Nc1ccccc1>>CC(=O)Nc1ccccc1"], [135.17]
+        )
+
+        assert acetyl_chloride[0] == "CC(=O)Cl"
+        assert acetyl_chloride[2] == pytest.approx(1.0, rel=1e-3)
+        assert acetyl_chloride[1] == pytest.approx(78.50, rel=1e-3)
+        assert aniline[1] == pytest.approx(93.13, rel=1e-3)
+
+    def test_intermediates_are_made_not_weighed(self):
+        """Test that a multi-step route lists only its starting materials, first used first."""
+        ((*quantities,),) = reagent_quantities(ACETANILIDE_ROUTE, [135.17])
+
+        assert [molecule for molecule, _, _ in quantities] == [
+            "O=[N+]([O-])c1ccccc1",
+            "[H][H]",
+            "CC(=O)Cl",
+        ]
+        assert all(mmol == pytest.approx(1.0, rel=1e-3) for _, _, mmol in quantities)
+
+    def test_scales_share_one_solution(self):
+        """Test that many scales are answered from one memoized route solution."""
+        route_factors.cache_clear()
+
+        small, large = reagent_quantities(ACETANILIDE_ROUTE, [10, 1000])
+
+        assert route_factors.cache_info().misses == 1
+        assert [mass * 100 for _, mass, _ in small] == pytest.approx(
+            [mass for _, mass, _ in large]
+        )
+
+    def test_assumed_yield(self, monkeypatch):
+        """Test that each reaction is scaled up by the assumed yield."""
+        monkeypatch.setattr(settings, "stoichiometry_assumed_yield", 0.5)
+        route_factors.cache_clear()
+        try:
+            ((*quantities,),) = reagent_quantities(ACETANILIDE_ROUTE, [135.17])
+        finally:
+            route_factors.cache_clear()
+
+        mmol = {molecule: amount for molecule, _, amount in quantities}
+        assert mmol["CC(=O)Cl"] == pytest.approx(2.0, rel=1e-3)
+        assert mmol["[H][H]"] == pytest.approx(4.0, rel=1e-3)
+
+    def test_unsolvable_routes(self):
+        """Test that routes without reactions or weights give no quantities."""
+        assert reagent_quantities([], [100]) == [[]]
+        assert reagent_quantities(["not a reaction"], [100]) == [[]]
+        assert reagent_quantities(["*C.CO>>CC"], [100]) == [[]]
+
+
+class TestWeighingStep:
+    """Tests for quantities in the weighing step."""
+
+    def test_weighing_step_lists_quantities(self):
+        """Test that the weighing step carries quantities for the requested scale."""
+        plan = {"source": "ibm_rxn", "steps": [{"rxn_smiles": ACETANILIDE_ROUTE[0]}]}
+        lab_context = LabContext(scale_mg=270.34, experience_level="grad", time_budget_hours=8)
+
+        weighing = generate_procedure(plan=plan, lab_context=lab_context)[3]
+
+        assert weighing.parameters["balance_type"] == "standard"
+        (acetyl_chloride, aniline) = weighing.parameters["quantities"]
+        assert acetyl_chloride == ("CC(=O)Cl", pytest.approx(157.0, rel=1e-3), 2.0001)
+        assert aniline == ("Nc1ccccc1", pytest.approx(186.3, rel=1e-3), 2.0001)
+
+    def test_placeholder_plan_has_no_quantities(self):
+        """Test that a plan without reactions keeps the plain weighing step."""
+        lab_context = LabContext(scale_mg=50, experience_level="grad", time_budget_hours=8)
+
+        weighing = generate_procedure(plan={"source": "placeholder"}, lab_context=lab_context)[3]
+
+        assert "quantities" not in weighing.parameters
@@ -0,0 +1,121 @@
+"""Tests for startup warm-up and readiness."""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.warmup import is_ready, mark_not_ready, run_warmup
+from app.main import app
+from app.services.retrosynthesis_adapter import (
+    _plan_cache,
+    load_plan_cache,
+    save_plan_cache,
+)
+
+
+class TestReadiness:
+    """Tests for the /ready endpoint."""
+
+    def test_not_ready_before_startup(self):
+        """Test that /ready fails until warm-up has run."""
+        mark_not_ready()
+        client = TestClient(app)
+
+        response = client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json() == {"ready": False}
+
+    def test_ready_after_startup(self):
+        """Test that /ready succeeds once the lifespan has started."""
+        with TestClient(app) as client:
+            response = client.get("/ready")
+
+        assert response.status_code == 200
+        assert response.json() == {"ready": True}
+        assert is_ready() is False
+
+    def test_health_independent_of_readiness(self):
+        """Test that liveness does not depend on warm-up."""
+        mark_not_ready()
+        client = TestClient(app)
+
+        assert client.get("/health").status_code == 200
+
+
+class TestRunWarmup:
+    """Tests for run_warmup."""
+
+    async def test_reports_phase_timings(self):
+        """Test that default phases run and are timed."""
+        timings = await run_warmup(app)
+        mark_not_ready()
+
+        assert {"preload_modules", "build_schemas", "load_caches"} <= set(timings)
+
+    async def test_synthetic_request_phase(self, monkeypatch):
+        """Test the optional end-to-end request phase."""
+        from app.core import warmup
+
+        monkeypatch.setattr(warmup.settings, "warmup_synthetic_request", True)
+
+        timings = await run_warmup(app)
+        mark_not_ready()
+
+        assert "synthetic_request" in timings
+
+    async def test_synthetic_request_leaves_no_trace(self, monkeypatch):
+        """Test that the synthetic request is not stored, registered or counted."""
+        from app.core import warmup
+
+        monkeypatch.setattr(warmup.settings, "warmup_synthetic_request", True)
+
+        with (
+            patch("app.services.pipeline.save_procedure_state") as save_state,
+            patch("app.services.pipeline.register_request_id") as register,
+            patch("app.services.pipeline.record_version") as record_version,
+            patch("app.services.pipeline.record_target_request") as record_target,
+        ):
+            timings = await run_warmup(app)
+        mark_not_ready()
+
+        assert "synthetic_request" in timings
+        save_state.assert_not_called()
+        register.assert_not_called()
+        record_version.assert_not_called()
+        record_target.assert_not_called()
+
+    async def test_failing_phase_still_marks_ready(self):
+        """Test that a failing phase does not block readiness."""
+        with patch("app.core.warmup.load_plan_cache", side_effect=OSError("disk")):
+            timings = await run_warmup(app)
+
+        assert "load_caches" not in timings
+        assert is_ready() is True
+        mark_not_ready()
+
+
+class TestPlanCacheSnapshot:
+    """Tests for plan cache persistence."""
+
+    def test_round_trip(self, isolated_storage):
+        """Test that saved plans are loaded back with their expiry."""
+        path = str(isolated_storage / "plans.jsonl")
+        _plan_cache.set("CCO", {"source": "ibm_rxn", "target_smiles": "CCO", "steps": []})
+
+        assert save_plan_cache(path) == 1
+        _plan_cache.clear()
+
+        assert load_plan_cache(path) == 1
+        assert _plan_cache.get("CCO")["source"] == "ibm_rxn"
+
+    def test_expired_entries_skipped(self, isolated_storage):
+        """Test that expired snapshot entries are not loaded."""
+        path = isolated_storage / "plans.jsonl"
+        path.write_text('{"key": "CCO", "plan": {}, "expires_at": 0}\n')
+
+        assert load_plan_cache(str(path)) == 0
+
+    def test_missing_snapshot(self, isolated_storage):
+        """Test that a missing snapshot loads nothing."""
+        assert load_plan_cache(str(isolated_storage / "missing.jsonl")) == 0